@@ -0,0 +1,33 @@
+"""025: full-text index over graph node text (tsvector + GIN)
+
+Revision ID: 025_graph_nodes_fts
+Revises: 024_demo_access_requests
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+
+
+revision = "025_graph_nodes_fts"
+down_revision = "024_demo_access_requests"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Только PostgreSQL: SQLite-базы получают FTS5 при create_all
+    # (src/core/graph_rag/text_index.py), без индекса поиск идёт через LIKE.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        "ALTER TABLE graph_nodes ADD COLUMN IF NOT EXISTS text_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('russian', coalesce(title, '') || ' ' || text)) STORED"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_graph_nodes_text_tsv ON graph_nodes USING gin (text_tsv)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_graph_nodes_text_tsv")
+    op.execute("ALTER TABLE graph_nodes DROP COLUMN IF EXISTS text_tsv")
@@ -0,0 +1,41 @@
+"""026: unique (source, target, type) for machine rule/fact graph edges
+
+Revision ID: 026_graph_edges_rule_fact_unique
+Revises: 025_graph_nodes_fts
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "026_graph_edges_rule_fact_unique"
+down_revision = "025_graph_nodes_fts"
+branch_labels = None
+depends_on = None
+
+RULE_FACT_EDGE = "extracted_by = 'rule' AND edge_class = 'fact'"
+
+
+def upgrade() -> None:
+    # Дубли, накопленные до индекса (повторные ссылки на тот же пункт в
+    # Фазе 1), — оставляем самое раннее ребро каждой тройки
+    op.execute(f"""
+        DELETE FROM graph_edges WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY source_id, target_id, edge_type ORDER BY created_at, id
+                ) AS rn
+                FROM graph_edges WHERE {RULE_FACT_EDGE}
+            ) ranked WHERE rn > 1
+        )
+    """)
+    op.create_index(
+        "uq_graph_edges_rule_fact", "graph_edges",
+        ["source_id", "target_id", "edge_type"], unique=True,
+        postgresql_where=sa.text(RULE_FACT_EDGE), sqlite_where=sa.text(RULE_FACT_EDGE),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_graph_edges_rule_fact", table_name="graph_edges")
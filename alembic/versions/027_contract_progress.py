@@ -0,0 +1,32 @@
+"""027: contract_progress — lightweight analysis progress channel
+
+Revision ID: 027_contract_progress
+Revises: 026_graph_edges_rule_fact_unique
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "027_contract_progress"
+down_revision = "026_graph_edges_rule_fact_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "contract_progress",
+        sa.Column(
+            "contract_id", sa.String(length=36),
+            sa.ForeignKey("contracts.id", ondelete="CASCADE"), primary_key=True,
+        ),
+        sa.Column("percent", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("message", sa.String(length=500), nullable=False, server_default=""),
+        sa.Column("updated_at", sa.DateTime(), nullable=True, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("contract_progress")
@@ -0,0 +1,157 @@
+"""028: content-addressed blobs for parsed XML / extracted text
+
+Moves contracts.meta_info['xml'] and contracts.parsed_text into
+content_blobs (keyed by SHA-256 of the UTF-8 content); the contract row
+keeps only xml_sha256 / text_sha256.
+
+Revision ID: 028_content_blobs
+Revises: 027_contract_progress
+Create Date: 2026-10-16
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "028_content_blobs"
+down_revision = "027_contract_progress"
+branch_labels = None
+depends_on = None
+
+BATCH = 200
+
+blobs = sa.table(
+    "content_blobs",
+    sa.column("sha256", sa.String),
+    sa.column("content", sa.Text),
+    sa.column("size", sa.Integer),
+    sa.column("created_at", sa.DateTime),
+)
+
+
+def _contracts(*extra):
+    return sa.table(
+        "contracts",
+        sa.column("id", sa.String),
+        sa.column("meta_info", sa.JSON),
+        sa.column("xml_sha256", sa.String),
+        sa.column("text_sha256", sa.String),
+        *extra,
+    )
+
+
+def _meta(raw):
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return None
+    return raw if isinstance(raw, dict) else None
+
+
+def _insert_ignore(bind):
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(blobs).on_conflict_do_nothing()
+
+
+def _batches(bind, query):
+    ids = [row[0] for row in bind.execute(query)]
+    for i in range(0, len(ids), BATCH):
+        yield ids[i:i + BATCH]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "content_blobs",
+        sa.Column("sha256", sa.String(length=64), primary_key=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True, server_default=sa.func.now()),
+    )
+    with op.batch_alter_table("contracts") as batch:
+        batch.add_column(sa.Column("xml_sha256", sa.String(length=64), nullable=True))
+        batch.add_column(sa.Column("text_sha256", sa.String(length=64), nullable=True))
+        batch.create_foreign_key("fk_contracts_xml_sha256", "content_blobs", ["xml_sha256"], ["sha256"])
+        batch.create_foreign_key("fk_contracts_text_sha256", "content_blobs", ["text_sha256"], ["sha256"])
+        batch.create_index("ix_contracts_text_sha256", ["text_sha256"])
+
+    bind = op.get_bind()
+    contracts = _contracts(sa.column("parsed_text", sa.Text))
+    candidates = sa.select(contracts.c.id).where(
+        sa.or_(contracts.c.meta_info.isnot(None), contracts.c.parsed_text.isnot(None))
+    ).order_by(contracts.c.id)
+    now = datetime.now(timezone.utc)
+
+    for ids in _batches(bind, candidates):
+        rows = bind.execute(
+            sa.select(contracts.c.id, contracts.c.meta_info, contracts.c.parsed_text)
+            .where(contracts.c.id.in_(ids))
+        ).all()
+        new_blobs, updates = {}, []
+        for contract_id, raw_meta, text in rows:
+            meta = _meta(raw_meta)
+            xml = meta.pop("xml", None) if meta is not None else None
+            values = {"_id": contract_id}
+            for column, content in (("xml_sha256", xml), ("text_sha256", text)):
+                if isinstance(content, str) and content:
+                    sha = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                    new_blobs[sha] = {"sha256": sha, "content": content,
+                                      "size": len(content.encode("utf-8")), "created_at": now}
+                    values[column] = sha
+            if xml is not None:
+                values["meta_info"] = meta
+            if len(values) > 1:
+                updates.append(values)
+        if new_blobs:
+            bind.execute(_insert_ignore(bind), list(new_blobs.values()))
+        for values in updates:
+            contract_id = values.pop("_id")
+            bind.execute(contracts.update().where(contracts.c.id == contract_id).values(**values))
+
+    with op.batch_alter_table("contracts") as batch:
+        batch.drop_column("parsed_text")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("contracts") as batch:
+        batch.add_column(sa.Column("parsed_text", sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    contracts = _contracts(sa.column("parsed_text", sa.Text))
+    candidates = sa.select(contracts.c.id).where(
+        sa.or_(contracts.c.xml_sha256.isnot(None), contracts.c.text_sha256.isnot(None))
+    ).order_by(contracts.c.id)
+    xml_blob, text_blob = blobs.alias("xml_blob"), blobs.alias("text_blob")
+
+    for ids in _batches(bind, candidates):
+        rows = bind.execute(
+            sa.select(contracts.c.id, contracts.c.meta_info, xml_blob.c.content, text_blob.c.content)
+            .select_from(
+                contracts
+                .outerjoin(xml_blob, xml_blob.c.sha256 == contracts.c.xml_sha256)
+                .outerjoin(text_blob, text_blob.c.sha256 == contracts.c.text_sha256)
+            )
+            .where(contracts.c.id.in_(ids))
+        ).all()
+        for contract_id, raw_meta, xml, text in rows:
+            values = {"parsed_text": text}
+            if xml is not None:
+                meta = _meta(raw_meta) or {}
+                meta["xml"] = xml
+                values["meta_info"] = meta
+            bind.execute(contracts.update().where(contracts.c.id == contract_id).values(**values))
+
+    with op.batch_alter_table("contracts") as batch:
+        batch.drop_index("ix_contracts_text_sha256")
+        batch.drop_constraint("fk_contracts_text_sha256", type_="foreignkey")
+        batch.drop_constraint("fk_contracts_xml_sha256", type_="foreignkey")
+        batch.drop_column("text_sha256")
+        batch.drop_column("xml_sha256")
+    op.drop_table("content_blobs")
@@ -25,6 +25,12 @@ class Settings(BaseSettings):
     # RAG feature flags
     rag_rewrite: bool = False   # RAG_REWRITE=1 → query rewriting via deepseek-chat
     rag_graph_hop: bool = False  # RAG_GRAPH_HOP=1 → multi-hop обогащение связанными нормами (граф)
+    rag_context_cache_ttl: int = 900  # TTL кеша get_legal_context (сек); 0 = не кешировать
+    rag_rewrite_cache_ttl: int = 86400  # TTL кеша LLM-рерайта запроса (сек); 0 = не кешировать
+    rag_rewrite_deadline: float = 3.0  # Сек. ожидания рерайта от начала поиска; позже — без рерайта; 0 = ждать всегда
+    rag_fts_deadline: float = 2.0  # Сек. ожидания FTS от начала поиска; позже — только плотный поиск; 0 = ждать всегда
+    rag_context_cache_size: int = 512  # Записей в кеше контекстов/рерайтов; 0 = кеш выключен
+    rag_collection_catalog_ttl: float = 60.0  # Сек. жизни кеша хэндлов/count() коллекций admin-KB
     qwen_api_key: str = ""
 
     # Google Gemini
@@ -55,6 +61,7 @@ class Settings(BaseSettings):
 
     # Redis (optional)
     redis_url: str = "redis://localhost:6379/0"
+    cache_serializer: Literal["json", "orjson", "msgpack"] = "json"  # Кодек значений CacheService в Redis
 
     # Bridge Integration (Legal AI Platform)
     bridge_secret: str = ""  # Shared secret для bridge API и SSO
@@ -74,6 +81,31 @@ class Settings(BaseSettings):
 
     # Full-text analysis — отправка всего текста договора в LLM
     full_text_analysis: bool = True  # True = двухпроходный (full-text + clause-level), False = только clause-level
+    risk_passes_concurrent: bool = True  # True = Pass 1 и Pass 2 выполняются одновременно, False = последовательно
+
+    # In-memory LLM response cache (first tier in front of the llm_cache table)
+    llm_memory_cache_enabled: bool = True
+    llm_memory_cache_max_entries: int = 2048
+    llm_memory_cache_max_bytes: int = 64 * 1024 * 1024  # 64 MB
+    llm_memory_cache_ttl: int = 0  # Секунды; 0 = без истечения (вытесняется только LRU)
+    llm_cache_hit_flush_interval: float = 30.0  # Как часто сбрасывать hit_count в llm_cache
+    llm_cache_hit_flush_batch: int = 200
+    llm_single_flight_enabled: bool = True  # Объединять одновременные одинаковые запросы в один вызов провайдера
+
+    # Native async LLM calls (acall/stream) over pooled keep-alive HTTP connections
+    llm_native_async: bool = True  # False = acall выполняет sync call() в _LLM_THREAD_POOL
+    llm_http_max_connections: int = 200  # Соединений на провайдера (на event loop)
+    llm_http_max_keepalive_connections: int = 50
+    llm_http_keepalive_expiry: float = 30.0  # Секунды простоя до закрытия keep-alive соединения
+    llm_http_provider_max_connections: dict = {"ollama": 4}  # Переопределения лимита по провайдерам
+
+    # LLM rate limiter (utils/rate_limiter)
+    llm_rate_limit_blocking: bool = False  # True = ждать в FIFO/priority очереди вместо RateLimitExceeded
+    llm_rate_limit_max_wait: float = 120.0  # Секунды ожидания в очереди; 0 = без ограничения
+    llm_rate_limit_tenant_rpm: int = 0  # Запросов в минуту на tenant; 0 = без sub-bucket
+    llm_rate_limit_tenant_tpm: int = 0  # Токенов в минуту на tenant; 0 = без sub-bucket
+    llm_rate_limit_backend: Literal["memory", "redis"] = "memory"  # redis = общий бюджет для всех воркеров
+    llm_rate_limit_redis_prefix: str = "ratelimit:llm:"
 
     # Test Mode - экономия токенов
     llm_test_mode: bool = False  # Переключатель: True = тестовый режим, False = продакшн
@@ -105,6 +137,12 @@ class Settings(BaseSettings):
     # RAG Settings
     rag_top_k: int = 5
     embedding_model: str = "paraphrase-multilingual-MiniLM-L12-v2"
+    rag_model_batch_wait_ms: float = 5.0  # Окно сбора micro-batch для encode/rerank; 0 = без ожидания
+    rag_model_max_batch: int = 64  # Максимум текстов/пар в одном micro-batch
+    rag_model_backend: Literal["torch", "onnx"] = "torch"  # onnx = ONNX Runtime на CPU (sentence-transformers[onnx])
+    rag_model_onnx_quantize: bool = True  # Динамическая int8-квантизация весов для onnx
+    rag_model_onnx_dir: str = "data/models/onnx"  # Кэш экспортированных/квантованных моделей
+    rag_model_threads: int = 0  # Потоков инференса (torch / ORT intra-op); 0 = по умолчанию библиотеки
 
     # Security — REQUIRED! Generate with: python -c "import secrets; print(secrets.token_urlsafe(32))"
     secret_key: str = ""
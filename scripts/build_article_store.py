@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Сворачивает data/article_texts.json (build_article_texts.py) и
+data/semantic_edges.json в data/article_store.db — SQLite с ключом
+(doc_id, article), из которого graph-hop admin_rag_retriever читает
+отдельные статьи, не загружая JSON целиком в каждый воркер.
+
+Идемпотентно: пересобирает файл заново и подменяет атомарно; запущенные
+процессы подхватывают новый .db по mtime. Перезапускать после
+build_article_texts.py и пересборки графа рёбер.
+
+  build_article_store.py [--texts data/article_texts.json]
+                         [--edges data/semantic_edges.json] [--out data/article_store.db]
+"""
+import os, sys, time, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.services.article_store import (
+    ARTICLE_STORE_PATH, ARTICLE_TEXTS_PATH, SEMANTIC_EDGES_PATH, build_article_store,
+)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", default=ARTICLE_TEXTS_PATH)
+    ap.add_argument("--edges", default=SEMANTIC_EDGES_PATH)
+    ap.add_argument("--out", default=ARTICLE_STORE_PATH)
+    args = ap.parse_args()
+    for path in (args.texts, args.edges):
+        if not os.path.exists(path):
+            print(f"нет {path} — соответствующие поля останутся пустыми", flush=True)
+    t0 = time.time()
+    stats = build_article_store(args.out, args.texts, args.edges)
+    print(f"ГОТОВО: {stats['articles']} статей ({stats['texts']} с текстом), "
+          f"{stats['edges']} рёбер → {args.out} "
+          f"({os.path.getsize(args.out) / 1e6:.1f} MB, {time.time() - t0:.1f}s)", flush=True)
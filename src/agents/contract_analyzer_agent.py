@@ -2,22 +2,26 @@
 """
 Contract Analyzer Agent - Deep analysis of contracts with risk identification
 """
+import contextvars
 import json
 import re
-from typing import Dict, Any, List, Optional
+from contextlib import ExitStack
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from lxml import etree
 from loguru import logger
 
 from .base_agent import BaseAgent, AgentResult
-from ..services.llm_gateway import LLMGateway
+from ..services.llm_gateway import LLMGateway, rate_limit_tenant_scope
 from ..services.template_manager import TemplateManager
 from ..services.counterparty_service import CounterpartyService
 from ..services.clause_extractor import ClauseExtractor
+from ..services.contract_document import ContractDocument
 from ..services.risk_analyzer import RiskAnalyzer
 from ..services.recommendation_generator import RecommendationGenerator
 from ..services.metadata_analyzer import MetadataAnalyzer
+from ..services.analysis_progress import set_progress
 from ..models.analyzer_models import (
     ContractRisk, ContractRecommendation, ContractAnnotation,
     ContractSuggestedChange
@@ -147,6 +151,7 @@ class ContractAnalyzerAgent(BaseAgent):
         - counterparty_data: Optional counterparty check results
         - next_action: 'review_queue' or 'export'
         """
+        tenant_scope = ExitStack()
         try:
             contract_id = state.get('contract_id')
             parsed_xml = state.get('parsed_xml')
@@ -180,34 +185,26 @@ class ContractAnalyzerAgent(BaseAgent):
                     error=f"Contract {contract_id} not found"
                 )
 
+            # Per-tenant RPM/TPM sub-bucket: organization, else the uploader.
+            # Scoped to this analysis: the gateway is shared between agents.
+            tenant_scope.enter_context(
+                rate_limit_tenant_scope(contract.organization_id or metadata.get('uploaded_by'))
+            )
+
             analysis = self._create_analysis_record(contract)
-            structure = self.clause_extractor.extract_structure(parsed_xml)
-            required_fields = self._extract_required_fields(parsed_xml)
+            # Parse once: every stage below reads cached views of the same document
+            document = ContractDocument.coerce(parsed_xml)
+            structure = self.clause_extractor.extract_structure(document)
+            required_fields = self._extract_required_fields(document)
 
             counterparty_data = None
             if check_counterparty:
-                counterparty_data = self.metadata_analyzer.check_counterparties(parsed_xml, metadata)
+                counterparty_data = self.metadata_analyzer.check_counterparties(document, metadata)
 
             def _update_progress(pct: int, msg: str):
-                """Update progress in contract meta_info for WS/polling."""
-                try:
-                    from sqlalchemy.orm.attributes import flag_modified
-                    meta = contract.meta_info or {}
-                    if not isinstance(meta, dict):
-                        import json as _j
-                        meta = _j.loads(meta) if meta else {}
-                    meta["_progress"] = pct
-                    meta["_progress_msg"] = msg
-                    contract.meta_info = meta
-                    flag_modified(contract, "meta_info")
-                    self.db.commit()
-                    logger.debug(f"Progress updated: {pct}% - {msg}")
-                except Exception as exc:
-                    logger.warning(f"Failed to update progress: {exc}")
-                    try:
-                        self.db.rollback()
-                    except Exception:
-                        pass
+                """Update progress in the contract_progress channel for WS/polling."""
+                set_progress(self.db, contract_id, pct, msg)
+                logger.debug(f"Progress updated: {pct}% - {msg}")
 
             self._progress_updater = _update_progress
 
@@ -216,9 +213,9 @@ class ContractAnalyzerAgent(BaseAgent):
                 _update_progress(35, "Поиск контекста в базе знаний...")
             else:
                 _update_progress(35, "База знаний пуста, пропускаем поиск контекста...")
-            rag_context = self._get_rag_context(parsed_xml, metadata, kb_available=kb_available)
+            rag_context = self._get_rag_context(document, metadata, kb_available=kb_available)
             detected_contract_type = infer_contract_type_from_xml(
-                parsed_xml,
+                document,
                 fallback=metadata.get('contract_type') or contract.contract_type,
                 file_name=contract.file_name,
             )
@@ -229,7 +226,7 @@ class ContractAnalyzerAgent(BaseAgent):
 
             _update_progress(40, "AI анализ: выявление рисков...")
             risks = self._identify_risks(
-                parsed_xml,
+                document,
                 structure,
                 rag_context,
                 counterparty_data,
@@ -253,7 +250,7 @@ class ContractAnalyzerAgent(BaseAgent):
 
             _update_progress(78, "Генерация предложений по изменениям...")
             suggested_changes = self.recommendation_generator.generate_suggested_changes(
-                parsed_xml, structure, risks, recommendations, rag_context, required_fields=required_fields
+                document, structure, risks, recommendations, rag_context, required_fields=required_fields
             )
             self._save_suggested_changes(analysis.id, contract.id, suggested_changes)
 
@@ -265,12 +262,12 @@ class ContractAnalyzerAgent(BaseAgent):
 
             _update_progress(88, "Прогноз вероятности споров...")
             dispute_prediction = self.metadata_analyzer.predict_disputes(
-                parsed_xml, risks, rag_context
+                document, risks, rag_context
             )
 
             _update_progress(92, "Сравнение с шаблонами...")
             template_comparison = self.metadata_analyzer.compare_with_templates(
-                parsed_xml, metadata.get('contract_type')
+                document, metadata.get('contract_type')
             )
 
             analysis.entities = json.dumps({
@@ -337,6 +334,8 @@ class ContractAnalyzerAgent(BaseAgent):
                 data={},
                 error=str(e)
             )
+        finally:
+            tenant_scope.close()
 
     def _create_analysis_record(self, contract: Contract) -> AnalysisResult:
         """Create analysis result record"""
@@ -422,32 +421,10 @@ class ContractAnalyzerAgent(BaseAgent):
             traceback.print_exc()
             return {}
 
-    def _extract_plain_text(self, xml_content: str) -> str:
+    def _extract_plain_text(self, xml_content: Union[str, ContractDocument]) -> str:
         """Convert normalized XML into stable plain text for full-document analysis."""
         try:
-            root = parse_xml_safely(xml_content)
-            clause_nodes = root.findall('.//clauses/clause')
-            chunks: List[str] = []
-
-            if clause_nodes:
-                for clause in clause_nodes:
-                    title = (clause.findtext('title', '') or '').strip()
-                    paragraphs = [
-                        ' '.join((paragraph.text or '').split())
-                        for paragraph in clause.findall('.//paragraph')
-                        if (paragraph.text or '').strip()
-                    ]
-                    clause_text = '\n'.join(part for part in [title, *paragraphs] if part).strip()
-                    if clause_text:
-                        chunks.append(clause_text)
-                if chunks:
-                    return '\n\n'.join(chunks)
-
-            for text in root.itertext():
-                cleaned = ' '.join((text or '').split())
-                if cleaned:
-                    chunks.append(cleaned)
-            return '\n'.join(chunks)
+            return ContractDocument.coerce(xml_content).plain_text
         except XMLSecurityError as exc:
             logger.warning(f"Plain text extraction blocked by XML security: {exc}")
             return ''
@@ -666,17 +643,14 @@ class ContractAnalyzerAgent(BaseAgent):
         return first_line or tag
 
     def _check_counterparties(
-        self, xml_content: str, metadata: Dict[str, Any]
+        self, xml_content: Union[str, ContractDocument], metadata: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Check counterparty information via APIs"""
         try:
-            root = parse_xml_safely(xml_content)
-            parties = root.findall('.//party')
-
             results = {}
-            for party in parties:
-                inn = party.findtext('inn', '').strip()
-                name = party.findtext('name', '')
+            for party in ContractDocument.coerce(xml_content).parties:
+                inn = party['inn'].strip()
+                name = party['name']
 
                 if inn:
                     logger.info(f"Checking counterparty: {name} (INN: {inn})")
@@ -725,13 +699,13 @@ class ContractAnalyzerAgent(BaseAgent):
             return False
 
     def _get_rag_context(
-        self, xml_content: str, metadata: Dict[str, Any], kb_available: Optional[bool] = None
+        self, xml_content: Union[str, ContractDocument], metadata: Dict[str, Any], kb_available: Optional[bool] = None
     ) -> Dict[str, Any]:
         """Get RAG context (analogues + precedents + legal norms) + contract summary"""
         try:
             # Извлекаем базовую информацию о договоре из XML
-            from lxml import etree
-            tree = parse_xml_safely(xml_content)
+            document = ContractDocument.coerce(xml_content)
+            tree = document.root
 
             # Извлекаем стороны
             parties = []
@@ -1295,7 +1269,7 @@ JSON формат:
 
     def _identify_risks(
         self,
-        xml_content: str,
+        xml_content: Union[str, ContractDocument],
         structure: Dict[str, Any],
         rag_context: Dict[str, Any],
         counterparty_data: Optional[Dict[str, Any]],
@@ -1306,9 +1280,16 @@ JSON формат:
         Two-pass risk analysis:
         Pass 1 - full-text review for systemic risks and cross-section issues.
         Pass 2 - clause-level review for concrete, localized risks.
+
+        With ``settings.risk_passes_concurrent`` Pass 1 runs in a background
+        thread while Pass 2 runs on the calling thread (which also owns progress
+        reporting and the DB session). Results are merged in the same order as
+        in sequential mode: full-text risks first, then clause-level risks.
         """
         from config.settings import settings
 
+        # Both passes read views of one parsed document
+        xml_content = ContractDocument.coerce(xml_content)
         all_risks: List[ContractRisk] = []
         self._full_text_analysis = None
         is_local_provider = self.risk_analyzer._is_local_provider()
@@ -1321,71 +1302,38 @@ JSON формат:
                 progress_updater(40, "Локальная LLM: анализируем по разделам без полного прохода...")
             logger.info("Skipping full-text analysis for local LLM provider")
 
+        full_text_future: Optional[Future] = None
+        full_text_executor: Optional[ThreadPoolExecutor] = None
         if use_full_text:
-            try:
-                plain_text = self._extract_plain_text(xml_content)
-                logger.info(f"Pass 1: Full-text analysis - {len(plain_text)} chars (~{len(plain_text)//4} tokens)")
-
-                full_text_result = self.risk_analyzer.analyze_full_text(
-                    plain_text=plain_text,
-                    rag_context=rag_context,
-                    company_conditions=company_conditions,
-                    analysis_context=analysis_context,
+            if getattr(settings, 'risk_passes_concurrent', False):
+                logger.info("Running Pass 1 and Pass 2 concurrently")
+                full_text_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="full-text-pass")
+                full_text_future = full_text_executor.submit(
+                    contextvars.copy_context().run,
+                    self._run_full_text_pass,
+                    xml_content,
+                    rag_context,
+                    company_conditions,
+                    analysis_context,
                 )
-                self._full_text_analysis = full_text_result
-                self._merge_required_fields_from_analyses([{
-                    'clause_id': 'full_text_analysis',
-                    'clause_title': 'Полнотекстовый анализ',
-                    'clause_xpath': '',
-                    'required_fields': full_text_result.get('required_fields', []),
-                }])
-
-                type_mapping = {
-                    'compliance': 'legal',
-                    'regulatory': 'legal',
-                    'contractual': 'legal',
-                    'process': 'operational',
-                    'business': 'operational',
-                }
-                severity_mapping = {
-                    'significant': 'high',
-                    'minor': 'low',
-                    'warning': 'medium',
-                }
-                allowed_types = {'financial', 'legal', 'operational', 'reputational', 'general'}
-                allowed_severities = {'critical', 'high', 'medium', 'low', 'info'}
-                allowed_probabilities = {'high', 'medium', 'low'}
-
-                for risk_data in full_text_result.get('risks', []):
-                    try:
-                        raw_type = (risk_data.get('type', risk_data.get('risk_type', 'legal')) or 'legal').lower()
-                        raw_severity = (risk_data.get('severity', 'medium') or 'medium').lower()
-                        raw_probability = (risk_data.get('probability', 'medium') or 'medium').lower()
-
-                        normalized_type = type_mapping.get(raw_type, raw_type)
-                        if normalized_type not in allowed_types:
-                            normalized_type = 'legal'
-                        normalized_severity = severity_mapping.get(raw_severity, raw_severity)
-                        if normalized_severity not in allowed_severities:
-                            normalized_severity = 'medium'
-
-                        risk = ContractRisk(
-                            risk_type=normalized_type,
-                            severity=normalized_severity,
-                            probability=raw_probability if raw_probability in allowed_probabilities else 'medium',
-                            title=risk_data.get('title', 'Риск')[:255],
-                            description=risk_data.get('description', ''),
-                            consequences=risk_data.get('consequences', ''),
-                            xpath_location='',
-                            section_name='full_text_analysis',
-                        )
-                        all_risks.append(risk)
-                    except Exception as exc:
-                        logger.error(f"Failed to create full-text risk: {exc}")
-
-                logger.info(f"Pass 1 complete: {len(all_risks)} risks from full-text analysis")
-            except Exception as exc:
-                logger.error(f"Full-text analysis failed, continuing with clause-level: {exc}")
+            else:
+                all_risks.extend(self._apply_full_text_pass(
+                    self._run_full_text_pass(xml_content, rag_context, company_conditions, analysis_context)
+                ))
+
+        def _join_full_text_pass() -> None:
+            nonlocal full_text_future
+            if full_text_future is None:
+                return
+            future, full_text_future = full_text_future, None
+            if not future.done():
+                progress_updater = getattr(self, '_progress_updater', None)
+                if callable(progress_updater):
+                    progress_updater(58, "AI анализ: завершение полнотекстового анализа...")
+            try:
+                all_risks[:0] = self._apply_full_text_pass(future.result())
+            finally:
+                full_text_executor.shutdown(wait=False)
 
         try:
             logger.info("Pass 2: Clause-level analysis...")
@@ -1394,6 +1342,7 @@ JSON формат:
 
             if not clauses:
                 logger.warning("No clauses extracted, falling back to legacy method")
+                _join_full_text_pass()
                 if not all_risks:
                     return self._identify_risks_legacy(
                         xml_content, structure, rag_context, counterparty_data, analysis_context
@@ -1427,6 +1376,7 @@ JSON формат:
             logger.info(f"Batch analysis returned {len(all_clause_analyses)} results")
 
             clause_risks = self.risk_analyzer.identify_risks(all_clause_analyses)
+            _join_full_text_pass()
             all_risks.extend(clause_risks)
 
             # Дедупликация: убираем дубли между Pass 1 и Pass 2
@@ -1452,6 +1402,7 @@ JSON формат:
             logger.error(f"Detailed risk identification failed: {exc}")
             import traceback
             traceback.print_exc()
+            _join_full_text_pass()
             if is_local_provider:
                 raise
             if not all_risks:
@@ -1460,6 +1411,96 @@ JSON формат:
                 )
             return all_risks
 
+    def _run_full_text_pass(
+        self,
+        xml_content: Union[str, ContractDocument],
+        rag_context: Dict[str, Any],
+        company_conditions: Optional[List[Dict[str, Any]]] = None,
+        analysis_context: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Pass 1: full-text LLM review.
+
+        Touches no agent state and no DB session, so it is safe to run in a
+        worker thread. Returns None if the pass failed.
+        """
+        try:
+            plain_text = self._extract_plain_text(xml_content)
+            logger.info(f"Pass 1: Full-text analysis - {len(plain_text)} chars (~{len(plain_text)//4} tokens)")
+
+            return self.risk_analyzer.analyze_full_text(
+                plain_text=plain_text,
+                rag_context=rag_context,
+                company_conditions=company_conditions,
+                analysis_context=analysis_context,
+            )
+        except Exception as exc:
+            logger.error(f"Full-text analysis failed, continuing with clause-level: {exc}")
+            return None
+
+    def _apply_full_text_pass(self, full_text_result: Optional[Dict[str, Any]]) -> List[ContractRisk]:
+        """Store the Pass 1 result on the agent and convert its risks to ContractRisk objects."""
+        if full_text_result is None:
+            return []
+
+        risks: List[ContractRisk] = []
+        try:
+            self._full_text_analysis = full_text_result
+            self._merge_required_fields_from_analyses([{
+                'clause_id': 'full_text_analysis',
+                'clause_title': 'Полнотекстовый анализ',
+                'clause_xpath': '',
+                'required_fields': full_text_result.get('required_fields', []),
+            }])
+
+            type_mapping = {
+                'compliance': 'legal',
+                'regulatory': 'legal',
+                'contractual': 'legal',
+                'process': 'operational',
+                'business': 'operational',
+            }
+            severity_mapping = {
+                'significant': 'high',
+                'minor': 'low',
+                'warning': 'medium',
+            }
+            allowed_types = {'financial', 'legal', 'operational', 'reputational', 'general'}
+            allowed_severities = {'critical', 'high', 'medium', 'low', 'info'}
+            allowed_probabilities = {'high', 'medium', 'low'}
+
+            for risk_data in full_text_result.get('risks', []):
+                try:
+                    raw_type = (risk_data.get('type', risk_data.get('risk_type', 'legal')) or 'legal').lower()
+                    raw_severity = (risk_data.get('severity', 'medium') or 'medium').lower()
+                    raw_probability = (risk_data.get('probability', 'medium') or 'medium').lower()
+
+                    normalized_type = type_mapping.get(raw_type, raw_type)
+                    if normalized_type not in allowed_types:
+                        normalized_type = 'legal'
+                    normalized_severity = severity_mapping.get(raw_severity, raw_severity)
+                    if normalized_severity not in allowed_severities:
+                        normalized_severity = 'medium'
+
+                    risk = ContractRisk(
+                        risk_type=normalized_type,
+                        severity=normalized_severity,
+                        probability=raw_probability if raw_probability in allowed_probabilities else 'medium',
+                        title=risk_data.get('title', 'Риск')[:255],
+                        description=risk_data.get('description', ''),
+                        consequences=risk_data.get('consequences', ''),
+                        xpath_location='',
+                        section_name='full_text_analysis',
+                    )
+                    risks.append(risk)
+                except Exception as exc:
+                    logger.error(f"Failed to create full-text risk: {exc}")
+
+            logger.info(f"Pass 1 complete: {len(risks)} risks from full-text analysis")
+        except Exception as exc:
+            logger.error(f"Full-text analysis failed, continuing with clause-level: {exc}")
+        return risks
+
     def _deduplicate_risks(self, risks: List) -> List:
         """Remove duplicate risks based on title similarity"""
         if len(risks) <= 1:
@@ -1512,7 +1553,7 @@ JSON формат:
             self._clause_analyses = []
         self._clause_analyses = analyses
 
-    def _extract_required_fields(self, xml_content: str) -> List[Dict[str, Any]]:
+    def _extract_required_fields(self, xml_content: Union[str, ContractDocument]) -> List[Dict[str, Any]]:
         """Extract explicit placeholders and blanks that must be filled by the user."""
         clauses = self.clause_extractor.extract_clauses(xml_content)
         required_fields: List[Dict[str, Any]] = []
@@ -1712,7 +1753,7 @@ JSON формат:
 
     def _identify_risks_legacy(
         self,
-        xml_content: str,
+        xml_content: Union[str, ContractDocument],
         structure: Dict[str, Any],
         rag_context: Dict[str, Any],
         counterparty_data: Optional[Dict[str, Any]],
@@ -1720,6 +1761,8 @@ JSON формат:
     ) -> List[ContractRisk]:
         logger.info("⚠️ DEBUG: _identify_risks_legacy called (OLD method, NO batching, EXPENSIVE!)")
         """Legacy risk identification method (fallback)"""
+        if isinstance(xml_content, ContractDocument):
+            xml_content = xml_content.xml_content
         try:
             # Prepare prompt
             prompt = self._build_risk_identification_prompt(
@@ -338,8 +338,7 @@ class QuickExportAgent(BaseAgent):
         return Path(contract.file_name or contract.file_path or '').suffix.lower()
 
     def _get_canonical_xml(self, contract: Contract) -> str:
-        meta_info = contract.meta_info if isinstance(contract.meta_info, dict) else {}
-        cached_xml = meta_info.get('xml') if isinstance(meta_info, dict) else None
+        cached_xml = contract.parsed_xml
         if isinstance(cached_xml, str) and cached_xml.strip():
             return cached_xml
 
@@ -25,6 +25,7 @@ from loguru import logger
 
 from src.models.database import get_db, Contract, AnalysisResult
 from src.models.auth_models import User
+from src.services.analysis_progress import get_progress, resolve_progress
 from src.utils.file_validator import (
     sanitize_filename,
     validate_file_extension,
@@ -262,16 +263,18 @@ async def bridge_progress(
     if not contract:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    # Прогресс хранится в meta_info._progress
+    # Прогресс пишется в contract_progress; meta_info._progress — у старых записей
+    recorded = get_progress(db, job_id)
     meta = {}
-    if contract.meta_info:
+    if recorded is None and contract.meta_info:
         try:
             meta = json.loads(contract.meta_info) if isinstance(contract.meta_info, str) else contract.meta_info
         except (json.JSONDecodeError, TypeError):
             pass
 
-    percent = meta.get("_progress", 0)
-    message = meta.get("_progress_msg", "")
+    percent, message = resolve_progress(recorded, meta)
+    percent = percent if percent is not None else 0
+    message = message or ""
 
     if contract.status == 'analyzed':
         percent = 100
@@ -23,7 +23,9 @@ from src.models.analyzer_models import ContractRecommendation
 from src.services.document_parser_extended import ExtendedDocumentParser
 from src.agents.contract_analyzer_agent import ContractAnalyzerAgent
 from src.services.llm_gateway import LLMGateway
+from src.services.llm_http_pool import run_with_llm_clients
 from src.services.quota_service import get_llm_quota
+from src.services.analysis_progress import set_progress
 from src.services.digital_service import DigitalContractService
 from src.services.clause_library_service import ClauseLibraryService
 from src.services.clause_extractor import ClauseExtractor
@@ -207,13 +209,11 @@ def _analyze_contract_sync(
         if not contract.file_path or not os.path.exists(contract.file_path):
             logger.error(f"Contract file not found: {contract.file_path}")
             contract.status = 'error'
-            meta = contract.meta_info or {}
-            if not isinstance(meta, dict):
-                import json as _json
-                meta = _json.loads(meta) if meta else {}
-            meta["_progress"] = 0
-            meta["_progress_msg"] = f"Файл не найден: {contract.file_name}. Загрузите документ повторно."
-            contract.meta_info = meta
+            set_progress(
+                db, contract_id, 0,
+                f"Файл не найден: {contract.file_name}. Загрузите документ повторно.",
+                commit=False,
+            )
             db.commit()
             return
 
@@ -231,22 +231,7 @@ def _analyze_contract_sync(
             logger.warning(f"Failed to load company conditions: {cond_err}")
 
         def _set_progress(pct: int, msg: str = ""):
-            try:
-                meta = _load_meta(contract.meta_info)
-                meta['_progress'] = pct
-                meta['_progress_msg'] = msg
-                if analysis_perspective:
-                    meta['analysis_perspective'] = analysis_perspective
-                if analysis_date:
-                    meta['analysis_date'] = analysis_date
-                contract.meta_info = meta
-                flag_modified(contract, 'meta_info')
-                db.commit()
-            except Exception:
-                try:
-                    db.rollback()
-                except Exception:
-                    pass
+            set_progress(db, contract_id, pct, msg)
 
         contract.status = 'parsing'
         _set_progress(5, 'Загрузка документа...')
@@ -263,10 +248,7 @@ def _analyze_contract_sync(
             logger.error(f"Failed to parse contract {contract_id}")
             return
 
-        meta = _load_meta(contract.meta_info)
-        meta['xml'] = parsed_xml if isinstance(parsed_xml, str) else str(parsed_xml)
-        contract.meta_info = meta
-        flag_modified(contract, 'meta_info')
+        contract.parsed_xml = parsed_xml if isinstance(parsed_xml, str) else str(parsed_xml)
         db.commit()
 
         _set_progress(20, 'Документ распознан, подготовка к анализу...')
@@ -288,7 +270,10 @@ def _analyze_contract_sync(
 
         _set_progress(30, 'AI анализ: выявление рисков...')
 
-        llm_gateway = LLMGateway(model=settings.llm_quick_model)
+        llm_gateway = LLMGateway(
+            model=settings.llm_quick_model,
+            rate_limit_tenant=contract.organization_id or user_id,
+        )
         agent = ContractAnalyzerAgent(llm_gateway=llm_gateway, db_session=db)
 
         result = agent.execute({
@@ -348,9 +333,9 @@ def _analyze_contract_sync(
             def _task_rag():
                 try:
                     if len(contract_text) > 100:
-                        from src.services.enhanced_rag import EnhancedRAGSystem, CHROMA_AVAILABLE
+                        from src.services.enhanced_rag import get_enhanced_rag, CHROMA_AVAILABLE
                         if CHROMA_AVAILABLE:
-                            rag = EnhancedRAGSystem()
+                            rag = get_enhanced_rag()
                             num_chunks = rag.add_contract_with_chunking(
                                 contract_id=contract_id,
                                 contract_text=contract_text,
@@ -641,11 +626,7 @@ async def cancel_analysis(
         raise HTTPException(status_code=409, detail="Анализ не запущен")
 
     contract.status = 'uploaded'
-    meta = _load_meta(contract.meta_info)
-    meta['_progress'] = 0
-    meta['_progress_msg'] = 'Анализ остановлен'
-    contract.meta_info = meta
-    flag_modified(contract, 'meta_info')
+    set_progress(db, contract_id, 0, 'Анализ остановлен', commit=False)
     db.commit()
     logger.info(f"Analysis cancelled for contract {contract_id} by user {current_user.id}")
     return {"ok": True, "message": "Анализ остановлен"}
@@ -683,7 +664,7 @@ async def analyze_contract_stream(
         )
     db.commit()
 
-    parsed_xml = (contract.meta_info or {}).get('xml')
+    parsed_xml = contract.parsed_xml
     if not parsed_xml:
         # Parse on the fly
         parser = ExtendedDocumentParser()
@@ -793,7 +774,7 @@ def _analyze_single_sync(contract_id: str, user_id: str, check_counterparty: boo
     await из синхронного потока → корутина создавалась и молча выбрасывалась,
     и весь batch тихо не делал ничего (RuntimeWarning: never awaited). Мы внутри
     asyncio.to_thread (отдельный поток без активного loop) → asyncio.run корректно
-    исполняет корутину до конца.
+    исполняет корутину до конца. Async-клиенты LLM, открытые на этом loop,
+    закрываются вместе с ним (run_with_llm_clients).
     """
-    import asyncio
-    asyncio.run(analyze_contract_background(contract_id, user_id, check_counterparty, None))
+    run_with_llm_clients(analyze_contract_background(contract_id, user_id, check_counterparty, None))
@@ -17,10 +17,11 @@ from sqlalchemy import select, func, or_, and_, exists
 from loguru import logger
 
 from src.models.database import get_async_db, AsyncSessionLocal
-from src.models import Contract, AnalysisResult, ContractParty, ContractRelation, Counterparty
+from src.models import ContentBlob, Contract, AnalysisResult, ContractParty, ContractRelation, Counterparty
 from src.models.auth_models import User
 from src.models.analyzer_models import ContractRisk, ContractRecommendation
 from src.api.dependencies import get_current_user, get_contract_with_access
+from src.services.analysis_progress import progress_query, resolve_progress
 
 from .schemas import ContractGroup, ContractListResponse
 
@@ -202,7 +203,12 @@ async def list_contracts(
                 or_(
                     Contract.file_name.ilike(like, escape="\\"),
                     Contract.contract_number.ilike(like, escape="\\"),
-                    Contract.parsed_text.ilike(like, escape="\\"),
+                    # Коррелированный EXISTS: сканируется только текстовый blob
+                    # самого договора-кандидата, не вся content_blobs
+                    exists(select(1).where(
+                        ContentBlob.sha256 == Contract.text_sha256,
+                        ContentBlob.content.ilike(like, escape="\\"),
+                    )),
                 )
             )
 
@@ -560,9 +566,11 @@ async def get_contract_details(
                     'analysis_perspective': risk_meta.get('analysis_perspective'),
                 }
 
-        meta = _load_meta(contract.meta_info)
-        progress = meta.get('_progress')
-        progress_message = meta.get('_progress_msg')
+        if _ASYNC_MODE:
+            recorded_progress = (await db.execute(progress_query(contract_id))).first()
+        else:
+            recorded_progress = db.execute(progress_query(contract_id)).first()
+        progress, progress_message = resolve_progress(recorded_progress, _load_meta(contract.meta_info))
 
         if progress is None and contract.status == 'completed':
             progress = 100
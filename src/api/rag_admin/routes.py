@@ -30,6 +30,7 @@ from src.models.auth_models import User
 from src.services.admin_rag_retriever import (
     COLLECTION_LABELS,
     COLLECTIONS,
+    bump_kb_index_version,
     get_collection as _get_collection_shared,
 )
 
@@ -179,6 +180,7 @@ def _invalidate_doc_counts() -> None:
     with _doc_count_lock:
         _doc_counts_dirty = True
     _stats_cache = None
+    bump_kb_index_version()  # и кеш get_legal_context (агент видит новый документ сразу)
 
 
 def _ensure_doc_counts_fresh() -> None:
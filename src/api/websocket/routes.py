@@ -20,6 +20,7 @@ from src.models import Contract, AnalysisResult
 from src.models.auth_models import User, UserSession
 from src.services.auth_service import AuthService
 from src.services.quota_service import get_contract_quota
+from src.services.analysis_progress import get_progress
 
 
 router = APIRouter()
@@ -229,16 +230,17 @@ async def websocket_analysis_updates(
             # Short-lived DB session for each poll — does not hold pool slot between polls
             poll_db = SessionLocal()
             try:
-                # Single query with joined load instead of two separate queries
-                contract = poll_db.query(Contract).filter(Contract.id == contract_id).first()
-                if not contract:
+                # Status column only — the poll needs nothing else from the contract row
+                row = poll_db.query(Contract.status).filter(Contract.id == contract_id).first()
+                if row is None:
                     break
+                current_status = row.status
 
                 analysis = poll_db.query(AnalysisResult).filter(
                     AnalysisResult.contract_id == contract_id
                 ).first()
 
-                current_status = contract.status
+                recorded_progress = get_progress(poll_db, contract_id)
                 risks_count = len(analysis.risks_by_category) if analysis and analysis.risks_by_category else 0
                 recs_count = len(analysis.recommendations) if analysis and analysis.recommendations else 0
 
@@ -249,7 +251,7 @@ async def websocket_analysis_updates(
             finally:
                 poll_db.close()
 
-            # Calculate progress — use granular progress from meta_info if available
+            # Calculate progress — use granular progress from the progress channel if available
             progress_map = {
                 'uploaded': 0,
                 'parsing': 10,
@@ -260,18 +262,10 @@ async def websocket_analysis_updates(
             progress = progress_map.get(current_status, 0)
             progress_msg = f"Статус: {current_status}"
 
-            # Read granular progress from contract meta_info
-            try:
-                meta = contract.meta_info
-                if meta and isinstance(meta, dict):
-                    granular = meta.get("_progress")
-                    if granular is not None and isinstance(granular, (int, float)):
-                        progress = int(granular)
-                    msg = meta.get("_progress_msg")
-                    if msg:
-                        progress_msg = msg
-            except Exception:
-                pass
+            if recorded_progress is not None:
+                progress, msg = recorded_progress
+                if msg:
+                    progress_msg = msg
 
             # Send status update
             update_message = {
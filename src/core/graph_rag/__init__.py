@@ -43,6 +43,7 @@ from .repository import (
     GraphEdgeRepository,
     CandidateEdgeRepository,
     GraphEntityRepository,
+    GraphBulkWriter,
 )
 
 from .pipeline import GraphRAGPipeline, IngestionResult
@@ -77,6 +78,7 @@ __all__ = [
     "GraphEdgeRepository",
     "CandidateEdgeRepository",
     "GraphEntityRepository",
+    "GraphBulkWriter",
     # Pipeline
     "GraphRAGPipeline",
     "IngestionResult",
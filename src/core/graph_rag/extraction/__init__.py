@@ -7,10 +7,15 @@ Graph-RAG Extraction
 
 from .reference_extractor import ReferenceExtractor, ExtractedReference
 from .entity_extractor import EntityExtractor, ExtractedEntity
+from .node_extractor import NodeTextExtractor, NodeExtraction
+from .scanner import KeywordScanner
 
 __all__ = [
     "ReferenceExtractor",
     "ExtractedReference",
     "EntityExtractor",
     "ExtractedEntity",
+    "NodeTextExtractor",
+    "NodeExtraction",
+    "KeywordScanner",
 ]
@@ -17,8 +17,9 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set
 
+from .scanner import KeywordScanner
 
 # ──────────────────────────────────────────────
 # Data classes
@@ -131,6 +132,35 @@ CONTRACT_TYPE_KEYWORDS = {
 }
 
 
+# Паттерны ключевых слов компилируются один раз, а не на каждый узел
+KEYWORD_PATTERNS = {
+    kw: re.compile(kw, re.IGNORECASE)
+    for keywords in (*CLAUSE_TYPE_KEYWORDS.values(), *CONTRACT_TYPE_KEYWORDS.values())
+    for kw in keywords
+}
+
+
+def _keyword_trigger(kw: str) -> str:
+    """Литеральный префикс ключевого слова: 'купл.*продаж' → 'купл'."""
+    return re.split(r'[.*+?\[\](){}|\\^$]', kw, maxsplit=1)[0]
+
+
+# Триггеры KeywordScanner: без них паттерн совпасть не может
+RE_YEAR_SUFFIX = re.compile(r'\.\d{4}')         # хвост RE_DATE_DMY: .2026
+
+ENTITY_TRIGGERS = {
+    'money_rub': ['руб', '₽'],
+    'money_usd': ['$', 'доллар', 'usd'],
+    'money_eur': ['€', 'евро', 'eur'],
+    'date_dmy': [RE_YEAR_SUFFIX],
+    'date_ru': list(MONTHS_RU),
+    'date_iso': [RE_DATE_ISO],
+    **{f'kw:{kw}': [_keyword_trigger(kw)] for kw in KEYWORD_PATTERNS},
+}
+
+ENTITY_SCANNER = KeywordScanner(ENTITY_TRIGGERS)
+
+
 def _parse_amount(text: str, currency: str = 'RUB') -> Optional[float]:
     """Парсинг суммы из текста: '75 000 000' → 75000000.0"""
     cleaned = text.replace(' ', '')
@@ -168,14 +198,21 @@ class EntityExtractor:
         # → [monetary(75000000, RUB), date_ref(2026-09-01, deadline)]
     """
 
-    def extract(self, text: str) -> List[ExtractedEntity]:
-        """Извлечь все сущности из текста."""
+    def extract(self, text: str, hits: Optional[Set[str]] = None) -> List[ExtractedEntity]:
+        """
+        Извлечь все сущности из текста.
+
+        hits — результат KeywordScanner.scan по этому тексту, если он уже
+        просканирован (NodeTextExtractor); иначе сканируем здесь.
+        """
+        if hits is None:
+            hits = ENTITY_SCANNER.scan(text)
         entities: List[ExtractedEntity] = []
 
-        entities.extend(self._extract_monetary(text))
-        entities.extend(self._extract_dates(text))
-        entities.extend(self._extract_clause_types(text))
-        entities.extend(self._extract_contract_types(text))
+        entities.extend(self._extract_monetary(text, hits))
+        entities.extend(self._extract_dates(text, hits))
+        entities.extend(self._extract_clause_types(text, hits))
+        entities.extend(self._extract_contract_types(text, hits))
 
         return entities
 
@@ -183,12 +220,12 @@ class EntityExtractor:
     # Monetary
     # ──────────────────────────────────────────
 
-    def _extract_monetary(self, text: str) -> List[ExtractedEntity]:
+    def _extract_monetary(self, text: str, hits: Set[str]) -> List[ExtractedEntity]:
         """Денежные суммы."""
         entities = []
 
         # Рубли
-        for m in RE_MONEY_RUB.finditer(text):
+        for m in (RE_MONEY_RUB.finditer(text) if 'money_rub' in hits else ()):
             amount = _parse_amount(m.group(1))
             if amount and amount > 0:
                 entities.append(ExtractedEntity(
@@ -200,7 +237,7 @@ class EntityExtractor:
                 ))
 
         # Доллары
-        for m in RE_MONEY_USD.finditer(text):
+        for m in (RE_MONEY_USD.finditer(text) if 'money_usd' in hits else ()):
             amt_str = m.group(1) or m.group(2)
             if amt_str:
                 amount = _parse_amount(amt_str, 'USD')
@@ -214,7 +251,7 @@ class EntityExtractor:
                     ))
 
         # Евро
-        for m in RE_MONEY_EUR.finditer(text):
+        for m in (RE_MONEY_EUR.finditer(text) if 'money_eur' in hits else ()):
             amt_str = m.group(1) or m.group(2)
             if amt_str:
                 amount = _parse_amount(amt_str, 'EUR')
@@ -233,12 +270,12 @@ class EntityExtractor:
     # Dates
     # ──────────────────────────────────────────
 
-    def _extract_dates(self, text: str) -> List[ExtractedEntity]:
+    def _extract_dates(self, text: str, hits: Set[str]) -> List[ExtractedEntity]:
         """Даты с определением контекста (начало, конец, дедлайн)."""
         entities = []
 
         # DD.MM.YYYY
-        for m in RE_DATE_DMY.finditer(text):
+        for m in (RE_DATE_DMY.finditer(text) if 'date_dmy' in hits else ()):
             dt = _parse_date_dmy(m.group(1), m.group(2), m.group(3))
             if dt:
                 date_type = self._determine_date_type(text, m.start())
@@ -251,7 +288,7 @@ class EntityExtractor:
                 ))
 
         # "1 сентября 2026"
-        for m in RE_DATE_RU.finditer(text):
+        for m in (RE_DATE_RU.finditer(text) if 'date_ru' in hits else ()):
             month_num = MONTHS_RU.get(m.group(2).lower())
             if month_num:
                 dt = _parse_date_dmy(m.group(1), str(month_num), m.group(3))
@@ -266,7 +303,7 @@ class EntityExtractor:
                     ))
 
         # YYYY-MM-DD (ISO)
-        for m in RE_DATE_ISO.finditer(text):
+        for m in (RE_DATE_ISO.finditer(text) if 'date_iso' in hits else ()):
             dt = _parse_date_dmy(m.group(3), m.group(2), m.group(1))
             if dt:
                 entities.append(ExtractedEntity(
@@ -297,15 +334,13 @@ class EntityExtractor:
     # Clause types
     # ──────────────────────────────────────────
 
-    def _extract_clause_types(self, text: str) -> List[ExtractedEntity]:
+    def _extract_clause_types(self, text: str, hits: Set[str]) -> List[ExtractedEntity]:
         """Типы клаузул (неустойка, гарантия и т.д.)."""
         entities = []
-        text_lower = text.lower()
 
         for clause_type, keywords in CLAUSE_TYPE_KEYWORDS.items():
             for kw in keywords:
-                pattern = re.compile(kw, re.IGNORECASE)
-                m = pattern.search(text)
+                m = KEYWORD_PATTERNS[kw].search(text) if f'kw:{kw}' in hits else None
                 if m:
                     entities.append(ExtractedEntity(
                         entity_type='clause_type',
@@ -322,14 +357,13 @@ class EntityExtractor:
     # Contract types
     # ──────────────────────────────────────────
 
-    def _extract_contract_types(self, text: str) -> List[ExtractedEntity]:
+    def _extract_contract_types(self, text: str, hits: Set[str]) -> List[ExtractedEntity]:
         """Типы договоров (поставка, аренда и т.д.)."""
         entities = []
 
         for contract_type, keywords in CONTRACT_TYPE_KEYWORDS.items():
             for kw in keywords:
-                pattern = re.compile(kw, re.IGNORECASE)
-                m = pattern.search(text)
+                m = KEYWORD_PATTERNS[kw].search(text) if f'kw:{kw}' in hits else None
                 if m:
                     entities.append(ExtractedEntity(
                         entity_type='contract_type',
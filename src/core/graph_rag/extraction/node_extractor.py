@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Node Text Extractor
+
+Ссылки и сущности узла за один просмотр текста: общий KeywordScanner
+ReferenceExtractor и EntityExtractor решает, какие паттерны запускать,
+дальше работают только они. Результат совпадает с отдельными вызовами
+ReferenceExtractor.extract / EntityExtractor.extract.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from .entity_extractor import ENTITY_SCANNER, EntityExtractor, ExtractedEntity
+from .reference_extractor import REFERENCE_SCANNER, ExtractedReference, ReferenceExtractor
+
+
+@dataclass
+class NodeExtraction:
+    """Ссылки и сущности одного текста."""
+    references: List[ExtractedReference] = field(default_factory=list)
+    entities: List[ExtractedEntity] = field(default_factory=list)
+
+
+class NodeTextExtractor:
+    """
+    Извлечение ссылок и сущностей из текстов узлов.
+
+    Использование:
+        extractor = NodeTextExtractor()
+        for ex in extractor.extract_batch(texts):
+            ex.references, ex.entities
+    """
+
+    scanner = REFERENCE_SCANNER + ENTITY_SCANNER
+
+    def __init__(
+        self,
+        ref_extractor: Optional[ReferenceExtractor] = None,
+        entity_extractor: Optional[EntityExtractor] = None,
+    ):
+        self.ref_extractor = ref_extractor or ReferenceExtractor()
+        self.entity_extractor = entity_extractor or EntityExtractor()
+
+    def extract(self, text: str) -> NodeExtraction:
+        """Ссылки и сущности одного текста."""
+        hits = self.scanner.scan(text)
+        return NodeExtraction(
+            references=self.ref_extractor.extract(text, hits),
+            entities=self.entity_extractor.extract(text, hits),
+        )
+
+    def extract_batch(self, texts: Iterable[str]) -> List[NodeExtraction]:
+        """Пакет текстов (узлы документа) — результаты в том же порядке."""
+        return [self.extract(text) for text in texts]
@@ -17,8 +17,9 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Tuple
+from typing import List, Optional, Dict, Set, Tuple
 
+from .scanner import KeywordScanner
 
 # ──────────────────────────────────────────────
 # Data classes для извлечённых ссылок
@@ -139,6 +140,21 @@ RE_TERM_DEF = re.compile(
     re.IGNORECASE
 )
 
+# Триггеры KeywordScanner: без них паттерн совпасть не может
+RE_DOTTED_NUMBER = re.compile(r'\d\.\d')
+
+REFERENCE_TRIGGERS = {
+    'norm_ref': [code.lower() for code in NPA_CODES],   # RE_NORM_ARTICLE, RE_NORM_IN_ACCORDANCE
+    'federal_law': ['федеральн', 'фз'],
+    'clause_ref': [RE_DOTTED_NUMBER],
+    'appendix_ref': ['приложени'],
+    'table_ref': ['таблиц'],
+    'gost_ref': ['гост'],
+    'defined_in': ['«', '"'],
+}
+
+REFERENCE_SCANNER = KeywordScanner(REFERENCE_TRIGGERS)
+
 
 # ──────────────────────────────────────────────
 # ReferenceExtractor
@@ -154,17 +170,31 @@ class ReferenceExtractor:
         # → [norm_ref(330, ГК РФ), clause_ref(4.2), appendix_ref(1)]
     """
 
-    def extract(self, text: str) -> List[ExtractedReference]:
-        """Извлечь все ссылки из текста."""
+    def extract(self, text: str, hits: Optional[Set[str]] = None) -> List[ExtractedReference]:
+        """
+        Извлечь все ссылки из текста.
+
+        hits — результат KeywordScanner.scan по этому тексту, если он уже
+        просканирован (NodeTextExtractor); иначе сканируем здесь.
+        """
+        if hits is None:
+            hits = REFERENCE_SCANNER.scan(text)
         refs: List[ExtractedReference] = []
 
-        refs.extend(self._extract_norm_refs(text))
-        refs.extend(self._extract_federal_laws(text))
-        refs.extend(self._extract_clause_refs(text))
-        refs.extend(self._extract_appendix_refs(text))
-        refs.extend(self._extract_table_refs(text))
-        refs.extend(self._extract_gost_refs(text))
-        refs.extend(self._extract_term_defs(text))
+        if 'norm_ref' in hits:
+            refs.extend(self._extract_norm_refs(text))
+        if 'federal_law' in hits:
+            refs.extend(self._extract_federal_laws(text))
+        if 'clause_ref' in hits:
+            refs.extend(self._extract_clause_refs(text))
+        if 'appendix_ref' in hits:
+            refs.extend(self._extract_appendix_refs(text))
+        if 'table_ref' in hits:
+            refs.extend(self._extract_table_refs(text))
+        if 'gost_ref' in hits:
+            refs.extend(self._extract_gost_refs(text))
+        if 'defined_in' in hits:
+            refs.extend(self._extract_term_defs(text))
 
         # Дедупликация по позиции (если перекрываются)
         refs = self._deduplicate(refs)
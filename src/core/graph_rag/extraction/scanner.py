@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Keyword Scanner
+
+Префильтр для экстракторов: по тексту узла определяет, какие regex-паттерны
+вообще могут сработать. Паттерн запускается, только если в тексте есть хотя
+бы один его триггер — фрагмент, без которого совпадение невозможно
+(ГОСТ → "гост", ссылка на пункт → цифра-точка-цифра).
+
+Буквенные триггеры ищутся подстрокой в одной lowercase-копии текста
+(C-поиск вместо IGNORECASE-regex на каждый паттерн), триггеры с цифрами —
+regex.search с выходом на первом совпадении. Символы, которые IGNORECASE
+сопоставляет буквам триггеров, а lower() в них не переводит (ſ, ı, ᲀ ...),
+отключают префильтр для такого текста — результат экстрактора всегда тот же,
+что при прогоне всех паттернов.
+"""
+from __future__ import annotations
+
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Pattern, Set, Union
+
+Trigger = Union[str, Pattern]
+
+# Буквы, которые могут встречаться в литеральных триггерах
+_FOLD_ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюяabcdefghijklmnopqrstuvwxyz"
+
+
+@lru_cache(maxsize=1)
+def _case_exceptions() -> str:
+    """Символы, равные букве алфавита под IGNORECASE, но не после lower()."""
+    universe = "".join(map(chr, range(sys.maxunicode + 1)))
+    found = re.findall(f"[{_FOLD_ALPHABET}]", universe, re.IGNORECASE)
+    return "".join(c for c in found if c.lower() not in _FOLD_ALPHABET)
+
+
+class KeywordScanner:
+    """
+    Какие правила могут сработать на тексте.
+
+    Использование:
+        scanner = KeywordScanner({'gost_ref': ['гост'], 'clause_ref': [re.compile(r'\\d\\.\\d')]})
+        scanner.scan("по ГОСТ 9353-2016")
+        # → {'gost_ref'}
+
+    Правило без совпавших триггеров можно не запускать. Правило с пустым
+    списком триггеров срабатывает всегда.
+    """
+
+    def __init__(self, triggers: Dict[str, Iterable[Trigger]]):
+        self.rules: Set[str] = set(triggers)
+        self._always: Set[str] = set()
+        self._literals: Dict[str, Set[str]] = {}
+        self._patterns: Dict[Pattern, Set[str]] = {}
+
+        for rule, rule_triggers in triggers.items():
+            rule_triggers = list(rule_triggers)
+            if not rule_triggers:
+                self._always.add(rule)
+            for trigger in rule_triggers:
+                if isinstance(trigger, str):
+                    if trigger != trigger.lower() or any(
+                        c.isalpha() and c not in _FOLD_ALPHABET for c in trigger
+                    ):
+                        raise ValueError(f"Trigger must be lowercase Cyrillic/Latin: {trigger!r}")
+                    self._literals.setdefault(trigger, set()).add(rule)
+                else:
+                    self._patterns.setdefault(trigger, set()).add(rule)
+
+    def __add__(self, other: "KeywordScanner") -> "KeywordScanner":
+        """Общий сканер для нескольких экстракторов (имена правил не пересекаются)."""
+        merged = KeywordScanner({})
+        for scanner in (self, other):
+            merged.rules |= scanner.rules
+            merged._always |= scanner._always
+            for literal, rules in scanner._literals.items():
+                merged._literals.setdefault(literal, set()).update(rules)
+            for pattern, rules in scanner._patterns.items():
+                merged._patterns.setdefault(pattern, set()).update(rules)
+        return merged
+
+    def scan(self, text: str) -> Set[str]:
+        """Имена правил, триггеры которых есть в тексте."""
+        if not text.isascii() and any(c in text for c in _case_exceptions()):
+            return set(self.rules)
+
+        hits = set(self._always)
+        lowered = text.lower()
+        for literal, rules in self._literals.items():
+            if literal in lowered:
+                hits |= rules
+        for pattern, rules in self._patterns.items():
+            if not rules <= hits and pattern.search(text):
+                hits |= rules
+        return hits
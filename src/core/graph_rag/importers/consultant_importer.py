@@ -17,6 +17,9 @@ date/edition_date). source_url содержит cons_doc_LAW_<id> = doc_id.
            (по doc_id из markdown-ссылок и по norm_ref-entities ГК/ТК/…),
            т.к. target нельзя связать пока он не загружен.
 
+Разбор + валидация идут в пуле из N процессов (--workers, по умолчанию
+ядра−1) и потоком отдают ParseResult единственному писателю в БД.
+
 CLI:
     python -m src.core.graph_rag.importers.consultant_importer --dry-run
     python -m src.core.graph_rag.importers.consultant_importer --kind kodeksy
@@ -26,14 +29,19 @@ from __future__ import annotations
 
 import argparse
 import logging
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from ..enums import EdgeType, EdgeClass, EdgeStatus, ExtractedBy, LayerType
-from ..models import GraphDocument, GraphEdge
+from ..models import GraphDocument, GraphEdge, GraphEntity, GraphNode
 from ..parser import NPAGraphParser
+from ..repository import GraphBulkWriter
 from .validator import validate_parse_result, ValidationReport
 
 logger = logging.getLogger(__name__)
@@ -155,6 +163,62 @@ def _load_all_models() -> None:
             logger.warning(f"_load_all_models: {mod} — {e}")
 
 
+_worker_parser: Optional[NPAGraphParser] = None
+
+
+def _parse_and_validate(path: Path, parser: Optional[NPAGraphParser] = None) -> Tuple:
+    """Разбор + обязательная валидация одного .md (выполняется в воркере пула).
+
+    Файл читается один раз: парсер и validate_parse_result получают одну строку.
+    Возвращает (path, parse_result, validation_report, error); при ошибке
+    разбора первые два — None, error — текст исключения.
+    """
+    global _worker_parser
+    if parser is None:
+        if _worker_parser is None:
+            _worker_parser = NPAGraphParser()
+        parser = _worker_parser
+    try:
+        raw = path.read_text(encoding='utf-8', errors='replace')
+        parse_result = parser.parse_markdown(raw, default_title=path.stem)
+    except Exception as e:
+        return path, None, None, str(e)
+    # body для валидации (без frontmatter)
+    body = re.sub(r'^---\n.*?\n---\n', '', raw, count=1, flags=re.DOTALL)
+    return path, parse_result, validate_parse_result(parse_result, body, file_label=path.name), None
+
+
+def _iter_parsed(files: List[Path], workers: int,
+                 parser: Optional[NPAGraphParser] = None) -> Iterator[Tuple]:
+    """_parse_and_validate по files в исходном порядке; workers > 1 — в пуле процессов.
+
+    Окно заданий ограничено (workers * 4): разобранные, но ещё не записанные
+    ParseResult крупных кодексов не копятся в памяти писателя.
+    """
+    if workers <= 1:
+        for path in files:
+            yield _parse_and_validate(path, parser)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        todo = iter(files)
+        pending = deque(pool.submit(_parse_and_validate, path)
+                        for path in islice(todo, workers * 4))
+        while pending:
+            result = pending.popleft().result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append(pool.submit(_parse_and_validate, nxt))
+            yield result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def default_workers() -> int:
+    """Ядра − 1 (одно — писателю в БД), минимум 1."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
 def _normcode_from_title(title: str) -> Optional[str]:
     for rx, code in TITLE_TO_NORMCODE:
         if rx.search(title):
@@ -194,16 +258,18 @@ class ConsultantImporter:
     """Импорт НПА из ~/consultant-data в graph_rag.
 
     db=None → dry-run (только parse + валидация, без записи в граф).
+    bulk=True → Фаза 1 пишет узлы/рёбра/entities/аудит bulk-вставкой
+    (GraphBulkWriter), а не ORM-объектом на строку.
     """
 
-    def __init__(self, db=None, data_root: Path = DATA_ROOT):
+    def __init__(self, db=None, data_root: Path = DATA_ROOT, bulk: bool = True):
         self.db = db
         self.data_root = data_root
         self.parser = NPAGraphParser()
         self.pipeline = None
         if db is not None:
             from ..pipeline import GraphRAGPipeline
-            self.pipeline = GraphRAGPipeline(db)
+            self.pipeline = GraphRAGPipeline(db, bulk=bulk)
         # doc_id → graph_document_id (для Фазы 2)
         self._docid_to_gdoc: Dict[str, str] = {}
         # norm_code → graph_document_id
@@ -250,7 +316,9 @@ class ConsultantImporter:
     def import_all(self, kinds: Optional[List[str]] = None,
                    dry_run: bool = False, limit: Optional[int] = None,
                    no_phase2: bool = False, update: bool = False,
-                   only_docids: Optional[set] = None) -> ImportReport:
+                   only_docids: Optional[set] = None, workers: int = 1) -> ImportReport:
+        """Фаза 1 (+ Фаза 2). workers > 1 — разбор/валидация в пуле процессов,
+        запись в БД — здесь же, в одном потоке, по транзакции на документ."""
         if not dry_run and self.pipeline is not None:
             _load_all_models()  # полный SQLAlchemy-registry до первого запроса
         files = self.discover(kinds)
@@ -275,22 +343,16 @@ class ConsultantImporter:
         if limit:
             files = files[:limit]
         rep = ImportReport(total_files=len(files))
-        logger.info(f'Найдено файлов: {len(files)} (dry_run={dry_run})')
+        logger.info(f'Найдено файлов: {len(files)} (dry_run={dry_run}, workers={workers})')
 
-        for i, path in enumerate(files, 1):
-            try:
-                parse_result = self.parser.parse_file(str(path))
-            except Exception as e:
-                logger.error(f'[{i}/{len(files)}] PARSE FAIL {path.name}: {e}')
+        parsed = _iter_parsed(files, workers, self.parser)
+        for i, (path, parse_result, vrep, error) in enumerate(parsed, 1):
+            if error is not None:
+                logger.error(f'[{i}/{len(files)}] PARSE FAIL {path.name}: {error}')
                 rep.failed += 1
                 continue
 
-            # body для валидации (без frontmatter)
-            raw = path.read_text(encoding='utf-8')
-            body = re.sub(r'^---\n.*?\n---\n', '', raw, count=1, flags=re.DOTALL)
-
-            # ОБЯЗАТЕЛЬНАЯ автопроверка
-            vrep = validate_parse_result(parse_result, body, file_label=path.name)
+            # ОБЯЗАТЕЛЬНАЯ автопроверка (выполнена в _parse_and_validate)
             rep.reports.append(vrep)
             logger.info(f'[{i}/{len(files)}] {vrep.summary()}')
             if not vrep.ok:
@@ -341,16 +403,18 @@ class ConsultantImporter:
         Карты целей (doc_id→gdoc, norm_code→gdoc) строятся из ВСЕХ активных НПА
         в графе, поэтому ссылки только что залитых документов резолвятся на уже
         существующие (напр. ФКЗ → ранее залитый ГК/УК). Источники — узлы текущего
-        запуска (чтобы не пересканировать весь граф). Дедуп по существующим рёбрам.
+        запуска (чтобы не пересканировать весь граф).
 
         (А) norm_ref-entities (ГК РФ ст.330 …) → REGULATED_BY на статью цели.
         (Б) inline-ссылки [..](/document/cons_doc_LAW_X/..) → REFERENCES на цель.
+
+        Цели резолвятся по индексам (gdoc, номер)→узел и gdoc→корень, каждый —
+        одним запросом; рёбра пишутся bulk-вставкой INSERT … ON CONFLICT DO
+        NOTHING (uq_graph_edges_rule_fact), т.е. дедуп — в БД, а не в памяти.
         """
         if self.pipeline is None:
             return 0
-        repo = self.pipeline.repo
         db = self.pipeline.db
-        created = 0
 
         # Карты целей из ВСЕЙ БД
         docid_all: Dict[str, str] = {}
@@ -378,92 +442,106 @@ class ConsultantImporter:
 
         # Источники — gdoc'и текущего запуска (если карта пуста — берём все НПА)
         src_gdocs = set(self._docid_to_gdoc.values()) or set(docid_all.values())
-        # node_id → True для узлов источников (для фильтра (А))
-        src_node_ids = set()
-        roots_by_gdoc: Dict[str, str] = {}
-        nodes_by_gdoc: Dict[str, list] = {}
-        for gd in src_gdocs:
-            nodes = repo.nodes.get_by_document(gd)
-            nodes_by_gdoc[gd] = nodes
-            for n in nodes:
-                src_node_ids.add(n.id)
-                if n.node_type == 'document':
-                    roots_by_gdoc[gd] = n.id
-
-        # корень любого целевого документа (кэш)
-        root_cache: Dict[str, Optional[str]] = {}
-        def _root(gdoc: str) -> Optional[str]:
-            if gdoc in root_cache:
-                return root_cache[gdoc]
-            roots = [n.id for n in repo.nodes.get_by_document(gdoc)
-                     if n.node_type == 'document']
-            root_cache[gdoc] = roots[0] if roots else None
-            return root_cache[gdoc]
-
-        # Существующие рёбра (дедуп)
-        existing = set()
-        for s, t, et in db.query(GraphEdge.source_id, GraphEdge.target_id,
-                                 GraphEdge.edge_type).filter(
-                GraphEdge.edge_type.in_([EdgeType.REGULATED_BY.value,
-                                         EdgeType.REFERENCES.value])):
-            existing.add((s, t, et))
+        if not src_gdocs:
+            return 0
+
+        # (А) norm_ref-entities узлов-источников → (источник, gdoc цели, статья)
+        targets: List[Tuple[object, str, str]] = []
+        wanted_numbers = set()
+        entities = (db.query(GraphEntity)
+                    .join(GraphNode, GraphNode.id == GraphEntity.node_id)
+                    .filter(GraphEntity.entity_type == 'norm_ref',
+                            GraphNode.document_id.in_(src_gdocs),
+                            GraphNode.is_archived == False)
+                    .all())
+        # код цели → сущности, в norm_code которых он входит (ILIKE '%код%', как
+        # find_norm_references); коды считаем один раз на различное значение
+        codes_for: Dict[str, List[str]] = {}
+        by_code: Dict[str, list] = {}
+        for ent in entities:
+            value = (ent.norm_code or '').lower()
+            if value not in codes_for:
+                codes_for[value] = [nc for nc in normcode_all if nc.lower() in value]
+            for nc in codes_for[value]:
+                by_code.setdefault(nc, []).append(ent)
+        for norm_code, target_gdoc in normcode_all.items():
+            for ent in by_code.get(norm_code, ()):
+                targets.append((ent, norm_code, target_gdoc))
+                if ent.norm_article:
+                    wanted_numbers.update((ent.norm_article, f'ст. {ent.norm_article}'))
+
+        # Индексы целей: (gdoc, номер) → узел и gdoc → корень
+        by_number: Dict[Tuple[str, str], str] = {}
+        if wanted_numbers:
+            for node_id, gdoc, number in (
+                    db.query(GraphNode.id, GraphNode.document_id, GraphNode.number)
+                    .filter(GraphNode.document_id.in_(set(normcode_all.values())),
+                            GraphNode.number.in_(wanted_numbers),
+                            GraphNode.is_archived == False)
+                    .order_by(GraphNode.level, GraphNode.position)):
+                by_number.setdefault((gdoc, number), node_id)
+        root_of: Dict[str, str] = {}
+        for node_id, gdoc in (db.query(GraphNode.id, GraphNode.document_id)
+                              .join(GraphDocument, GraphDocument.id == GraphNode.document_id)
+                              .filter(GraphNode.node_type == 'document',
+                                      GraphNode.is_archived == False,
+                                      GraphDocument.layer == LayerType.NPA.value,
+                                      GraphDocument.status == 'active')):
+            root_of.setdefault(gdoc, node_id)
+
+        writer = GraphBulkWriter(db, skip_duplicate_edges=True)
 
         def _add_edge(src, tgt, etype, conf, evidence, rationale):
-            nonlocal created
-            if not tgt or src == tgt or (src, tgt, etype) in existing:
+            if not tgt or src == tgt:
                 return
-            repo.edges.create(
+            writer.edges.create(
                 actor='importer', source_id=src, target_id=tgt,
                 edge_type=etype, edge_class=EdgeClass.FACT.value,
                 status=EdgeStatus.MACHINE_EXTRACTED.value,
                 extracted_by=ExtractedBy.RULE.value,
                 confidence=conf, evidence=evidence, rationale=rationale,
             )
-            existing.add((src, tgt, etype))
-            created += 1
 
-        # (А) norm_ref entities → REGULATED_BY (источник из текущего запуска)
-        for norm_code, target_gdoc in normcode_all.items():
-            for ent in repo.entities.find_norm_references(norm_code=norm_code):
-                if ent.node_id not in src_node_ids:
-                    continue
-                target_node = None
-                if ent.norm_article:
-                    target_node = (repo.nodes.find_by_number(target_gdoc, ent.norm_article)
-                                   or repo.nodes.find_by_number(target_gdoc, f'ст. {ent.norm_article}'))
-                tgt = target_node.id if target_node else _root(target_gdoc)
-                _add_edge(ent.node_id, tgt, EdgeType.REGULATED_BY.value,
-                          float(ent.confidence or 0.8), ent.raw_text,
-                          f'norm_ref → {norm_code} ст.{ent.norm_article}')
+        for ent, norm_code, target_gdoc in targets:
+            tgt = None
+            if ent.norm_article:
+                tgt = (by_number.get((target_gdoc, ent.norm_article))
+                       or by_number.get((target_gdoc, f'ст. {ent.norm_article}')))
+            _add_edge(ent.node_id, tgt or root_of.get(target_gdoc), EdgeType.REGULATED_BY.value,
+                      float(ent.confidence or 0.8), ent.raw_text,
+                      f'norm_ref → {norm_code} ст.{ent.norm_article}')
 
         # (Б) inline-ссылки cons_doc_LAW → REFERENCES (источник из текущего запуска)
         # (В) текстовые реквизиты подзаконки → REFERENCES на акт-цель
-        for gd, nodes in nodes_by_gdoc.items():
-            for node in nodes:
-                if not node.text:
-                    continue
-                if 'cons_doc_LAW_' in node.text:
-                    for m in _DOC_LINK_RE.finditer(node.text):
-                        tgt_gdoc = docid_all.get(m.group(1))
-                        if not tgt_gdoc or tgt_gdoc == gd:
-                            continue
-                        _add_edge(node.id, _root(tgt_gdoc), EdgeType.REFERENCES.value,
-                                  0.95, m.group(0)[:200],
-                                  f'inline-ссылка → cons_doc_LAW_{m.group(1)}')
-                # (В) «Постановлением Правительства РФ от ДАТА N НОМЕР» текстом
-                if subord_by_req and ('равительств' in node.text or 'резидент' in node.text):
-                    for m in _SUBORD_REQ_RE.finditer(node.text):
-                        kind = _subord_kind(m.group(1), m.group(2))
-                        if not kind:
-                            continue
-                        key = (kind, m.group(3), m.group(4).rstrip('.').lower())
-                        tgt_gdoc = subord_by_req.get(key)
-                        if not tgt_gdoc or tgt_gdoc == gd:
-                            continue
-                        _add_edge(node.id, _root(tgt_gdoc), EdgeType.REFERENCES.value,
-                                  0.9, m.group(0)[:200],
-                                  f'реквизит → {kind} от {m.group(3)} N {m.group(4)}')
-
+        for node_id, gd, text in (db.query(GraphNode.id, GraphNode.document_id, GraphNode.text)
+                                  .filter(GraphNode.document_id.in_(src_gdocs),
+                                          GraphNode.is_archived == False)
+                                  .order_by(GraphNode.document_id, GraphNode.level, GraphNode.position)):
+            if not text:
+                continue
+            if 'cons_doc_LAW_' in text:
+                for m in _DOC_LINK_RE.finditer(text):
+                    tgt_gdoc = docid_all.get(m.group(1))
+                    if not tgt_gdoc or tgt_gdoc == gd:
+                        continue
+                    _add_edge(node_id, root_of.get(tgt_gdoc), EdgeType.REFERENCES.value,
+                              0.95, m.group(0)[:200],
+                              f'inline-ссылка → cons_doc_LAW_{m.group(1)}')
+            # (В) «Постановлением Правительства РФ от ДАТА N НОМЕР» текстом
+            if subord_by_req and ('равительств' in text or 'резидент' in text):
+                for m in _SUBORD_REQ_RE.finditer(text):
+                    kind = _subord_kind(m.group(1), m.group(2))
+                    if not kind:
+                        continue
+                    key = (kind, m.group(3), m.group(4).rstrip('.').lower())
+                    tgt_gdoc = subord_by_req.get(key)
+                    if not tgt_gdoc or tgt_gdoc == gd:
+                        continue
+                    _add_edge(node_id, root_of.get(tgt_gdoc), EdgeType.REFERENCES.value,
+                              0.9, m.group(0)[:200],
+                              f'реквизит → {kind} от {m.group(3)} N {m.group(4)}')
+
+        created = writer.flush().get(GraphEdge.__tablename__, 0)
         logger.info(f'Фаза 2: создано cross-document рёбер: {created}')
         return created
 
@@ -491,6 +569,10 @@ def main():
                          'удаляются целиком и перезаливаются (обновление редакций).')
     ap.add_argument('--only-docids', default='',
                     help='Через запятую: обрабатывать только эти doc_id (точечно).')
+    ap.add_argument('--workers', type=int, default=default_workers(),
+                    help='Процессов на разбор/валидацию (по умолч. ядра−1; 1 — без пула).')
+    ap.add_argument('--no-bulk', action='store_true',
+                    help='Фаза 1 через ORM по объекту (медленно; для сверки с bulk-режимом).')
     args = ap.parse_args()
 
     db = None
@@ -498,7 +580,7 @@ def main():
         from src.models.database import SessionLocal
         db = SessionLocal()
     try:
-        importer = ConsultantImporter(db=db)
+        importer = ConsultantImporter(db=db, bulk=not args.no_bulk)
         if args.relink:
             _load_all_models()
             n = importer.resolve_cross_document_edges()
@@ -508,7 +590,7 @@ def main():
             only = set(x.strip() for x in args.only_docids.split(',') if x.strip())
             importer.import_all(kinds=args.kind, dry_run=args.dry_run, limit=args.limit,
                                 no_phase2=args.no_phase2, update=args.update,
-                                only_docids=only or None)
+                                only_docids=only or None, workers=args.workers)
     finally:
         if db is not None:
             db.close()
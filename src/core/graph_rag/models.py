@@ -8,7 +8,7 @@ Graph-RAG SQLAlchemy Models
 from datetime import datetime, timezone
 from sqlalchemy import (
     Boolean, Column, String, Text, Integer, Float,
-    DateTime, ForeignKey, CheckConstraint, Index, JSON
+    DateTime, ForeignKey, CheckConstraint, Index, JSON, event, text as sql_text
 )
 from sqlalchemy.orm import relationship
 
@@ -218,6 +218,9 @@ class NodeVersion(Base):
 # GraphEdge — связь между узлами (verified)
 # ──────────────────────────────────────────────
 
+_RULE_FACT_EDGE = "extracted_by = 'rule' AND edge_class = 'fact'"
+
+
 class GraphEdge(Base):
     """
     Связь между узлами графа.
@@ -287,6 +290,10 @@ class GraphEdge(Base):
         Index("ix_graph_edges_source_type", "source_id", "edge_type"),
         Index("ix_graph_edges_target_type", "target_id", "edge_type"),
         Index("ix_graph_edges_valid_from_to", "valid_from", "valid_to"),
+        # Машинные rule/fact-рёбра не дублируются: Фаза 2 импорта пишет их
+        # INSERT ... ON CONFLICT DO NOTHING против этого индекса
+        Index("uq_graph_edges_rule_fact", "source_id", "target_id", "edge_type", unique=True,
+              postgresql_where=sql_text(_RULE_FACT_EDGE), sqlite_where=sql_text(_RULE_FACT_EDGE)),
     )
 
     def __repr__(self):
@@ -469,6 +476,18 @@ class RAGAuditLog(Base):
         return f"<RAGAuditLog(action={self.action}, entity={self.entity_type}:{self.entity_id[:8]})>"
 
 
+# ──────────────────────────────────────────────
+# Full-text index (FTS5 / tsvector, см. text_index.py)
+# ──────────────────────────────────────────────
+
+def _install_node_text_index(target, connection, **kw):
+    from .text_index import install_node_text_index
+    install_node_text_index(connection)
+
+
+event.listen(GraphNode.__table__, "after_create", _install_node_text_index)
+
+
 # ──────────────────────────────────────────────
 # Exports
 # ──────────────────────────────────────────────
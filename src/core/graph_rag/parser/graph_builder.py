@@ -4,6 +4,7 @@ Graph Builder
 
 Сохраняет ParseResult (дерево ParsedNode) в БД как GraphDocument + GraphNode + GraphEdge.
 Автоматически создаёт structural edges: parent_child, adjacent_to, contains.
+В bulk-режиме узлы/версии/рёбра/аудит пишутся GraphBulkWriter — по INSERT на таблицу.
 """
 from __future__ import annotations
 
@@ -14,7 +15,7 @@ from sqlalchemy.orm import Session
 
 from .base_parser import ParseResult, ParsedNode
 from ..models import GraphDocument, GraphNode, GraphEdge
-from ..repository import GraphRepository
+from ..repository import GraphRepository, GraphBulkWriter
 from ..enums import (
     EdgeType, EdgeClass, EdgeStatus, ExtractedBy,
     AuditAction, DocumentStatus,
@@ -32,11 +33,15 @@ class GraphBuilder:
         builder = GraphBuilder(db)
         document = builder.build(result, source_file="contract.docx")
         builder.commit()
+
+        # Крупные НПА (тысячи статей/частей): bulk-вставка
+        builder = GraphBuilder(db, bulk=True)
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, bulk: bool = False):
         self.db = db
         self.repo = GraphRepository(db)
+        self.bulk = bulk
 
     def build(
         self,
@@ -74,11 +79,14 @@ class GraphBuilder:
         )
 
         # 2. Рекурсивно сохраняем дерево узлов
+        sink = GraphBulkWriter(self.db) if self.bulk else self.repo
         node_map: Dict[int, GraphNode] = {}  # id(ParsedNode) → GraphNode
-        self._save_node_tree(doc, parse_result.root, parent_id=None, node_map=node_map)
+        self._save_node_tree(doc, parse_result.root, parent_id=None, node_map=node_map, sink=sink)
 
         # 3. Создаём structural edges
-        self._create_structural_edges(parse_result.root, node_map)
+        self._create_structural_edges(parse_result.root, node_map, sink=sink)
+        if self.bulk:
+            sink.flush()
 
         # 4. Обновляем статистику документа
         self.repo.documents.update_stats(doc.id)
@@ -95,9 +103,11 @@ class GraphBuilder:
         parsed_node: ParsedNode,
         parent_id: Optional[str],
         node_map: Dict[int, GraphNode],
+        sink=None,
     ) -> GraphNode:
         """Рекурсивно сохранить дерево ParsedNode → GraphNode."""
-        db_node = self.repo.nodes.create(
+        sink = sink or self.repo
+        db_node = sink.nodes.create(
             actor="parser",
             document_id=doc.id,
             layer=doc.layer,
@@ -115,7 +125,7 @@ class GraphBuilder:
 
         # Рекурсия по дочерним
         for child in parsed_node.children:
-            self._save_node_tree(doc, child, parent_id=db_node.id, node_map=node_map)
+            self._save_node_tree(doc, child, parent_id=db_node.id, node_map=node_map, sink=sink)
 
         return db_node
 
@@ -123,6 +133,7 @@ class GraphBuilder:
         self,
         root: ParsedNode,
         node_map: Dict[int, GraphNode],
+        sink=None,
     ):
         """
         Создание structural edges для всего дерева:
@@ -130,12 +141,13 @@ class GraphBuilder:
         - adjacent_to: между соседними узлами (одного родителя)
         - contains: от document/section к вложенным элементам
         """
-        self._create_edges_recursive(root, node_map)
+        self._create_edges_recursive(root, node_map, sink=sink or self.repo)
 
     def _create_edges_recursive(
         self,
         parsed_node: ParsedNode,
         node_map: Dict[int, GraphNode],
+        sink,
     ):
         """Рекурсивное создание structural edges."""
         db_node = node_map.get(id(parsed_node))
@@ -151,7 +163,7 @@ class GraphBuilder:
                 continue
 
             # parent_child edge
-            self.repo.edges.create(
+            sink.edges.create(
                 actor="parser",
                 source_id=db_node.id,
                 target_id=child_db.id,
@@ -164,7 +176,7 @@ class GraphBuilder:
 
             # adjacent_to edge (между соседними)
             if prev_child_db is not None:
-                self.repo.edges.create(
+                sink.edges.create(
                     actor="parser",
                     source_id=prev_child_db.id,
                     target_id=child_db.id,
@@ -178,14 +190,14 @@ class GraphBuilder:
             prev_child_db = child_db
 
             # Рекурсия
-            self._create_edges_recursive(child, node_map)
+            self._create_edges_recursive(child, node_map, sink)
 
         # contains edge: section/document содержит все дочерние
         if db_node.node_type in ('document', 'section', 'chapter', 'title', 'article') and children:
             for child in children:
                 child_db = node_map.get(id(child))
                 if child_db:
-                    self.repo.edges.create(
+                    sink.edges.create(
                         actor="parser",
                         source_id=db_node.id,
                         target_id=child_db.id,
@@ -138,9 +138,12 @@ class NPAGraphParser(BaseDocumentGraphParser):
         """
         with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
             raw = f.read()
+        return self.parse_markdown(raw, default_title=Path(file_path).stem)
 
+    def parse_markdown(self, raw: str, default_title: str = "Без названия") -> ParseResult:
+        """Распарсить уже прочитанный .md (frontmatter + тело), см. _parse_md."""
         fm, body = self._split_frontmatter(raw)
-        title = fm.get('title') or Path(file_path).stem
+        title = fm.get('title') or default_title
         # Многострочный title (название НПА переносится) — схлопываем
         title = ' '.join(title.split())
 
@@ -13,6 +13,9 @@ Graph-RAG Ingestion Pipeline
     result = pipeline.ingest_file("contract.docx", layer="contract")
     # result.document — GraphDocument
     # result.nodes_count, result.edges_count, result.entities_count
+
+    # Массовая загрузка (кодексы, ConsultantImporter): bulk-вставка по таблицам
+    pipeline = GraphRAGPipeline(db, bulk=True)
 """
 from __future__ import annotations
 
@@ -27,9 +30,11 @@ from .enums import (
     LayerType, EdgeType, EdgeClass, EdgeStatus, ExtractedBy, AuditAction,
 )
 from .models import GraphDocument, GraphNode, GraphEdge, GraphEntity
-from .repository import GraphRepository
+from .repository import GraphRepository, GraphBulkWriter
 from .parser import ContractGraphParser, NPAGraphParser, GraphBuilder, ParseResult
-from .extraction import ReferenceExtractor, EntityExtractor, ExtractedReference, ExtractedEntity
+from .extraction import (
+    ReferenceExtractor, EntityExtractor, ExtractedReference, ExtractedEntity, NodeTextExtractor,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -81,14 +86,16 @@ class GraphRAGPipeline:
         result = pipeline.ingest_xml(xml_content, title="...", contract_id="...")
     """
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, bulk: bool = False):
         self.db = db
         self.repo = GraphRepository(db)
+        self.bulk = bulk
         self.contract_parser = ContractGraphParser()
         self.npa_parser = NPAGraphParser()
-        self.builder = GraphBuilder(db)
+        self.builder = GraphBuilder(db, bulk=bulk)
         self.ref_extractor = ReferenceExtractor()
         self.entity_extractor = EntityExtractor()
+        self.node_extractor = NodeTextExtractor(self.ref_extractor, self.entity_extractor)
 
     # ──────────────────────────────────────────
     # Public API
@@ -191,14 +198,23 @@ class GraphRAGPipeline:
                 for n in db_nodes
                 if n.text and n.node_type not in ('document',)
             ]
+            # Ссылки и сущности — один просмотр текста узла на оба шага
+            for node_info, extracted in zip(
+                node_texts, self.node_extractor.extract_batch(n['text'] for n in node_texts)
+            ):
+                node_info['refs'] = extracted.references
+                node_info['entities'] = extracted.entities
 
             # Step 3: Extract references → fact edges
-            fact_edges = self._extract_and_create_edges(doc, node_texts, db_nodes)
+            sink = GraphBulkWriter(self.db) if self.bulk else self.repo
+            fact_edges = self._extract_and_create_edges(doc, node_texts, db_nodes, sink)
             result.fact_edges_count = fact_edges
 
             # Step 4: Extract entities → GraphEntity
-            entities = self._extract_and_create_entities(node_texts)
+            entities = self._extract_and_create_entities(node_texts, sink)
             result.entities_count = entities
+            if self.bulk:
+                sink.flush()
 
             # Step 5: Update stats
             self.repo.documents.update_stats(doc.id)
@@ -233,8 +249,10 @@ class GraphRAGPipeline:
         doc: GraphDocument,
         node_texts: List[Dict],
         db_nodes: List[GraphNode],
+        sink=None,
     ) -> int:
         """Извлечь ссылки и создать fact edges."""
+        sink = sink or self.repo
         # Индексы для быстрого поиска
         number_to_node: Dict[str, GraphNode] = {}
         appendix_to_node: Dict[str, GraphNode] = {}
@@ -249,9 +267,12 @@ class GraphRAGPipeline:
                 table_to_node[n.number] = n
 
         created = 0
+        # (source, target, type) уже созданных рёбер: повторная ссылка на тот же
+        # пункт не даёт второго ребра (уникальный индекс uq_graph_edges_rule_fact)
+        seen = set()
 
         for node_info in node_texts:
-            refs = self.ref_extractor.extract(node_info['text'])
+            refs = node_info['refs'] if 'refs' in node_info else self.ref_extractor.extract(node_info['text'])
             source_id = node_info['node_id']
 
             for ref in refs:
@@ -265,8 +286,10 @@ class GraphRAGPipeline:
 
                 if target_node:
                     # Intra-document edge: source → target
-                    if source_id != target_node.id:
-                        self.repo.edges.create(
+                    key = (source_id, target_node.id, edge_type.value)
+                    if source_id != target_node.id and key not in seen:
+                        seen.add(key)
+                        sink.edges.create(
                             actor="parser",
                             source_id=source_id,
                             target_id=target_node.id,
@@ -283,7 +306,7 @@ class GraphRAGPipeline:
                     # External reference (e.g., norm_ref to an NPA not in the graph)
                     # Store as entity for now, edge will be created when NPA is ingested
                     if ref.ref_type == 'norm_ref' and ref.norm_code:
-                        self.repo.entities.create(
+                        sink.entities.create(
                             node_id=source_id,
                             entity_type='norm_ref',
                             entity_value=f"{ref.norm_code} ст. {ref.article}" if ref.article else ref.norm_code,
@@ -321,15 +344,17 @@ class GraphRAGPipeline:
     # Step 4: Entities → GraphEntity
     # ──────────────────────────────────────────
 
-    def _extract_and_create_entities(self, node_texts: List[Dict]) -> int:
+    def _extract_and_create_entities(self, node_texts: List[Dict], sink=None) -> int:
         """Извлечь сущности и сохранить в БД."""
+        sink = sink or self.repo
         created = 0
 
         for node_info in node_texts:
-            entities = self.entity_extractor.extract(node_info['text'])
+            entities = (node_info['entities'] if 'entities' in node_info
+                        else self.entity_extractor.extract(node_info['text']))
 
             for ent in entities:
-                self.repo.entities.create(
+                sink.entities.create(
                     node_id=node_info['node_id'],
                     entity_type=ent.entity_type,
                     entity_value=ent.entity_value,
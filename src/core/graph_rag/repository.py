@@ -12,7 +12,7 @@ from typing import List, Optional, Dict, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
-from sqlalchemy import text, and_, or_, func, literal_column
+from sqlalchemy import text, and_, or_, func, literal_column, insert
 from sqlalchemy.orm import Session, joinedload
 
 from .models import (
@@ -23,6 +23,7 @@ from .enums import (
     EdgeClass, EdgeStatus, ExtractedBy, ChangeType,
     ChangedBy, AuditAction, ParseStatus, DocumentStatus,
 )
+from .text_index import node_text_index_available, search_nodes
 
 
 # ──────────────────────────────────────────────
@@ -240,7 +241,9 @@ class GraphNodeRepository:
                 .first())
 
     def search_text(self, document_id: str, query: str, limit: int = 20) -> List[GraphNode]:
-        """Полнотекстовый поиск по узлам документа (LIKE для MVP)."""
+        """Полнотекстовый поиск по узлам документа (FTS-индекс, без него — LIKE)."""
+        if node_text_index_available(self.db):
+            return [node for node, _ in search_nodes(self.db, query, document_ids=[document_id], limit=limit)]
         pattern = f"%{query}%"
         return (self.db.query(GraphNode)
                 .filter(GraphNode.document_id == document_id,
@@ -574,6 +577,171 @@ class GraphEntityRepository:
         return q.all()
 
 
+# ──────────────────────────────────────────────
+# Bulk ingestion
+# ──────────────────────────────────────────────
+
+class BulkRow(dict):
+    """Строка bulk-вставки: dict для executemany + атрибутный доступ как у ORM-объекта."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class _BulkNodes:
+    def __init__(self, writer: "GraphBulkWriter"):
+        self.writer = writer
+
+    def create(self, actor: str = "parser", **kwargs) -> BulkRow:
+        """Как GraphNodeRepository.create: узел + первая версия + аудит."""
+        node = self.writer.add(GraphNode, **kwargs)
+        self.writer.add(
+            NodeVersion,
+            node_id=node.id,
+            version_number=1,
+            text=node.text,
+            meta_info=node.meta_info,
+            valid_from=datetime.now(timezone.utc),
+            changed_by=ChangedBy.SYSTEM,
+            change_type=ChangeType.NEW,
+        )
+        self.writer.audit(AuditAction.NODE_CREATED, "graph_node", node.id,
+                          actor=actor,
+                          context={"document_id": node.document_id, "node_type": node.node_type,
+                                   "number": node.number})
+        return node
+
+
+class _BulkEdges:
+    def __init__(self, writer: "GraphBulkWriter"):
+        self.writer = writer
+
+    def create(self, actor: str = "parser", **kwargs) -> BulkRow:
+        """Как GraphEdgeRepository.create: ребро + аудит."""
+        edge = self.writer.add(GraphEdge, **kwargs)
+        self.writer.audit(AuditAction.EDGE_CREATED, "graph_edge", edge.id,
+                          actor=actor,
+                          context={"source_id": edge.source_id, "target_id": edge.target_id,
+                                   "edge_type": edge.edge_type, "edge_class": edge.edge_class})
+        return edge
+
+
+class _BulkEntities:
+    def __init__(self, writer: "GraphBulkWriter"):
+        self.writer = writer
+
+    def create(self, **kwargs) -> BulkRow:
+        return self.writer.add(GraphEntity, **kwargs)
+
+
+class GraphBulkWriter:
+    """
+    Bulk-режим загрузки графа.
+
+    Узлы, версии, рёбра, сущности и записи аудита копятся в памяти с заранее
+    сгенерированными id (Python-defaults колонок применяются здесь же) и
+    пишутся flush() одним executemany на таблицу — вместо db.add + flush()
+    на каждый объект. nodes/edges/entities повторяют create() репозиториев,
+    поэтому GraphBuilder и GraphRAGPipeline подставляют writer вместо repo.
+
+    skip_duplicate_edges=True — рёбра пишутся INSERT ... ON CONFLICT DO NOTHING
+    (уникальный индекс uq_graph_edges_rule_fact): уже существующие rule/fact
+    рёбра пропускаются вместе со своими записями аудита.
+
+    Использование:
+        writer = GraphBulkWriter(db)
+        node = writer.nodes.create(document_id=doc.id, ...)
+        writer.edges.create(source_id=node.id, target_id=..., ...)
+        writer.flush()
+    """
+
+    # Порядок вставки: FK-зависимые таблицы после своих целей
+    _ORDER = (GraphNode, NodeVersion, GraphEdge, GraphEntity, RAGAuditLog)
+    _columns_cache: Dict[Any, List[Tuple[str, Any]]] = {}
+
+    def __init__(self, db: Session, skip_duplicate_edges: bool = False):
+        self.db = db
+        self.skip_duplicate_edges = skip_duplicate_edges
+        self.nodes = _BulkNodes(self)
+        self.edges = _BulkEdges(self)
+        self.entities = _BulkEntities(self)
+        self._rows: Dict[Any, List[BulkRow]] = {model: [] for model in self._ORDER}
+
+    @classmethod
+    def _columns(cls, model) -> List[Tuple[str, Any]]:
+        """(имя колонки, ColumnDefault|None); автоинкрементный PK пропускаем."""
+        cols = cls._columns_cache.get(model)
+        if cols is None:
+            cols = [(col.name, col.default) for col in model.__table__.columns
+                    if not (col.primary_key and col.autoincrement is True)]
+            cls._columns_cache[model] = cols
+        return cols
+
+    def add(self, model, **kwargs) -> BulkRow:
+        """Поставить строку в очередь; недостающие колонки — из их defaults."""
+        columns = self._columns(model)
+        unknown = set(kwargs).difference(name for name, _ in columns)
+        if unknown:
+            raise TypeError(f"{model.__name__}: неизвестные поля {sorted(unknown)}")
+        row = BulkRow()
+        for name, default in columns:
+            if name in kwargs:
+                row[name] = kwargs[name]
+            elif default is None:
+                row[name] = None
+            elif default.is_callable:
+                row[name] = default.arg(None)
+            else:
+                row[name] = default.arg
+        self._rows[model].append(row)
+        return row
+
+    def audit(self, action: str, entity_type: str, entity_id: str,
+              actor: str = "system", **kwargs) -> None:
+        """Как _audit: запись RAGAuditLog в очередь."""
+        self.add(RAGAuditLog, action=action, entity_type=entity_type,
+                 entity_id=entity_id, actor=actor, **kwargs)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self._rows.values())
+
+    def flush(self) -> Dict[str, int]:
+        """Записать очередь: по одному INSERT (executemany) на таблицу."""
+        self.db.flush()  # документ и прочие ORM-объекты сессии — раньше их FK-потомков
+        counts: Dict[str, int] = {}
+        skipped: set = set()
+        for model in self._ORDER:
+            rows = self._rows[model]
+            if model is GraphEdge and rows and self.skip_duplicate_edges:
+                inserted = set(self.db.execute(_insert_ignore(self.db, GraphEdge).returning(GraphEdge.id),
+                                               rows).scalars())
+                skipped = {row["id"] for row in rows} - inserted
+                counts[model.__tablename__] = len(inserted)
+                self._rows[model] = []
+                continue
+            if model is RAGAuditLog and skipped:
+                rows = [row for row in rows
+                        if not (row["entity_type"] == "graph_edge" and row["entity_id"] in skipped)]
+            if rows:
+                self.db.execute(insert(model.__table__), rows)
+                counts[model.__tablename__] = len(rows)
+            self._rows[model] = []
+        return counts
+
+
+def _insert_ignore(db: Session, model):
+    """INSERT ... ON CONFLICT DO NOTHING для диалекта сессии (PostgreSQL/SQLite)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model.__table__).on_conflict_do_nothing()
+
+
 # ──────────────────────────────────────────────
 # Convenience: единый фасад
 # ──────────────────────────────────────────────
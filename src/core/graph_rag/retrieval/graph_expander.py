@@ -17,15 +17,33 @@ import logging
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Set
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session, aliased
 
-from ..models import GraphNode, GraphEdge
+from ..models import GraphNode, GraphEdge, GraphEntity
 from ..repository import GraphRepository
 from ..enums import EdgeType, EdgeClass, EdgeStatus
 from .graph_retriever import RetrievedNode
 
 logger = logging.getLogger(__name__)
 
+# Fact edges: на что ссылается узел / кто ссылается на узел
+_OUTGOING_FACT_TYPES = (
+    EdgeType.REFERENCES.value,
+    EdgeType.REGULATED_BY.value,
+    EdgeType.DEFINED_IN.value,
+    EdgeType.APPENDIX_REF.value,
+    EdgeType.TABLE_REF.value,
+    EdgeType.AMENDS.value,
+    EdgeType.SUPERSEDES.value,
+)
+_INCOMING_FACT_TYPES = (
+    EdgeType.REFERENCES.value,
+    EdgeType.REGULATED_BY.value,
+)
+# Сколько ссылающихся узлов брать на один узел (как прежний .limit(10))
+_MAX_REFERENCED_BY = 10
+
 
 @dataclass
 class ExpandedContext:
@@ -81,6 +99,10 @@ class GraphExpander:
         """
         Расширить контекст для каждого найденного узла.
 
+        Set-based: предки всех узлов — одним recursive CTE, дети/соседи, рёбра,
+        узлы по рёбрам и сущности — IN-запросами по всему набору (6 запросов
+        на весь top-k вместо ~7 на узел); ExpandedContext собираются в памяти.
+
         Args:
             results: Результаты поиска
             depth: Глубина расширения по рёбрам
@@ -92,107 +114,122 @@ class GraphExpander:
         Returns:
             Список ExpandedContext для каждого найденного узла
         """
-        contexts = []
+        if not results:
+            return []
+        nodes = [r.node for r in results]
+        node_ids = list(dict.fromkeys(n.id for n in nodes))
 
-        for result in results:
-            ctx = self._expand_single(
-                result,
-                depth=depth,
-                include_siblings=include_siblings,
-                include_children=include_children,
-                max_children=max_children,
-                max_siblings=max_siblings,
-            )
-            contexts.append(ctx)
+        ancestors = self._ancestors_by_node(node_ids, max_depth=5)
 
-        return contexts
+        # Дети узлов и соседи (дети их родителей) — одним запросом по parent_id
+        parent_ids = {n.parent_id for n in nodes
+                      if include_siblings and n.parent_id and not n.is_archived}
+        wanted_parents = parent_ids | (set(node_ids) if include_children else set())
+        by_parent: Dict[str, List[GraphNode]] = {}
+        if wanted_parents:
+            for child in (self.db.query(GraphNode)
+                          .filter(GraphNode.parent_id.in_(wanted_parents),
+                                  GraphNode.is_archived == False)
+                          .order_by(GraphNode.parent_id, GraphNode.position)):
+                by_parent.setdefault(child.parent_id, []).append(child)
 
-    def _expand_single(
-        self,
-        result: RetrievedNode,
-        depth: int,
-        include_siblings: bool,
-        include_children: bool,
-        max_children: int,
-        max_siblings: int,
-    ) -> ExpandedContext:
-        """Расширить контекст одного узла."""
-        node = result.node
-        ctx = ExpandedContext(primary_node=result)
-
-        # 1. Ancestors (всегда — даёт структурный контекст)
-        ctx.ancestors = self.repo.nodes.get_ancestors(node.id, max_depth=5)
-
-        # 2. Children (опционально)
-        if include_children:
-            children = self.repo.nodes.get_children(node.id)
-            ctx.children = children[:max_children]
-
-        # 3. Siblings (опционально)
-        if include_siblings:
-            siblings = self.repo.nodes.get_siblings(node.id)
-            ctx.siblings = siblings[:max_siblings]
-
-        # 4. Fact edges — referenced nodes
-        ctx.referenced_nodes = self._get_referenced_nodes(node.id, depth)
-
-        # 5. Reverse fact edges — who references this node
-        ctx.referenced_by = self._get_referencing_nodes(node.id)
-
-        # 6. Entities summary
-        entities = self.repo.entities.get_by_node(node.id)
-        ctx.entities_summary = [
-            f"{e.entity_type}: {e.entity_value}" for e in entities
-        ]
-
-        return ctx
-
-    def _get_referenced_nodes(self, node_id: str, depth: int) -> List[GraphNode]:
-        """Получить узлы, на которые ссылается данный узел через fact edges."""
-        fact_edge_types = [
-            EdgeType.REFERENCES.value,
-            EdgeType.REGULATED_BY.value,
-            EdgeType.DEFINED_IN.value,
-            EdgeType.APPENDIX_REF.value,
-            EdgeType.TABLE_REF.value,
-            EdgeType.AMENDS.value,
-            EdgeType.SUPERSEDES.value,
-        ]
-
-        edges = self.repo.edges.get_outgoing(
-            node_id,
-            edge_types=fact_edge_types,
-            edge_classes=[EdgeClass.FACT.value],
-        )
+        referenced, referenced_by = self._fact_neighbours(node_ids)
 
-        target_ids = [e.target_id for e in edges if e.target_id != node_id]
-        if not target_ids:
-            return []
+        entities: Dict[str, List[str]] = {}
+        for e in self.db.query(GraphEntity).filter(GraphEntity.node_id.in_(node_ids)):
+            entities.setdefault(e.node_id, []).append(f"{e.entity_type}: {e.entity_value}")
 
-        nodes = (self.db.query(GraphNode)
-                 .filter(GraphNode.id.in_(target_ids), GraphNode.is_archived == False)
-                 .all())
-        return nodes
-
-    def _get_referencing_nodes(self, node_id: str) -> List[GraphNode]:
-        """Получить узлы, которые ссылаются на данный узел."""
-        fact_edge_types = [
-            EdgeType.REFERENCES.value,
-            EdgeType.REGULATED_BY.value,
-        ]
-
-        edges = self.repo.edges.get_incoming(
-            node_id,
-            edge_types=fact_edge_types,
-            edge_classes=[EdgeClass.FACT.value],
-        )
+        contexts = []
+        for result, node in zip(results, nodes):
+            ctx = ExpandedContext(primary_node=result)
+            # 1. Ancestors (всегда — даёт структурный контекст)
+            ctx.ancestors = list(ancestors.get(node.id, []))
+            # 2. Children (опционально)
+            if include_children:
+                ctx.children = by_parent.get(node.id, [])[:max_children]
+            # 3. Siblings (опционально)
+            if include_siblings and node.parent_id and not node.is_archived:
+                ctx.siblings = [n for n in by_parent.get(node.parent_id, [])
+                                if n.id != node.id][:max_siblings]
+            # 4-5. Fact edges в обе стороны
+            ctx.referenced_nodes = list(referenced.get(node.id, []))
+            ctx.referenced_by = list(referenced_by.get(node.id, []))
+            # 6. Entities summary
+            ctx.entities_summary = list(entities.get(node.id, []))
+            contexts.append(ctx)
 
-        source_ids = [e.source_id for e in edges if e.source_id != node_id]
-        if not source_ids:
-            return []
+        return contexts
 
-        nodes = (self.db.query(GraphNode)
-                 .filter(GraphNode.id.in_(source_ids), GraphNode.is_archived == False)
-                 .limit(10)
-                 .all())
-        return nodes
+    def _ancestors_by_node(self, node_ids: List[str], max_depth: int) -> Dict[str, List[GraphNode]]:
+        """
+        Предки для всех узлов сразу (как GraphNodeRepository.get_ancestors):
+        recursive CTE несёт id исходного узла; порядок — от корня к узлу.
+        """
+        max_depth = min(max_depth, 50)  # Safety limit
+        walk = (select(GraphNode.id.label("origin"), GraphNode.id.label("id"),
+                       GraphNode.parent_id.label("parent_id"), literal(1).label("depth"))
+                .where(GraphNode.id.in_(node_ids), GraphNode.is_archived == False)
+                .cte("ancestors", recursive=True))
+        parent = aliased(GraphNode)
+        walk = walk.union_all(
+            select(walk.c.origin, parent.id, parent.parent_id, walk.c.depth + 1)
+            .join(walk, parent.id == walk.c.parent_id)
+            .where(parent.is_archived == False, walk.c.depth < max_depth)
+        )
+        rows = self.db.execute(
+            select(walk.c.origin, walk.c.id, walk.c.depth).where(walk.c.depth > 1)
+        ).all()
+        if not rows:
+            return {}
+        loaded = {n.id: n for n in
+                  self.db.query(GraphNode).filter(GraphNode.id.in_({r.id for r in rows}))}
+        chains: Dict[str, List] = {}
+        for origin, ancestor_id, level in rows:
+            chains.setdefault(origin, []).append((level, ancestor_id))
+        return {
+            origin: [loaded[a] for _, a in sorted(chain, reverse=True) if a in loaded]
+            for origin, chain in chains.items()
+        }
+
+    def _fact_neighbours(self, node_ids: List[str]):
+        """
+        Узлы по fact edges для всего набора одним запросом рёбер + одним узлов:
+        (исходящие: node_id → [target], входящие: node_id → [source]).
+        Входящих — не больше _MAX_REFERENCED_BY на узел, отсечка в SQL: хаб
+        вроде ст. 330 ГК не тянет тысячи ссылающихся узлов.
+        """
+        outgoing = (select(GraphEdge.source_id.label("anchor"), GraphEdge.target_id.label("linked"),
+                           literal(True).label("is_out"))
+                    .where(GraphEdge.edge_class == EdgeClass.FACT.value,
+                           GraphEdge.source_id.in_(node_ids),
+                           GraphEdge.edge_type.in_(_OUTGOING_FACT_TYPES),
+                           GraphEdge.source_id != GraphEdge.target_id))
+        sources = (select(GraphEdge.target_id, GraphEdge.source_id)
+                   .join(GraphNode, GraphNode.id == GraphEdge.source_id)
+                   .where(GraphEdge.edge_class == EdgeClass.FACT.value,
+                          GraphEdge.target_id.in_(node_ids),
+                          GraphEdge.edge_type.in_(_INCOMING_FACT_TYPES),
+                          GraphEdge.source_id != GraphEdge.target_id,
+                          GraphNode.is_archived == False)
+                   .distinct()
+                   .subquery())
+        ranked = select(sources.c.target_id, sources.c.source_id,
+                        func.row_number().over(partition_by=sources.c.target_id,
+                                               order_by=sources.c.source_id).label("rn")).subquery()
+        incoming = (select(ranked.c.target_id, ranked.c.source_id, literal(False))
+                    .where(ranked.c.rn <= _MAX_REFERENCED_BY))
+
+        out_ids: Dict[str, Set[str]] = {}
+        in_ids: Dict[str, Set[str]] = {}
+        for anchor, linked_id, is_out in self.db.execute(outgoing.union_all(incoming)):
+            (out_ids if is_out else in_ids).setdefault(anchor, set()).add(linked_id)
+
+        linked = set().union(*out_ids.values(), *in_ids.values())
+        if not linked:
+            return {}, {}
+        ordered = (self.db.query(GraphNode)
+                   .filter(GraphNode.id.in_(linked), GraphNode.is_archived == False)
+                   .all())
+        referenced = {nid: [n for n in ordered if n.id in ids] for nid, ids in out_ids.items()}
+        referenced_by = {nid: [n for n in ordered if n.id in ids] for nid, ids in in_ids.items()}
+        return referenced, referenced_by
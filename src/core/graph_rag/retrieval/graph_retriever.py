@@ -23,6 +23,7 @@ from sqlalchemy.orm import Session
 from ..models import GraphDocument, GraphNode, GraphEdge, GraphEntity
 from ..repository import GraphRepository
 from ..enums import LayerType, NodeType, EdgeType, EdgeClass
+from ..text_index import node_text_index_available, search_nodes
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +71,14 @@ RE_ARTICLE_QUERY = re.compile(r'(?:ст(?:атья|\.)?\.?\s*)(\d+(?:\.\d+)?)',
 RE_NPA_QUERY = re.compile(r'(ГК|ТК|НК|ЗК|АПК|ГПК|БК|ЖК|СК|УК|КоАП)\s*РФ', re.IGNORECASE)
 
 
+def _text_highlight(node: GraphNode) -> str:
+    """Фрагмент для text-матча: первые 150 символов узла."""
+    highlight = node.text[:150]
+    if len(node.text) > 150:
+        highlight += "..."
+    return highlight
+
+
 class GraphRetriever:
     """
     Hybrid retriever по графу документов.
@@ -268,7 +277,10 @@ class GraphRetriever:
     # ──────────────────────────────────────────
 
     def _text_search(self, query: RetrievalQuery) -> List[RetrievedNode]:
-        """Полнотекстовый поиск (LIKE для MVP, можно заменить на FTS)."""
+        """Полнотекстовый поиск: FTS-индекс узлов, без него — LIKE."""
+        if node_text_index_available(self.db):
+            return self._index_search(query)
+
         # Разбиваем запрос на ключевые слова (>= 3 символов)
         words = [w for w in query.text.split() if len(w) >= 3]
         if not words:
@@ -298,19 +310,33 @@ class GraphRetriever:
             text_lower = node.text.lower()
             matched = sum(1 for w in words if w.lower() in text_lower)
             score = 0.5 + (0.3 * matched / len(words))  # 0.5-0.8
-
-            # Формируем highlight
-            highlight = node.text[:150]
-            if len(node.text) > 150:
-                highlight += "..."
-
             results.append(RetrievedNode(
                 node=node, score=score, match_type="text",
-                highlight=highlight,
+                highlight=_text_highlight(node),
             ))
 
         return results
 
+    def _index_search(self, query: RetrievalQuery) -> List[RetrievedNode]:
+        """Поиск по FTS-индексу: ранжирует БД (ts_rank_cd / bm25)."""
+        hits = search_nodes(
+            self.db, query.text,
+            document_ids=query.document_ids, layers=query.layers,
+            node_types=query.node_types, limit=query.top_k * 3,
+        )
+        if not hits:
+            return []
+
+        # Релевантность индекса → прежняя шкала text-матча 0.5-0.8
+        best = max(rel for _, rel in hits) or 1.0
+        return [
+            RetrievedNode(
+                node=node, score=0.5 + 0.3 * max(rel, 0.0) / best, match_type="text",
+                highlight=_text_highlight(node),
+            )
+            for node, rel in hits
+        ]
+
     # ──────────────────────────────────────────
     # 4. Vector search
     # ──────────────────────────────────────────
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Graph-RAG Text Index
+
+Полнотекстовый индекс по узлам графа вместо ILIKE-скана graph_nodes.text:
+  - PostgreSQL: generated-колонка text_tsv = to_tsvector('russian', title || text)
+    + GIN-индекс; ранжирование ts_rank_cd, морфология — русский стеммер.
+  - SQLite (тесты, локальные прогоны): FTS5 graph_nodes_fts с копией title/text
+    и id узла (не rowid); ранжирование bm25, морфологию заменяют префиксные термы.
+
+Индекс поддерживается самой БД инкрементально: в PostgreSQL колонка
+пересчитывается на INSERT/UPDATE, в SQLite — триггерами на INSERT/UPDATE/DELETE
+graph_nodes, т.е. покрыты repo.nodes.create, update_text, GraphBulkWriter и
+purge. Архивация индекс не трогает: is_archived, документ, слой и тип узла
+фильтруются в том же запросе к индексу.
+
+Создаётся вместе с таблицей graph_nodes (after_create, см. models.py) и
+миграцией 025_graph_nodes_fts для существующих баз.
+"""
+from __future__ import annotations
+
+import re
+import weakref
+from typing import List, Optional, Tuple
+
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.orm import Session
+
+NODE_FTS_TABLE = "graph_nodes_fts"
+TSV_COLUMN = "text_tsv"
+TS_CONFIG = "russian"
+
+# Контентная FTS5-таблица с id узла: rowid у graph_nodes (строковый PK) неявный,
+# VACUUM может его перенумеровать, поэтому индекс связан с узлом только по id.
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {NODE_FTS_TABLE} USING fts5("
+    "id UNINDEXED, title, text, tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {NODE_FTS_TABLE}_ai AFTER INSERT ON graph_nodes BEGIN "
+    f"INSERT INTO {NODE_FTS_TABLE}(id, title, text) VALUES (new.id, new.title, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {NODE_FTS_TABLE}_ad AFTER DELETE ON graph_nodes BEGIN "
+    f"DELETE FROM {NODE_FTS_TABLE} WHERE id = old.id; END",
+    f"CREATE TRIGGER IF NOT EXISTS {NODE_FTS_TABLE}_au AFTER UPDATE OF id, title, text ON graph_nodes BEGIN "
+    f"DELETE FROM {NODE_FTS_TABLE} WHERE id = old.id; "
+    f"INSERT INTO {NODE_FTS_TABLE}(id, title, text) VALUES (new.id, new.title, new.text); END",
+]
+
+_SQLITE_REBUILD = [
+    f"DELETE FROM {NODE_FTS_TABLE}",
+    f"INSERT INTO {NODE_FTS_TABLE}(id, title, text) SELECT id, title, text FROM graph_nodes",
+]
+
+_PG_DDL = [
+    f"ALTER TABLE graph_nodes ADD COLUMN IF NOT EXISTS {TSV_COLUMN} tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}', coalesce(title, '') || ' ' || text)) STORED",
+    f"CREATE INDEX IF NOT EXISTS ix_graph_nodes_{TSV_COLUMN} ON graph_nodes USING gin ({TSV_COLUMN})",
+]
+
+# engine → доступен ли индекс; проверяем один раз на движок
+_available: "weakref.WeakKeyDictionary[object, bool]" = weakref.WeakKeyDictionary()
+
+
+def install_node_text_index(connection, rebuild: bool = False) -> None:
+    """Создать индекс для диалекта соединения (идемпотентно).
+
+    rebuild=True (SQLite) — переиндексировать уже существующие узлы; прежний
+    индекс по rowid заменяется и переиндексируется автоматически.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        if _drop_rowid_keyed_index(connection):
+            rebuild = True
+        for ddl in _SQLITE_DDL:
+            connection.exec_driver_sql(ddl)
+        if rebuild:
+            for statement in _SQLITE_REBUILD:
+                connection.exec_driver_sql(statement)
+    elif dialect == "postgresql":
+        for ddl in _PG_DDL:
+            connection.exec_driver_sql(ddl)
+    _available.pop(connection.engine, None)
+
+
+def _drop_rowid_keyed_index(connection) -> bool:
+    """Снести прежний external-content индекс (по rowid узла), если он есть."""
+    row = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (NODE_FTS_TABLE,)
+    ).first()
+    if row is None or "content_rowid" not in (row[0] or ""):
+        return False
+    for trigger in ("ai", "ad", "au"):
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {NODE_FTS_TABLE}_{trigger}")
+    connection.exec_driver_sql(f"DROP TABLE {NODE_FTS_TABLE}")
+    return True
+
+
+def node_text_index_available(db: Session) -> bool:
+    """Есть ли индекс в базе сессии (иначе — ILIKE-fallback)."""
+    bind = db.get_bind()
+    key = bind.engine if hasattr(bind, "engine") else bind
+    if key not in _available:
+        dialect = bind.dialect.name
+        if dialect == "sqlite":
+            found = db.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {"name": NODE_FTS_TABLE}).first()
+        elif dialect == "postgresql":
+            found = db.execute(text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'graph_nodes' AND column_name = :name"
+            ), {"name": TSV_COLUMN}).first()
+        else:
+            found = None
+        _available[key] = found is not None
+    return _available[key]
+
+
+def _query_words(query: str) -> List[str]:
+    """Значимые слова запроса (>= 3 символов), без дублей."""
+    words = [w for w in re.findall(r"\w+", query.lower()) if len(w) >= 3]
+    return list(dict.fromkeys(words))
+
+
+def _fts5_match(words: List[str]) -> str:
+    """FTS5 MATCH: префиксы — грубая компенсация русской морфологии, которой нет
+    в FTS5 ("неустой"* OR "договор"* ...)."""
+    stems = dict.fromkeys(w[: max(3, len(w) - 2)] for w in words)
+    return " OR ".join(f'"{stem}"*' for stem in stems)
+
+
+def search_nodes(
+    db: Session,
+    query: str,
+    document_ids: Optional[List[str]] = None,
+    layers: Optional[List[str]] = None,
+    node_types: Optional[List[str]] = None,
+    limit: int = 30,
+) -> List[Tuple["GraphNode", float]]:
+    """
+    Узлы по полнотекстовому индексу: [(GraphNode, relevance)], лучшие первыми.
+
+    Фильтры (не архивные, документы, слои, типы узлов) идут в тот же запрос,
+    что и MATCH / @@. relevance > 0, больше — лучше (ts_rank_cd или −bm25).
+    """
+    from .models import GraphNode
+
+    words = _query_words(query)
+    if not words:
+        return []
+
+    if db.get_bind().dialect.name == "postgresql":
+        tsq = func.to_tsquery(TS_CONFIG, " | ".join(words))
+        tsv = literal_column(f"graph_nodes.{TSV_COLUMN}")
+        relevance = func.ts_rank_cd(tsv, tsq)
+        q = db.query(GraphNode, relevance.label("relevance")).filter(tsv.op("@@")(tsq))
+        order = relevance.desc()
+    else:
+        fts = table(NODE_FTS_TABLE, column("id"))
+        relevance = -func.bm25(literal_column(NODE_FTS_TABLE))
+        q = (db.query(GraphNode, relevance.label("relevance"))
+             .join(fts, fts.c.id == GraphNode.id)
+             .filter(literal_column(NODE_FTS_TABLE).op("MATCH")(_fts5_match(words))))
+        order = relevance.desc()
+
+    q = q.filter(GraphNode.is_archived == False)
+    if document_ids:
+        q = q.filter(GraphNode.document_id.in_(document_ids))
+    if layers:
+        q = q.filter(GraphNode.layer.in_(layers))
+    if node_types:
+        q = q.filter(GraphNode.node_type.in_(node_types))
+
+    return [(node, float(rel)) for node, rel in q.order_by(order).limit(limit).all()]
@@ -170,6 +170,12 @@ async def lifespan(app: FastAPI):
                     pass
     except Exception:
         pass
+    # Close pooled keep-alive connections of native async LLM clients
+    try:
+        from src.services.llm_http_pool import get_llm_http_pool
+        await get_llm_http_pool().aclose()
+    except Exception:
+        pass
     ScopedSession.remove()
     logger.info("👋 Shutting down Contract AI System Backend...")
 
@@ -2,7 +2,7 @@
 Database models and connection management
 """
 from loguru import logger
-from .database import Base, engine, SessionLocal, get_db, Template, Contract, AnalysisResult, ReviewTask, LegalDocument, ExportLog, ContractFeedback, ScheduledTaskLog
+from .database import Base, engine, SessionLocal, get_db, Template, ContentBlob, Contract, ContractProgress, AnalysisResult, ReviewTask, LegalDocument, ExportLog, ContractFeedback, ScheduledTaskLog
 from .auth_models import (
     User, UserSession, DemoToken, DemoAccessRequest, AuditLog,
     PasswordResetRequest, EmailVerification, LoginAttempt
@@ -47,7 +47,9 @@ __all__ = [
     "LoginAttempt",
     # Core models
     "Template",
+    "ContentBlob",
     "Contract",
+    "ContractProgress",
     "AnalysisResult",
     "ReviewTask",
     "LegalDocument",
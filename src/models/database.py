@@ -9,8 +9,10 @@ from sqlalchemy import (
     DateTime, ForeignKey, CheckConstraint, UniqueConstraint, JSON
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, object_session
+from sqlalchemy.orm.exc import DetachedInstanceError
 from sqlalchemy.sql import func
+import hashlib
 import uuid
 
 Base = declarative_base()
@@ -76,6 +78,49 @@ class Template(Base):
         return f"<Template(id={self.id}, name={self.name}, type={self.contract_type}, version={self.version})>"
 
 
+class ContentBlob(Base):
+    """Неизменяемое содержимое, адресуемое SHA-256 (распарсенный XML, извлечённый текст).
+
+    Одинаковые загрузки хранятся один раз; строка договора держит только хэш.
+    """
+    __tablename__ = "content_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    content = Column(Text, nullable=False)
+    size = Column(Integer, nullable=False)  # байт в UTF-8
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    @staticmethod
+    def digest(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def put(cls, session, content: str) -> str:
+        """Сохранить содержимое (INSERT ... ON CONFLICT DO NOTHING), вернуть хэш."""
+        if session.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        sha = cls.digest(content)
+        # Проверка по ключу, чтобы не гонять содержимое повторно по сети
+        if session.query(cls.sha256).filter(cls.sha256 == sha).first() is None:
+            session.execute(dialect_insert(cls.__table__).values(
+                sha256=sha, content=content, size=len(content.encode("utf-8")),
+                created_at=datetime.now(timezone.utc),
+            ).on_conflict_do_nothing())
+        return sha
+
+    @classmethod
+    def read(cls, session, sha: Optional[str]) -> Optional[str]:
+        if sha is None:
+            return None
+        blob = session.get(cls, sha)
+        return blob.content if blob is not None else None
+
+    def __repr__(self):
+        return f"<ContentBlob(sha256={self.sha256[:12]}, size={self.size})>"
+
+
 class Contract(Base):
     """>45;L 4>3>2>@0"""
     __tablename__ = "contracts"
@@ -105,8 +150,11 @@ class Contract(Base):
     total_amount = Column(Numeric(18, 2), nullable=True)
     currency = Column(String(3), nullable=True)
 
-    # Извлечённый из документа текст для full-text поиска
-    parsed_text = Column(Text, nullable=True)
+    # Распарсенный XML и извлечённый текст (для full-text поиска) лежат в
+    # content_blobs; здесь только SHA-256 (миграция 028). Содержимое —
+    # через ленивые свойства parsed_xml / parsed_text.
+    xml_sha256 = Column(String(64), ForeignKey('content_blobs.sha256'), nullable=True)
+    text_sha256 = Column(String(64), ForeignKey('content_blobs.sha256'), nullable=True, index=True)
 
     # Денормализованная копия ContractRelation.relation_type для быстрой
     # фильтрации в списке (источник истины — ContractRelation).
@@ -158,10 +206,51 @@ class Contract(Base):
         ),
     )
 
+    def _session(self):
+        session = object_session(self)
+        if session is None:
+            raise DetachedInstanceError(f"Contract {self.id} is not bound to a session")
+        return session
+
+    @property
+    def parsed_xml(self) -> Optional[str]:
+        """Распарсенный XML (загружается из content_blobs при обращении)."""
+        return ContentBlob.read(self._session(), self.xml_sha256) if self.xml_sha256 else None
+
+    @parsed_xml.setter
+    def parsed_xml(self, value: Optional[str]) -> None:
+        self.xml_sha256 = ContentBlob.put(self._session(), value) if value else None
+
+    @property
+    def parsed_text(self) -> Optional[str]:
+        """Извлечённый текст (загружается из content_blobs при обращении)."""
+        return ContentBlob.read(self._session(), self.text_sha256) if self.text_sha256 else None
+
+    @parsed_text.setter
+    def parsed_text(self, value: Optional[str]) -> None:
+        self.text_sha256 = ContentBlob.put(self._session(), value) if value else None
+
     def __repr__(self):
         return f"<Contract(id={self.id}, file_name={self.file_name}, status={self.status})>"
 
 
+class ContractProgress(Base):
+    """Прогресс анализа договора (для WebSocket/polling).
+
+    Отдельная маленькая строка на договор: этапы анализа пишут сюда,
+    а не переписывают Contract.meta_info целиком на каждый тик.
+    """
+    __tablename__ = "contract_progress"
+
+    contract_id = Column(String(36), ForeignKey('contracts.id', ondelete='CASCADE'), primary_key=True)
+    percent = Column(Integer, nullable=False, default=0)
+    message = Column(String(500), nullable=False, default='')
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<ContractProgress(contract_id={self.contract_id}, percent={self.percent})>"
+
+
 class AnalysisResult(Base):
     """>45;L @57C;LB0B0 0=0;870 4>3>2>@0"""
     __tablename__ = "analysis_results"
@@ -340,7 +429,9 @@ __all__ = [
     "Base",
     "User",
     "Template",
+    "ContentBlob",
     "Contract",
+    "ContractProgress",
     "AnalysisResult",
     "ReviewTask",
     "LegalDocument",
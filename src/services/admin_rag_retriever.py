@@ -11,9 +11,13 @@ ChromaDB: data/chromadb (отдельная от data/chroma_enhanced)
 """
 from __future__ import annotations
 
+import contextvars
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 from loguru import logger
 
@@ -64,10 +68,7 @@ def get_embedding_fn():
         os.environ.setdefault("HF_HUB_OFFLINE", "1")
         os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
         try:
-            from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
-            _embedding_fn = SentenceTransformerEmbeddingFunction(
-                model_name="paraphrase-multilingual-MiniLM-L12-v2"
-            )
+            _embedding_fn = _registry_embedding_fn("paraphrase-multilingual-MiniLM-L12-v2")
         except Exception as e:
             # НЕ делаем fallback на DefaultEF — несовместим со стором. Падаем громко.
             logger.error(f"AdminRAG: не удалось загрузить multilingual-MiniLM из кеша: {e}. "
@@ -77,6 +78,42 @@ def get_embedding_fn():
     return _embedding_fn
 
 
+def _registry_embedding_fn(model_name: str):
+    """Embedding function Chroma поверх общей модели из model_registry.
+
+    Реализует публичный протокол EmbeddingFunction (__call__ / name / get_config),
+    модель не грузится второй раз. Имя и конфиг — как у штатной
+    SentenceTransformerEmbeddingFunction («sentence_transformer»), иначе Chroma
+    отклонит уже созданные ею коллекции.
+    """
+    import numpy as np
+    from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+    from src.services.model_registry import get_model_registry
+
+    class _RegistryEmbeddingFunction(EmbeddingFunction[Documents]):
+        def __init__(self, name: str):
+            self.model_name = name
+            self._model = get_model_registry().embedder(name, device="cpu")
+
+        def __call__(self, input: Documents) -> Embeddings:
+            vectors = self._model.encode(list(input), convert_to_numpy=True, normalize_embeddings=False)
+            return np.asarray(vectors, dtype=np.float32).tolist()
+
+        @staticmethod
+        def name() -> str:
+            return "sentence_transformer"
+
+        def get_config(self) -> Dict[str, Any]:
+            return {"model_name": self.model_name, "device": "cpu",
+                    "normalize_embeddings": False, "kwargs": {}}
+
+        @staticmethod
+        def build_from_config(config: Dict[str, Any]) -> "_RegistryEmbeddingFunction":
+            return _RegistryEmbeddingFunction(config["model_name"])
+
+    return _RegistryEmbeddingFunction(model_name)
+
+
 def get_collection(name: str):
     """Получить или создать коллекцию."""
     client = get_chroma_client()
@@ -104,11 +141,12 @@ def get_reranker():
         os.environ.setdefault("HF_HUB_OFFLINE", "1")
         os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
         try:
-            from sentence_transformers import CrossEncoder
+            from src.services.model_registry import get_model_registry
             # РУССКИЙ реранкер (не английский ms-marco — тот для RU ранжировал плохо).
             # DiTy/cross-encoder-russian-msmarco — ruBERT, обучен на ru MS MARCO, лёгкий.
             # CPU: реранк идёт по ~20 кандидатам/запрос (не bulk), а MPS занят сервисом.
-            _reranker = CrossEncoder("DiTy/cross-encoder-russian-msmarco", device="cpu", max_length=512)
+            _reranker = get_model_registry().reranker(
+                "DiTy/cross-encoder-russian-msmarco", device="cpu", max_length=512)
             logger.info("AdminRAG: русский реранкер DiTy загружен (cpu)")
         except Exception as e:
             _reranker_failed = True
@@ -127,10 +165,10 @@ def get_u2_model():
         os.environ.setdefault("HF_HUB_OFFLINE", "1")
         os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
         try:
-            from sentence_transformers import SentenceTransformer
+            from src.services.model_registry import get_model_registry
             import torch
             dev = "mps" if torch.backends.mps.is_available() else "cpu"
-            _u2_model = SentenceTransformer("deepvk/USER2-small", device=dev)
+            _u2_model = get_model_registry().embedder("deepvk/USER2-small", device=dev)
             logger.info(f"AdminRAG: USER2-small загружен (device={dev})")
         except Exception as e:
             _u2_failed = True
@@ -139,15 +177,85 @@ def get_u2_model():
 
 def _u2_collection(name: str):
     """USER2-коллекция (laws_u2/case_law_u2) без chroma-EF, если наполнена."""
-    client = get_chroma_client()
-    if client is None:
-        return None
+    info = collection_info(name, u2=True)
+    return info.handle if info is not None and info.count > 0 else None
+
+
+# ── Каталог коллекций (хэндлы, число чанков, размерность) ───────────────────
+# get_or_create_collection и count() на большом persistent-сторе ходят в диск;
+# раньше их звали на каждый запрос, коллекцию и aux-вариант рерайта. Каталог
+# кеширует их на rag_collection_catalog_ttl и сбрасывается при смене версии
+# KB-индекса (запись через rag_admin или kb_embed/kb_fts_build).
+class CollectionInfo(NamedTuple):
+    handle: Any
+    count: int
+    dimension: Optional[int]
+
+
+_catalog: Dict[str, Tuple[CollectionInfo, float, tuple]] = {}
+_catalog_lock = threading.Lock()
+
+
+def _catalog_ttl() -> float:
     try:
-        coll = client.get_or_create_collection(name=name + "_u2")
-        return coll if coll.count() > 0 else None
+        from config.settings import settings as _cfg
+        return float(_cfg.rag_collection_catalog_ttl)
     except Exception:
+        return 60.0
+
+
+def _collection_dimension(handle, count: int) -> Optional[int]:
+    dim = getattr(handle, "dimension", None)  # есть не во всех версиях chromadb
+    dim = dim if isinstance(dim, int) else None
+    if dim is None and count:
+        try:
+            emb = handle.get(limit=1, include=["embeddings"]).get("embeddings")
+            if emb is not None and len(emb) and hasattr(emb[0], "__len__"):
+                dim = len(emb[0])
+        except Exception:
+            pass
+    return dim
+
+
+def collection_info(name: str, u2: bool = False) -> Optional[CollectionInfo]:
+    """Хэндл, число чанков и размерность коллекции (из каталога, без похода в диск)."""
+    key = name + "_u2" if u2 else name
+    version = kb_index_version()
+    now = time.monotonic()
+    with _catalog_lock:
+        cached = _catalog.get(key)
+    if cached is not None and cached[2] == version and now - cached[1] < _catalog_ttl():
+        return cached[0]
+
+    if u2:
+        client = get_chroma_client()
+        if client is None:
+            return None
+        try:
+            handle = client.get_or_create_collection(name=key)
+        except Exception:
+            return None
+    else:
+        handle = get_collection(name)
+        if handle is None:
+            return None
+    try:
+        count = handle.count()
+    except Exception as e:
+        logger.warning(f"AdminRAG: не удалось посчитать коллекцию '{key}': {e}")
         return None
 
+    info = CollectionInfo(handle, count, _collection_dimension(handle, count))
+    with _catalog_lock:
+        _catalog[key] = (info, now, version)
+    return info
+
+
+def invalidate_collection_catalog() -> None:
+    """Сбросить каталог (следующий запрос перечитает хэндлы и count())."""
+    with _catalog_lock:
+        _catalog.clear()
+
 
 # ── Лексический канал (BM25/FTS5) для гибридного поиска ─────────────────────
 _fts_conn = None
@@ -212,16 +320,46 @@ def _fts_search(query: str, k: int):
 # ── Retrieval ──────────────────────────────────────────────────────────────
 
 # -- Graph-hop (semantic edges, project graph-build) --
-_SEM_EDGES = None
-def _semantic_edges():
-    global _SEM_EDGES
-    if _SEM_EDGES is None:
+# Тексты статей и рёбра — article_store (SQLite, scripts/build_article_store.py);
+# переоткрывается, когда .db или JSON-источники изменились (mtime, проверка не
+# чаще раза в _ARTICLE_STORE_CHECK_INTERVAL сек.), без .db — JSON.
+from src.services.article_store import (
+    ARTICLE_STORE_PATH as _ARTICLE_STORE_PATH,
+    ARTICLE_TEXTS_PATH as _ARTICLE_TEXTS_PATH,
+    SEMANTIC_EDGES_PATH as _SEMANTIC_EDGES_PATH,
+)
+_ARTICLE_STORE_CHECK_INTERVAL = 1.0
+_article_store_obj = None
+_article_store_stamps = None
+_article_store_checked = 0.0
+_article_store_lock = threading.Lock()
+
+def _article_store_mtimes() -> tuple:
+    stamps = []
+    for path in (_ARTICLE_STORE_PATH, _ARTICLE_TEXTS_PATH, _SEMANTIC_EDGES_PATH):
         try:
-            import json as _json
-            _SEM_EDGES = _json.load(open("data/semantic_edges.json", encoding="utf-8"))
-        except Exception:
-            _SEM_EDGES = {}
-    return _SEM_EDGES
+            stamps.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return tuple(stamps)
+
+def _article_store():
+    global _article_store_obj, _article_store_stamps, _article_store_checked
+    now = time.monotonic()
+    if _article_store_obj is not None and now - _article_store_checked < _ARTICLE_STORE_CHECK_INTERVAL:
+        return _article_store_obj
+    stamps = _article_store_mtimes()
+    _article_store_checked = now
+    if _article_store_obj is None or stamps != _article_store_stamps:
+        with _article_store_lock:
+            if _article_store_obj is None or stamps != _article_store_stamps:
+                from src.services.article_store import open_article_store
+                # Прежний store не закрываем: его ещё могут читать потоки _RETRIEVAL_POOL;
+                # соединение закроется при сборке мусора, когда ссылок не останется.
+                _article_store_obj = open_article_store(
+                    _ARTICLE_STORE_PATH, _ARTICLE_TEXTS_PATH, _SEMANTIC_EDGES_PATH)
+                _article_store_stamps = stamps
+    return _article_store_obj
 
 _PILOT_COLL = None
 def _pilot_collection():
@@ -240,20 +378,9 @@ def _clean_norm(t):
     return _r.sub(r"[ \t]+", " ", t).strip()
 
 
-_ART_TEXTS = None
-def _article_texts():
-    global _ART_TEXTS
-    if _ART_TEXTS is None:
-        try:
-            import json as _json
-            _ART_TEXTS = _json.load(open("data/article_texts.json", encoding="utf-8"))
-        except Exception:
-            _ART_TEXTS = {}
-    return _ART_TEXTS
-
 def _norm_text(did, art):
     """Чистый текст статьи: сперва article_texts (из .md), затем pilot (fallback)."""
-    t = _article_texts().get(did, {}).get(art)
+    t = _article_store().text(did, art)
     if t:
         return t
     pilot = _pilot_collection()
@@ -269,7 +396,7 @@ def _norm_text(did, art):
     return ""
 
 def _graph_hop_text(query, qemb, base_ctx=""):
-    edges = _semantic_edges()
+    edges = _article_store()
     if not edges or qemb is None:
         return ""
     rr = get_reranker()
@@ -278,7 +405,9 @@ def _graph_hop_text(query, qemb, base_ctx=""):
     try:
         import re as _re
         # 1а) ЯКОРЬ-A: основной поиск laws_u2 -> реранк -> номер статьи из текста чанка.
-        main = get_chroma_client().get_collection("laws_u2")
+        main = _u2_collection("laws")
+        if main is None:
+            return ""
         mr = main.query(query_embeddings=[qemb], n_results=12,
                         include=["documents", "metadatas"])
         if not mr["documents"] or not mr["documents"][0]:
@@ -292,10 +421,10 @@ def _graph_hop_text(query, qemb, base_ctx=""):
         # слабый чанк-топ гейтит только regex-якорь; LLM-якорь работает всегда
         for i in (morder[:4] if msc[morder[0]] >= minsc else []):
             did = (metas[i] or {}).get("doc_id")
-            if not did or did not in edges:
+            if not did or not edges.has_doc(did):
                 continue
             for a in _ART.findall(docs[i][:600]):
-                if a in edges.get(did, {}) and (did, a) not in prim_keys:
+                if edges.has_article(did, a) and (did, a) not in prim_keys:
                     prim_keys.add((did, a)); prim.append((did, a))
                     break
             if len(prim) >= 2:
@@ -320,7 +449,7 @@ def _graph_hop_text(query, qemb, base_ctx=""):
             for _num, _cdx in _re.findall(r"ст\.?\s*(\d+(?:\.\d+)?)\s*([А-Яа-яЁё]+)",
                                           _o if isinstance(_o, str) else str(_o)):
                 for _did in _CDX.get(_cdx.upper().replace("РФ", "").strip(), []):
-                    if _num in edges.get(_did, {}):
+                    if edges.has_article(_did, _num):
                         llm_keys.add((_did, _num))
                         if (_did, _num) not in prim_keys:
                             prim_keys.add((_did, _num)); prim.append((_did, _num))
@@ -333,7 +462,7 @@ def _graph_hop_text(query, qemb, base_ctx=""):
         ctx_nums = set(_ART.findall(base_ctx or ""))
         rel_keys = [(did, a) for did, a in prim if a not in ctx_nums]
         for did, a in prim:
-            for r in edges.get(did, {}).get(a, []):
+            for r in edges.related(did, a):
                 if (did, r) not in prim_keys and (did, r) not in rel_keys:
                     rel_keys.append((did, r))
         items = []
@@ -364,6 +493,152 @@ def _graph_hop_text(query, qemb, base_ctx=""):
         return ""
 
 
+# ── Кеш результатов (контекст + рерайт) ─────────────────────────────────────
+# Анализы договоров одного типа весь день повторяют почти одинаковые запросы
+# («Договор {тип}: {предмет}»); каждый промах — LLM-рерайт, несколько плотных
+# запросов, FTS, реранк всего пула. Кеш ограничен по числу записей и TTL.
+_result_cache = None
+_kb_generation = 0
+
+
+def bump_kb_index_version() -> None:
+    """Отметить запись в KB (upload/delete в rag_admin) — кеш контекстов устаревает."""
+    global _kb_generation
+    _kb_generation += 1
+
+
+def kb_index_version() -> tuple:
+    """Версия KB-индекса: счётчик записей этого процесса + mtime файлов Chroma/FTS/
+    article_store (их меняют kb_embed/kb_fts_build/build_article_store из других процессов)."""
+    stamps = [_kb_generation]
+    for path in (os.path.join(_CHROMA_DIR, "chroma.sqlite3"),
+                 os.path.join(_CHROMA_DIR, "chroma.sqlite3-wal"), _FTS_PATH,
+                 _ARTICLE_STORE_PATH, _ARTICLE_TEXTS_PATH, _SEMANTIC_EDGES_PATH):
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return tuple(stamps)
+
+
+def _cache_setting(name: str, default: int) -> int:
+    try:
+        from config.settings import settings as _cfg
+        return int(getattr(_cfg, name, default))
+    except Exception:
+        return default
+
+
+def _get_result_cache():
+    global _result_cache
+    if _result_cache is None:
+        from src.services.cache_service import CacheService
+        _result_cache = CacheService(
+            use_redis=False,
+            max_memory_items=max(1, _cache_setting("rag_context_cache_size", 512)),
+        )
+    return _result_cache
+
+
+def _cache_get(key: str):
+    if _cache_setting("rag_context_cache_size", 512) <= 0:
+        return None
+    return _get_result_cache().get(key)
+
+
+def _cache_set(key: str, value, ttl: int) -> None:
+    if ttl > 0 and _cache_setting("rag_context_cache_size", 512) > 0:
+        _get_result_cache().set(key, value, ttl=ttl)
+
+
+def clear_result_cache() -> None:
+    """Сбросить кеш контекстов и рерайтов (тесты, ручной сброс)."""
+    if _result_cache is not None:
+        _result_cache.clear()
+
+
+def _normalize_query(query: str) -> str:
+    import unicodedata
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+def _context_cache_key(query, collections, n_results, max_chars, aux_query) -> str:
+    """Ключ контекста: запрос + параметры + RAG_*-веса + флаги + версия KB."""
+    import hashlib
+    import json as _json
+    flags = {}
+    try:
+        from config.settings import settings as _cfg
+        flags = {"rewrite": bool(_cfg.rag_rewrite), "hop": bool(getattr(_cfg, "rag_graph_hop", False))}
+    except Exception:
+        pass
+    payload = _json.dumps([
+        _normalize_query(query), list(collections), n_results, max_chars,
+        _normalize_query(aux_query) if aux_query else None,
+        sorted((k, v) for k, v in os.environ.items() if k.startswith("RAG_")),
+        flags, kb_index_version(),
+    ], ensure_ascii=False)
+    return "ctx:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _rewrite_cache_key(query: str) -> str:
+    return "rewrite:" + _normalize_query(query)
+
+
+def _rewrite_query(query: str) -> Optional[List[str]]:
+    """Рерайт запроса deepseek-chat в 1–2 поисковых варианта (кешируется по запросу).
+
+    None — LLM-вызов не удался (не кешируется), [] — вариантов нет.
+    """
+    key = _rewrite_cache_key(query)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    try:
+        from src.services.llm_gateway import LLMGateway as _GW
+        _SYS = (
+            "Ты — помощник юридического поиска по российскому праву. "
+            "Перепиши бытовой вопрос пользователя в поисковые запросы на "
+            "языке закона. Верни РОВНО ДВЕ строки без нумерации и кавычек:\n"
+            "строка 1 — область права и ключевые правовые термины/институты "
+            "(как в названиях статей кодексов);\n"
+            "строка 2 — если тема регулируется профильным федеральным "
+            "законом: его официальное краткое название (как в заголовке "
+            "закона) плюс ключевые термины заголовка; если профильного ФЗ "
+            "нет — та же тема другими словами.\n"
+            "НЕ отвечай на вопрос."
+        )
+        _FEWSHOT = (
+            "Примеры (для других тем):\n"
+            "Вопрос: сколько времени есть на возврат денег за авиабилет\n"
+            "Запрос:\nвозврат провозной платы при отказе пассажира от воздушной перевозки\n"
+            "Воздушный кодекс, договор воздушной перевозки пассажира\n\n"
+            "Вопрос: мне постоянно звонят с рекламой хотя я не соглашался\n"
+            "Запрос:\nраспространение рекламы по сетям электросвязи, согласие абонента\n"
+            "федеральный закон о рекламе, требования к распространению рекламы\n\n"
+            f"Вопрос: {query}\nЗапрос:"
+        )
+        _rw = _GW(provider="deepseek", model="deepseek-chat").call(
+            prompt=_FEWSHOT, system_prompt=_SYS,
+            response_format="text", temperature=0.0, max_tokens=160,
+        )
+        _rw = (_rw if isinstance(_rw, str) else str(_rw)).strip().strip('"')
+        _aux_list: List[str] = []
+        for _line in _rw.splitlines():
+            _line = _line.strip().strip('"').lstrip("-•1234567890.) ").strip()
+            if _line and _line != query and _line not in _aux_list:
+                _aux_list.append(_line)
+            if len(_aux_list) >= 2:
+                break
+        if _aux_list:
+            logger.debug(f"AdminRAG rewrite: «{query[:50]}» → {_aux_list}")
+    except Exception as _re:
+        logger.warning(f"AdminRAG: query rewrite failed ({_re})")
+        return None
+    _cache_set(key, _aux_list, _cache_setting("rag_rewrite_cache_ttl", 86400))
+    return _aux_list
+
+
 def get_legal_context(
     query: str,
     collections: Optional[List[str]] = None,
@@ -376,10 +651,125 @@ def get_legal_context(
 
     Возвращает строку-контекст для вставки в промпт LLM.
     При любой ошибке возвращает пустую строку (не ломает анализ).
+    Результат кешируется (TTL rag_context_cache_ttl) по нормализованному запросу,
+    коллекциям, n_results, RAG_*-весам и версии KB-индекса.
     """
     if collections is None:
         collections = ["laws", "case_law"]
 
+    key = _context_cache_key(query, collections, n_results, max_chars, aux_query)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    context, cacheable = _retrieve_legal_context(query, collections, n_results, max_chars, aux_query)
+    if cacheable:
+        _cache_set(key, context, _cache_setting("rag_context_cache_ttl", 900))
+    return context
+
+
+# FTS (и прочий локальный поиск) и LLM-рерайт — в разных пулах: опоздавшие рерайты
+# не отменяются и держат поток, FTS не должен стоять за ними в очереди.
+_RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="admin-rag")
+_REWRITE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="admin-rag-rewrite")
+
+
+def _deadline_setting(name: str, default: float) -> float:
+    try:
+        from config.settings import settings as _cfg
+        return float(getattr(_cfg, name, default))
+    except Exception:
+        return default
+
+
+def _result_by_deadline(future, started: float, deadline: float):
+    """future.result() к дедлайну (сек. от начала поиска; 0 — ждать всегда). Raises FuturesTimeout."""
+    timeout = max(0.0, deadline - (time.monotonic() - started)) if deadline > 0 else None
+    return future.result(timeout=timeout)
+
+
+def _await_rewrite(future, started: float) -> Optional[List[str]]:
+    """Результат рерайта к дедлайну rag_rewrite_deadline (от начала поиска), иначе None.
+
+    Опоздавший рерайт не отменяется: досчитается в фоне и ляжет в кеш рерайтов.
+    """
+    deadline = _deadline_setting("rag_rewrite_deadline", 3.0)
+    try:
+        return _result_by_deadline(future, started, deadline)
+    except FuturesTimeout:
+        logger.info(f"AdminRAG: рерайт не успел за {deadline:.1f}s — поиск без aux-вариантов")
+        return None
+
+
+def _await_fts(future, started: float) -> Tuple[list, bool]:
+    """(FTS-кандидаты, ok) к дедлайну rag_fts_deadline; опоздал — ([], False), только плотный поиск."""
+    deadline = _deadline_setting("rag_fts_deadline", 2.0)
+    try:
+        return _result_by_deadline(future, started, deadline), True
+    except FuturesTimeout:
+        logger.info(f"AdminRAG: FTS не успел за {deadline:.1f}s — только плотные кандидаты")
+        return [], False
+
+
+def _aux_variants(future, started: float, aux_list: List[str]) -> Tuple[List[str], bool]:
+    """(aux-варианты, ok): при неудаче/опоздании рерайта — прежний список и ok=False."""
+    rewrites = _await_rewrite(future, started)
+    if rewrites is None:
+        return aux_list, False
+    return rewrites or aux_list, True
+
+
+def _u2_query_pools(collections: List[str], embeddings: List[List[float]], fetch_k: int) -> Dict[str, dict]:
+    """Один query на USER2-коллекцию со всеми эмбеддингами (строка i ответа — embeddings[i])."""
+    pools = {}
+    for coll_name in collections:
+        info = collection_info(coll_name, u2=True)
+        if info is None or info.count == 0:
+            continue
+        if info.dimension and info.dimension != len(embeddings[0]):
+            logger.warning(f"AdminRAG: размерность {coll_name}_u2 ({info.dimension}) "
+                           f"≠ эмбеддинга запроса ({len(embeddings[0])}) — коллекция пропущена")
+            continue
+        pools[coll_name] = info.handle.query(query_embeddings=embeddings,
+                                             n_results=min(fetch_k, info.count),
+                                             include=["documents", "metadatas", "distances"])
+    return pools
+
+
+def _append_candidates(cands: list, results: dict, row: int, coll_name: str,
+                       seen: Optional[set] = None, is_aux: bool = False) -> None:
+    """Добавить в пул кандидатов строку row ответа Chroma (seen — dedup по cid)."""
+    docs = results.get("documents") or []
+    if len(docs) <= row or not docs[row]:
+        return
+    n = len(docs[row])
+    label = COLLECTION_LABELS.get(coll_name, coll_name)
+    dists = ((results.get("distances") or [])[row:row + 1] or [[None] * n])[0]
+    ids = ((results.get("ids") or [])[row:row + 1] or [[None] * n])[0]
+    metas = ((results.get("metadatas") or [])[row:row + 1] or [[None] * n])[0]
+    for cid, doc, meta, dist in zip(ids, docs[row], metas, dists):
+        if seen is not None:
+            if cid in seen:
+                continue
+            seen.add(cid)
+        cand = {"doc": doc, "label": label,
+                "title": (meta or {}).get("title", ""),
+                "category": (meta or {}).get("category", ""),
+                "dist": dist, "cid": cid}
+        if is_aux:
+            cand["is_aux"] = True
+        cands.append(cand)
+
+
+def _retrieve_legal_context(
+    query: str,
+    collections: List[str],
+    n_results: int,
+    max_chars: int,
+    aux_query: Optional[str],
+) -> Tuple[str, bool]:
+    """Сам поиск без кеша. Возвращает (контекст, можно ли его кешировать)."""
+    cacheable = True
     try:
         # 0) Авто-рерайт за флагом RAG_REWRITE: deepseek-chat переводит разговорный
         # запрос в канон-форму → pool-union расширяет пул кандидатов.
@@ -398,114 +788,77 @@ def get_legal_context(
         # варианта идут в pool-union КАК ДВА aux-запроса (пул только растёт,
         # эмбеддинг локальный/дешёвый, LLM-вызов один).
         _aux_list = [aux_query] if aux_query else []
+        fetch_k = max(n_results * 8, int(os.environ.get("RAG_FETCH_K", "24")))
+        # Рерайт (LLM), лексика (FTS5) и raw-плотный поиск друг от друга не зависят:
+        # рерайт и FTS уходят в свои пулы, raw-поиск идёт здесь же. Рерайт ждём не
+        # дольше rag_rewrite_deadline, FTS — rag_fts_deadline от начала: медленный
+        # LLM или занятый пул не раздувают p99 контекста.
+        _started = time.monotonic()
+        _rewrite_future = None
         if aux_query is None and _do_rewrite:
-            try:
-                from src.services.llm_gateway import LLMGateway as _GW
-                _SYS = (
-                    "Ты — помощник юридического поиска по российскому праву. "
-                    "Перепиши бытовой вопрос пользователя в поисковые запросы на "
-                    "языке закона. Верни РОВНО ДВЕ строки без нумерации и кавычек:\n"
-                    "строка 1 — область права и ключевые правовые термины/институты "
-                    "(как в названиях статей кодексов);\n"
-                    "строка 2 — если тема регулируется профильным федеральным "
-                    "законом: его официальное краткое название (как в заголовке "
-                    "закона) плюс ключевые термины заголовка; если профильного ФЗ "
-                    "нет — та же тема другими словами.\n"
-                    "НЕ отвечай на вопрос."
-                )
-                _FEWSHOT = (
-                    "Примеры (для других тем):\n"
-                    "Вопрос: сколько времени есть на возврат денег за авиабилет\n"
-                    "Запрос:\nвозврат провозной платы при отказе пассажира от воздушной перевозки\n"
-                    "Воздушный кодекс, договор воздушной перевозки пассажира\n\n"
-                    "Вопрос: мне постоянно звонят с рекламой хотя я не соглашался\n"
-                    "Запрос:\nраспространение рекламы по сетям электросвязи, согласие абонента\n"
-                    "федеральный закон о рекламе, требования к распространению рекламы\n\n"
-                    f"Вопрос: {query}\nЗапрос:"
-                )
-                _rw = _GW(provider="deepseek", model="deepseek-chat").call(
-                    prompt=_FEWSHOT, system_prompt=_SYS,
-                    response_format="text", temperature=0.0, max_tokens=160,
-                )
-                _rw = (_rw if isinstance(_rw, str) else str(_rw)).strip().strip('"')
-                for _line in _rw.splitlines():
-                    _line = _line.strip().strip('"').lstrip("-•1234567890.) ").strip()
-                    if _line and _line != query and _line not in _aux_list:
-                        _aux_list.append(_line)
-                    if len(_aux_list) >= 2:
-                        break
-                if _aux_list:
-                    aux_query = _aux_list[0]  # для обратной совместимости логики ниже
-                    logger.debug(f"AdminRAG rewrite: «{query[:50]}» → {_aux_list}")
-            except Exception as _re:
-                logger.warning(f"AdminRAG: query rewrite failed ({_re})")
+            # Закешированный рерайт берём синхронно, до пула: тогда raw-запрос и все
+            # aux-варианты — один encode и один query на коллекцию. В пул уходит
+            # только настоящий LLM-вызов; его варианты — отдельным батчем после.
+            _cached_rewrite = _cache_get(_rewrite_cache_key(query))
+            if _cached_rewrite is not None:
+                _aux_list = _cached_rewrite or _aux_list
+            else:
+                # copy_context: the rewrite LLM call keeps the caller's rate limiter tenant
+                _rewrite_future = _REWRITE_POOL.submit(contextvars.copy_context().run, _rewrite_query, query)
+        _fts_future = None
+        if os.environ.get("RAG_HYBRID", "1") == "1":
+            _fts_future = _RETRIEVAL_POOL.submit(_fts_search, query, fetch_k)
 
         # 1) Кандидаты: берём заведомо больше (fetch_k) для последующего смешанного
         # ранжирования. Предпочитаем USER2-стор (laws_u2/case_law_u2) если наполнен.
-        fetch_k = max(n_results * 8, int(os.environ.get("RAG_FETCH_K", "24")))
         cands = []  # dict: doc/label/title/category/dist
         u2 = get_u2_model()
         u2_active = u2 is not None and _u2_collection(collections[0]) is not None
         qemb = None
+        # LLM-рерайт в полёте: raw-поиск идёт параллельно, варианты — батчем после
+        _rewrite_pending = _rewrite_future is not None
+        _aux_pools, _aux_row = {}, 0
         if u2_active:
-            qemb = u2.encode([query], prompt_name="search_query", convert_to_numpy=True)[0].tolist()
-        for coll_name in collections:
-            if u2_active:
-                coll = _u2_collection(coll_name)
-                if coll is None:
-                    continue
-                results = coll.query(query_embeddings=[qemb],
-                                     n_results=min(fetch_k, coll.count()),
-                                     include=["documents", "metadatas", "distances"])
-            else:
-                coll = get_collection(coll_name)
-                if coll is None or coll.count() == 0:
+            _texts = [query] + ([] if _rewrite_pending else _aux_list)
+            _embs = [e.tolist() for e in u2.encode(_texts, prompt_name="search_query",
+                                                   convert_to_numpy=True)]
+            qemb = _embs[0]
+            _pools = _u2_query_pools(collections, _embs, fetch_k)
+            for coll_name in collections:
+                if coll_name in _pools:
+                    _append_candidates(cands, _pools[coll_name], 0, coll_name)
+            if len(_embs) > 1:
+                _aux_pools, _aux_row = _pools, 1
+        else:
+            for coll_name in collections:
+                info = collection_info(coll_name)
+                if info is None or info.count == 0:
                     continue
-                results = coll.query(query_texts=[query],
-                                     n_results=min(fetch_k, coll.count()),
-                                     include=["documents", "metadatas", "distances"])
-            if not results["documents"] or not results["documents"][0]:
-                continue
-            label = COLLECTION_LABELS.get(coll_name, coll_name)
-            dists = (results.get("distances") or [[None]*len(results["documents"][0])])[0]
-            ids0 = (results.get("ids") or [[None]*len(results["documents"][0])])[0]
-            for cid, doc, meta, dist in zip(ids0, results["documents"][0], results["metadatas"][0], dists):
-                cands.append({"doc": doc, "label": label,
-                              "title": (meta or {}).get("title", ""),
-                              "category": (meta or {}).get("category", ""),
-                              "dist": dist, "cid": cid})
+                results = info.handle.query(query_texts=[query],
+                                            n_results=min(fetch_k, info.count),
+                                            include=["documents", "metadatas", "distances"])
+                _append_candidates(cands, results, 0, coll_name)
+
+        if _rewrite_pending:
+            _aux_list, _rewrite_ok = _aux_variants(_rewrite_future, _started, _aux_list)
+            cacheable = cacheable and _rewrite_ok
 
         # 1a') POOL-UNION (query rewriting): отдельный плотный поиск по КАЖДОМУ
         # варианту рерайта, слияние пулов кандидатов (dedup по cid). Реранк
         # остаётся по ИСХОДНОМУ query. НЕ заменяет, а ДОБАВЛЯет — raw-попадание
-        # не теряется.
+        # не теряется. Все варианты — одним encode и одним query на коллекцию.
         if _aux_list and u2_active and qemb is not None:
             _seen = {c.get("cid") for c in cands}
             try:
-                for _aq in _aux_list:
-                    aemb = u2.encode([_aq], prompt_name="search_query",
-                                     convert_to_numpy=True)[0].tolist()
+                if not _aux_pools:
+                    _aembs = [e.tolist() for e in u2.encode(_aux_list, prompt_name="search_query",
+                                                            convert_to_numpy=True)]
+                    _aux_pools = _u2_query_pools(collections, _aembs, fetch_k)
+                for i in range(len(_aux_list)):
                     for coll_name in collections:
-                        coll = _u2_collection(coll_name)
-                        if coll is None:
-                            continue
-                        ares = coll.query(query_embeddings=[aemb],
-                                          n_results=min(fetch_k, coll.count()),
-                                          include=["documents", "metadatas", "distances"])
-                        if not ares["documents"] or not ares["documents"][0]:
-                            continue
-                        label = COLLECTION_LABELS.get(coll_name, coll_name)
-                        adists = (ares.get("distances") or [[None]*len(ares["documents"][0])])[0]
-                        aids = (ares.get("ids") or [[None]*len(ares["documents"][0])])[0]
-                        for cid, doc, meta, dist in zip(aids, ares["documents"][0],
-                                                        ares["metadatas"][0], adists):
-                            if cid in _seen:
-                                continue
-                            _seen.add(cid)
-                            cands.append({"doc": doc, "label": label,
-                                          "title": (meta or {}).get("title", ""),
-                                          "category": (meta or {}).get("category", ""),
-                                          "dist": dist, "cid": cid, "is_aux": True})
+                        if coll_name in _aux_pools:
+                            _append_candidates(cands, _aux_pools[coll_name], _aux_row + i,
+                                               coll_name, seen=_seen, is_aux=True)
             except Exception as _e:
                 logger.warning(f"AdminRAG: pool-union aux retrieval failed ({_e})")
 
@@ -526,8 +879,9 @@ def get_legal_context(
         # Ограничение инъекции кодексами убирает шум, оставляя спасение статьи кодекса.
         # Вместе с grab_pref (профильный код гарантированно получает слот) это даёт
         # чистый прирост без регресса.
-        if os.environ.get("RAG_HYBRID", "1") == "1":
-            lex = _fts_search(query, k=fetch_k)
+        if _fts_future is not None:
+            lex, _fts_ok = _await_fts(_fts_future, _started)
+            cacheable = cacheable and _fts_ok
             if lex:
                 by_cid = {c["cid"] for c in cands}
                 worst = max((c["dist"] for c in cands if c["dist"] is not None),
@@ -548,7 +902,8 @@ def get_legal_context(
                     by_cid.add(cid); lex_titles.add(title)
 
         if not cands:
-            return ""
+            # пустой Chroma-клиент (ошибка инициализации) — не повод кешировать пустоту
+            return "", cacheable and get_chroma_client() is not None
 
         # 2) СМЕШАННОЕ ранжирование: вектор (USER2) + реранк (DiTy) + приоритет кодексам.
         # Чистый реранк DiTy топил лаконичные статьи кодексов под многословную практику;
@@ -678,19 +1033,19 @@ def get_legal_context(
             _ex = _graph_hop_text(query, qemb, context)
             if _ex:
                 context = context + "\n\n" + _ex
-        return context
+        return context, cacheable
 
     except Exception as e:
         logger.warning(f"AdminRAG.get_legal_context error (non-fatal): {e}")
-        return ""
+        return "", False
 
 
 def has_legal_docs() -> bool:
     """Проверить, есть ли хоть что-то в laws или case_law."""
     try:
         for name in ("laws", "case_law"):
-            coll = get_collection(name)
-            if coll and coll.count() > 0:
+            info = collection_info(name)
+            if info is not None and info.count > 0:
                 return True
     except Exception:
         pass
@@ -0,0 +1,82 @@
+"""Progress channel for contract analysis (WebSocket / polling).
+
+Stages write ``(percent, message)`` into the small ``contract_progress`` row
+instead of rewriting the whole ``Contract.meta_info`` JSON on every tick;
+readers fetch just that row.
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from typing import Any, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from src.models.database import ContractProgress
+
+_MESSAGE_MAX = 500
+
+
+def _upsert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(ContractProgress.__table__)
+
+
+def set_progress(
+    db: Session,
+    contract_id: str,
+    percent: int,
+    message: str = "",
+    *,
+    commit: bool = True,
+) -> None:
+    """Record analysis progress; errors are logged, never raised.
+
+    The upsert runs in a savepoint: a failed progress write is rolled back
+    alone and never discards the caller's pending changes.
+    """
+    try:
+        values = {
+            "percent": int(percent),
+            "message": (message or "")[:_MESSAGE_MAX],
+            "updated_at": datetime.now(UTC).replace(tzinfo=None),
+        }
+        stmt = _upsert(db).values(contract_id=contract_id, **values)
+        with db.begin_nested():
+            db.execute(stmt.on_conflict_do_update(index_elements=["contract_id"], set_=values))
+    except Exception as exc:
+        logger.warning(f"Failed to update progress for {contract_id}: {exc}")
+        return
+    if commit:
+        try:
+            db.commit()
+        except Exception as exc:
+            logger.warning(f"Failed to commit progress for {contract_id}: {exc}")
+            db.rollback()
+
+
+def progress_query(contract_id: str) -> Select:
+    """SELECT of ``(percent, message)`` — for sync and async sessions alike."""
+    return select(ContractProgress.percent, ContractProgress.message).where(
+        ContractProgress.contract_id == contract_id
+    )
+
+
+def get_progress(db: Session, contract_id: str) -> Optional[Tuple[int, str]]:
+    """``(percent, message)`` of the contract, or None if nothing was recorded."""
+    row = db.execute(progress_query(contract_id)).first()
+    return (row.percent, row.message) if row else None
+
+
+def resolve_progress(recorded: Any, meta: Any = None) -> Tuple[Optional[int], Optional[str]]:
+    """Recorded progress row, falling back to legacy ``meta_info._progress``."""
+    if recorded is not None:
+        return recorded[0], recorded[1]
+    if isinstance(meta, dict):
+        return meta.get("_progress"), meta.get("_progress_msg")
+    return None, None
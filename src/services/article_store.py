@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Article store — точечный доступ к тексту статей и семантическим рёбрам графа.
+
+Раньше graph-hop читал data/article_texts.json и data/semantic_edges.json
+целиком в каждый процесс (json.load на первом запросе). Теперь оба файла
+сворачиваются в один SQLite (data/article_store.db, сборка —
+scripts/build_article_store.py), и get_legal_context достаёт только нужные
+пары (doc_id, article) по первичному ключу, а страницы файла делит page cache ОС.
+
+Если .db нет или он старше JSON-источников — JsonArticleStore с прежним
+поведением (полная загрузка JSON), чтобы без пересборки ничего не сломалось.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+ARTICLE_STORE_PATH = "data/article_store.db"
+ARTICLE_TEXTS_PATH = "data/article_texts.json"
+SEMANTIC_EDGES_PATH = "data/semantic_edges.json"
+
+# related = NULL — у статьи нет узла в графе рёбер (есть только текст);
+# '[]' — узел есть, связей нет (важно для проверки «статья в графе»).
+_SCHEMA = (
+    "CREATE TABLE articles ("
+    "doc_id TEXT NOT NULL, article TEXT NOT NULL, text TEXT, related TEXT, "
+    "PRIMARY KEY (doc_id, article)) WITHOUT ROWID"
+)
+
+
+class ArticleStore:
+    """Read-only SQLite-хранилище статей: text / related / has_* по (doc_id, article)."""
+
+    def __init__(self, path: str = ARTICLE_STORE_PATH, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        # read-only, общий для потоков uvicorn (как FTS-индекс admin_rag_retriever)
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self._has_edges = self._conn.execute(
+            "SELECT 1 FROM articles WHERE related IS NOT NULL LIMIT 1").fetchone() is not None
+
+    def __bool__(self) -> bool:
+        return self._has_edges
+
+    def text(self, doc_id: str, article: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT text FROM articles WHERE doc_id = ? AND article = ?",
+            (doc_id, article)).fetchone()
+        return row[0] if row else None
+
+    def related(self, doc_id: str, article: str) -> List[str]:
+        row = self._conn.execute(
+            "SELECT related FROM articles WHERE doc_id = ? AND article = ?",
+            (doc_id, article)).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def has_doc(self, doc_id: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM articles WHERE doc_id = ? AND related IS NOT NULL LIMIT 1",
+            (doc_id,)).fetchone() is not None
+
+    def has_article(self, doc_id: str, article: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM articles WHERE doc_id = ? AND article = ? AND related IS NOT NULL",
+            (doc_id, article)).fetchone() is not None
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class JsonArticleStore:
+    """Fallback без .db: тот же интерфейс поверх целиком загруженных JSON."""
+
+    def __init__(self, texts_path: str = ARTICLE_TEXTS_PATH, edges_path: str = SEMANTIC_EDGES_PATH):
+        self._texts = _load_json(texts_path)
+        self._edges = _load_json(edges_path)
+
+    def __bool__(self) -> bool:
+        return bool(self._edges)
+
+    def text(self, doc_id: str, article: str) -> Optional[str]:
+        return self._texts.get(doc_id, {}).get(article)
+
+    def related(self, doc_id: str, article: str) -> List[str]:
+        return self._edges.get(doc_id, {}).get(article, [])
+
+    def has_doc(self, doc_id: str) -> bool:
+        return doc_id in self._edges
+
+    def has_article(self, doc_id: str, article: str) -> bool:
+        return article in self._edges.get(doc_id, {})
+
+    def close(self) -> None:
+        pass
+
+
+def _load_json(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def open_article_store(path: str = ARTICLE_STORE_PATH,
+                       texts_path: str = ARTICLE_TEXTS_PATH,
+                       edges_path: str = SEMANTIC_EDGES_PATH):
+    """SQLite-хранилище, если оно собрано и не старше JSON; иначе JsonArticleStore."""
+    if Path(path).exists():
+        if _mtime(path) >= max(_mtime(texts_path), _mtime(edges_path)):
+            try:
+                return ArticleStore(path)
+            except Exception as e:
+                logger.warning(f"ArticleStore: {path} не открылся ({e}) — читаем JSON")
+        else:
+            logger.warning(f"ArticleStore: {path} старше JSON — пересоберите "
+                           f"scripts/build_article_store.py; пока читаем JSON")
+    return JsonArticleStore(texts_path, edges_path)
+
+
+def build_article_store(out_path: str = ARTICLE_STORE_PATH,
+                        texts_path: str = ARTICLE_TEXTS_PATH,
+                        edges_path: str = SEMANTIC_EDGES_PATH) -> Dict[str, int]:
+    """Конвертирует article_texts.json + semantic_edges.json в SQLite.
+
+    Пишет во временный файл и подменяет атомарно (os.replace): открытые
+    читатели дочитывают старую версию, новые видят новую по mtime.
+    """
+    texts = _load_json(texts_path)
+    edges = _load_json(edges_path)
+    rows: Dict[tuple, list] = {}
+    for did, arts in texts.items():
+        for art, text in arts.items():
+            rows[(str(did), str(art))] = [text, None]
+    for did, arts in edges.items():
+        for art, related in arts.items():
+            rows.setdefault((str(did), str(art)), [None, None])[1] = json.dumps(
+                [str(r) for r in related], ensure_ascii=False)
+
+    tmp = f"{out_path}.tmp"
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute(_SCHEMA)
+        con.executemany(
+            "INSERT INTO articles (doc_id, article, text, related) VALUES (?, ?, ?, ?)",
+            ((did, art, text, related) for (did, art), (text, related) in sorted(rows.items())))
+        con.commit()
+        con.execute("VACUUM")
+    finally:
+        con.close()
+    os.replace(tmp, out_path)
+    return {
+        "articles": len(rows),
+        "texts": sum(1 for text, _ in rows.values() if text is not None),
+        "edges": sum(len(json.loads(rel)) for _, rel in rows.values() if rel),
+    }
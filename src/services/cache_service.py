@@ -7,25 +7,34 @@ Cache Service - Multi-layer caching for performance optimization
 - Redis caching (distributed, persistent)
 - Cache invalidation strategies
 - TTL (Time-To-Live) управление
+- Batched Redis operations (get_many/set_many через pipeline)
+- JSON / orjson / msgpack сериализация
 """
 import json
 import hashlib
+import sys
+import threading
 import time
-from typing import Any, Optional, Callable, Dict
+from collections import OrderedDict
+from typing import Any, Optional, Callable, Dict, Iterable, List, Tuple
 from functools import wraps
 from loguru import logger
 
+# Keys per DEL/UNLINK call when invalidating by pattern
+_DELETE_CHUNK = 500
+
 
 class CacheService:
     """
     Multi-layer cache service with Redis and in-memory fallback
 
     Features:
-    - In-memory LRU cache (default)
+    - In-memory LRU cache (default): O(1) get/set/evict, TTL, optional byte budget
     - Optional Redis backend for distributed caching
-    - Automatic serialization/deserialization
+    - Automatic serialization/deserialization (json, orjson or msgpack)
     - TTL support
-    - Cache invalidation by pattern
+    - Batched get_many/set_many: one Redis round-trip per batch
+    - Cache invalidation by pattern (SCAN, never blocks Redis with KEYS)
     - Decorator for easy caching
     """
 
@@ -36,7 +45,10 @@ class CacheService:
         redis_port: int = 6379,
         redis_db: int = 0,
         default_ttl: int = 3600,
-        max_memory_items: int = 1000
+        max_memory_items: int = 1000,
+        max_memory_bytes: Optional[int] = None,
+        serializer: Optional[str] = None,
+        redis_client=None
     ):
         """
         Initialize cache service
@@ -48,24 +60,45 @@ class CacheService:
             redis_db: Redis database number
             default_ttl: Default TTL in seconds
             max_memory_items: Max items in memory cache
+            max_memory_bytes: Max approximate size of memory cache values (None = unlimited)
+            serializer: Redis value codec: "json", "orjson" or "msgpack"
+                (None = settings.cache_serializer; falls back to json if the
+                package is not installed)
+            redis_client: Pre-configured Redis client (bytes responses); overrides host/port/db
         """
-        self.use_redis = use_redis
+        self.use_redis = use_redis or redis_client is not None
         self.default_ttl = default_ttl
         self.max_memory_items = max_memory_items
+        self.max_memory_bytes = max_memory_bytes
+
+        # In-memory cache (always available): key -> (value, size, expires_at),
+        # ordered from least to most recently used
+        self._memory_cache: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._memory_lock = threading.Lock()
 
-        # In-memory cache (always available)
-        self._memory_cache: Dict[str, Dict[str, Any]] = {}
+        # Memory tier counters
+        self.memory_hits = 0
+        self.memory_misses = 0
+        self.memory_evictions = 0
+        self.memory_expirations = 0
+
+        if serializer is None:
+            from config.settings import settings
+            serializer = settings.cache_serializer
+        self.serializer, self._dumps, self._loads = self._make_codec(serializer)
 
         # Redis cache (optional)
-        self.redis_client = None
-        if use_redis:
+        self.redis_client = redis_client
+        if use_redis and redis_client is None:
             try:
                 import redis
+                # Raw bytes: every codec decodes bytes, and msgpack payloads are not UTF-8
                 self.redis_client = redis.Redis(
                     host=redis_host,
                     port=redis_port,
                     db=redis_db,
-                    decode_responses=True,
+                    decode_responses=False,
                     socket_connect_timeout=2
                 )
                 # Test connection
@@ -76,6 +109,30 @@ class CacheService:
                 self.redis_client = None
                 self.use_redis = False
 
+    @staticmethod
+    def _make_codec(serializer: str) -> Tuple[str, Callable[[Any], Any], Callable[[Any], Any]]:
+        """Return (name, dumps, loads) for the Redis value codec"""
+        if serializer == "orjson":
+            try:
+                import orjson
+                return "orjson", lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS), orjson.loads
+            except ImportError:
+                logger.warning("orjson not installed, using json cache serializer")
+        elif serializer == "msgpack":
+            try:
+                import msgpack
+                return (
+                    "msgpack",
+                    lambda value: msgpack.packb(value, use_bin_type=True),
+                    lambda raw: msgpack.unpackb(raw, raw=False, strict_map_key=False),
+                )
+            except ImportError:
+                logger.warning("msgpack not installed, using json cache serializer")
+        elif serializer != "json":
+            raise ValueError(f"Unknown cache serializer: {serializer}")
+
+        return "json", lambda value: json.dumps(value, ensure_ascii=False), json.loads
+
     def get(self, key: str) -> Optional[Any]:
         """
         Get value from cache
@@ -92,37 +149,77 @@ class CacheService:
             Cached value or None if not found/expired
         """
         # Check memory cache first
-        if key in self._memory_cache:
-            entry = self._memory_cache[key]
-
-            # Check if expired
-            if entry['expires_at'] > time.time():
-                logger.debug(f"✓ Memory cache HIT: {key}")
-                return entry['value']
-            else:
-                # Expired, remove from memory
-                logger.debug(f"✗ Memory cache EXPIRED: {key}")
-                del self._memory_cache[key]
+        found, value = self._get_memory(key)
+        if found:
+            logger.debug(f"✓ Memory cache HIT: {key}")
+            return value
 
         # Check Redis if available
         if self.redis_client:
-            try:
-                redis_value = self.redis_client.get(key)
-                if redis_value:
-                    logger.debug(f"✓ Redis cache HIT: {key}")
-                    # Deserialize and store in memory
-                    value = json.loads(redis_value)
-                    # Get TTL from Redis
-                    ttl = self.redis_client.ttl(key)
-                    if ttl > 0:
-                        self._set_memory(key, value, ttl)
-                    return value
-            except Exception as e:
-                logger.error(f"Redis get error: {e}")
+            found = self._get_redis([key])
+            if key in found:
+                logger.debug(f"✓ Redis cache HIT: {key}")
+                return found[key]
 
         logger.debug(f"✗ Cache MISS: {key}")
         return None
 
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get several values at once
+
+        Memory hits are served locally, the rest is fetched from Redis in a
+        single pipelined round-trip (GET + TTL per key).
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Dict key -> value for keys that were found (misses are absent)
+        """
+        keys = list(dict.fromkeys(keys))
+        result: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in keys:
+            found, value = self._get_memory(key)
+            if found:
+                result[key] = value
+            else:
+                missing.append(key)
+
+        if missing and self.redis_client:
+            result.update(self._get_redis(missing))
+
+        logger.debug(f"Cache get_many: {len(result)}/{len(keys)} found")
+        return result
+
+    def _get_redis(self, keys: List[str]) -> Dict[str, Any]:
+        """Fetch keys from Redis with their TTL in one round-trip and promote hits to memory"""
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.get(key)
+                pipe.ttl(key)
+            replies = pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis get error: {e}")
+            return {}
+
+        result: Dict[str, Any] = {}
+        for key, redis_value, ttl in zip(keys, replies[::2], replies[1::2]):
+            if not redis_value:
+                continue
+            try:
+                value = self._loads(redis_value)
+            except Exception as e:
+                # Written by another codec or corrupted - treat as a miss
+                logger.warning(f"Cannot decode cached value for {key}: {e}")
+                continue
+            if ttl > 0:
+                self._set_memory(key, value, ttl, size=sys.getsizeof(redis_value))
+            result[key] = value
+        return result
+
     def set(
         self,
         key: str,
@@ -143,24 +240,53 @@ class CacheService:
         if ttl is None:
             ttl = self.default_ttl
 
+        return self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Set several values at once (one pipelined Redis round-trip)
+
+        Args:
+            items: Dict key -> value (values must be serializable)
+            ttl: Time-to-live in seconds for all items (None = use default)
+
+        Returns:
+            True if successful
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+
         try:
+            serialized = {}
+            if self.redis_client:
+                for key, value in items.items():
+                    try:
+                        serialized[key] = self._dumps(value)
+                    except Exception as e:
+                        # Only this entry stays out of Redis; the rest of the batch is written
+                        logger.error(f"Cache serialize error for {key}: {e}")
+
             # Set in memory cache
-            self._set_memory(key, value, ttl)
+            for key, value in items.items():
+                raw = serialized.get(key)
+                self._set_memory(key, value, ttl, size=sys.getsizeof(raw) if raw is not None else None)
 
             # Set in Redis if available
             if self.redis_client:
                 try:
-                    serialized = json.dumps(value, ensure_ascii=False)
-                    self.redis_client.setex(key, ttl, serialized)
-                    logger.debug(f"✓ Cached in Redis: {key} (TTL: {ttl}s)")
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    for key, raw in serialized.items():
+                        pipe.setex(key, ttl, raw)
+                    pipe.execute()
+                    logger.debug(f"✓ Cached in Redis: {len(serialized)} keys (TTL: {ttl}s)")
                 except Exception as e:
                     logger.error(f"Redis set error: {e}")
 
-            logger.debug(f"✓ Cached in memory: {key} (TTL: {ttl}s)")
+            logger.debug(f"✓ Cached in memory: {len(items)} keys (TTL: {ttl}s)")
             return True
 
         except Exception as e:
-            logger.error(f"Cache set error for {key}: {e}")
+            logger.error(f"Cache set error for {list(items)[:3]}: {e}")
             return False
 
     def delete(self, key: str) -> bool:
@@ -176,9 +302,11 @@ class CacheService:
         deleted = False
 
         # Delete from memory
-        if key in self._memory_cache:
-            del self._memory_cache[key]
-            deleted = True
+        with self._memory_lock:
+            if key in self._memory_cache:
+                self._remove_memory(key)
+                deleted = True
+        if deleted:
             logger.debug(f"✓ Deleted from memory: {key}")
 
         # Delete from Redis
@@ -205,17 +333,23 @@ class CacheService:
         count = 0
 
         # Delete from memory
-        keys_to_delete = [k for k in self._memory_cache.keys() if self._match_pattern(k, pattern)]
-        for key in keys_to_delete:
-            del self._memory_cache[key]
-            count += 1
+        with self._memory_lock:
+            keys_to_delete = [k for k in self._memory_cache if self._match_pattern(k, pattern)]
+            for key in keys_to_delete:
+                self._remove_memory(key)
+                count += 1
 
-        # Delete from Redis
+        # Delete from Redis: incremental SCAN instead of KEYS (does not block the server)
         if self.redis_client:
             try:
-                redis_keys = self.redis_client.keys(pattern)
-                if redis_keys:
-                    count += self.redis_client.delete(*redis_keys)
+                batch = []
+                for redis_key in self.redis_client.scan_iter(match=pattern, count=_DELETE_CHUNK):
+                    batch.append(redis_key)
+                    if len(batch) >= _DELETE_CHUNK:
+                        count += self.redis_client.unlink(*batch)
+                        batch = []
+                if batch:
+                    count += self.redis_client.unlink(*batch)
                 logger.debug(f"✓ Deleted {count} keys matching pattern: {pattern}")
             except Exception as e:
                 logger.error(f"Redis delete pattern error: {e}")
@@ -230,7 +364,9 @@ class CacheService:
             True if successful
         """
         # Clear memory
-        self._memory_cache.clear()
+        with self._memory_lock:
+            self._memory_cache.clear()
+            self._memory_bytes = 0
 
         # Clear Redis
         if self.redis_client:
@@ -244,22 +380,68 @@ class CacheService:
         logger.info("✓ Cleared memory cache")
         return True
 
-    def _set_memory(self, key: str, value: Any, ttl: int):
-        """Set value in memory cache with TTL"""
-        # LRU eviction if cache is full
-        if len(self._memory_cache) >= self.max_memory_items:
-            # Remove oldest entry
-            oldest_key = min(
-                self._memory_cache.keys(),
-                key=lambda k: self._memory_cache[k]['expires_at']
-            )
-            del self._memory_cache[oldest_key]
-            logger.debug(f"✓ Evicted oldest entry: {oldest_key}")
-
-        self._memory_cache[key] = {
-            'value': value,
-            'expires_at': time.time() + ttl
-        }
+    def _get_memory(self, key: str) -> Tuple[bool, Any]:
+        """Look up key in memory cache, marking it most recently used"""
+        with self._memory_lock:
+            entry = self._memory_cache.get(key)
+            if entry is None:
+                self.memory_misses += 1
+                return False, None
+
+            value, _, expires_at = entry
+            if expires_at <= time.time():
+                # Expired, remove from memory
+                self._remove_memory(key)
+                self.memory_expirations += 1
+                self.memory_misses += 1
+                return False, None
+
+            self._memory_cache.move_to_end(key)
+            self.memory_hits += 1
+            return True, value
+
+    def _set_memory(self, key: str, value: Any, ttl: int, size: Optional[int] = None):
+        """Set value in memory cache with TTL, evicting least recently used entries"""
+        if self.max_memory_bytes is not None:
+            size = self._estimate_size(value) if size is None else size
+            if size > self.max_memory_bytes:
+                logger.debug(f"Value for {key} ({size} bytes) exceeds memory budget, not cached in memory")
+                with self._memory_lock:
+                    if key in self._memory_cache:
+                        self._remove_memory(key)
+                return
+        else:
+            size = 0
+
+        with self._memory_lock:
+            if key in self._memory_cache:
+                self._remove_memory(key)
+
+            self._memory_cache[key] = (value, size, time.time() + ttl)
+            self._memory_bytes += size
+
+            # LRU eviction if cache is full
+            while len(self._memory_cache) > self.max_memory_items or (
+                self.max_memory_bytes is not None and self._memory_bytes > self.max_memory_bytes
+            ):
+                oldest_key, (_, oldest_size, _) = self._memory_cache.popitem(last=False)
+                self._memory_bytes -= oldest_size
+                self.memory_evictions += 1
+
+    def _remove_memory(self, key: str):
+        """Remove key from memory cache (caller holds _memory_lock)"""
+        _, size, _ = self._memory_cache.pop(key)
+        self._memory_bytes -= size
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """Approximate memory footprint of a cached value (serialized length for containers)"""
+        if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+            return sys.getsizeof(value)
+        try:
+            return sys.getsizeof(json.dumps(value, ensure_ascii=False, default=str))
+        except (TypeError, ValueError):
+            return sys.getsizeof(value)
 
     def _match_pattern(self, key: str, pattern: str) -> bool:
         """Simple pattern matching for cache keys"""
@@ -284,6 +466,13 @@ class CacheService:
             return result
         ```
 
+        The wrapped function also gets ``.many(calls)`` for batches: one
+        get_many/set_many round-trip instead of one per call.
+
+        ```python
+        companies = get_company_info.many([("7707083893",), ("7728168971",)])
+        ```
+
         Args:
             ttl: Cache TTL in seconds
             key_prefix: Prefix for cache key
@@ -292,8 +481,7 @@ class CacheService:
             Decorated function
         """
         def decorator(func: Callable) -> Callable:
-            @wraps(func)
-            def wrapper(*args, **kwargs):
+            def make_key(args: tuple, kwargs: dict) -> str:
                 # Generate cache key from function name and arguments
                 key_parts = [key_prefix, func.__name__] if key_prefix else [func.__name__]
 
@@ -308,7 +496,11 @@ class CacheService:
                     kwargs_hash = hashlib.sha256(kwargs_str.encode()).hexdigest()[:8]
                     key_parts.append(kwargs_hash)
 
-                cache_key = ":".join(key_parts)
+                return ":".join(key_parts)
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                cache_key = make_key(args, kwargs)
 
                 # Try to get from cache
                 cached_result = self.get(cache_key)
@@ -324,6 +516,24 @@ class CacheService:
 
                 return result
 
+            def many(calls: Iterable[tuple]) -> List[Any]:
+                """Call func for each args tuple, batching cache reads and writes"""
+                calls = [tuple(call) for call in calls]
+                keys = [make_key(call, {}) for call in calls]
+                results = self.get_many(keys)
+
+                computed: Dict[str, Any] = {}
+                for call, cache_key in zip(calls, keys):
+                    if results.get(cache_key) is None and cache_key not in computed:
+                        computed[cache_key] = func(*call)
+                if computed:
+                    self.set_many(computed, ttl=ttl)
+                    results.update(computed)
+
+                logger.info(f"✓ {func.__name__}.many: {len(calls) - len(computed)}/{len(calls)} from cache")
+                return [results[cache_key] for cache_key in keys]
+
+            wrapper.many = many
             return wrapper
         return decorator
 
@@ -334,9 +544,17 @@ class CacheService:
         Returns:
             Dict with cache stats
         """
+        memory_lookups = self.memory_hits + self.memory_misses
         stats = {
             'memory_items': len(self._memory_cache),
             'memory_max_items': self.max_memory_items,
+            'memory_bytes': self._memory_bytes,
+            'memory_max_bytes': self.max_memory_bytes,
+            'memory_hits': self.memory_hits,
+            'memory_misses': self.memory_misses,
+            'memory_evictions': self.memory_evictions,
+            'memory_expirations': self.memory_expirations,
+            'memory_hit_rate': self.memory_hits / memory_lookups * 100 if memory_lookups else 0,
             'default_ttl': self.default_ttl,
             'redis_enabled': self.use_redis,
             'redis_connected': self.redis_client is not None
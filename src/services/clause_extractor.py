@@ -4,11 +4,12 @@ Clause Extractor - Extract and structure contract clauses from XML
 
 Извлекает пункты договора из XML для дальнейшего анализа
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from loguru import logger
 from lxml import etree
 
 from ..utils.xml_security import parse_xml_safely, XMLSecurityError
+from .contract_document import ContractDocument
 
 
 class ClauseExtractor:
@@ -19,22 +20,37 @@ class ClauseExtractor:
     - DocumentParser format (<clauses><clause>)
     - Generic XML structure
     - Recursive extraction with depth tracking
+
+    Every public method accepts either the raw XML string or a
+    ContractDocument; with a document the cached view is returned instead
+    of re-parsing the XML.
     """
 
     @staticmethod
-    def extract_structure(xml_content: str) -> Dict[str, Any]:
+    def _root(source: Union[str, ContractDocument]) -> etree._Element:
+        if isinstance(source, ContractDocument):
+            return source.root
+        return parse_xml_safely(source)
+
+    @staticmethod
+    def extract_structure(xml_content: Union[str, ContractDocument]) -> Dict[str, Any]:
         """
         Extract high-level contract structure
 
         Args:
-            xml_content: Raw XML content
+            xml_content: Raw XML content or parsed ContractDocument
 
         Returns:
             Structure dict with parties, price, terms, sections
         """
+        if isinstance(xml_content, ContractDocument):
+            return xml_content.structure
+        return ClauseExtractor._build_structure(xml_content)
+
+    @staticmethod
+    def _build_structure(xml_content: Union[str, ContractDocument]) -> Dict[str, Any]:
         try:
-            tree = parse_xml_safely(xml_content)
-            root = tree
+            root = ClauseExtractor._root(xml_content)
 
             structure = {
                 'sections': [],
@@ -124,25 +140,32 @@ class ClauseExtractor:
             return {}
 
     @staticmethod
-    def extract_clauses(xml_content: str, max_clauses: int = 50) -> List[Dict[str, Any]]:
+    def extract_clauses(
+        xml_content: Union[str, ContractDocument], max_clauses: int = 50
+    ) -> List[Dict[str, Any]]:
         """
         Extract individual contract clauses for analysis
 
         Args:
-            xml_content: Raw XML content
+            xml_content: Raw XML content or parsed ContractDocument
             max_clauses: Maximum number of clauses to extract
 
         Returns:
             List of clause dicts with id, text, type, xpath
         """
+        if isinstance(xml_content, ContractDocument) and max_clauses <= xml_content.MAX_CLAUSES:
+            return xml_content.clauses[:max_clauses]
+        return ClauseExtractor._build_clauses(xml_content, max_clauses)
+
+    @staticmethod
+    def _build_clauses(xml_content: Union[str, ContractDocument], max_clauses: int = 50) -> List[Dict[str, Any]]:
         try:
             logger.info("Starting clause extraction from XML...")
-            tree = parse_xml_safely(xml_content)
-            root = tree
+            root = ClauseExtractor._root(xml_content)
 
             logger.info(f"Root tag: {root.tag}, children: {len(list(root))}")
 
-            direct_clauses = ClauseExtractor._extract_clauses_alternative(xml_content)
+            direct_clauses = ClauseExtractor._extract_clauses_alternative(root)
             if direct_clauses:
                 logger.info(f"Using normalized clause container: {len(direct_clauses)} clauses")
                 return direct_clauses[:max_clauses]
@@ -212,7 +235,7 @@ class ClauseExtractor:
             # Fallback to alternative method if no clauses found
             if len(clauses) == 0:
                 logger.warning("No clauses found, trying alternative method...")
-                clauses = ClauseExtractor._extract_clauses_alternative(xml_content)
+                clauses = ClauseExtractor._extract_clauses_alternative(root)
                 logger.info(f"Alternative method found {len(clauses)} clauses")
 
             return clauses[:max_clauses]
@@ -222,14 +245,19 @@ class ClauseExtractor:
             return []
 
     @staticmethod
-    def _extract_clauses_alternative(xml_content: str) -> List[Dict[str, Any]]:
+    def _extract_clauses_alternative(
+        xml_content: Union[str, ContractDocument, etree._Element]
+    ) -> List[Dict[str, Any]]:
         """
         Alternative extraction for DocumentParser format
 
         Handles <clauses><clause> structure specifically
         """
         try:
-            tree = parse_xml_safely(xml_content)
+            if isinstance(xml_content, etree._Element):
+                tree = xml_content
+            else:
+                tree = ClauseExtractor._root(xml_content)
             clauses: List[Dict[str, Any]] = []
 
             # Try DocumentParser <clauses> container first
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Contract Document - parse-once view over normalized contract XML
+
+Один экземпляр на прогон анализа: XML парсится один раз, а производные
+представления (пункты, plain text, структура, стороны, индекс xpath)
+вычисляются лениво и кэшируются.
+"""
+import threading
+from functools import cached_property
+from typing import Any, Dict, FrozenSet, List, Optional, Union
+
+from lxml import etree
+
+from ..utils.xml_security import parse_xml_safely
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only (shared ContractDocument view)")
+
+
+class FrozenDict(dict):
+    """dict без изменения на месте; json.dumps и сравнение с dict работают как обычно"""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # copy / deepcopy / pickle дают обычный изменяемый dict
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """list без изменения на месте; срез возвращает обычный list"""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(_freeze(item) for item in value)
+    return value
+
+
+class ContractDocument:
+    """
+    Immutable parsed contract document
+
+    Wraps the normalized XML string produced by DocumentParser and exposes
+    cached views that the analysis pipeline previously recomputed from the
+    raw string at every stage:
+
+    - root: parsed lxml tree (parsed once, parse errors are cached too)
+    - clauses: ClauseExtractor.extract_clauses() result
+    - structure: ClauseExtractor.extract_structure() result
+    - plain_text: stable plain text for full-document analysis
+    - parties: party elements as dicts (name, role, inn)
+    - xpath_index: clause xpath -> clause dict
+    - tag_set: set of element tags (template comparison)
+
+    Views are shared between stages without copying: clauses, structure,
+    parties and xpath_index are frozen (FrozenDict / FrozenList). A stage that
+    needs to modify one takes its own copy (dict(clause), copy.deepcopy(...)).
+    """
+
+    MAX_CLAUSES = 50
+
+    def __init__(self, xml_content: str):
+        self.xml_content = xml_content
+        self._root: Optional[etree._Element] = None
+        self._parse_error: Optional[Exception] = None
+        self._parse_lock = threading.Lock()
+
+    @classmethod
+    def coerce(cls, source: Union[str, 'ContractDocument']) -> 'ContractDocument':
+        """Return ``source`` unchanged if it is already a document, otherwise wrap the XML string."""
+        if isinstance(source, ContractDocument):
+            return source
+        return cls(source)
+
+    def __repr__(self) -> str:
+        return f"ContractDocument({len(self.xml_content or '')} chars)"
+
+    @property
+    def root(self) -> etree._Element:
+        """Parsed XML root. Raises the original parse error on every access if parsing failed."""
+        if self._root is None and self._parse_error is None:
+            with self._parse_lock:
+                if self._root is None and self._parse_error is None:
+                    try:
+                        self._root = parse_xml_safely(self.xml_content)
+                    except Exception as exc:
+                        self._parse_error = exc
+        if self._parse_error is not None:
+            raise self._parse_error
+        return self._root
+
+    @cached_property
+    def clauses(self) -> List[Dict[str, Any]]:
+        from .clause_extractor import ClauseExtractor
+        return _freeze(ClauseExtractor._build_clauses(self, self.MAX_CLAUSES))
+
+    @cached_property
+    def structure(self) -> Dict[str, Any]:
+        from .clause_extractor import ClauseExtractor
+        return _freeze(ClauseExtractor._build_structure(self))
+
+    @cached_property
+    def plain_text(self) -> str:
+        """Clause titles and paragraphs joined for full-text analysis (falls back to all text nodes)."""
+        root = self.root
+        chunks: List[str] = []
+
+        clause_nodes = root.findall('.//clauses/clause')
+        if clause_nodes:
+            for clause in clause_nodes:
+                title = (clause.findtext('title', '') or '').strip()
+                paragraphs = [
+                    ' '.join((paragraph.text or '').split())
+                    for paragraph in clause.findall('.//paragraph')
+                    if (paragraph.text or '').strip()
+                ]
+                clause_text = '\n'.join(part for part in [title, *paragraphs] if part).strip()
+                if clause_text:
+                    chunks.append(clause_text)
+            if chunks:
+                return '\n\n'.join(chunks)
+
+        for text in root.itertext():
+            cleaned = ' '.join((text or '').split())
+            if cleaned:
+                chunks.append(cleaned)
+        return '\n'.join(chunks)
+
+    @cached_property
+    def parties(self) -> List[Dict[str, str]]:
+        return _freeze([
+            {
+                'name': party.findtext('name', ''),
+                'role': party.get('role', 'unknown'),
+                'inn': party.findtext('inn', ''),
+            }
+            for party in self.root.findall('.//party')
+        ])
+
+    @cached_property
+    def xpath_index(self) -> Dict[str, Dict[str, Any]]:
+        return FrozenDict((clause['xpath'], clause) for clause in self.clauses if clause.get('xpath'))
+
+    @cached_property
+    def tag_set(self) -> FrozenSet[str]:
+        return frozenset(elem.tag for elem in self.root.iter())
+
+
+__all__ = ['ContractDocument', 'FrozenDict', 'FrozenList']
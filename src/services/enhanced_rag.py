@@ -20,11 +20,15 @@ Author: AI Contract System
 
 import os
 import json
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple, Set
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from collections import defaultdict
 import hashlib
+import threading
 
 try:
     import chromadb
@@ -34,7 +38,7 @@ except ImportError:
     CHROMA_AVAILABLE = False
 
 try:
-    from sentence_transformers import SentenceTransformer, CrossEncoder
+    import sentence_transformers  # noqa: F401 — модели выдаёт get_model_registry()
     SENTENCE_TRANSFORMERS_AVAILABLE = True
 except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
@@ -43,6 +47,12 @@ from loguru import logger
 import re
 from typing import Generator
 
+from src.services.model_registry import get_model_registry
+
+# Fan-out pool for per-collection ANN queries (contracts / company_kb / legal_docs).
+# Chroma releases the GIL inside its HNSW/SQLite calls, so the queries overlap.
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="rag-search")
+
 
 @dataclass
 class DocumentChunk:
@@ -368,7 +378,7 @@ class EnhancedRAGSystem:
         """Initialize embedding model"""
         if SENTENCE_TRANSFORMERS_AVAILABLE:
             try:
-                self.embedding_model = SentenceTransformer(self.embedding_model_name)
+                self.embedding_model = get_model_registry().embedder(self.embedding_model_name)
                 logger.info(f"✅ Loaded embedding model: {self.embedding_model_name}")
             except Exception as e:
                 logger.error(f"❌ Failed to load embedding model: {e}")
@@ -414,7 +424,7 @@ class EnhancedRAGSystem:
         """Initialize cross-encoder for re-ranking"""
         if SENTENCE_TRANSFORMERS_AVAILABLE:
             try:
-                self.reranker = CrossEncoder(self.reranker_model_name)
+                self.reranker = get_model_registry().reranker(self.reranker_model_name)
                 logger.info(f"✅ Loaded re-ranker: {self.reranker_model_name}")
             except Exception as e:
                 logger.error(f"❌ Failed to load re-ranker: {e}")
@@ -739,11 +749,16 @@ class EnhancedRAGSystem:
         search_kb: bool = True,
         search_legal: bool = False,
         use_reranking: bool = True,
-        expand_query: bool = True
+        expand_query: bool = True,
+        rerank_pool: Optional[int] = None
     ) -> List[SearchResult]:
         """
         Enhanced multi-source search
 
+        The expanded query is embedded once and the selected collections are
+        queried concurrently with that embedding; their score-sorted results
+        are heap-merged so only the best candidates reach the cross-encoder.
+
         Args:
             query: Search query
             top_k: Number of results to return
@@ -752,6 +767,7 @@ class EnhancedRAGSystem:
             search_legal: Search legal documents
             use_reranking: Use cross-encoder re-ranking
             expand_query: Expand query with synonyms
+            rerank_pool: Candidates passed to the cross-encoder (default: 2 * top_k)
 
         Returns:
             List of SearchResult objects, ranked by relevance
@@ -768,28 +784,31 @@ class EnhancedRAGSystem:
         logger.info(f"🔍 Searching: '{query}' (expanded: '{expanded_query}')")
 
         # Search all selected sources
-        all_results = []
-
+        sources = []
         if search_contracts and self.contracts_collection is not None:
-            results = self._search_collection(self.contracts_collection, expanded_query, top_k, source='contract')
-            all_results.extend(results)
-
+            sources.append((self.contracts_collection, 'contract', 1.0))
         if search_kb and self.kb_collection is not None:
-            results = self._search_collection(self.kb_collection, expanded_query, top_k, source='kb')
             # Boost company KB results (company-specific knowledge is valuable)
-            for result in results:
-                result.score *= 1.2  # 20% boost
-            all_results.extend(results)
-
+            sources.append((self.kb_collection, 'kb', 1.2))  # 20% boost
         if search_legal and self.legal_collection is not None:
-            results = self._search_collection(self.legal_collection, expanded_query, top_k, source='legal_doc')
-            all_results.extend(results)
-
-        # Sort by score
-        all_results.sort(key=lambda x: x.score, reverse=True)
+            sources.append((self.legal_collection, 'legal_doc', 1.0))
+
+        # One embedding for all collections instead of query_texts per collection
+        query_embedding = self._embed_query(expanded_query)
+        per_source = self._search_sources(sources, expanded_query, query_embedding, top_k)
+        candidate_count = sum(len(results) for results in per_source)
+
+        # Heap-merge the score-sorted lists; stop once the pool that can still
+        # make the final cut is filled
+        use_reranking = use_reranking and self.reranker is not None
+        pool_size = max(top_k, rerank_pool or 2 * top_k) if use_reranking else top_k
+        all_results = list(itertools.islice(
+            heapq.merge(*per_source, key=lambda x: x.score, reverse=True),
+            pool_size
+        ))
 
         # Re-rank if enabled
-        if use_reranking and self.reranker is not None:
+        if use_reranking:
             all_results = self._rerank_results(query, all_results)
 
         # Take top K
@@ -801,22 +820,60 @@ class EnhancedRAGSystem:
         # Cache results
         self._add_to_cache(cache_key, final_results)
 
-        logger.info(f"✅ Found {len(final_results)} results from {len(all_results)} candidates")
+        logger.info(f"✅ Found {len(final_results)} results from {candidate_count} candidates")
         return final_results
 
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        """Encode the query once with the model used for indexing (None = let Chroma embed)"""
+        if self.embedding_model is None:
+            return None
+        try:
+            return self.embedding_model.encode([query])[0].tolist()
+        except Exception as e:
+            logger.error(f"❌ Query embedding failed: {e}")
+            return None
+
+    def _search_sources(
+        self,
+        sources: List[Tuple[object, str, float]],
+        query: str,
+        query_embedding: Optional[List[float]],
+        top_k: int
+    ) -> List[List[SearchResult]]:
+        """Query (collection, source, boost) sources concurrently; each result list sorted by score"""
+        def run(collection, source: str, boost: float) -> List[SearchResult]:
+            results = self._search_collection(collection, query, top_k, source, query_embedding=query_embedding)
+            for result in results:
+                result.score *= boost
+            results.sort(key=lambda x: x.score, reverse=True)
+            return results
+
+        if len(sources) <= 1:
+            return [run(*source) for source in sources]
+
+        futures = [_SEARCH_POOL.submit(run, *source) for source in sources]
+        return [future.result() for future in futures]
+
     def _search_collection(
         self,
         collection,
         query: str,
         top_k: int,
-        source: str
+        source: str,
+        query_embedding: Optional[List[float]] = None
     ) -> List[SearchResult]:
         """Search a single ChromaDB collection"""
         try:
-            results = collection.query(
-                query_texts=[query],
-                n_results=top_k
-            )
+            if query_embedding is not None:
+                results = collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=top_k
+                )
+            else:
+                results = collection.query(
+                    query_texts=[query],
+                    n_results=top_k
+                )
 
             search_results = []
             if results['documents'] and len(results['documents'][0]) > 0:
@@ -1034,11 +1091,14 @@ class EnhancedRAGSystem:
 
 # Singleton instance for convenient access
 _rag_instance = None
+_rag_instance_lock = threading.Lock()
 
 
 def get_enhanced_rag() -> EnhancedRAGSystem:
     """Get singleton RAG instance"""
     global _rag_instance
     if _rag_instance is None:
-        _rag_instance = EnhancedRAGSystem()
+        with _rag_instance_lock:
+            if _rag_instance is None:
+                _rag_instance = EnhancedRAGSystem()
     return _rag_instance
@@ -2,33 +2,170 @@
 LLM Gateway - Единая точка доступа ко всем LLM провайдерам
 Поддержка: Claude, GPT-4, Perplexity, YandexGPT, DeepSeek, Qwen
 """
+import copy
 import json
 import asyncio
 import hashlib
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any, Literal, Optional, Union
-from tenacity import Retrying, stop_after_attempt, wait_exponential
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, ContextManager, Dict, Any, Iterator, List, Literal, Optional, Tuple, Union
+from tenacity import AsyncRetrying, Retrying, stop_after_attempt, wait_exponential
 from loguru import logger
-from datetime import datetime, timezone
 from config.settings import settings
 from ..utils.rate_limiter import get_global_rate_limiter, RateLimitExceeded
+from .llm_response_cache import get_llm_response_cache
+from .llm_http_pool import get_llm_http_pool
 
 # Dedicated thread pool for LLM calls — keeps blocking LLM I/O off the event loop.
 # 32 workers: each thread holds ~2-8 MB stack + one blocking HTTP connection.
 # At 32 workers × 30s avg LLM latency = up to ~1 req/s sustained throughput.
 # Scale up only if profiling shows queue buildup under real load.
+# acall/stream use it only when native async is disabled or a db_session is passed.
 _LLM_THREAD_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm")
 
+# Providers with a native async code path (pooled keep-alive HTTP, see llm_http_pool)
+_NATIVE_ASYNC_PROVIDERS = {"claude", "openai", "perplexity", "deepseek", "ollama", "yandex", "qwen"}
+
+_OPENAI_COMPATIBLE_BASE_URLS = {
+    "openai": None,
+    "perplexity": "https://api.perplexity.ai",
+    "deepseek": "https://api.deepseek.com",
+}
+
+_YANDEX_COMPLETION_URL = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+_QWEN_GENERATION_URL = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+
+_CACHE_MISS = object()
+
+# Rate limiter tenant of the current request/analysis (see rate_limit_tenant_scope)
+_RATE_LIMIT_TENANT: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "llm_rate_limit_tenant", default=None
+)
+
+
+@contextmanager
+def rate_limit_tenant_scope(tenant: Optional[str]) -> Iterator[None]:
+    """
+    Charge every LLM call made in this context to ``tenant``'s sub-bucket.
+
+    Scoped per task/thread, so a gateway shared between agents is never
+    pinned to one tenant. A per-call ``rate_limit_tenant=`` still wins.
+    """
+    token = _RATE_LIMIT_TENANT.set(tenant)
+    try:
+        yield
+    finally:
+        _RATE_LIMIT_TENANT.reset(token)
+
+
+class _SingleFlight:
+    """
+    Coalesces concurrent identical LLM requests into one upstream call.
+
+    The first caller for a cache key becomes the leader and performs the
+    call; callers arriving while it is in flight wait on the leader's
+    Future (sync callers block, acall awaits it without holding a pool
+    thread) and receive a copy of the same result or the same exception.
+    A cancelled leader does not cancel its followers: they get
+    _LeaderCancelled and claim the key again, one of them as the new leader.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, list] = {}  # key -> [future, waiter_count]
+
+    def claim(self, key: str) -> Tuple[Future, bool]:
+        """Return (future, is_leader) for the key."""
+        with self._lock:
+            slot = self._calls.get(key)
+            if slot is not None:
+                slot[1] += 1
+                return slot[0], False
+            future = Future()
+            self._calls[key] = [future, 0]
+            return future, True
+
+    def run(self, key: str, future: Future, fn: Callable[[], Any]) -> Any:
+        """Execute fn as the leader and publish its outcome to waiting followers."""
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._fail(key, future, exc)
+            raise
+        return self._publish(key, future, result)
+
+    async def arun(self, key: str, future: Future, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """run() for an async leader: awaits fn() on the event loop."""
+        try:
+            result = await fn()
+        except BaseException as exc:
+            self._fail(key, future, exc)
+            raise
+        return self._publish(key, future, result)
+
+    def _fail(self, key: str, future: Future, exc: BaseException) -> None:
+        self._release(key)
+        if isinstance(exc, asyncio.CancelledError):
+            # The leader's own cancellation is not the followers' outcome
+            exc = _LeaderCancelled()
+        future.set_exception(exc)
+
+    def _publish(self, key: str, future: Future, result: Any) -> Any:
+        # Nobody can join after release, so the copy is only made when someone waits
+        waiters = self._release(key)
+        future.set_result(_copy_result(result) if waiters else None)
+        return result
+
+    def _release(self, key: str) -> int:
+        with self._lock:
+            slot = self._calls.pop(key, None)
+        return slot[1] if slot else 0
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class _LeaderCancelled(Exception):
+    """The single-flight leader was cancelled before producing a result."""
+
+
+def _copy_result(result: Any) -> Any:
+    """JSON responses are mutable dicts: every waiter gets its own copy."""
+    return result if isinstance(result, str) else copy.deepcopy(result)
+
+
+_IN_FLIGHT = _SingleFlight()
+
+
+def _in_event_loop_thread() -> bool:
+    """True when called from a thread that is running an asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
 
 class LLMGateway:
     """Unified gateway for all LLM providers"""
 
-    def __init__(self, provider: Optional[str] = None, model: Optional[str] = None):
+    rate_limit_tenant: Optional[str] = None
+
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        rate_limit_tenant: Optional[str] = None,
+    ):
         """
         =8F80;870F8O gateway
 
         Args:
             provider: 0720=85 ?@>20945@0 8;8 None 4;O 8A?>;L7>20=8O default
+            rate_limit_tenant: Tenant (org/user id) for the rate limiter sub-bucket
+                when a call does not pass ``rate_limit_tenant`` itself
         """
         self.provider = provider or settings.default_llm_provider
         self._client = None
@@ -40,6 +177,10 @@ class LLMGateway:
         # Rate limiting
         self.use_rate_limiter = True
         self.rate_limiter = get_global_rate_limiter()
+        self.rate_limit_tenant = rate_limit_tenant
+
+        # Process-local response cache (works without db_session)
+        self.memory_cache = get_llm_response_cache() if settings.llm_memory_cache_enabled else None
 
     def _initialize_client(self):
         """Инициализирует клиента для выбранного провайдера"""
@@ -133,25 +274,36 @@ class LLMGateway:
         return hashlib.sha256(cache_string.encode('utf-8')).hexdigest()
 
     def _get_from_cache(self, cache_key: str, db_session=None) -> Optional[str]:
-        """Получает ответ из кэша"""
+        """
+        Получает ответ из кэша
+
+        Tier 1 - process-local LRU (no DB round-trip, works without session).
+        Tier 2 - llm_cache table (only with db_session); a DB hit is promoted
+        to tier 1. hit_count/last_accessed are flushed to llm_cache in batches
+        by the memory cache instead of UPDATE + commit on every hit.
+        """
+        if self.memory_cache is not None:
+            cached_response = self.memory_cache.get(cache_key)
+            if cached_response is not None:
+                logger.debug(f"Memory cache HIT: {cache_key[:16]}...")
+                return cached_response
+
         if not db_session:
             return None
-        
+
         try:
             from src.models.database import LLMCache
-            cached = db_session.query(LLMCache).filter(
+            cached = db_session.query(LLMCache.response).filter(
                 LLMCache.prompt_hash == cache_key
             ).first()
-            
+
             if cached:
-                # Update hit count and last accessed
-                cached.hit_count += 1
-                cached.last_accessed = datetime.now(timezone.utc)
-                db_session.commit()
-                
-                logger.info(f"Cache HIT: {cache_key[:16]}... (hits: {cached.hit_count})")
+                logger.info(f"Cache HIT: {cache_key[:16]}...")
+                if self.memory_cache is not None:
+                    self.memory_cache.put(cache_key, cached.response, persisted=True)
+                    self.memory_cache.record_hit(cache_key)
                 return cached.response
-            
+
             return None
         except Exception as e:
             logger.warning(f"Cache read failed: {e}")
@@ -215,6 +367,58 @@ class LLMGateway:
         Returns:
             str 8;8 dict 2 7028A8<>AB8 >B response_format
         """
+        request = dict(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            response_format=response_format,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            use_cache=use_cache,
+            db_session=db_session,
+            **kwargs,
+        )
+        flight_key = self._single_flight_key(request)
+        if flight_key is None or _in_event_loop_thread():
+            # On the loop thread a blocked follower would starve an acall leader
+            # running on that same loop: call the provider directly instead.
+            return self._call_with_retries(**request)
+
+        while True:
+            future, is_leader = _IN_FLIGHT.claim(flight_key)
+            if is_leader:
+                return _IN_FLIGHT.run(flight_key, future, lambda: self._call_with_retries(**request))
+            logger.debug(f"Coalesced with in-flight LLM request {flight_key[:16]}...")
+            try:
+                return _copy_result(future.result())
+            except _LeaderCancelled:
+                logger.debug(f"In-flight LLM request {flight_key[:16]}... was cancelled, retrying")
+
+    def _single_flight_key(self, request: Dict[str, Any]) -> Optional[str]:
+        """Key for request coalescing; None when coalescing does not apply (use_cache=False)."""
+        if not request.get("use_cache", True) or not settings.llm_single_flight_enabled:
+            return None
+        temperature = request.get("temperature")
+        max_tokens = request.get("max_tokens")
+        return self._generate_cache_key(
+            request["prompt"],
+            request.get("system_prompt"),
+            temperature if temperature is not None else settings.llm_temperature,
+            max_tokens if max_tokens is not None else settings.llm_max_tokens,
+            request.get("response_format", "text"),
+        )
+
+    def _call_with_retries(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        response_format: Literal["text", "json"] = "text",
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        db_session = None,
+        **kwargs
+    ) -> Union[str, Dict[str, Any]]:
+        """call() body: outer tenacity retry loop around _call_once."""
         retry_attempts = kwargs.pop("retry_attempts", None)
         retry_attempts = max(1, int(retry_attempts or self.get_retry_attempts()))
 
@@ -254,20 +458,85 @@ class LLMGateway:
 
         logger.debug(f"LLM call to {self.provider}: prompt_length={len(prompt)}")
 
-        # Check cache first
-        if use_cache and db_session:
-            cache_key = self._generate_cache_key(prompt, system_prompt, temperature, max_tokens, response_format)
-            cached_response = self._get_from_cache(cache_key, db_session)
-            if cached_response:
-                # Parse if JSON format
-                if response_format == "json":
-                    try:
-                        return json.loads(cached_response)
-                    except (json.JSONDecodeError, ValueError):
-                        logger.warning("Failed to parse cached JSON response, fetching fresh")
-                        pass
-                return cached_response
+        cache_key, cached = self._lookup_cache(
+            prompt, system_prompt, response_format, temperature, max_tokens, use_cache, db_session
+        )
+        if cached is not _CACHE_MISS:
+            return cached
+
+        max_tokens, estimated_tokens = self._fit_max_tokens(prompt, system_prompt, max_tokens)
+        try:
+            with self._rate_limit_slot(estimated_tokens, **self._pop_rate_limit_options(kwargs)):
+                response = self._make_api_call(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        except RateLimitExceeded as e:
+            logger.error(f"Rate limit exceeded: {e}")
+            raise
+
+        return self._finish_response(response, response_format, cache_key)
+
+    async def _acall_once(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        response_format: Literal["text", "json"] = "text",
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        db_session = None,
+        **kwargs
+    ) -> Union[str, Dict[str, Any]]:
+        """_call_once() over the native async provider client."""
+        temperature = temperature if temperature is not None else settings.llm_temperature
+        max_tokens = max_tokens if max_tokens is not None else settings.llm_max_tokens
+
+        logger.debug(f"Async LLM call to {self.provider}: prompt_length={len(prompt)}")
+
+        cache_key, cached = self._lookup_cache(
+            prompt, system_prompt, response_format, temperature, max_tokens, use_cache, db_session
+        )
+        if cached is not _CACHE_MISS:
+            return cached
 
+        max_tokens, estimated_tokens = self._fit_max_tokens(prompt, system_prompt, max_tokens)
+        try:
+            async with self._rate_limit_slot(estimated_tokens, **self._pop_rate_limit_options(kwargs)):
+                response = await self._amake_api_call(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        except RateLimitExceeded as e:
+            logger.error(f"Rate limit exceeded: {e}")
+            raise
+
+        return self._finish_response(response, response_format, cache_key)
+
+    def _lookup_cache(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        response_format: str,
+        temperature: float,
+        max_tokens: int,
+        use_cache: bool,
+        db_session=None,
+    ) -> Tuple[Optional[str], Any]:
+        """Return (cache_key, cached result or _CACHE_MISS); cache_key is None when caching does not apply."""
+        if not use_cache or not (db_session or self.memory_cache is not None):
+            return None, _CACHE_MISS
+
+        cache_key = self._generate_cache_key(prompt, system_prompt, temperature, max_tokens, response_format)
+        cached_response = self._get_from_cache(cache_key, db_session)
+        if cached_response:
+            # Parse if JSON format
+            if response_format != "json":
+                return cache_key, cached_response
+            try:
+                return cache_key, json.loads(cached_response)
+            except (json.JSONDecodeError, ValueError):
+                logger.warning("Failed to parse cached JSON response, fetching fresh")
+                if self.memory_cache is not None:
+                    self.memory_cache.invalidate(cache_key)
+        return cache_key, _CACHE_MISS
+
+    def _fit_max_tokens(self, prompt: str, system_prompt: Optional[str], max_tokens: int) -> Tuple[int, int]:
+        """Truncate max_tokens to the model context; returns (max_tokens, estimated total tokens)."""
         # Token limit check — warn/truncate if prompt exceeds model context
         estimated_input_tokens = len(prompt) // 4 + (len(system_prompt) // 4 if system_prompt else 0)
         MODEL_CONTEXT_LIMITS = {
@@ -283,65 +552,88 @@ class LLMGateway:
                 f"exceeds model context ({context_limit}). Truncating max_tokens."
             )
             max_tokens = min(max_tokens, max(1000, context_limit - estimated_input_tokens))
+        return max_tokens, estimated_input_tokens + max_tokens
 
-        # Rate limiting check
-        estimated_tokens = estimated_input_tokens + max_tokens
-        estimated_cost = self._estimate_cost(estimated_tokens)
+    def _pop_rate_limit_options(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Take rate_limit_tenant / rate_limit_priority out of the provider kwargs."""
+        return {
+            "tenant": (
+                kwargs.pop("rate_limit_tenant", None)
+                or _RATE_LIMIT_TENANT.get()
+                or self.rate_limit_tenant
+            ),
+            "priority": kwargs.pop("rate_limit_priority", 0),
+        }
 
-        if self.use_rate_limiter and self.rate_limiter:
-            try:
-                # Acquire rate limit (will raise exception if exceeded)
-                with self.rate_limiter.acquire(tokens=estimated_tokens, cost=estimated_cost):
-                    # Make API call within rate limit context
-                    response = self._make_api_call(prompt, system_prompt, temperature, max_tokens, **kwargs)
-            except RateLimitExceeded as e:
-                logger.error(f"Rate limit exceeded: {e}")
-                raise
-        else:
-            # No rate limiting
-            response = self._make_api_call(prompt, system_prompt, temperature, max_tokens, **kwargs)
+    def _rate_limit_slot(self, estimated_tokens: int, tenant: Optional[str] = None, priority: int = 0) -> ContextManager:
+        """
+        Rate limiter context for one provider request (no-op when rate limiting is off).
+
+        Usable with both ``with`` and ``async with``; in blocking mode the
+        async form waits for the RPM/TPM budget without holding a thread.
+        """
+        if not (self.use_rate_limiter and self.rate_limiter):
+            return nullcontext()
+        # Acquire rate limit (raises when exceeded, or queues in blocking mode)
+        return self.rate_limiter.acquire(
+            tokens=estimated_tokens,
+            cost=self._estimate_cost(estimated_tokens),
+            tenant=tenant,
+            priority=priority,
+        )
 
-        # Парсинг JSON если требуется (applies to both rate-limited and non-rate-limited paths)
+    def _finish_response(self, response: str, response_format: str, cache_key: Optional[str]) -> Union[str, Dict[str, Any]]:
+        """Parse JSON if requested and store the result in the memory cache."""
         if response_format == "json":
-            try:
-                # Clean markdown code blocks if present
-                cleaned_response = response.strip()
-
-                # Remove markdown code fences
-                if cleaned_response.startswith("```"):
-                    lines = cleaned_response.split('\n')
-                    if lines[0].startswith("```"):
-                        lines = lines[1:]
-                    if lines and lines[-1].strip() == "```":
-                        lines = lines[:-1]
-                    cleaned_response = '\n'.join(lines).strip()
-
-                return json.loads(cleaned_response)
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON response: {e}")
-                logger.debug(f"Raw response (truncated): {response[:500]}")
-
-                # Попытка извлечь JSON из текста — ищем первый { или [
-                # и пытаемся распарсить от него до конца
-                logger.info("Attempting to extract JSON from text response...")
-                for start_char, end_char in [('{', '}'), ('[', ']')]:
-                    start_idx = response.find(start_char)
-                    if start_idx == -1:
-                        continue
-                    # Ищем с конца строки подходящую закрывающую скобку
-                    end_idx = response.rfind(end_char)
-                    if end_idx == -1 or end_idx <= start_idx:
-                        continue
-                    candidate = response[start_idx:end_idx + 1]
-                    try:
-                        return json.loads(candidate)
-                    except (json.JSONDecodeError, ValueError):
-                        continue
-
-                raise ValueError("LLM returned invalid JSON — could not extract valid JSON from response")
+            parsed = self._parse_json_response(response)
+            if cache_key and self.memory_cache is not None:
+                self.memory_cache.put(cache_key, json.dumps(parsed, ensure_ascii=False))
+            return parsed
 
+        if cache_key and self.memory_cache is not None and response:
+            self.memory_cache.put(cache_key, response)
         return response
 
+    @staticmethod
+    def _parse_json_response(response: str) -> Union[Dict[str, Any], list]:
+        """Parse JSON from raw LLM output (markdown fences and surrounding text are tolerated)."""
+        try:
+            # Clean markdown code blocks if present
+            cleaned_response = response.strip()
+
+            # Remove markdown code fences
+            if cleaned_response.startswith("```"):
+                lines = cleaned_response.split('\n')
+                if lines[0].startswith("```"):
+                    lines = lines[1:]
+                if lines and lines[-1].strip() == "```":
+                    lines = lines[:-1]
+                cleaned_response = '\n'.join(lines).strip()
+
+            return json.loads(cleaned_response)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON response: {e}")
+            logger.debug(f"Raw response (truncated): {response[:500]}")
+
+            # Попытка извлечь JSON из текста — ищем первый { или [
+            # и пытаемся распарсить от него до конца
+            logger.info("Attempting to extract JSON from text response...")
+            for start_char, end_char in [('{', '}'), ('[', ']')]:
+                start_idx = response.find(start_char)
+                if start_idx == -1:
+                    continue
+                # Ищем с конца строки подходящую закрывающую скобку
+                end_idx = response.rfind(end_char)
+                if end_idx == -1 or end_idx <= start_idx:
+                    continue
+                candidate = response[start_idx:end_idx + 1]
+                try:
+                    return json.loads(candidate)
+                except (json.JSONDecodeError, ValueError):
+                    continue
+
+            raise ValueError("LLM returned invalid JSON — could not extract valid JSON from response")
+
     async def acall(
         self,
         prompt: str,
@@ -353,21 +645,91 @@ class LLMGateway:
         db_session=None,
         **kwargs
     ) -> Union[str, Dict[str, Any]]:
-        """Async wrapper for call() — runs sync LLM call in dedicated thread pool (32 workers)."""
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            _LLM_THREAD_POOL,
-            lambda: self.call(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                response_format=response_format,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                use_cache=use_cache,
-                db_session=db_session,
-                **kwargs,
-            ),
+        """
+        Async call(): native async provider request over the shared pooled
+        HTTP client (llm_http_pool), no thread is held while waiting.
+
+        Falls back to the sync call() in _LLM_THREAD_POOL when a db_session is
+        passed (sync Session must not be used on the event loop), for providers
+        without an async path, or with settings.llm_native_async = False.
+
+        Identical in-flight requests (sync or async) are coalesced: a waiting
+        acall awaits the leader's result without occupying a pool thread.
+        """
+        request = dict(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            response_format=response_format,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            use_cache=use_cache,
+            db_session=db_session,
+            **kwargs,
         )
+        if self._native_async_enabled(db_session):
+            execute = lambda: self._acall_with_retries(**request)
+        else:
+            loop = asyncio.get_running_loop()
+            # copy_context: the pool thread keeps the caller's rate limiter tenant
+            execute = lambda: loop.run_in_executor(
+                _LLM_THREAD_POOL, contextvars.copy_context().run, lambda: self._call_with_retries(**request)
+            )
+
+        flight_key = self._single_flight_key(request)
+        if flight_key is None:
+            return await execute()
+
+        while True:
+            future, is_leader = _IN_FLIGHT.claim(flight_key)
+            if is_leader:
+                return await _IN_FLIGHT.arun(flight_key, future, execute)
+            logger.debug(f"Coalesced with in-flight LLM request {flight_key[:16]}...")
+            try:
+                # shield: a cancelled follower must not cancel the shared future
+                return _copy_result(await asyncio.shield(asyncio.wrap_future(future)))
+            except _LeaderCancelled:
+                logger.debug(f"In-flight LLM request {flight_key[:16]}... was cancelled, retrying")
+
+    def _native_async_enabled(self, db_session=None) -> bool:
+        return (
+            settings.llm_native_async
+            and db_session is None
+            and self.provider in _NATIVE_ASYNC_PROVIDERS
+        )
+
+    async def _acall_with_retries(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        response_format: Literal["text", "json"] = "text",
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        db_session = None,
+        **kwargs
+    ) -> Union[str, Dict[str, Any]]:
+        """_call_with_retries() for the native async path (backoff sleeps do not block the loop)."""
+        retry_attempts = kwargs.pop("retry_attempts", None)
+        retry_attempts = max(1, int(retry_attempts or self.get_retry_attempts()))
+
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(retry_attempts),
+            wait=wait_exponential(multiplier=1, min=2, max=10),
+            reraise=True,
+        ):
+            with attempt:
+                return await self._acall_once(
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    response_format=response_format,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    use_cache=use_cache,
+                    db_session=db_session,
+                    **kwargs,
+                )
+
+        raise RuntimeError("LLM call exhausted retries without returning a response")
 
     def _make_api_call(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
         """Execute actual API call to LLM provider"""
@@ -382,6 +744,64 @@ class LLMGateway:
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
 
+    async def _amake_api_call(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
+        """Execute API call over the pooled async client of the running event loop"""
+        if self.provider == "claude":
+            return await self._acall_claude(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        elif self.provider in ["openai", "perplexity", "deepseek", "ollama"]:
+            return await self._acall_openai_compatible(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        elif self.provider == "yandex":
+            return await self._acall_yandex(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        elif self.provider == "qwen":
+            return await self._acall_qwen(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        else:
+            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+
+    def _get_async_client(self):
+        """Pooled async client for self.provider (shared by all gateways on the running loop)."""
+        return get_llm_http_pool().get(self.provider, self._create_async_client)
+
+    def _create_async_client(self):
+        """Create the async SDK/HTTP client with per-provider connection limits and keep-alive."""
+        import httpx
+
+        pool = get_llm_http_pool()
+        limits = pool.limits(self.provider)
+        timeout = pool.timeout(self.get_timeout())
+
+        if self.provider == "claude":
+            from anthropic import AsyncAnthropic
+            return AsyncAnthropic(
+                api_key=settings.anthropic_api_key,
+                http_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+            )
+
+        if self.provider in _OPENAI_COMPATIBLE_BASE_URLS or self.provider == "ollama":
+            import openai
+            http_client_cls = getattr(openai, "DefaultAsyncHttpxClient", httpx.AsyncClient)
+            if self.provider == "ollama":
+                ollama_base_url = getattr(settings, 'ollama_base_url', 'http://localhost:11434')
+                api_key, base_url = "ollama", f"{ollama_base_url}/v1"
+            else:
+                api_key = getattr(settings, f"{self.provider}_api_key")
+                base_url = _OPENAI_COMPATIBLE_BASE_URLS[self.provider]
+            return openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=http_client_cls(limits=limits, timeout=timeout),
+            )
+
+        if self.provider == "yandex":
+            headers = {
+                "Authorization": f"Api-Key {settings.yandex_api_key}",
+                "x-folder-id": str(settings.yandex_folder_id or ""),
+            }
+        elif self.provider == "qwen":
+            headers = {"Authorization": f"Bearer {settings.qwen_api_key}"}
+        else:
+            raise ValueError(f"No async client for provider: {self.provider}")
+        return httpx.AsyncClient(headers=headers, limits=limits, timeout=timeout)
+
     def _estimate_cost(self, tokens: int) -> float:
         """Estimate cost based on tokens (rough approximation)"""
         model = self.model or "deepseek-chat"
@@ -396,33 +816,38 @@ class LLMGateway:
 
         return input_cost + output_cost
 
-    def _call_claude(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
-        """Вызов Claude API"""
-        messages = [{"role": "user", "content": prompt}]
-
+    def _claude_params(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> Dict[str, Any]:
         params = {
             "model": self.model or "claude-sonnet-4-6-20250227",
             "max_tokens": max_tokens,
             "temperature": temperature,
-            "messages": messages
+            "messages": [{"role": "user", "content": prompt}],
         }
-
         if system_prompt:
             params["system"] = system_prompt
+        return params
 
-        response = self._client.messages.create(**params)
+    def _call_claude(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
+        """Вызов Claude API"""
+        response = self._client.messages.create(**self._claude_params(prompt, system_prompt, temperature, max_tokens))
         return response.content[0].text
 
-    def _call_openai_compatible(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
-        """Вызов OpenAI-совместимого API (OpenAI, Perplexity, DeepSeek)"""
-        messages = []
+    async def _acall_claude(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
+        """Async вызов Claude API"""
+        client = self._get_async_client()
+        response = await client.messages.create(**self._claude_params(prompt, system_prompt, temperature, max_tokens))
+        return response.content[0].text
 
+    @staticmethod
+    def _openai_messages(prompt: str, system_prompt: Optional[str]) -> List[Dict[str, str]]:
+        messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
-
         messages.append({"role": "user", "content": prompt})
+        return messages
 
-        # >45;L 2 7028A8<>AB8 >B ?@>20945@0
+    def _openai_model(self) -> str:
+        """Model for OpenAI-compatible providers"""
         # Используем модель из self.model, если она указана
         if self.model:
             model = self.model
@@ -443,6 +868,20 @@ class LLMGateway:
         if self.provider == "deepseek" and model not in ("deepseek-chat", "deepseek-reasoner"):
             logger.warning(f"Model {model} is not a DeepSeek model, forcing deepseek-chat")
             model = "deepseek-chat"
+        return model
+
+    def _track_openai_usage(self, response) -> None:
+        # Отслеживаем использование токенов
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            self.total_input_tokens += usage.prompt_tokens
+            self.total_output_tokens += usage.completion_tokens
+            logger.debug(f"Tokens used: {usage.prompt_tokens} input, {usage.completion_tokens} output")
+
+    def _call_openai_compatible(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
+        """Вызов OpenAI-совместимого API (OpenAI, Perplexity, DeepSeek)"""
+        messages = self._openai_messages(prompt, system_prompt)
+        model = self._openai_model()
 
         timeout = kwargs.pop("timeout", None)
         if timeout is None:
@@ -464,12 +903,32 @@ class LLMGateway:
             logger.error(f"API call failed: {type(e).__name__}: {e}")
             raise
 
-        # Отслеживаем использование токенов
-        if hasattr(response, 'usage'):
-            self.total_input_tokens += response.usage.prompt_tokens
-            self.total_output_tokens += response.usage.completion_tokens
-            logger.debug(f"Tokens used: {response.usage.prompt_tokens} input, {response.usage.completion_tokens} output")
+        self._track_openai_usage(response)
+        return response.choices[0].message.content
+
+    async def _acall_openai_compatible(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
+        """Async вызов OpenAI-совместимого API (OpenAI, Perplexity, DeepSeek, Ollama)"""
+        messages = self._openai_messages(prompt, system_prompt)
+        model = self._openai_model()
+
+        timeout = kwargs.pop("timeout", None)
+        if timeout is None:
+            timeout = self.get_timeout()
 
+        logger.debug(f"Async API call with model = {model}, prompt_len={len(prompt)}, timeout={timeout}s")
+        try:
+            response = await self._get_async_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+            )
+        except Exception as e:
+            logger.error(f"API call failed: {type(e).__name__}: {e}")
+            raise
+
+        self._track_openai_usage(response)
         return response.choices[0].message.content
 
     def _call_yandex(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
@@ -489,14 +948,33 @@ class LLMGateway:
 
         return ""
 
+    async def _acall_yandex(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
+        """Async вызов YandexGPT (REST Foundation Models API вместо gRPC SDK)"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "text": system_prompt})
+        messages.append({"role": "user", "text": prompt})
+
+        payload = {
+            "modelUri": f"gpt://{settings.yandex_folder_id}/yandexgpt/latest",
+            "completionOptions": {"stream": False, "temperature": temperature, "maxTokens": str(max_tokens)},
+            "messages": messages,
+        }
+        response = await self._get_async_client().post(
+            _YANDEX_COMPLETION_URL, json=payload, timeout=kwargs.get("timeout") or self.get_timeout()
+        )
+        response.raise_for_status()
+
+        for alternative in response.json().get("result", {}).get("alternatives", []):
+            return alternative.get("message", {}).get("text", "")
+
+        return ""
+
     def _call_qwen(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
         """K7>2 Qwen API (Alibaba Cloud)"""
         from dashscope import Generation
 
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        messages = self._openai_messages(prompt, system_prompt)
 
         response = Generation.call(
             model="qwen-max",
@@ -511,6 +989,26 @@ class LLMGateway:
         else:
             raise Exception(f"Qwen API error: {response.message}")
 
+    async def _acall_qwen(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, **kwargs) -> str:
+        """Async вызов Qwen API (DashScope REST, тот же запрос, что делает Generation.call)"""
+        payload = {
+            "model": "qwen-max",
+            "input": {"messages": self._openai_messages(prompt, system_prompt)},
+            "parameters": {"temperature": temperature, "max_tokens": max_tokens, "result_format": "message"},
+        }
+        response = await self._get_async_client().post(
+            _QWEN_GENERATION_URL, json=payload, timeout=kwargs.get("timeout") or self.get_timeout()
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            data = {"message": response.text}
+
+        if response.status_code == 200:
+            return data["output"]["choices"][0]["message"]["content"]
+        else:
+            raise Exception(f"Qwen API error: {data.get('message')}")
+
     async def stream(
         self,
         prompt: str,
@@ -520,48 +1018,50 @@ class LLMGateway:
     ):
         """
         Streaming LLM call — yields text chunks as they arrive.
-        Supports OpenAI-compatible providers and Claude.
+        Supports OpenAI-compatible providers and Claude (native async clients
+        from the shared pool); other providers yield the full acall() result.
         """
         temperature = temperature if temperature is not None else settings.llm_temperature
         max_tokens = max_tokens if max_tokens is not None else settings.llm_max_tokens
 
-        if self.provider == "claude":
-            from anthropic import Anthropic
-            messages = [{"role": "user", "content": prompt}]
-            params = {
-                "model": self.model or "claude-sonnet-4-6-20250227",
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "messages": messages,
-                "stream": True,
-            }
-            if system_prompt:
-                params["system"] = system_prompt
+        if not settings.llm_native_async:
+            async for chunk in self._stream_sync(prompt, system_prompt, temperature, max_tokens):
+                yield chunk
 
-            with self._client.messages.stream(**{k: v for k, v in params.items() if k != "stream"}) as stream_resp:
-                for text in stream_resp.text_stream:
+        elif self.provider == "claude":
+            params = self._claude_params(prompt, system_prompt, temperature, max_tokens)
+            async with self._get_async_client().messages.stream(**params) as stream_resp:
+                async for text in stream_resp.text_stream:
                     yield text
 
-        elif self.provider in ["openai", "perplexity", "deepseek"]:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
+        elif self.provider in ["openai", "perplexity", "deepseek", "ollama"]:
+            response = await self._get_async_client().chat.completions.create(
+                model=self._openai_model(),
+                messages=self._openai_messages(prompt, system_prompt),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
 
-            model = self.model
-            if not model:
-                if self.provider == "deepseek":
-                    model = "deepseek-chat"
-                elif self.provider == "openai":
-                    model = "gpt-5.4-mini"
-                elif self.provider == "perplexity":
-                    model = "llama-3.1-sonar-large-128k-online"
-                else:
-                    model = "deepseek-chat"
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        else:
+            # Fallback: non-streaming call, yield all at once
+            yield await self.acall(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
 
+    async def _stream_sync(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int):
+        """stream() over the sync clients (settings.llm_native_async = False)."""
+        if self.provider == "claude":
+            params = self._claude_params(prompt, system_prompt, temperature, max_tokens)
+            with self._client.messages.stream(**params) as stream_resp:
+                for text in stream_resp.text_stream:
+                    yield text
+
+        elif self.provider in ["openai", "perplexity", "deepseek"]:
             response = self._client.chat.completions.create(
-                model=model,
-                messages=messages,
+                model=self._openai_model(),
+                messages=self._openai_messages(prompt, system_prompt),
                 temperature=temperature,
                 max_tokens=max_tokens,
                 stream=True,
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+LLM HTTP Pool - shared async HTTP clients for LLM providers
+
+Один пул соединений на провайдера (и на event loop): keep-alive
+соединения переиспользуются всеми LLMGateway.acall/stream, число
+одновременных соединений ограничено per-provider лимитами из settings.
+Ожидающий ответа запрос занимает только корутину, а не поток.
+"""
+import asyncio
+import inspect
+import threading
+import weakref
+from typing import Any, Callable, Coroutine, Dict, Optional, TypeVar
+
+import httpx
+from loguru import logger
+
+from config.settings import settings
+
+T = TypeVar("T")
+
+
+class LLMHttpPool:
+    """
+    Registry of pooled async clients, one per provider per event loop
+
+    httpx connections are bound to the event loop that opened them, so
+    clients are cached per running loop. The API worker has exactly one and
+    closes it on shutdown; short-lived loops (batch workers, scripts) should
+    use run_with_llm_clients() so their clients are closed with the loop.
+
+    Stored values are either SDK clients (AsyncAnthropic, AsyncOpenAI) that
+    wrap a pooled httpx.AsyncClient, or bare httpx.AsyncClient instances for
+    REST providers (YandexGPT, Qwen).
+    """
+
+    def __init__(self):
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return the client registered under ``name`` for the running loop, creating it once."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get(name)
+            if client is None:
+                client = factory()
+                clients[name] = client
+                logger.info(f"LLM HTTP pool: created async client for {name}")
+        return client
+
+    @staticmethod
+    def limits(provider: str) -> httpx.Limits:
+        """Connection limits for a provider (llm_http_provider_max_connections overrides the default)."""
+        max_connections = int(
+            settings.llm_http_provider_max_connections.get(provider, settings.llm_http_max_connections)
+        )
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(max_connections, settings.llm_http_max_keepalive_connections),
+            keepalive_expiry=settings.llm_http_keepalive_expiry,
+        )
+
+    @staticmethod
+    def timeout(seconds: float) -> httpx.Timeout:
+        """Request timeout; waiting for a free pooled connection is not limited (requests queue instead of failing)."""
+        return httpx.Timeout(seconds, connect=min(seconds, 10.0), pool=None)
+
+    def size(self) -> int:
+        """Number of clients registered for the running loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return 0
+        return len(self._clients.get(loop, {}))
+
+    async def aclose(self) -> None:
+        """Close all clients opened on the running loop (call on application shutdown)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.pop(loop, {})
+        for name, client in clients.items():
+            close = getattr(client, "aclose", None) or getattr(client, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"LLM HTTP pool: failed to close client for {name}: {e}")
+
+
+# Global pool instance
+_llm_http_pool: Optional[LLMHttpPool] = None
+_llm_http_pool_lock = threading.Lock()
+
+
+def get_llm_http_pool() -> LLMHttpPool:
+    """Получить глобальный пул async-клиентов LLM"""
+    global _llm_http_pool
+
+    if _llm_http_pool is None:
+        with _llm_http_pool_lock:
+            if _llm_http_pool is None:
+                _llm_http_pool = LLMHttpPool()
+
+    return _llm_http_pool
+
+
+def run_with_llm_clients(main: Coroutine[Any, Any, T]) -> T:
+    """
+    asyncio.run() that closes the LLM clients opened on its loop before the
+    loop goes away, instead of leaving their pooled sockets to GC.
+    """
+    async def _main() -> T:
+        try:
+            return await main
+        finally:
+            await get_llm_http_pool().aclose()
+
+    return asyncio.run(_main())
+
+
+__all__ = ['LLMHttpPool', 'get_llm_http_pool', 'run_with_llm_clients']
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Response Cache - process-local LRU in front of the llm_cache table
+
+Первый уровень кэша LLM-ответов: живёт в памяти процесса, ограничен по
+количеству записей и по байтам, не требует DB-сессии. Счётчики попаданий
+не пишутся в БД на каждый hit, а накапливаются и сбрасываются в LLMCache
+пачками (периодически раз в интервал или досрочно по размеру пачки) в
+фоновом потоке — никогда на потоке вызывающего (в acall это event loop).
+Считаются только попадания по ключам, пришедшим из llm_cache: чисто
+in-memory ответов в таблице нет.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+
+class LLMResponseCache:
+    """
+    Size- and byte-bounded LRU cache for raw LLM responses
+
+    Keys are LLMGateway._generate_cache_key() hashes, values are the raw
+    response strings (the same payload stored in LLMCache.response).
+
+    Features:
+    - O(1) get/put/evict (OrderedDict in recency order)
+    - max_entries and max_bytes bounds, optional TTL
+    - Thread-safe (shared by all LLMGateway instances and _LLM_THREAD_POOL)
+    - Batched hit_count / last_accessed flush to LLMCache (periodic background
+      thread, only for entries promoted from the DB tier)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: Optional[int] = None,
+        hit_flush_interval: float = 30.0,
+        hit_flush_batch: int = 200,
+        session_factory: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        Args:
+            max_entries: Max number of cached responses
+            max_bytes: Max total size of cached responses (approximate, sys.getsizeof)
+            ttl_seconds: Entry lifetime in seconds (None = no expiry)
+            hit_flush_interval: Seconds between periodic hit counter flushes
+                (a daemon thread, started on the first DB-backed hit)
+            hit_flush_batch: Flush early as soon as this many distinct keys have pending hits
+            session_factory: Callable returning a new DB session (default: SessionLocal)
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_seconds = ttl_seconds
+        self.hit_flush_interval = hit_flush_interval
+        self.hit_flush_batch = max(1, int(hit_flush_batch))
+        self._session_factory = session_factory
+
+        # key -> (response, size, expires_at, persisted in llm_cache)
+        self._entries: "OrderedDict[str, Tuple[str, int, Optional[float], bool]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._pending_hits: Dict[str, Tuple[int, datetime]] = {}
+        self._flush_lock = threading.Lock()
+        self._flush_wakeup = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._flusher_stopped = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached response and mark it most recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            response, size, expires_at, persisted = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        if persisted:
+            self.record_hit(key)
+        return response
+
+    def put(self, key: str, response: str, persisted: bool = False) -> None:
+        """
+        Store response, evicting least recently used entries to respect bounds.
+
+        ``persisted`` marks responses that have a row in llm_cache; only their
+        hits are counted for LLMCache.hit_count.
+        """
+        if not isinstance(response, str):
+            return
+        size = sys.getsizeof(response)
+        if size > self.max_bytes:
+            logger.debug(f"LLM memory cache: response {key[:16]}... too large ({size} bytes), skipped")
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, size, expires_at, persisted)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    # ------------------------------------------------------------------
+    # Hit counters
+    # ------------------------------------------------------------------
+
+    def record_hit(self, key: str) -> None:
+        """Count a hit for LLMCache.hit_count; flushed later in batches off the caller's thread."""
+        now = datetime.now(timezone.utc)
+        with self._flush_lock:
+            count, _ = self._pending_hits.get(key, (0, now))
+            self._pending_hits[key] = (count + 1, now)
+            batch_full = len(self._pending_hits) >= self.hit_flush_batch
+        self._ensure_flusher()
+        if batch_full:
+            self._flush_wakeup.set()
+
+    def _ensure_flusher(self) -> None:
+        """Start the periodic flush thread on the first counted hit (again after close())."""
+        with self._flush_lock:
+            if self._flush_thread is not None and self._flush_thread.is_alive():
+                return
+            self._flusher_stopped = False
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name="llm-cache-hits", daemon=True,
+            )
+            self._flush_thread.start()
+
+    def _flush_loop(self) -> None:
+        """Flush pending hits every hit_flush_interval, or early when a batch fills up."""
+        while not self._flusher_stopped:
+            self._flush_wakeup.wait(self.hit_flush_interval)
+            self._flush_wakeup.clear()
+            if self._pending_hits:
+                self.flush_hits()
+
+    def close(self) -> None:
+        """Stop the flush thread and write out any pending hits."""
+        self._flusher_stopped = True
+        self._flush_wakeup.set()
+        thread = self._flush_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.flush_hits()
+
+    def flush_hits(self, db_session=None) -> int:
+        """
+        Write pending hit counters to LLMCache in a single executemany UPDATE.
+
+        Uses ``db_session`` if given (without committing it), otherwise opens
+        and commits a short-lived session. Returns number of keys flushed.
+        Called from the periodic flush thread, close() at exit, or explicitly.
+        """
+        with self._flush_lock:
+            pending, self._pending_hits = self._pending_hits, {}
+        if not pending:
+            return 0
+
+        from sqlalchemy import bindparam, update
+        from src.models.database import LLMCache
+
+        statement = (
+            update(LLMCache)
+            .where(LLMCache.prompt_hash == bindparam("key"))
+            .values(
+                hit_count=LLMCache.hit_count + bindparam("hits"),
+                last_accessed=bindparam("accessed"),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        params = [
+            {"key": key, "hits": count, "accessed": accessed}
+            for key, (count, accessed) in pending.items()
+        ]
+
+        own_session = db_session is None
+        session = None
+        try:
+            session = self._new_session() if own_session else db_session
+            session.connection().execute(statement, params)
+            if own_session:
+                session.commit()
+            logger.debug(f"LLM cache: flushed hit counters for {len(params)} keys")
+            return len(params)
+        except Exception as exc:
+            logger.warning(f"LLM cache hit flush failed: {exc}")
+            if own_session and session is not None:
+                session.rollback()
+            return 0
+        finally:
+            if own_session and session is not None:
+                session.close()
+
+    def _new_session(self):
+        if self._session_factory is None:
+            from src.models.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / total * 100) if total else 0.0,
+            'pending_hit_keys': len(self._pending_hits),
+        }
+
+
+# Global cache instance
+_llm_response_cache: Optional[LLMResponseCache] = None
+_llm_response_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Получить глобальный in-memory кэш LLM-ответов"""
+    global _llm_response_cache
+
+    if _llm_response_cache is None:
+        with _llm_response_cache_lock:
+            if _llm_response_cache is None:
+                import atexit
+                from config.settings import settings
+
+                _llm_response_cache = LLMResponseCache(
+                    max_entries=settings.llm_memory_cache_max_entries,
+                    max_bytes=settings.llm_memory_cache_max_bytes,
+                    ttl_seconds=settings.llm_memory_cache_ttl or None,
+                    hit_flush_interval=settings.llm_cache_hit_flush_interval,
+                    hit_flush_batch=settings.llm_cache_hit_flush_batch,
+                )
+                atexit.register(_llm_response_cache.close)
+
+    return _llm_response_cache
+
+
+def set_llm_response_cache(cache: Optional[LLMResponseCache]) -> None:
+    """Установить глобальный in-memory кэш LLM-ответов (None = пересоздать по настройкам)"""
+    global _llm_response_cache
+    _llm_response_cache = cache
+
+
+__all__ = ['LLMResponseCache', 'get_llm_response_cache', 'set_llm_response_cache']
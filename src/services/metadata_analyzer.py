@@ -4,14 +4,14 @@ Metadata Analyzer - Contract metadata and auxiliary analysis
 
 Анализирует метаданные договора: контрагенты, шаблоны, споры, следующие действия
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 import json
 from loguru import logger
 from lxml import etree
 
 from ..services.llm_gateway import LLMGateway
 from ..models.analyzer_models import ContractRisk
-from ..utils.xml_security import parse_xml_safely
+from ..services.contract_document import ContractDocument
 
 
 class MetadataAnalyzer:
@@ -48,7 +48,7 @@ class MetadataAnalyzer:
 
     def check_counterparties(
         self,
-        xml_content: str,
+        xml_content: Union[str, ContractDocument],
         metadata: Dict[str, Any]
     ) -> Dict[str, Any]:
         """
@@ -61,7 +61,7 @@ class MetadataAnalyzer:
         - Financial reliability (if available)
 
         Args:
-            xml_content: Raw XML content with party information
+            xml_content: Raw XML content or ContractDocument with party information
             metadata: Contract metadata
 
         Returns:
@@ -72,13 +72,10 @@ class MetadataAnalyzer:
             return {}
 
         try:
-            root = parse_xml_safely(xml_content)
-            parties = root.findall('.//party')
-
             results = {}
-            for party in parties:
-                inn = party.findtext('inn', '').strip()
-                name = party.findtext('name', '')
+            for party in ContractDocument.coerce(xml_content).parties:
+                inn = party['inn'].strip()
+                name = party['name']
 
                 if inn:
                     logger.info(f"Checking counterparty: {name} (INN: {inn})")
@@ -97,7 +94,7 @@ class MetadataAnalyzer:
 
     def predict_disputes(
         self,
-        xml_content: str,
+        xml_content: Union[str, ContractDocument],
         risks: List[ContractRisk],
         rag_context: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -111,7 +108,7 @@ class MetadataAnalyzer:
         - Legal context
 
         Args:
-            xml_content: Raw XML content
+            xml_content: Raw XML content or ContractDocument
             risks: List of identified risks
             rag_context: RAG context with precedents
 
@@ -143,7 +140,7 @@ class MetadataAnalyzer:
 
     def compare_with_templates(
         self,
-        xml_content: str,
+        xml_content: Union[str, ContractDocument],
         contract_type: Optional[str]
     ) -> Dict[str, Any]:
         """
@@ -155,7 +152,7 @@ class MetadataAnalyzer:
         - Overall match percentage
 
         Args:
-            xml_content: Raw XML content
+            xml_content: Raw XML content or ContractDocument
             contract_type: Type of contract (e.g., 'supply', 'service')
 
         Returns:
@@ -177,10 +174,9 @@ class MetadataAnalyzer:
                     'reason': f'No template for type {contract_type}'
                 }
 
-            root = parse_xml_safely(xml_content)
             template_root = etree.fromstring(template.xml_content.encode('utf-8'))
 
-            contract_tags = set([elem.tag for elem in root.iter()])
+            contract_tags = set(ContractDocument.coerce(xml_content).tag_set)
             template_tags = set([elem.tag for elem in template_root.iter()])
 
             missing_sections = template_tags - contract_tags
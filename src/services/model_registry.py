@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+Model Registry - process-wide embedding and reranker models
+
+Каждая модель (SentenceTransformer / CrossEncoder) загружается один раз на
+процесс и переиспользуется всеми RAG-сервисами (EnhancedRAGSystem, RAGSystem,
+RAGService, admin_rag_retriever). Раньше каждый сервис держал свою копию, а
+анализ договора создавал новый EnhancedRAGSystem и заново грузил e5-large.
+
+encode()/rerank() из разных потоков объединяются в micro-batch: первый запрос
+ждёт до rag_model_batch_wait_ms (или пока модель занята предыдущим батчем),
+собирая запросы соседей, и выполняет один forward pass на всех.
+
+    embedder = get_model_registry().embedder("intfloat/multilingual-e5-large")
+    vectors = embedder.encode(["текст 1", "текст 2"])
+
+    reranker = get_model_registry().reranker("DiTy/cross-encoder-russian-msmarco", device="cpu")
+    scores = reranker.rerank("неустойка", ["ст. 330 ГК", "ст. 333 ГК"])
+
+Бэкенд rag_model_backend="onnx" выполняет те же модели через ONNX Runtime на
+CPU (для узлов без GPU). При rag_model_onnx_quantize модель один раз
+экспортируется в rag_model_onnx_dir с динамической int8-квантизацией весов.
+Допуск относительно PyTorch-пути (проверяется tests/rag_eval/onnx_backend_bench.py):
+косинус эмбеддингов не ниже ONNX_MIN_COSINE, корреляция Спирмена скоров
+реранкера не ниже ONNX_MIN_SPEARMAN, recall@3 на вопросах rag_eval не хуже
+на ONNX_MAX_RECALL_DROP вопроса.
+"""
+import os
+import platform
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from config.settings import settings
+
+
+Loader = Callable[[str, str, Optional[str], Dict[str, Any]], Any]
+
+# Допуск int8-ONNX относительно PyTorch (fp32)
+ONNX_MIN_COSINE = 0.98
+ONNX_MIN_SPEARMAN = 0.95
+ONNX_MAX_RECALL_DROP = 1
+
+# Имя квантованного файла внутри экспорта: onnx/model_qint8.onnx
+_QUANTIZED_SUFFIX = "qint8"
+
+
+def _resolve_device(device: Optional[str]) -> Optional[str]:
+    """'auto' -> mps/cuda если доступны, иначе cpu; None - выбор библиотеки"""
+    if device != "auto":
+        return device
+    try:
+        import torch
+        if torch.backends.mps.is_available():
+            return "mps"
+        if torch.cuda.is_available():
+            return "cuda"
+    except Exception:
+        pass
+    return "cpu"
+
+
+def _load_model(kind: str, name: str, device: Optional[str], options: Dict[str, Any]) -> Any:
+    """Загрузить модель sentence-transformers"""
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+    if kind == "embedder":
+        return SentenceTransformer(name, device=device, **options)
+    return CrossEncoder(name, device=device, **options)
+
+
+def _quantization_config() -> str:
+    """Профиль квантизации под текущий CPU (arm64 / avx512_vnni / avx2)"""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            if "avx512_vnni" in f.read():
+                return "avx512_vnni"
+    except OSError:
+        pass
+    return "avx2"
+
+
+def _load_onnx_model(kind: str, name: str, device: Optional[str], options: Dict[str, Any]) -> Any:
+    """
+    Загрузить модель через ONNX Runtime (CPU), при необходимости int8
+
+    Первый вызов экспортирует ONNX-граф и квантованные веса в
+    rag_model_onnx_dir/<name> (под файловой блокировкой, через временный
+    каталог и os.replace): воркеры, стартующие одновременно, экспортируют
+    один раз и не читают недописанный файл; следующие процессы читают готовый.
+    device игнорируется - ONNX-бэкенд всегда CPUExecutionProvider.
+    """
+    import onnxruntime as ort
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+    model_cls = SentenceTransformer if kind == "embedder" else CrossEncoder
+    model_kwargs: Dict[str, Any] = {"provider": "CPUExecutionProvider"}
+    if settings.rag_model_threads:
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = settings.rag_model_threads
+        session_options.inter_op_num_threads = 1
+        model_kwargs["session_options"] = session_options
+
+    if not settings.rag_model_onnx_quantize:
+        return model_cls(name, device="cpu", backend="onnx", model_kwargs=model_kwargs, **options)
+
+    export_dir = Path(settings.rag_model_onnx_dir) / name.replace("/", "__")
+    quantized_file = f"onnx/model_{_QUANTIZED_SUFFIX}.onnx"
+    if not (export_dir / quantized_file).exists():
+        _export_quantized_onnx(
+            lambda: model_cls(name, device="cpu", backend="onnx", model_kwargs=model_kwargs, **options),
+            name, export_dir, quantized_file,
+        )
+
+    model_kwargs["file_name"] = quantized_file
+    return model_cls(str(export_dir), device="cpu", backend="onnx", model_kwargs=model_kwargs, **options)
+
+
+@contextmanager
+def _export_lock(path: Path) -> Iterator[None]:
+    """Межпроцессная блокировка экспорта (flock); без fcntl - только атомарный rename"""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _export_quantized_onnx(load: Callable[[], Any], name: str, export_dir: Path, quantized_file: str) -> None:
+    """
+    Экспорт int8-ONNX под файловой блокировкой: во временный каталог рядом с
+    export_dir и os.replace на место, так что export_dir появляется только целиком
+    """
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    export_dir.parent.mkdir(parents=True, exist_ok=True)
+    with _export_lock(export_dir.parent / f".{export_dir.name}.lock"):
+        if (export_dir / quantized_file).exists():
+            return  # соседний процесс экспортировал, пока мы ждали блокировку
+
+        config = _quantization_config()
+        logger.info(f"Model registry: exporting {name} to int8 ONNX ({config}) -> {export_dir}")
+        staging = Path(tempfile.mkdtemp(prefix=f".{export_dir.name}.", dir=export_dir.parent))
+        try:
+            model = load()
+            model.save(str(staging))
+            export_dynamic_quantized_onnx_model(
+                model, quantization_config=config, model_name_or_path=str(staging), file_suffix=_QUANTIZED_SUFFIX
+            )
+            if export_dir.exists():
+                # Недописанный экспорт (прерванный процесс / старая версия)
+                logger.warning(f"Model registry: replacing incomplete ONNX export {export_dir}")
+                shutil.rmtree(export_dir)
+            os.replace(staging, export_dir)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+class _Batch:
+    """Пачка запросов, которые уйдут в модель одним вызовом"""
+
+    __slots__ = ("items", "full", "done", "result", "error")
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent calls into batched model calls
+
+    The first caller of a batch becomes its leader: it waits up to
+    ``wait_seconds`` (or until the batch holds ``max_batch`` items) and then
+    for the model to be free, runs ``run(key, items)`` for everyone and hands
+    each caller its slice. Only calls with the same ``key`` (model kwargs
+    such as prompt_name) are batched together. Model calls are serialized, so
+    requests arriving while a batch is running pile up into the next one.
+    """
+
+    def __init__(self, run: Callable[[Hashable, List[Any]], Any], wait_seconds: float, max_batch: int):
+        self._run = run
+        self.wait_seconds = max(0.0, wait_seconds)
+        self.max_batch = max(1, max_batch)
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._pending: Dict[Hashable, _Batch] = {}
+
+        self.calls = 0
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, key: Hashable, items: Sequence[Any]) -> Any:
+        """Выполнить items в составе micro-batch; возвращает срез результата модели"""
+        with self._lock:
+            self.calls += 1
+            batch = self._pending.get(key)
+            leader = batch is None or len(batch.items) + len(items) > self.max_batch
+            if leader:
+                batch = _Batch()
+                self._pending[key] = batch
+            offset = len(batch.items)
+            batch.items.extend(items)
+            if len(batch.items) >= self.max_batch:
+                self._pending.pop(key, None)
+                batch.full.set()
+
+        if leader:
+            self._lead(key, batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.result[offset:offset + len(items)]
+
+    def _lead(self, key: Hashable, batch: _Batch) -> None:
+        if self.wait_seconds:
+            batch.full.wait(self.wait_seconds)
+        # Пока модель занята предыдущим батчем, этот продолжает набирать запросы
+        with self._model_lock:
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+                self.batches += 1
+                self.items += len(batch.items)
+            try:
+                batch.result = self._run(key, batch.items)
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+            }
+
+
+class _SharedModel:
+    """Общая модель реестра; model - исходный объект sentence-transformers"""
+
+    def __init__(self, name: str, model: Any, wait_seconds: float, max_batch: int):
+        self.name = name
+        self.model = model
+        self._batcher = MicroBatcher(self._run_batch, wait_seconds, max_batch)
+
+    @staticmethod
+    def _batch_key(kwargs: Dict[str, Any]) -> Tuple:
+        # show_progress_bar не влияет на результат; в батче всегда выключен
+        kwargs.pop("show_progress_bar", None)
+        return tuple(sorted(kwargs.items()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'model': self.name, **self._batcher.get_stats()}
+
+    def __getattr__(self, item: str) -> Any:
+        # Остальные атрибуты (get_sentence_embedding_dimension, max_seq_length, ...)
+        if item == "model":
+            raise AttributeError(item)
+        return getattr(self.model, item)
+
+
+class SharedEmbedder(_SharedModel):
+    """SentenceTransformer с micro-batching; encode() совместим по сигнатуре"""
+
+    def _run_batch(self, key: Tuple, texts: List[str]) -> Any:
+        return self.model.encode(texts, show_progress_bar=False, **dict(key))
+
+    def encode(self, sentences, **kwargs) -> Any:
+        """
+        Эмбеддинги текстов (как SentenceTransformer.encode)
+
+        Args:
+            sentences: Строка или список строк
+            **kwargs: Параметры encode (prompt_name, normalize_embeddings, ...)
+
+        Returns:
+            Массив эмбеддингов (для строки - один вектор)
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return self.model.encode(texts, show_progress_bar=False, **kwargs)
+        result = self._batcher.submit(self._batch_key(kwargs), texts)
+        return result[0] if single else result
+
+
+class SharedReranker(_SharedModel):
+    """CrossEncoder с micro-batching; predict() совместим по сигнатуре"""
+
+    def _run_batch(self, key: Tuple, pairs: List[Tuple[str, str]]) -> Any:
+        return self.model.predict(pairs, show_progress_bar=False, **dict(key))
+
+    def predict(self, sentences, **kwargs) -> Any:
+        """Скоры для пар (query, document) (как CrossEncoder.predict)"""
+        pairs = [tuple(pair) for pair in sentences]
+        if not pairs:
+            return []
+        return self._batcher.submit(self._batch_key(kwargs), pairs)
+
+    def rerank(self, query: str, documents: Sequence[str], **kwargs) -> List[float]:
+        """Скоры документов относительно запроса (в порядке documents)"""
+        return [float(score) for score in self.predict([(query, doc) for doc in documents], **kwargs)]
+
+
+class ModelRegistry:
+    """
+    Process-wide registry: one loaded model per (kind, name, device, options)
+
+    Loading happens under a per-model lock, so concurrent first requests wait
+    for a single load instead of loading the model several times. Failed
+    loads are not cached; the caller decides whether to retry.
+    """
+
+    def __init__(
+        self,
+        loader: Optional[Loader] = None,
+        batch_wait_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        backend: Optional[str] = None,
+    ):
+        """
+        Args:
+            loader: Функция загрузки (kind, name, device, options) -> модель
+            batch_wait_ms: Окно micro-batch (по умолчанию settings.rag_model_batch_wait_ms)
+            max_batch: Размер micro-batch (по умолчанию settings.rag_model_max_batch)
+            backend: "torch" или "onnx" (по умолчанию settings.rag_model_backend)
+        """
+        self.backend = backend or settings.rag_model_backend
+        if loader is None:
+            loader = _load_onnx_model if self.backend == "onnx" else _load_model
+            if self.backend == "torch" and settings.rag_model_threads:
+                import torch
+                torch.set_num_threads(settings.rag_model_threads)
+        self._loader = loader
+        self.batch_wait_ms = settings.rag_model_batch_wait_ms if batch_wait_ms is None else batch_wait_ms
+        self.max_batch = settings.rag_model_max_batch if max_batch is None else max_batch
+        self._models: Dict[Tuple, _SharedModel] = {}
+        self._load_locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, name: str, device: Optional[str], options: Dict[str, Any]) -> _SharedModel:
+        device = _resolve_device(device)
+        key = (kind, name, device, tuple(sorted(options.items())))
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                model = self._models.get(key)
+            if model is not None:
+                return model
+
+            logger.info(f"Model registry: loading {kind} {name} (backend={self.backend}, device={device or 'default'})")
+            raw = self._loader(kind, name, device, options)
+            wrapper = SharedEmbedder if kind == "embedder" else SharedReranker
+            model = wrapper(name, raw, self.batch_wait_ms / 1000.0, self.max_batch)
+            with self._lock:
+                self._models[key] = model
+            return model
+
+    def embedder(self, name: str, device: Optional[str] = None, **options) -> SharedEmbedder:
+        """Общий SentenceTransformer (device='auto' - mps/cuda/cpu)"""
+        return self._get("embedder", name, device, options)
+
+    def reranker(self, name: str, device: Optional[str] = None, **options) -> SharedReranker:
+        """Общий CrossEncoder (options - например max_length=512)"""
+        return self._get("reranker", name, device, options)
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            models = list(self._models.items())
+        return [
+            {'kind': key[0], 'backend': self.backend, 'device': key[2], **model.get_stats()}
+            for key, model in models
+        ]
+
+
+# Global registry instance
+_model_registry: Optional[ModelRegistry] = None
+_model_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Получить глобальный реестр моделей"""
+    global _model_registry
+
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+
+    return _model_registry
+
+
+__all__ = ['MicroBatcher', 'ModelRegistry', 'SharedEmbedder', 'SharedReranker', 'get_model_registry']
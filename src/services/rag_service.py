@@ -2,6 +2,7 @@
 RAG (Retrieval-Augmented Generation) Service for Contract AI System v2.0
 Uses pgvector for semantic search in knowledge_base and contracts_core
 """
+import asyncio
 from typing import List, Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
@@ -37,10 +38,14 @@ class RAGService:
         Args:
             db_session: Async database session
             embedding_model: Embedding model instance (e.g., SentenceTransformer)
+                or model name, resolved through the shared model registry
             top_k: Number of results to retrieve
             similarity_threshold: Minimum similarity score (0.0-1.0)
         """
         self.db = db_session
+        if isinstance(embedding_model, str):
+            from src.services.model_registry import get_model_registry
+            embedding_model = get_model_registry().embedder(embedding_model)
         self.embedding_model = embedding_model
         self.top_k = top_k
         self.similarity_threshold = similarity_threshold
@@ -317,7 +322,9 @@ class RAGService:
         try:
             # Assuming sentence-transformers or similar
             if hasattr(self.embedding_model, 'encode'):
-                embedding = self.embedding_model.encode(text, convert_to_numpy=True)
+                # В потоке: не блокирует event loop, а параллельные запросы
+                # объединяются общей моделью в micro-batch
+                embedding = await asyncio.to_thread(self.embedding_model.encode, text, convert_to_numpy=True)
             else:
                 # Fallback
                 embedding = np.zeros(EMBEDDING_VECTOR_SIZE)
@@ -410,8 +417,6 @@ class RAGService:
 
 # Example usage
 if __name__ == "__main__":
-    import asyncio
-
     async def test_rag():
         # This is just for demonstration
         # In real usage, you would pass a real database session
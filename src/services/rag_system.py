@@ -33,13 +33,13 @@ import hashlib
 
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer, CrossEncoder
 from loguru import logger
 from sqlalchemy.orm import Session
 
 from ..models.database import LegalDocument
 from ..models.repositories import LegalDocumentRepository
 from .llm_gateway import LLMGateway
+from .model_registry import get_model_registry
 
 
 class Document:
@@ -133,7 +133,7 @@ class RAGSystem:
             # Get model name from preset or use directly
             model_name = self.EMBEDDING_MODELS.get(embedding_model, embedding_model)
             logger.info(f"Loading embedding model: {model_name}")
-            self.embedding_model = SentenceTransformer(model_name)
+            self.embedding_model = get_model_registry().embedder(model_name)
             self.embedding_model_name = model_name
             logger.info("Embedding model loaded")
 
@@ -143,7 +143,7 @@ class RAGSystem:
             try:
                 reranker_name = self.RERANKER_MODELS.get(reranker_model, reranker_model)
                 logger.info(f"Loading reranker: {reranker_name}")
-                self.reranker = CrossEncoder(reranker_name)
+                self.reranker = get_model_registry().reranker(reranker_name)
                 logger.info("Reranker loaded")
             except Exception as e:
                 logger.warning(f"Failed to load reranker: {e}. Continuing without reranker.")
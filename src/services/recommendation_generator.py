@@ -4,11 +4,12 @@ Recommendation Generator - Generate recommendations and suggested changes
 
 Создает рекомендации и предложения по исправлению рисков в договорах
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 import json
 from loguru import logger
 
 from ..services.llm_gateway import LLMGateway
+from ..services.contract_document import ContractDocument
 from ..models.analyzer_models import (
     ContractRisk,
     ContractRecommendation,
@@ -310,7 +311,7 @@ class RecommendationGenerator:
 
     def generate_suggested_changes(
         self,
-        xml_content: str,
+        xml_content: Union[str, ContractDocument],
         structure: Dict[str, Any],
         risks: List[ContractRisk],
         recommendations: List[ContractRecommendation],
@@ -321,7 +322,7 @@ class RecommendationGenerator:
         Generate specific text changes to fix identified risks
 
         Args:
-            xml_content: Raw XML content (for reference)
+            xml_content: Raw XML content or ContractDocument (for reference)
             structure: Contract structure with sections
             risks: Identified risks
             recommendations: Generated recommendations
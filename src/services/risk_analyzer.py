@@ -6,6 +6,7 @@ Risk Analyzer - Identify and assess contract risks
 стороны и правил фильтрации ложных срабатываний.
 """
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
 import json
 from typing import Any, Callable, Dict, List, Optional
 
@@ -289,7 +290,8 @@ class RiskAnalyzer:
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {
-                executor.submit(_process_batch, idx, batch): idx
+                # copy_context: batch threads keep the caller's rate limiter tenant
+                executor.submit(contextvars.copy_context().run, _process_batch, idx, batch): idx
                 for idx, (_, batch) in enumerate(batches)
             }
             completed_batches = 0
@@ -5,7 +5,10 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict, Iterable, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union
+
+if TYPE_CHECKING:
+    from src.services.contract_document import ContractDocument
 
 # Словарь типов договоров (все поименованные в ГК РФ, Часть 2)
 CONTRACT_TYPES = {
@@ -257,7 +260,7 @@ def prettify_contract_type_name(value: Optional[str]) -> str:
 
 
 def infer_contract_type_from_xml(
-    xml_content: str,
+    xml_content: Union[str, ContractDocument],
     fallback: Optional[str] = None,
     file_name: Optional[str] = None,
 ) -> str:
@@ -278,9 +281,9 @@ def infer_contract_type_from_xml(
     candidates: List[str] = []
 
     try:
-        from src.utils.xml_security import parse_xml_safely
+        from src.services.contract_document import ContractDocument
 
-        root = parse_xml_safely(xml_content)
+        root = ContractDocument.coerce(xml_content).root
         metadata_title = root.findtext(".//metadata/title") or ""
         metadata_file_name = root.findtext(".//metadata/file_name") or ""
         clause_titles = [text.strip() for text in root.xpath(".//clause/title/text()")[:5] if text and text.strip()]
@@ -292,7 +295,8 @@ def infer_contract_type_from_xml(
             first_lines = [line.strip() for line in full_text.splitlines() if line.strip()][:10]
             candidates.extend(first_lines)
     except Exception:
-        plain_text = re.sub(r"<[^>]+>", " ", xml_content)
+        raw_xml = getattr(xml_content, "xml_content", xml_content) or ""
+        plain_text = re.sub(r"<[^>]+>", " ", raw_xml)
         plain_text = re.sub(r"\s+", " ", plain_text).strip()
         if plain_text:
             candidates.extend([plain_text[:600]])
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Distributed Rate Limiter - общий RPM/TPM/$ бюджет для всех процессов
+
+RateLimiter хранит окна в памяти процесса, поэтому каждый uvicorn-воркер и
+scheduler считает, что весь бюджет провайдера принадлежит ему. RedisRateLimiter
+держит скользящие окна в Redis и проверяет/записывает использование одним
+атомарным Lua-скриптом, так что лимиты общие для всех процессов.
+
+Окно хранится как hash из 60 корзин (1 с для минутных лимитов, 1 мин для
+часового, 24 мин для дневного): проверка O(60) и не зависит от RPS, запись
+истекает не раньше, чем в точном скользящем окне.
+
+При ошибке Redis вызов учитывается in-process логикой RateLimiter (как если бы
+Redis не было), и лимитер возвращается к Redis при следующем вызове.
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .rate_limiter import RateLimiter, RateLimitExceeded
+
+
+# Число корзин в окне; ширина корзины = окно / _BUCKETS
+_BUCKETS = 60
+
+# KEYS[i] - hash окна i-го лимита (поле = номер корзины, значение = сумма)
+# ARGV[1] - now; далее по тройке на лимит: limit, amount, bucket_size
+# Возвращает {1} если использование записано, иначе {0, индекс лимита, used, retry_after}
+_RESERVE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local buckets = tonumber(ARGV[2])
+
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[3 + (i - 1) * 3])
+    local amount = tonumber(ARGV[4 + (i - 1) * 3])
+    local size = tonumber(ARGV[5 + (i - 1) * 3])
+    local now_bucket = math.floor(now / size)
+
+    local raw = redis.call('HGETALL', KEYS[i])
+    local used = 0
+    local live = {}
+    for j = 1, #raw, 2 do
+        local bucket = tonumber(raw[j])
+        local value = tonumber(raw[j + 1])
+        if bucket <= now_bucket - buckets then
+            redis.call('HDEL', KEYS[i], raw[j])
+        else
+            used = used + value
+            table.insert(live, {bucket, value})
+        end
+    end
+
+    local excess = used + amount - limit
+    if excess > 0 then
+        table.sort(live, function(a, b) return a[1] < b[1] end)
+        local retry_after = -1
+        for _, entry in ipairs(live) do
+            excess = excess - entry[2]
+            if excess <= 0 then
+                retry_after = (entry[1] + buckets) * size - now
+                break
+            end
+        end
+        return {0, i, tostring(used), tostring(retry_after)}
+    end
+end
+
+for i = 1, #KEYS do
+    local amount = tonumber(ARGV[4 + (i - 1) * 3])
+    local size = tonumber(ARGV[5 + (i - 1) * 3])
+    if amount > 0 then
+        redis.call('HINCRBYFLOAT', KEYS[i], tostring(math.floor(now / size)), amount)
+        redis.call('EXPIRE', KEYS[i], math.ceil(size * (buckets + 1)))
+    end
+end
+return {1}
+"""
+
+
+# Таймаут чтения/записи сокета: EVAL идёт синхронно (в blocking-режиме — под
+# self.lock, async-путь — в потоке), зависший Redis должен быстро уйти в
+# in-process fallback, а не держать lock и все воркер-потоки
+_REDIS_SOCKET_TIMEOUT = 0.5
+
+
+def connect_rate_limit_redis():
+    """
+    Подключиться к Redis для общего rate limiter
+
+    Для localhost Redis сначала пытается поднять его через ensure_local_redis().
+
+    Returns:
+        redis.Redis или None, если Redis недоступен
+    """
+    try:
+        import redis
+    except ImportError:
+        return None
+
+    from config.settings import settings
+    from src.services.redis_runtime import ensure_local_redis
+
+    ensure_local_redis()
+    try:
+        client = redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=1,
+            socket_timeout=_REDIS_SOCKET_TIMEOUT,
+        )
+        client.ping()
+        return client
+    except Exception:
+        return None
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    RateLimiter с окнами в Redis (общими для всех воркеров)
+
+    Интерфейс тот же: acquire() (with / async with, blocking-режим, tenant,
+    priority) и get_stats(). Очередь blocking-режима локальна для процесса:
+    порядок (priority, seq) соблюдается внутри воркера, а бюджет делится
+    между воркерами через Redis.
+
+        limiter = RedisRateLimiter(redis_client, requests_per_minute=300, tokens_per_minute=1_000_000)
+    """
+
+    _REDIS_ERROR_LOG_INTERVAL = 60.0
+    # _record_usage ходит в Redis: async-путь выполняет его в потоке
+    record_usage_blocks = True
+
+    def __init__(self, redis_client, key_prefix: str = "ratelimit:llm:", **kwargs):
+        """
+        Args:
+            redis_client: redis.Redis (decode_responses=True) или совместимый (fakeredis)
+            key_prefix: Префикс ключей окон в Redis
+            **kwargs: Лимиты и режим, как у RateLimiter
+        """
+        super().__init__(**kwargs)
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._script = redis_client.register_script(_RESERVE_SCRIPT)
+        self._last_redis_error = 0.0
+
+    def _windows(self, tokens: int, cost: float, tenant: Optional[str]) -> List[Tuple[str, str, float, float, float]]:
+        """(kind, key, limit, amount, bucket_size) для каждого заданного лимита"""
+        windows = [
+            ("requests", "rpm", self.requests_per_minute, 1, 60),
+            ("tokens", "tpm", self.tokens_per_minute, tokens, 60),
+            ("hourly_cost", "cost:hour", self.cost_per_hour, cost, 3600),
+            ("daily_cost", "cost:day", self.cost_per_day, cost, 86400),
+        ]
+        if tenant is not None:
+            windows += [
+                ("tenant_requests", f"tenant:{tenant}:rpm", self.tenant_requests_per_minute, 1, 60),
+                ("tenant_tokens", f"tenant:{tenant}:tpm", self.tenant_tokens_per_minute, tokens, 60),
+            ]
+        return [
+            (kind, self.key_prefix + suffix, float(limit), float(amount), window / _BUCKETS)
+            for kind, suffix, limit, amount, window in windows
+            if limit is not None
+        ]
+
+    def _redis_reserve(self, tokens: int, cost: float, tenant: Optional[str]) -> Optional[Tuple[str, float, float, float]]:
+        """
+        Атомарно проверить и записать использование в Redis
+
+        Returns:
+            None, если использование записано, иначе (kind, limit, used, retry_after)
+        """
+        windows = self._windows(tokens, cost, tenant)
+        if not windows:
+            return None
+
+        args: List[Any] = [time.time(), _BUCKETS]
+        for _, _, limit, amount, size in windows:
+            args += [limit, amount, size]
+
+        result = self._script(keys=[key for _, key, _, _, _ in windows], args=args)
+        if int(result[0]) == 1:
+            return None
+
+        kind, _, limit, _, _ = windows[int(result[1]) - 1]
+        retry_after = float(result[3])
+        return kind, limit, float(result[2]), float('inf') if retry_after < 0 else retry_after
+
+    def _count_usage(self, tokens: int, cost: float) -> None:
+        """Локальная статистика процесса (total_* в get_stats)"""
+        self.total_requests += 1
+        self.total_tokens += tokens
+        self.total_cost += cost
+
+    def _on_redis_error(self, exc: Exception) -> None:
+        now = time.monotonic()
+        if now - self._last_redis_error > self._REDIS_ERROR_LOG_INTERVAL:
+            logger.warning(f"Rate limiter: Redis error ({exc}), falling back to in-process limits")
+        self._last_redis_error = now
+
+    def _record_usage(self, tokens: int, cost: float, tenant: Optional[str] = None) -> None:
+        """Записать использование ресурсов (raise-режим)"""
+        try:
+            denied = self._redis_reserve(tokens, cost, tenant)
+        except Exception as e:
+            self._on_redis_error(e)
+            super()._record_usage(tokens, cost, tenant)
+            return
+
+        if denied is not None:
+            raise RateLimitExceeded(self._denied_message(tokens, cost, tenant, *denied))
+
+        with self.lock:
+            self._count_usage(tokens, cost)
+
+    def _reserve(self, tokens: int, cost: float, tenant: Optional[str]) -> Tuple[float, bool]:
+        """Занять место в лимитах Redis (blocking-режим, под self.lock)"""
+        try:
+            denied = self._redis_reserve(tokens, cost, tenant)
+        except Exception as e:
+            self._on_redis_error(e)
+            return super()._reserve(tokens, cost, tenant)
+
+        if denied is None:
+            self._count_usage(tokens, cost)
+            return 0.0, False
+
+        kind, _, _, retry_after = denied
+        # Соседний воркер мог занять освободившееся место: повторяем не реже раза в секунду
+        return max(0.01, min(retry_after, 1.0)), kind.startswith("tenant_")
+
+    @staticmethod
+    def _denied_message(tokens: int, cost: float, tenant: Optional[str], kind: str, limit: float, used: float, retry_after: float) -> str:
+        if kind == "requests":
+            return f"Request rate limit exceeded: {int(limit)} RPM. Please wait {retry_after:.1f} seconds."
+        if kind == "tokens":
+            return f"Token rate limit exceeded: {int(limit)} TPM. Current: {int(used)}, requested: {tokens}"
+        if kind == "hourly_cost":
+            return f"Hourly cost limit exceeded: ${limit:.2f}/hour. Current: ${used:.4f}, requested: ${cost:.4f}"
+        if kind == "daily_cost":
+            return f"Daily cost limit exceeded: ${limit:.2f}/day. Current: ${used:.4f}, requested: ${cost:.4f}"
+        if kind == "tenant_requests":
+            return f"Tenant request rate limit exceeded for {tenant}: {int(limit)} RPM"
+        return (
+            f"Tenant token rate limit exceeded for {tenant}: {int(limit)} TPM. "
+            f"Current: {int(used)}, requested: {tokens}"
+        )
+
+    def _window_usage(self, suffix: str, window: int) -> float:
+        """Текущее использование окна из Redis"""
+        size = window / _BUCKETS
+        oldest_bucket = int(time.time() // size) - _BUCKETS
+        raw = self.redis_client.hgetall(self.key_prefix + suffix)
+        return sum(float(value) for bucket, value in raw.items() if int(bucket) > oldest_bucket)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика: текущее использование - общее по Redis, total_* - по этому процессу"""
+        stats = super().get_stats()
+
+        try:
+            current = {
+                'current_rpm': int(self._window_usage("rpm", 60)),
+                'current_tpm': int(self._window_usage("tpm", 60)),
+                'current_hourly_cost': self._window_usage("cost:hour", 3600),
+                'current_daily_cost': self._window_usage("cost:day", 86400),
+            }
+        except Exception as e:
+            self._on_redis_error(e)
+            stats['backend'] = 'memory (redis unavailable)'
+            return stats
+
+        stats.update(current)
+        for key, limit_key, pct_key in (
+            ('current_rpm', 'limit_rpm', 'rpm_usage_pct'),
+            ('current_tpm', 'limit_tpm', 'tpm_usage_pct'),
+            ('current_hourly_cost', 'limit_hourly_cost', 'hourly_cost_usage_pct'),
+            ('current_daily_cost', 'limit_daily_cost', 'daily_cost_usage_pct'),
+        ):
+            stats[pct_key] = (stats[key] / stats[limit_key] * 100) if stats[limit_key] else 0
+        stats['backend'] = 'redis'
+        return stats
+
+    def reset_stats(self) -> None:
+        """Сбросить статистику и окна в Redis"""
+        try:
+            keys = list(self.redis_client.scan_iter(match=self.key_prefix + "*"))
+            if keys:
+                self.redis_client.delete(*keys)
+        except Exception as e:
+            self._on_redis_error(e)
+        super().reset_stats()
+
+
+__all__ = ['RedisRateLimiter', 'connect_rate_limit_redis']
@@ -6,11 +6,16 @@ Rate Limiter - Защита от превышения лимитов LLM API
 - Ограничение частоты вызовов API (requests per minute)
 - Ограничение общей стоимости (cost per hour/day)
 - Ограничение токенов (tokens per minute)
+- Per-tenant sub-buckets (RPM/TPM на арендатора)
+- Blocking mode: FIFO/priority очередь вместо RateLimitExceeded (sync и async)
 - Thread-safe реализация
 """
 import time
+import asyncio
+import bisect
+import itertools
 import threading
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 from collections import deque
 from loguru import logger
@@ -21,6 +26,28 @@ class RateLimitExceeded(Exception):
     pass
 
 
+class _Waiter:
+    """acquire(), ожидающий в очереди blocking-режима"""
+
+    __slots__ = ('priority', 'seq', 'tokens', 'cost', 'tenant', 'granted', '_wake')
+
+    def __init__(self, priority: int, seq: int, tokens: int, cost: float, tenant: Optional[str], wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.cost = cost
+        self.tenant = tenant
+        self.granted = False
+        self._wake = wake
+
+    def __lt__(self, other: '_Waiter') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def grant(self) -> None:
+        self.granted = True
+        self._wake()
+
+
 class RateLimiter:
     """
     Rate limiter с поддержкой нескольких лимитов
@@ -36,14 +63,36 @@ class RateLimiter:
         with limiter.acquire(tokens=1000, cost=0.001):
             # Выполнить API запрос
             pass
+
+    В blocking-режиме acquire() не бросает RateLimitExceeded при исчерпанном
+    лимите, а ставит вызов в очередь и пропускает его, когда окно RPM/TPM
+    освободится. Очередь обслуживается по (priority, порядок прихода):
+    меньший priority проходит раньше. Вызов, чей tenant исчерпал свой
+    sub-bucket, не задерживает вызовы других арендаторов.
+
+        limiter = RateLimiter(requests_per_minute=300, blocking=True, max_wait=120)
+
+        with limiter.acquire(tokens=1000, tenant="org-1"):
+            ...
+
+        async with limiter.acquire(tokens=1000, priority=-1):
+            ...
     """
 
+    # _record_usage/_reserve делают сетевой I/O (RedisRateLimiter): async-путь
+    # уводит их (и dispatch очереди blocking-режима) в поток
+    record_usage_blocks = False
+
     def __init__(
         self,
         requests_per_minute: Optional[int] = None,
         tokens_per_minute: Optional[int] = None,
         cost_per_hour: Optional[float] = None,
-        cost_per_day: Optional[float] = None
+        cost_per_day: Optional[float] = None,
+        blocking: bool = False,
+        max_wait: Optional[float] = None,
+        tenant_requests_per_minute: Optional[int] = None,
+        tenant_tokens_per_minute: Optional[int] = None
     ):
         """
         Инициализация rate limiter
@@ -53,17 +102,31 @@ class RateLimiter:
             tokens_per_minute: Максимум токенов в минуту
             cost_per_hour: Максимальная стоимость в час (USD)
             cost_per_day: Максимальная стоимость в день (USD)
+            blocking: Ждать освобождения лимита в очереди вместо RateLimitExceeded
+            max_wait: Максимальное ожидание в очереди, секунды (None = без ограничения)
+            tenant_requests_per_minute: Максимум запросов в минуту на одного tenant
+            tenant_tokens_per_minute: Максимум токенов в минуту на одного tenant
         """
         self.requests_per_minute = requests_per_minute
         self.tokens_per_minute = tokens_per_minute
         self.cost_per_hour = cost_per_hour
         self.cost_per_day = cost_per_day
+        self.blocking = blocking
+        self.max_wait = max_wait
+        self.tenant_requests_per_minute = tenant_requests_per_minute
+        self.tenant_tokens_per_minute = tenant_tokens_per_minute
 
         # Deques для хранения временных меток
         self.request_times: deque = deque()
         self.token_usage: deque = deque()  # (timestamp, tokens)
         self.hourly_costs: deque = deque()  # (timestamp, cost)
         self.daily_costs: deque = deque()  # (timestamp, cost)
+        self.tenant_requests: Dict[str, deque] = {}  # tenant -> (timestamp, 1)
+        self.tenant_tokens: Dict[str, deque] = {}  # tenant -> (timestamp, tokens)
+
+        # Очередь blocking-режима, отсортирована по (priority, seq)
+        self._waiters: List[_Waiter] = []
+        self._waiter_seq = itertools.count()
 
         # Thread safety
         self.lock = threading.Lock()
@@ -72,6 +135,8 @@ class RateLimiter:
         self.total_requests = 0
         self.total_tokens = 0
         self.total_cost = 0.0
+        self.total_queued = 0
+        self.total_wait_seconds = 0.0
         self.start_time = datetime.now()
 
         logger.info(
@@ -79,7 +144,8 @@ class RateLimiter:
             f"RPM={requests_per_minute}, "
             f"TPM={tokens_per_minute}, "
             f"$/hour={cost_per_hour}, "
-            f"$/day={cost_per_day}"
+            f"$/day={cost_per_day}, "
+            f"blocking={blocking}"
         )
 
     def _cleanup_old_entries(self, queue: deque, max_age_seconds: int) -> None:
@@ -150,52 +216,341 @@ class RateLimiter:
                     f"Current: ${current_daily_cost:.4f}, requested: ${cost:.4f}"
                 )
 
-    def acquire(self, tokens: int = 0, cost: float = 0.0) -> 'RateLimiterContext':
+    def _check_tenant_limit(self, tenant: Optional[str], tokens: int) -> None:
+        """Проверить sub-bucket tenant (RPM/TPM на арендатора)"""
+        if tenant is None:
+            return
+
+        self._cleanup_tenant(tenant)
+
+        requests = self.tenant_requests.get(tenant, ())
+        if self.tenant_requests_per_minute is not None and len(requests) >= self.tenant_requests_per_minute:
+            raise RateLimitExceeded(
+                f"Tenant request rate limit exceeded for {tenant}: {self.tenant_requests_per_minute} RPM"
+            )
+
+        current_tokens = sum(t[1] for t in self.tenant_tokens.get(tenant, ()))
+        if self.tenant_tokens_per_minute is not None and current_tokens + tokens > self.tenant_tokens_per_minute:
+            raise RateLimitExceeded(
+                f"Tenant token rate limit exceeded for {tenant}: {self.tenant_tokens_per_minute} TPM. "
+                f"Current: {current_tokens}, requested: {tokens}"
+            )
+
+    def _cleanup_tenant(self, tenant: str) -> None:
+        """Очистить окно tenant и забыть его, когда окно опустело"""
+        for usage in (self.tenant_requests, self.tenant_tokens):
+            queue = usage.get(tenant)
+            if queue is None:
+                continue
+            self._cleanup_old_entries(queue, 60)
+            if not queue:
+                del usage[tenant]
+
+    def acquire(
+        self,
+        tokens: int = 0,
+        cost: float = 0.0,
+        tenant: Optional[str] = None,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ) -> 'RateLimiterContext':
         """
         Получить разрешение на выполнение запроса
 
         Args:
             tokens: Количество токенов для запроса
             cost: Стоимость запроса в USD
+            tenant: Ключ sub-bucket (организация/пользователь); None = только общие лимиты
+            priority: Порядок в очереди blocking-режима (меньше = раньше)
+            timeout: Максимальное ожидание в очереди (по умолчанию self.max_wait)
 
         Returns:
-            Context manager для использования в with statement
+            Context manager для использования в with / async with statement
 
         Raises:
-            RateLimitExceeded: Если превышен какой-либо лимит
+            RateLimitExceeded: Если превышен какой-либо лимит (в blocking-режиме -
+                если лимит не освободился за timeout или запрос не помещается в лимит вовсе)
         """
-        return RateLimiterContext(self, tokens, cost)
+        return RateLimiterContext(self, tokens, cost, tenant=tenant, priority=priority, timeout=timeout)
 
-    def _record_usage(self, tokens: int, cost: float) -> None:
+    def _record_usage(self, tokens: int, cost: float, tenant: Optional[str] = None) -> None:
         """Записать использование ресурсов"""
-        now = time.time()
-
         with self.lock:
             # Проверить все лимиты
             self._check_request_limit()
             self._check_token_limit(tokens)
             self._check_cost_limit(cost)
+            self._check_tenant_limit(tenant, tokens)
 
-            # Записать использование
-            self.request_times.append((now, 1))
+            self._commit_usage(tokens, cost, tenant)
 
+    def _commit_usage(self, tokens: int, cost: float, tenant: Optional[str]) -> None:
+        """Записать использование (вызывается под self.lock, лимиты уже проверены)"""
+        now = time.time()
+
+        self.request_times.append((now, 1))
+
+        if tokens > 0:
+            self.token_usage.append((now, tokens))
+
+        if cost > 0:
+            self.hourly_costs.append((now, cost))
+            self.daily_costs.append((now, cost))
+
+        if tenant is not None:
+            self.tenant_requests.setdefault(tenant, deque()).append((now, 1))
             if tokens > 0:
-                self.token_usage.append((now, tokens))
+                self.tenant_tokens.setdefault(tenant, deque()).append((now, tokens))
 
-            if cost > 0:
-                self.hourly_costs.append((now, cost))
-                self.daily_costs.append((now, cost))
+        # Обновить статистику
+        self.total_requests += 1
+        self.total_tokens += tokens
+        self.total_cost += cost
 
-            # Обновить статистику
-            self.total_requests += 1
-            self.total_tokens += tokens
-            self.total_cost += cost
+        logger.debug(
+            f"Rate limiter usage recorded: "
+            f"tokens={tokens}, cost=${cost:.4f}, "
+            f"total_requests={self.total_requests}"
+        )
 
-            logger.debug(
-                f"Rate limiter usage recorded: "
-                f"tokens={tokens}, cost=${cost:.4f}, "
-                f"total_requests={self.total_requests}"
-            )
+    # ------------------------------------------------------------------
+    # Blocking mode
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _window_wait(queue, limit: Optional[float], amount: float, window: int, now: float) -> float:
+        """Секунд до момента, когда amount поместится в скользящее окно (0 = помещается сейчас)"""
+        if limit is None:
+            return 0.0
+
+        excess = sum(entry[1] for entry in queue) + amount - limit
+        if excess <= 0:
+            return 0.0
+
+        # Записи истекают от старых к новым: ждём ту, после которой хватит места
+        for timestamp, value in queue:
+            excess -= value
+            if excess <= 0:
+                return max(0.0, timestamp + window - now)
+
+        return float('inf')
+
+    def _global_wait(self, tokens: int, cost: float, now: float) -> float:
+        """Время до освобождения общих лимитов (под self.lock)"""
+        self._cleanup_old_entries(self.request_times, 60)
+        self._cleanup_old_entries(self.token_usage, 60)
+        self._cleanup_old_entries(self.hourly_costs, 3600)
+        self._cleanup_old_entries(self.daily_costs, 86400)
+
+        return max(
+            self._window_wait(self.request_times, self.requests_per_minute, 1, 60, now),
+            self._window_wait(self.token_usage, self.tokens_per_minute, tokens, 60, now),
+            self._window_wait(self.hourly_costs, self.cost_per_hour, cost, 3600, now),
+            self._window_wait(self.daily_costs, self.cost_per_day, cost, 86400, now),
+        )
+
+    def _tenant_wait(self, tenant: Optional[str], tokens: int, now: float) -> float:
+        """Время до освобождения sub-bucket tenant (под self.lock)"""
+        if tenant is None:
+            return 0.0
+
+        self._cleanup_tenant(tenant)
+        return max(
+            self._window_wait(self.tenant_requests.get(tenant, ()), self.tenant_requests_per_minute, 1, 60, now),
+            self._window_wait(self.tenant_tokens.get(tenant, ()), self.tenant_tokens_per_minute, tokens, 60, now),
+        )
+
+    def _check_fits(self, tokens: int, cost: float) -> None:
+        """Запрос, который не поместится даже в пустое окно, ждать бессмысленно"""
+        limits = (
+            (tokens, self.tokens_per_minute, "Token rate limit"),
+            (tokens, self.tenant_tokens_per_minute, "Tenant token rate limit"),
+            (cost, self.cost_per_hour, "Hourly cost limit"),
+            (cost, self.cost_per_day, "Daily cost limit"),
+        )
+        for amount, limit, name in limits:
+            if limit is not None and amount > limit:
+                raise RateLimitExceeded(f"{name} exceeded: request ({amount}) is larger than the limit ({limit})")
+
+    def _dispatch(self) -> float:
+        """
+        Пропустить ожидающих по порядку (priority, seq), пока хватает лимита (под self.lock)
+
+        Returns:
+            Секунд до ближайшего освобождения лимита для первого непропущенного
+        """
+        next_refill = float('inf')
+
+        for waiter in list(self._waiters):
+            wait, tenant_only = self._reserve(waiter.tokens, waiter.cost, waiter.tenant)
+            if wait > 0:
+                next_refill = min(next_refill, wait)
+                if tenant_only:
+                    # Исчерпан sub-bucket tenant: не задерживаем остальных арендаторов
+                    continue
+                # Голова очереди ждёт общий лимит, следующие её не обгоняют
+                break
+
+            self._waiters.remove(waiter)
+            waiter.grant()
+
+        return next_refill
+
+    def _reserve(self, tokens: int, cost: float, tenant: Optional[str]) -> Tuple[float, bool]:
+        """
+        Занять место в лимитах, если оно есть (под self.lock)
+
+        Returns:
+            (0, False), если использование записано, иначе (секунд до освобождения,
+            ограничивает ли только sub-bucket tenant)
+        """
+        now = time.time()
+
+        tenant_wait = self._tenant_wait(tenant, tokens, now)
+        if tenant_wait > 0:
+            return tenant_wait, True
+
+        global_wait = self._global_wait(tokens, cost, now)
+        if global_wait > 0:
+            return global_wait, False
+
+        self._commit_usage(tokens, cost, tenant)
+        return 0.0, False
+
+    def _enqueue(
+        self,
+        tokens: int,
+        cost: float,
+        tenant: Optional[str],
+        priority: int,
+        wake: Callable[[], None]
+    ) -> _Waiter:
+        """Поставить запрос в очередь и сразу попытаться его пропустить"""
+        self._check_fits(tokens, cost)
+
+        with self.lock:
+            waiter = _Waiter(priority, next(self._waiter_seq), tokens, cost, tenant, wake)
+            bisect.insort(self._waiters, waiter)
+            self._dispatch()
+        return waiter
+
+    def _poll(self, waiter: _Waiter, deadline: Optional[float]) -> Optional[float]:
+        """
+        Повторить dispatch для waiter
+
+        Returns:
+            None, если waiter пропущен, иначе сколько ждать до следующей попытки
+
+        Raises:
+            RateLimitExceeded: Если истёк deadline
+        """
+        with self.lock:
+            if not waiter.granted:
+                next_refill = self._dispatch()
+            if waiter.granted:
+                return None
+
+            remaining = float('inf') if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                self._waiters.remove(waiter)
+                self._dispatch()
+                raise RateLimitExceeded(
+                    f"Rate limit wait timed out: request (tokens={waiter.tokens}) "
+                    f"was not admitted within the queue timeout"
+                )
+            return min(next_refill, remaining)
+
+    async def _off_loop(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Вызвать fn в потоке, если она ходит в сеть под self.lock (иначе — прямо на loop)"""
+        if self.record_usage_blocks:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Убрать прерванного ожидающего из очереди"""
+        with self.lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._dispatch()
+
+    def _deadline(self, timeout: Optional[float]) -> Optional[float]:
+        timeout = self.max_wait if timeout is None else timeout
+        return None if timeout is None else time.monotonic() + timeout
+
+    def _record_wait(self, started: float) -> None:
+        """Учесть запрос, который ждал в очереди"""
+        waited = time.monotonic() - started
+        with self.lock:
+            self.total_queued += 1
+            self.total_wait_seconds += waited
+        if waited > 1.0:
+            logger.debug(f"Rate limiter: request admitted after {waited:.1f}s in queue")
+
+    def wait_for_slot(
+        self,
+        tokens: int = 0,
+        cost: float = 0.0,
+        tenant: Optional[str] = None,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ) -> None:
+        """Дождаться места в лимитах (blocking-режим, sync) и записать использование"""
+        started = time.monotonic()
+        deadline = self._deadline(timeout)
+        event = threading.Event()
+        waiter = self._enqueue(tokens, cost, tenant, priority, event.set)
+
+        if waiter.granted:
+            return
+
+        try:
+            while True:
+                wait = self._poll(waiter, deadline)
+                if wait is None:
+                    break
+                event.wait(None if wait == float('inf') else wait)
+                event.clear()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+        self._record_wait(started)
+
+    async def async_wait_for_slot(
+        self,
+        tokens: int = 0,
+        cost: float = 0.0,
+        tenant: Optional[str] = None,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ) -> None:
+        """wait_for_slot() для event loop: ожидание не занимает поток"""
+        started = time.monotonic()
+        deadline = self._deadline(timeout)
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = await self._off_loop(
+            self._enqueue, tokens, cost, tenant, priority, lambda: loop.call_soon_threadsafe(event.set)
+        )
+
+        if waiter.granted:
+            return
+
+        try:
+            while True:
+                wait = await self._off_loop(self._poll, waiter, deadline)
+                if wait is None:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=None if wait == float('inf') else wait)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            await self._off_loop(self._abandon, waiter)
+            raise
+
+        self._record_wait(started)
 
     def get_stats(self) -> Dict[str, Any]:
         """Получить статистику использования"""
@@ -214,6 +569,9 @@ class RateLimiter:
             current_hourly_cost = sum(c[1] for c in self.hourly_costs)
             current_daily_cost = sum(c[1] for c in self.daily_costs)
 
+            for tenant in list(self.tenant_requests):
+                self._cleanup_tenant(tenant)
+
             return {
                 # Текущее использование
                 'current_rpm': current_rpm,
@@ -239,6 +597,14 @@ class RateLimiter:
                 'total_cost': self.total_cost,
                 'runtime_seconds': runtime,
                 'avg_rps': self.total_requests / runtime if runtime > 0 else 0,
+
+                # Blocking mode / tenants
+                'blocking': self.blocking,
+                'queued_requests': len(self._waiters),
+                'total_queued': self.total_queued,
+                'total_wait_seconds': self.total_wait_seconds,
+                'active_tenants': len(self.tenant_requests),
+                'backend': 'memory',
             }
 
     def reset_stats(self) -> None:
@@ -248,32 +614,64 @@ class RateLimiter:
             self.token_usage.clear()
             self.hourly_costs.clear()
             self.daily_costs.clear()
+            self.tenant_requests.clear()
+            self.tenant_tokens.clear()
 
             self.total_requests = 0
             self.total_tokens = 0
             self.total_cost = 0.0
+            self.total_queued = 0
+            self.total_wait_seconds = 0.0
             self.start_time = datetime.now()
 
+            # Окна очищены - пропустить ожидающих
+            self._dispatch()
+
             logger.info("Rate limiter stats reset")
 
 
 class RateLimiterContext:
-    """Context manager для rate limiter"""
+    """Context manager для rate limiter (sync и async)"""
 
-    def __init__(self, limiter: RateLimiter, tokens: int, cost: float):
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        tokens: int,
+        cost: float,
+        tenant: Optional[str] = None,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ):
         self.limiter = limiter
         self.tokens = tokens
         self.cost = cost
+        self.tenant = tenant
+        self.priority = priority
+        self.timeout = timeout
 
     def __enter__(self):
-        """Проверить лимиты и записать использование"""
-        self.limiter._record_usage(self.tokens, self.cost)
+        """Проверить лимиты (или дождаться очереди) и записать использование"""
+        if self.limiter.blocking:
+            self.limiter.wait_for_slot(self.tokens, self.cost, self.tenant, self.priority, self.timeout)
+        else:
+            self.limiter._record_usage(self.tokens, self.cost, self.tenant)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Cleanup (если нужно)"""
         pass
 
+    async def __aenter__(self):
+        """__enter__ без блокировки event loop"""
+        if self.limiter.blocking:
+            await self.limiter.async_wait_for_slot(self.tokens, self.cost, self.tenant, self.priority, self.timeout)
+        else:
+            await self.limiter._off_loop(self.limiter._record_usage, self.tokens, self.cost, self.tenant)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
 
 # Глобальный rate limiter (можно настроить через settings)
 _global_limiter: Optional[RateLimiter] = None
@@ -287,11 +685,29 @@ def get_global_rate_limiter() -> RateLimiter:
         # Создать с дефолтными лимитами
         from config.settings import settings
 
-        _global_limiter = RateLimiter(
+        limiter_cls = RateLimiter
+        limiter_kwargs: Dict[str, Any] = {}
+        if settings.llm_rate_limit_backend == "redis":
+            # Общий бюджет для всех uvicorn-воркеров и scheduler; без Redis - in-process
+            from .distributed_rate_limiter import RedisRateLimiter, connect_rate_limit_redis
+
+            client = connect_rate_limit_redis()
+            if client is not None:
+                limiter_cls = RedisRateLimiter
+                limiter_kwargs = {"redis_client": client, "key_prefix": settings.llm_rate_limit_redis_prefix}
+            else:
+                logger.warning("Rate limiter: Redis unavailable, using in-process limits (per worker)")
+
+        _global_limiter = limiter_cls(
+            **limiter_kwargs,
             requests_per_minute=300,  # DeepSeek: высокий лимит
             tokens_per_minute=1000000,  # DeepSeek: ~1M TPM
             cost_per_hour=10.0,  # $10/час максимум
-            cost_per_day=100.0  # $100/день максимум
+            cost_per_day=100.0,  # $100/день максимум
+            blocking=settings.llm_rate_limit_blocking,
+            max_wait=settings.llm_rate_limit_max_wait or None,
+            tenant_requests_per_minute=settings.llm_rate_limit_tenant_rpm or None,
+            tenant_tokens_per_minute=settings.llm_rate_limit_tenant_tpm or None
         )
 
     return _global_limiter
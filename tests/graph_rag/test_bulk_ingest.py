@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk ingestion (GraphBulkWriter): parity with the per-object ORM path and
+INSERT statement counts of ConsultantImporter.import_all on synthetic codexes.
+Throughput: tests/rag_eval/graph_ingest_bench.py.
+"""
+from collections import Counter
+
+import pytest
+from sqlalchemy import event, func
+
+from src.core.graph_rag.importers import consultant_importer
+from src.core.graph_rag.importers.consultant_importer import ConsultantImporter
+from src.core.graph_rag.models import (
+    GraphDocument, GraphEdge, GraphEntity, GraphNode, NodeVersion, RAGAuditLog,
+)
+from src.core.graph_rag.pipeline import GraphRAGPipeline
+from src.core.graph_rag.repository import GraphBulkWriter
+
+from .test_pipeline import SAMPLE_CONTRACT, SAMPLE_NPA
+
+
+def _graph_shape(db):
+    """Содержимое графа без id/времени: что сравнивать между режимами"""
+    nodes = {n.id: (n.node_type, n.number, n.level, n.position) for n in db.query(GraphNode)}
+    return {
+        "nodes": Counter(nodes.values()),
+        "versions": db.query(func.count(NodeVersion.id)).filter(NodeVersion.version_number == 1).scalar(),
+        "edges": Counter((nodes[e.source_id], nodes[e.target_id], e.edge_type, e.edge_class, e.status)
+                         for e in db.query(GraphEdge)),
+        "entities": Counter((nodes[e.node_id], e.entity_type, e.entity_value) for e in db.query(GraphEntity)),
+        "audit": Counter((a.action, a.entity_type) for a in db.query(RAGAuditLog)),
+    }
+
+
+def _clear_graph(db):
+    for model in (RAGAuditLog, GraphEntity, GraphEdge, NodeVersion, GraphNode, GraphDocument):
+        db.query(model).delete()
+    db.commit()
+
+
+@pytest.mark.parametrize("text,layer", [(SAMPLE_CONTRACT, "contract"), (SAMPLE_NPA, "npa")])
+def test_bulk_ingest_matches_orm_path(test_db, text, layer):
+    orm = GraphRAGPipeline(test_db).ingest_text(text, title="Документ", layer=layer)
+    expected = _graph_shape(test_db)
+    _clear_graph(test_db)
+
+    bulk = GraphRAGPipeline(test_db, bulk=True).ingest_text(text, title="Документ", layer=layer)
+
+    assert _graph_shape(test_db) == expected
+    assert (bulk.nodes_count, bulk.edges_count, bulk.fact_edges_count, bulk.entities_count) == \
+        (orm.nodes_count, orm.edges_count, orm.fact_edges_count, orm.entities_count)
+    assert bulk.document.nodes_count == orm.document.nodes_count
+
+
+def test_bulk_writer_applies_column_defaults_and_rejects_unknown_fields(test_db):
+    writer = GraphBulkWriter(test_db)
+
+    node = writer.nodes.create(document_id="doc-1", layer="npa", node_type="article", text="x")
+    with pytest.raises(TypeError, match="nodes_typo"):
+        writer.add(GraphNode, nodes_typo=1)
+
+    assert len(node.id) == 36 and node.is_archived is False and node.level == 0
+    assert node.created_at is not None
+    assert writer.pending == 3  # узел + версия + аудит
+
+
+# ── import_all statement counts ─────────────────────────────────
+
+def _codex(doc_id: int, articles: int) -> str:
+    """Синтетический кодекс в формате выгрузки consultant-tools"""
+    lines = [
+        "---",
+        f"title: Гражданский кодекс Российской Федерации (часть {doc_id})",
+        f"source_url: https://www.consultant.ru/document/cons_doc_LAW_{doc_id}/",
+        "category: kodeks",
+        f"number: {doc_id}-ФЗ",
+        "---",
+        f"Глава {doc_id}. Общие положения",
+    ]
+    for a in range(1, articles + 1):
+        lines += [
+            f"Статья {a}. Обязательства по договору {a}",
+            "1. Должник обязан уплатить неустойку в размере 1 000 рублей в соответствии со ст. 330 ГК РФ.",
+            f"2. Требование предъявляется до 01.09.2026, см. также статью {max(a - 1, 1)}.",
+            f"3. Иное может быть предусмотрено договором или ст. {a} ТК РФ.",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def write_codexes(directory, files: int = 3, articles: int = 20):
+    directory.mkdir(exist_ok=True)
+    for doc_id in range(1, files + 1):
+        (directory / f"codex_{doc_id}.md").write_text(_codex(doc_id, articles=articles), encoding="utf-8")
+    return directory
+
+
+@pytest.fixture
+def codexes(tmp_path, monkeypatch):
+    src = write_codexes(tmp_path / "kodeksy")
+    monkeypatch.setattr(consultant_importer, "SOURCES", {"kodeksy": src})
+    return src
+
+
+def count_statements(db, action):
+    """(результат action(), Counter первых слов SQL-операторов за время его работы)"""
+    statements = []
+    engine = db.get_bind()
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = action()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return result, Counter(statements)
+
+
+def test_import_all_bulk_uses_per_table_inserts(test_db, codexes):
+    """
+    ConsultantImporter.import_all (Фаза 1) на 3 кодексах по 20 статей:
+    ORM-путь делает INSERT на каждый узел/версию/ребро/entity/аудит,
+    bulk — по одному executemany на таблицу и фазу.
+    """
+    orm_report, orm_stmts = count_statements(
+        test_db, lambda: ConsultantImporter(db=test_db, bulk=False).import_all(no_phase2=True))
+    expected = _graph_shape(test_db)
+    _clear_graph(test_db)
+
+    bulk_report, bulk_stmts = count_statements(
+        test_db, lambda: ConsultantImporter(db=test_db, bulk=True).import_all(no_phase2=True))
+
+    assert orm_report.ingested == bulk_report.ingested == 3
+    assert _graph_shape(test_db) == expected
+    assert bulk_stmts["INSERT"] <= 3 * 12  # документ + 2 фазы x 5 таблиц на файл
+    assert bulk_stmts["INSERT"] * 10 < orm_stmts["INSERT"]
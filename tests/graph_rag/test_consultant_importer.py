@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+ConsultantImporter.import_all with a process pool: same graph and report as
+the sequential run, resumable skip and Phase 2 still work.
+"""
+import pytest
+
+from src.core.graph_rag.importers import consultant_importer
+from src.core.graph_rag.importers.consultant_importer import ConsultantImporter, _iter_parsed
+
+from .test_bulk_ingest import _codex, _graph_shape
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    src = tmp_path / "kodeksy"
+    src.mkdir()
+    for doc_id in range(1, 6):
+        (src / f"codex_{doc_id}.md").write_text(_codex(doc_id, articles=20), encoding="utf-8")
+    (src / "codex_toc.md").write_text("---\ntitle: Оглавление\ncategory: kodeks\n---\nСтатья 1. Пусто\n",
+                                      encoding="utf-8")
+    monkeypatch.setattr(consultant_importer, "SOURCES", {"kodeksy": src})
+    return src
+
+
+def _second_db(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'sequential.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_worker_pool_matches_sequential_import(test_db, sources, tmp_path):
+    seq_db = _second_db(tmp_path)
+    try:
+        sequential = ConsultantImporter(db=seq_db).import_all(workers=1)
+        expected = _graph_shape(seq_db)
+    finally:
+        seq_db.close()
+
+    pooled = ConsultantImporter(db=test_db).import_all(workers=3)
+
+    assert (pooled.ingested, pooled.validation_failed, pooled.failed) == (5, 1, 0)
+    assert [r.file for r in pooled.reports] == [r.file for r in sequential.reports]
+    assert pooled.cross_edges_created == sequential.cross_edges_created > 0
+    assert _graph_shape(test_db) == expected
+
+
+def test_rerun_skips_loaded_documents(test_db, sources):
+    ConsultantImporter(db=test_db).import_all(workers=2, no_phase2=True)
+
+    again = ConsultantImporter(db=test_db).import_all(workers=2)
+
+    assert again.total_files == 1  # только не прошедший валидацию
+    assert again.ingested == 0 and again.validation_failed == 1
+
+
+def test_parse_errors_are_reported_in_order(tmp_path):
+    good = tmp_path / "good.md"
+    good.write_text(_codex(7, articles=20), encoding="utf-8")
+    missing = tmp_path / "missing.md"
+
+    results = list(_iter_parsed([missing, good, missing], workers=2))
+
+    assert [r[0] for r in results] == [missing, good, missing]
+    assert results[0][1] is None and results[0][3]
+    assert results[1][1].title.startswith("Гражданский кодекс") and results[1][2].ok
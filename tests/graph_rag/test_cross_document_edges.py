@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Phase 2 of ConsultantImporter: cross-document edges resolved from index
+lookups (number / root per target document), written with
+INSERT ... ON CONFLICT DO NOTHING; re-runs add nothing.
+"""
+from collections import Counter
+
+import pytest
+from sqlalchemy import event
+
+from src.core.graph_rag.enums import EdgeType
+from src.core.graph_rag.importers import consultant_importer
+from src.core.graph_rag.importers.consultant_importer import ConsultantImporter
+from src.core.graph_rag.models import GraphEdge, GraphNode, RAGAuditLog
+from src.core.graph_rag.repository import GraphBulkWriter
+
+
+def _npa(doc_id: int, title: str, category: str, line: str, articles: int = 20) -> str:
+    lines = ["---", f"title: {title}",
+             f"source_url: https://www.consultant.ru/document/cons_doc_LAW_{doc_id}/",
+             f"category: {category}", "---", "Глава 1. Общие положения"]
+    for a in range(1, articles + 1):
+        lines += [
+            f"Статья {a}. Общие правила применения положений {a}",
+            f"1. {line.format(a=a)}",
+            "2. Стороны обязаны исполнять обязательства надлежащим образом в соответствии с условиями.",
+            f"3. Иное может быть предусмотрено соглашением сторон, если это не противоречит закону {a}.",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    src = tmp_path / "npa"
+    src.mkdir()
+    files = {
+        "gk.md": _npa(1, "Гражданский кодекс Российской Федерации (часть первая)", "kodeks",
+                      "Неустойка по ст. 330 ГК РФ и ст. {a} ТК РФ, см. также ст. 999 ГК РФ."),
+        "tk.md": _npa(2, "Трудовой кодекс Российской Федерации", "kodeks",
+                      "Работник вправе требовать по ст. {a} ГК РФ, ст. 1 ГК РФ и ст. 1 ГК РФ."),
+        "fz.md": _npa(3, "Федеральный закон от 05.04.2013 N 44-ФЗ", "federal_law",
+                      "См. [ГК РФ](https://www.consultant.ru/document/cons_doc_LAW_1/) и "
+                      "Постановление Правительства РФ от 07.02.2011 N 55."),
+        "decree.md": _npa(4, "Постановление Правительства РФ от 07.02.2011 N 55 О порядке",
+                          "government_decree", "Порядок применяется с 01.01.2012."),
+    }
+    for name, text in files.items():
+        (src / name).write_text(text, encoding="utf-8")
+    monkeypatch.setattr(consultant_importer, "SOURCES", {"npa": src})
+    return src
+
+
+def _cross_edges(db):
+    """Cross-document рёбра: (узел-источник, узел-цель, тип, rationale) → количество"""
+    raw = {n.id: n for n in db.query(GraphNode)}
+    nodes = {i: (n.document_id, n.node_type, n.number, raw[n.parent_id].number if n.parent_id else None)
+             for i, n in raw.items()}
+    return Counter(
+        (nodes[e.source_id], nodes[e.target_id], e.edge_type, e.rationale)
+        for e in db.query(GraphEdge).filter(GraphEdge.rationale.notlike("Reference extracted%"),
+                                            GraphEdge.edge_class == "fact")
+    )
+
+
+def test_phase2_links_articles_roots_and_decrees(test_db, sources):
+    report = ConsultantImporter(db=test_db).import_all()
+    edges = _cross_edges(test_db)
+
+    assert report.ingested == 4 and report.cross_edges_created == sum(edges.values())
+    by_kind = Counter((target[1], etype) for (_, target, etype, _) in edges)
+    # статья найдена по номеру; ст. 999 ГК → корень; inline-ссылка и реквизит → корень
+    assert by_kind[("article", EdgeType.REGULATED_BY.value)] > 0
+    assert by_kind[("document", EdgeType.REGULATED_BY.value)] > 0
+    assert by_kind[("document", EdgeType.REFERENCES.value)] > 0
+    assert all(n == 1 for n in edges.values())  # «ст. 1 ГК РФ и ст. 1 ГК РФ» — одно ребро
+    edge_ids = {e.id for e in test_db.query(GraphEdge)}
+    audited = {a.entity_id for a in test_db.query(RAGAuditLog).filter(RAGAuditLog.entity_type == "graph_edge")}
+    assert audited == edge_ids
+
+
+def test_rerun_creates_nothing_in_a_fixed_number_of_queries(test_db, sources):
+    importer = ConsultantImporter(db=test_db)
+    importer.import_all()
+    before = _cross_edges(test_db)
+
+    statements = []
+    engine = test_db.get_bind()
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        created = importer.resolve_cross_document_edges()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert created == 0 and _cross_edges(test_db) == before
+    assert len(statements) <= 8
+
+
+def test_bulk_writer_skips_duplicate_rule_edges_and_their_audit(test_db):
+    writer = GraphBulkWriter(test_db)
+    a = writer.nodes.create(document_id="d", layer="npa", node_type="article", text="a")
+    b = writer.nodes.create(document_id="d", layer="npa", node_type="article", text="b")
+    writer.flush()
+
+    fact = dict(source_id=a.id, target_id=b.id, edge_type="references", edge_class="fact",
+                status="machine_extracted", extracted_by="rule")
+    writer = GraphBulkWriter(test_db, skip_duplicate_edges=True)
+    writer.edges.create(**fact)
+    writer.edges.create(**fact)
+    writer.edges.create(**{**fact, "extracted_by": "llm"})
+    counts = writer.flush()
+
+    assert counts["graph_edges"] == 2
+    assert test_db.query(GraphEdge).count() == 2
+    assert test_db.query(RAGAuditLog).filter(RAGAuditLog.entity_type == "graph_edge").count() == 2
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+GraphExpander.expand: set-based expansion of the whole result set gives the
+same ExpandedContext as the per-node repository lookups, in a fixed number of queries.
+"""
+import pytest
+from sqlalchemy import event
+
+from src.core.graph_rag.enums import EdgeClass, EdgeStatus, EdgeType, ExtractedBy
+from src.core.graph_rag.models import GraphNode
+from src.core.graph_rag.pipeline import GraphRAGPipeline
+from src.core.graph_rag.repository import GraphRepository
+from src.core.graph_rag.retrieval import GraphExpander
+from src.core.graph_rag.retrieval.graph_retriever import RetrievedNode
+
+from .test_pipeline import SAMPLE_CONTRACT, SAMPLE_NPA
+
+
+def _per_node(repo, node, max_children=10, max_siblings=5):
+    """Эталон: прежнее расширение по одному узлу через репозиторий"""
+    def linked(edges, attr, limit=None):
+        ids = [getattr(e, attr) for e in edges if getattr(e, attr) != node.id]
+        if not ids:
+            return []
+        q = repo.db.query(GraphNode).filter(GraphNode.id.in_(ids), GraphNode.is_archived == False)
+        return q.limit(limit).all() if limit else q.all()
+
+    outgoing = repo.edges.get_outgoing(node.id, edge_classes=["fact"], edge_types=[
+        "references", "regulated_by", "defined_in", "appendix_ref", "table_ref", "amends", "supersedes"])
+    incoming = repo.edges.get_incoming(node.id, edge_classes=["fact"], edge_types=["references", "regulated_by"])
+    return {
+        "ancestors": [n.id for n in repo.nodes.get_ancestors(node.id, max_depth=5)],
+        "children": [n.id for n in repo.nodes.get_children(node.id)[:max_children]],
+        "siblings": [n.id for n in repo.nodes.get_siblings(node.id)[:max_siblings]],
+        "referenced_nodes": sorted(n.id for n in linked(outgoing, "target_id")),
+        "referenced_by": sorted(n.id for n in linked(incoming, "source_id", limit=10)),
+        "entities_summary": sorted(f"{e.entity_type}: {e.entity_value}" for e in repo.entities.get_by_node(node.id)),
+    }
+
+
+def _as_dict(ctx):
+    return {
+        "ancestors": [n.id for n in ctx.ancestors],
+        "children": [n.id for n in ctx.children],
+        "siblings": [n.id for n in ctx.siblings],
+        "referenced_nodes": sorted(n.id for n in ctx.referenced_nodes),
+        "referenced_by": sorted(n.id for n in ctx.referenced_by),
+        "entities_summary": sorted(ctx.entities_summary),
+    }
+
+
+@pytest.fixture
+def graph(test_db):
+    pipeline = GraphRAGPipeline(test_db)
+    contract = pipeline.ingest_text(SAMPLE_CONTRACT, title="Договор поставки", layer="contract").document
+    npa = pipeline.ingest_text(SAMPLE_NPA, title="ГК РФ", layer="npa").document
+    repo = GraphRepository(test_db)
+    nodes = repo.nodes.get_by_document(contract.id) + repo.nodes.get_by_document(npa.id)
+
+    # cross-document ребро договор → ГК и архивный узел среди результатов
+    clause = next(n for n in nodes if n.number == "3.2")
+    article = next(n for n in nodes if n.node_type == "article")
+    repo.edges.create(source_id=clause.id, target_id=article.id, edge_type=EdgeType.REGULATED_BY.value,
+                      edge_class=EdgeClass.FACT.value, status=EdgeStatus.MACHINE_EXTRACTED.value,
+                      extracted_by=ExtractedBy.RULE.value)
+    repo.nodes.archive(next(n for n in nodes if n.number == "1.2").id, reason="test", cascade=False)
+    test_db.commit()
+    test_db.query(GraphNode).all()  # как у retriever: узлы результатов уже загружены
+    return repo, nodes
+
+
+def test_set_based_expand_matches_per_node_expansion(graph):
+    repo, nodes = graph
+    results = [RetrievedNode(node=n) for n in nodes] + [RetrievedNode(node=nodes[3])]
+
+    contexts = GraphExpander(repo.db).expand(results, max_children=2, max_siblings=2)
+
+    assert [c.primary_node for c in contexts] == results
+    for ctx in contexts:
+        assert _as_dict(ctx) == _per_node(repo, ctx.primary_node.node, max_children=2, max_siblings=2)
+    assert any(c.referenced_by for c in contexts) and any(c.entities_summary for c in contexts)
+
+
+def test_expand_costs_a_fixed_number_of_queries(graph):
+    repo, nodes = graph
+    statements = []
+    engine = repo.db.get_bind()
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    expander = GraphExpander(repo.db)
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        expander.expand([RetrievedNode(node=n) for n in nodes[:3]])
+        small = len(statements)
+        statements.clear()
+        expander.expand([RetrievedNode(node=n) for n in nodes])
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(nodes) > 15
+    assert small <= len(statements) <= 6
+
+
+def test_flags_and_empty_input(graph):
+    repo, nodes = graph
+    expander = GraphExpander(repo.db)
+
+    ctx, = expander.expand([RetrievedNode(node=nodes[2])], include_children=False, include_siblings=False)
+
+    assert ctx.children == [] and ctx.siblings == []
+    assert expander.expand([]) == []
+
+
+def test_hub_node_loads_at_most_ten_referencing_nodes(graph):
+    repo, nodes = graph
+    hub = next(n for n in nodes if n.node_type == "article")
+    sources = [repo.nodes.create(document_id=hub.document_id, layer="npa", node_type="paragraph",
+                                 text=f"ссылка {i} на ст. 330") for i in range(40)]
+    repo.db.flush()
+    for source in sources:
+        repo.edges.create(source_id=source.id, target_id=hub.id, edge_type=EdgeType.REFERENCES.value,
+                          edge_class=EdgeClass.FACT.value, status=EdgeStatus.MACHINE_EXTRACTED.value,
+                          extracted_by=ExtractedBy.RULE.value)
+    repo.db.commit()
+
+    loaded = []
+    engine = repo.db.get_bind()
+
+    def count_rows(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "graph_nodes.text" in statement:
+            loaded.append(parameters)
+
+    event.listen(engine, "after_cursor_execute", count_rows)
+    try:
+        ctx, = GraphExpander(repo.db).expand([RetrievedNode(node=hub)], include_children=False,
+                                             include_siblings=False)
+    finally:
+        event.remove(engine, "after_cursor_execute", count_rows)
+
+    assert len(ctx.referenced_by) == 10
+    # узлы грузятся одним запросом по id: не больше 10 источников + исходящие цели
+    assert max(len(p) for p in loaded if isinstance(p, (tuple, list))) <= 10 + len(ctx.referenced_nodes) + 1
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+NodeTextExtractor / KeywordScanner: the prefiltered single-scan extraction
+gives exactly the output of running every pattern, also over the node
+texts of a whole (small) codex. Throughput: tests/rag_eval/node_extractor_bench.py.
+"""
+import pytest
+
+from src.core.graph_rag.extraction import (
+    EntityExtractor, KeywordScanner, NodeTextExtractor, ReferenceExtractor,
+)
+from src.core.graph_rag.parser import NPAGraphParser
+
+from .test_pipeline import SAMPLE_CONTRACT, SAMPLE_NPA
+
+# Абзацы разной «плотности» ссылок и сущностей, как в реальном кодексе
+PARAGRAPHS = [
+    "Гражданские права и обязанности возникают из оснований, предусмотренных законом и иными правовыми актами.",
+    "Должник обязан уплатить неустойку в размере 1 000 рублей в соответствии со ст. 330 ГК РФ.",
+    "Требование предъявляется до 01.09.2026, с 1 сентября 2026 года по 2026-11-30, см. п. 3.2.1.",
+    "«Товар» — продукция, поставляемая Поставщиком по ГОСТ Р 52554-2006 согласно Приложению №1.",
+    "Стоимость указана в Таблице 2 и составляет $1,500.50 или 2 000 евро (EUR).",
+    "Федеральный закон от 05.04.2013 N 44-ФЗ, ст. 15 ч. 2 п. 3 Трудового кодекса, КоАП.",
+    "Арендодатель вправе потребовать расторжения договора аренды и возмещения убытков.",
+    "Исполнитель обязан соблюдать конфиденциальность; ограничение ответственности сторон не допускается.",
+    "Лицо, право которого нарушено, может требовать полного возмещения причиненных ему убытков.",
+]
+
+EDGE_CASES = [
+    "",
+    "п.п. 01.1.2026 и 1.2026",
+    "ᲃт. 330 ГК РФ",                # IGNORECASE-эквивалент «с», который lower() не сводит
+    "ſ 100 USD, ıı",
+    "ГРАЖДАНСКОГО КОДЕКСА статьи 10 ГРАЖДАНСКОГО КОДЕКСА",
+    "Форс-мажор: обстоятельства непреодолимой силы 12 января 2025",
+    "сумма 5 ₽; 7 €; \"Термин\" означает",
+]
+
+
+def _full_codex(articles: int) -> str:
+    lines = ["---", "title: Гражданский кодекс Российской Федерации", "category: kodeks", "---",
+             "Глава 1. Общие положения"]
+    for a in range(1, articles + 1):
+        lines.append(f"Статья {a}. Статья {a} кодекса")
+        lines += [f"{i}. {PARAGRAPHS[(a + i) % len(PARAGRAPHS)]}" for i in range(1, 4)]
+    return "\n".join(lines) + "\n"
+
+
+def _node_texts(raw: str):
+    texts, stack = [], [NPAGraphParser().parse_markdown(raw).root]
+    while stack:
+        node = stack.pop()
+        if node.text:
+            texts.append(node.text)
+        stack.extend(node.children)
+    return texts
+
+
+def _unfiltered(text):
+    """Эталон: все паттерны без префильтра"""
+    refs, ents = ReferenceExtractor(), EntityExtractor()
+    return refs.extract(text, hits=NodeTextExtractor.scanner.rules), \
+        ents.extract(text, hits=NodeTextExtractor.scanner.rules)
+
+
+CORPUS = PARAGRAPHS + EDGE_CASES + SAMPLE_CONTRACT.splitlines() + SAMPLE_NPA.splitlines() \
+    + [SAMPLE_CONTRACT, SAMPLE_NPA]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_prefiltered_extraction_is_identical(text):
+    expected_refs, expected_ents = _unfiltered(text)
+
+    combined = NodeTextExtractor().extract(text)
+
+    assert combined.references == expected_refs
+    assert combined.entities == expected_ents
+    assert ReferenceExtractor().extract(text) == expected_refs
+    assert EntityExtractor().extract(text) == expected_ents
+
+
+def test_scanner_skips_rules_without_triggers():
+    scanner = NodeTextExtractor.scanner
+
+    assert scanner.scan("Гражданские права возникают из оснований.") == set()
+    assert {"gost_ref", "clause_ref", "date_dmy"} <= scanner.scan("ГОСТ 1.2, до 01.09.2026")
+    assert "norm_ref" not in scanner.scan("ст. 330")
+    assert scanner.scan("ᲃт. 330") == scanner.rules  # префильтр отключён
+
+
+def test_scanner_rejects_triggers_it_cannot_fold():
+    with pytest.raises(ValueError):
+        KeywordScanner({"x": ["ГОСТ"]})
+    assert KeywordScanner({"always": []}).scan("") == {"always"}
+
+
+def test_extract_batch_keeps_order():
+    batch = NodeTextExtractor().extract_batch(PARAGRAPHS)
+
+    assert [b.references for b in batch] == [_unfiltered(t)[0] for t in PARAGRAPHS]
+
+
+def test_codex_node_texts_match_unfiltered_extraction():
+    texts = _node_texts(_full_codex(articles=30))
+
+    combined = NodeTextExtractor().extract_batch(texts)
+
+    assert len(texts) > 100
+    assert [(c.references, c.entities) for c in combined] == [_unfiltered(t) for t in texts]
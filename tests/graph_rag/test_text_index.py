@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Full-text index over graph nodes: ranking, filters pushed into the index
+query, incremental maintenance (update_text, archive, delete), stable node
+id keys and the LIKE
+fallback for databases without the index.
+"""
+import pytest
+
+from src.core.graph_rag import text_index
+from src.core.graph_rag.models import GraphNode
+from src.core.graph_rag.pipeline import GraphRAGPipeline
+from src.core.graph_rag.repository import GraphRepository
+from src.core.graph_rag.retrieval.graph_retriever import GraphRetriever, RetrievalQuery
+from src.core.graph_rag.text_index import (
+    NODE_FTS_TABLE, node_text_index_available, search_nodes,
+)
+
+from .test_pipeline import SAMPLE_CONTRACT, SAMPLE_NPA
+
+
+@pytest.fixture
+def docs(test_db):
+    pipeline = GraphRAGPipeline(test_db)
+    contract = pipeline.ingest_text(SAMPLE_CONTRACT, title="Договор поставки", layer="contract").document
+    npa = pipeline.ingest_text(SAMPLE_NPA, title="ГК РФ", layer="npa").document
+    test_db.commit()
+    return contract, npa
+
+
+def test_index_is_created_with_the_schema(test_db):
+    assert node_text_index_available(test_db)
+
+
+def test_search_matches_word_forms_and_ranks(test_db, docs):
+    hits = search_nodes(test_db, "неустойка поставщика")
+
+    assert hits
+    for node, _ in hits:
+        content = f"{node.title or ''} {node.text}".lower()
+        assert "неустойк" in content or "поставщик" in content
+    scores = [rel for _, rel in hits]
+    assert scores == sorted(scores, reverse=True) and scores[-1] > 0
+
+
+def test_filters_are_applied_in_the_index_query(test_db, docs):
+    contract, npa = docs
+
+    only_npa = search_nodes(test_db, "неустойка", document_ids=[npa.id])
+    articles = search_nodes(test_db, "неустойка", layers=["npa"], node_types=["article"])
+
+    assert only_npa and {n.document_id for n, _ in only_npa} == {npa.id}
+    assert articles and all(n.node_type == "article" for n, _ in articles)
+    assert len(search_nodes(test_db, "неустойка", limit=1)) == 1
+    assert search_nodes(test_db, "и на") == []
+
+
+def test_index_follows_update_archive_and_delete(test_db, docs):
+    contract, _ = docs
+    repo = GraphRepository(test_db)
+    node = next(n for n, _ in search_nodes(test_db, "неустойка", document_ids=[contract.id]))
+
+    repo.nodes.update_text(node.id, "Арбитражная оговорка о подсудности", reason="test")
+    test_db.commit()
+    assert node.id in {n.id for n, _ in search_nodes(test_db, "арбитражный")}
+    assert node.id not in {n.id for n, _ in search_nodes(test_db, "неустойка")}
+
+    repo.nodes.archive(node.id, reason="test", cascade=False)
+    test_db.commit()
+    assert search_nodes(test_db, "арбитражный") == []
+
+    test_db.query(GraphNode).filter(GraphNode.document_id == contract.id).delete()
+    test_db.commit()
+    assert all(n.document_id != contract.id for n, _ in search_nodes(test_db, "договор"))
+
+
+def test_index_is_keyed_on_node_id_not_rowid(test_db, docs):
+    before = {n.id for n, _ in search_nodes(test_db, "неустойка")}
+
+    # Неявный rowid таблицы со строковым PK VACUUM может перенумеровать
+    test_db.connection().exec_driver_sql("UPDATE graph_nodes SET rowid = rowid + 100000")
+    test_db.commit()
+
+    assert before and {n.id for n, _ in search_nodes(test_db, "неустойка")} == before
+
+
+def test_rowid_keyed_index_is_replaced_on_install(test_db, docs):
+    connection = test_db.connection()
+    for trigger in ("ai", "ad", "au"):
+        connection.exec_driver_sql(f"DROP TRIGGER {NODE_FTS_TABLE}_{trigger}")
+    connection.exec_driver_sql(f"DROP TABLE {NODE_FTS_TABLE}")
+    connection.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE {NODE_FTS_TABLE} USING fts5("
+        "title, text, content='graph_nodes', content_rowid='rowid')"
+    )
+
+    text_index.install_node_text_index(connection)
+    test_db.commit()
+
+    assert search_nodes(test_db, "неустойка")
+
+
+def test_retriever_and_repository_use_index_or_like_fallback(test_db, docs):
+    contract, _ = docs
+    query = RetrievalQuery(text="неустойка за просрочку", document_ids=[contract.id])
+
+    indexed = GraphRetriever(test_db)._text_search(query)
+    assert indexed and all(0.5 <= r.score <= 0.8 and r.match_type == "text" for r in indexed)
+    assert max(r.score for r in indexed) == pytest.approx(0.8)
+    assert GraphRepository(test_db).nodes.search_text(contract.id, "неустойки")
+
+    test_db.connection().exec_driver_sql(f"DROP TABLE {NODE_FTS_TABLE}")
+    for trigger in ("ai", "ad", "au"):
+        test_db.connection().exec_driver_sql(f"DROP TRIGGER {NODE_FTS_TABLE}_{trigger}")
+    text_index._available.clear()
+
+    assert not node_text_index_available(test_db)
+    # LIKE в SQLite не сворачивает регистр кириллицы и не знает словоформ
+    fallback = GraphRetriever(test_db)._text_search(RetrievalQuery(text="день просрочки",
+                                                                   document_ids=[contract.id]))
+    assert fallback and all(0.5 <= r.score <= 0.8 for r in fallback)
+    assert GraphRepository(test_db).nodes.search_text(contract.id, "просрочки")
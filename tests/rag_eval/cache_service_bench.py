@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""БЕНЧМАРК memory-уровня CacheService: set/get на заполненном LRU.
+
+Заполняет кэш на --keys ключей, затем пишет ещё столько же (каждый set
+вытесняет самый старый ключ) и читает их. При O(1)-вытеснении вставка в полный
+кэш не медленнее вставки в пустой; полный min()-скан на каждый set занял бы минуты.
+
+    python tests/rag_eval/cache_service_bench.py [--keys 100000]
+"""
+import sys, time, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from loguru import logger
+
+from src.services.cache_service import CacheService
+
+
+def _rate(fn, n):
+    t0 = time.perf_counter(); fn(); return n / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--keys", type=int, default=100_000, help="ёмкость memory-уровня")
+    args = ap.parse_args()
+    n = args.keys
+
+    cache = CacheService(max_memory_items=n, max_memory_bytes=256 * 1024 * 1024)
+    payload = {"risk": "high", "score": 0.9}
+    # Меряем структуру данных, а не debug-лог на каждую операцию
+    logger.disable("src.services.cache_service")
+
+    def _set_range(start):
+        for i in range(start, start + n):
+            cache.set(f"key:{i}", payload)
+
+    def _get_range():
+        for i in range(n, 2 * n):
+            cache.get(f"key:{i}")
+
+    fill = _rate(lambda: _set_range(0), n)
+    evicting = _rate(lambda: _set_range(n), n)
+    lookups = _rate(_get_range, n)
+
+    stats = cache.get_stats()
+    print(f"\n{n:,} ключей: fill {fill:,.0f} set/s, с вытеснением {evicting:,.0f} set/s, "
+          f"get {lookups:,.0f} get/s", flush=True)
+    print(f"items {stats['memory_items']:,}, evictions {stats['memory_evictions']:,}, "
+          f"hits {stats['memory_hits']:,}", flush=True)
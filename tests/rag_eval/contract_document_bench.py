@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""БЕНЧМАРК ContractDocument: строка на каждом этапе vs один разобранный документ.
+
+Для договора ~200 страниц (650 разделов × 6 абзацев, ~500K символов) меряет по
+этапам анализа CPU-время и пик Python-аллокаций (tracemalloc не видит кучу
+libxml2, только Python-сторону):
+  строка — каждый этап сам разбирает XML (старое поведение);
+  документ — все этапы читают кэшированные представления одного ContractDocument.
+
+    python tests/rag_eval/contract_document_bench.py [--clauses 650]
+"""
+import sys, time, argparse, tracemalloc
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.services.clause_extractor import ClauseExtractor
+from src.services.contract_document import ContractDocument
+from src.services.metadata_analyzer import MetadataAnalyzer
+from src.utils.contract_types import infer_contract_type_from_xml
+from tests.test_contract_document import _TemplateManager, _contract_xml
+
+
+def _measure(stage):
+    tracemalloc.start()
+    started = time.process_time()
+    stage()
+    cpu = time.process_time() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+def _stages(source_factory, analyzer):
+    return [
+        ("extract_structure", lambda: ClauseExtractor.extract_structure(source_factory())),
+        ("required_fields", lambda: ClauseExtractor.extract_clauses(source_factory())),
+        ("plain_text", lambda: ContractDocument.coerce(source_factory()).plain_text),
+        ("infer_contract_type", lambda: infer_contract_type_from_xml(source_factory())),
+        ("pass2_clauses", lambda: ClauseExtractor.extract_clauses(source_factory())),
+        ("compare_with_templates", lambda: analyzer.compare_with_templates(source_factory(), "supply")),
+    ]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clauses", type=int, default=650, help="разделов в договоре (650 ≈ 200 страниц)")
+    args = ap.parse_args()
+
+    xml = _contract_xml(clause_count=args.clauses, paragraphs_per_clause=6)
+    analyzer = MetadataAnalyzer(llm_gateway=None, template_manager=_TemplateManager())
+    holder = {}
+
+    report = {}
+    for mode, factory in (("string", lambda: xml), ("document", lambda: holder["doc"])):
+        holder["doc"] = ContractDocument(xml)
+        report[mode] = [(name, *_measure(stage)) for name, stage in _stages(factory, analyzer)]
+
+    print(f"\n{len(xml) // 1024} KB XML", flush=True)
+    print(f"{'этап':<24}{'cpu строка':>12}{'cpu док':>10}{'пик строка':>14}{'пик док':>12}", flush=True)
+    for (name, cpu_s, peak_s), (_, cpu_d, peak_d) in zip(report["string"], report["document"]):
+        print(f"{name:<24}{cpu_s * 1000:>10.1f}ms{cpu_d * 1000:>8.1f}ms"
+              f"{peak_s // 1024:>12}KB{peak_d // 1024:>10}KB", flush=True)
+    total_string = sum(cpu for _, cpu, _ in report["string"])
+    total_document = sum(cpu for _, cpu, _ in report["document"])
+    print(f"{'итого':<24}{total_string * 1000:>10.1f}ms{total_document * 1000:>8.1f}ms", flush=True)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""БЕНЧМАРК ConsultantImporter.import_all (Фаза 1): ORM-путь vs bulk (GraphBulkWriter).
+
+На синтетических кодексах (формат выгрузки consultant-tools) меряет файлы/с и
+число SQL-операторов: ORM-путь делает INSERT на каждый узел/версию/ребро/
+entity/аудит, bulk — по одному executemany на таблицу и фазу. Каждый режим
+пишет в свою временную SQLite-БД.
+
+    python tests/rag_eval/graph_ingest_bench.py [--files 3] [--articles 60]
+"""
+import sys, time, argparse, tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Base
+from src.core.graph_rag.importers import consultant_importer
+from src.core.graph_rag.importers.consultant_importer import ConsultantImporter
+from tests.graph_rag.test_bulk_ingest import count_statements, write_codexes
+
+
+def _run(workdir: Path, bulk: bool):
+    engine = create_engine(f"sqlite:///{workdir / ('bulk.db' if bulk else 'orm.db')}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        t0 = time.perf_counter()
+        report, stmts = count_statements(
+            db, lambda: ConsultantImporter(db=db, bulk=bulk).import_all(no_phase2=True))
+        return report, stmts, time.perf_counter() - t0
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=3, help="число кодексов")
+    ap.add_argument("--articles", type=int, default=60, help="статей в кодексе")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        consultant_importer.SOURCES = {
+            "kodeksy": write_codexes(workdir / "kodeksy", files=args.files, articles=args.articles)
+        }
+        results = {mode: _run(workdir, bulk=mode == "bulk") for mode in ("orm", "bulk")}
+
+    print(f"\n{'режим':<8}{'файлы':>7}{'INSERT':>9}{'операторы':>12}{'файлов/с':>10}", flush=True)
+    for mode, (report, stmts, elapsed) in results.items():
+        print(f"{mode:<8}{report.total_files:>7}{stmts['INSERT']:>9}{sum(stmts.values()):>12}"
+              f"{report.ingested / elapsed:>10.1f}", flush=True)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""БЕНЧМАРК извлечения ссылок и сущностей из текстов узлов кодекса.
+
+Все узлы синтетического кодекса (--articles статей, ~4 узла на статью):
+прежний прогон всех паттернов (ReferenceExtractor + EntityExtractor) против
+NodeTextExtractor (префильтр KeywordScanner + один проход). Проверяет, что
+результаты совпадают, и печатает узлов/с.
+
+    python tests/rag_eval/node_extractor_bench.py [--articles 1000]
+"""
+import sys, time, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.core.graph_rag.extraction import NodeTextExtractor
+from tests.graph_rag.test_node_extractor import _full_codex, _node_texts, _unfiltered
+
+
+def _timed(fn):
+    t0 = time.perf_counter(); out = fn(); return out, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--articles", type=int, default=1000, help="статей в кодексе")
+    args = ap.parse_args()
+
+    texts = _node_texts(_full_codex(articles=args.articles))
+    baseline, baseline_s = _timed(lambda: [_unfiltered(t) for t in texts])
+    combined, combined_s = _timed(lambda: NodeTextExtractor().extract_batch(texts))
+    same = [(c.references, c.entities) for c in combined] == baseline
+
+    chars = sum(map(len, texts))
+    print(f"\n{'режим':<10}{'узлы':>7}{'MB':>6}{'сек':>9}{'узлов/с':>10}", flush=True)
+    for mode, elapsed in (("все", baseline_s), ("scanner", combined_s)):
+        print(f"{mode:<10}{len(texts):>7}{chars / 1e6:>6.1f}{elapsed:>9.2f}{len(texts) / elapsed:>10.0f}", flush=True)
+    print("РЕЗУЛЬТАТЫ СОВПАДАЮТ" if same else "РЕЗУЛЬТАТЫ РАЗЛИЧАЮТСЯ", flush=True)
+    sys.exit(0 if same else 1)
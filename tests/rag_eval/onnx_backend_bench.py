@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""БЕНЧМАРК бэкенда моделей: PyTorch (fp32) vs ONNX Runtime (int8) на CPU.
+
+Меряет на 30 held-out вопросах из rageval_indep:
+  1) пропускную способность encode (USER2-small запросы, e5-large чанки) и
+     реранка DiTy (48 кандидатов на вопрос, как пул get_legal_context);
+  2) расхождение с PyTorch: косинус эмбеддингов, Спирмен скоров реранка;
+  3) recall@3 прод-пути get_legal_context (raw, без рерайта) на каждом бэкенде.
+Допуски — ONNX_MIN_COSINE / ONNX_MIN_SPEARMAN / ONNX_MAX_RECALL_DROP из
+model_registry. Прод не трогает: int8-экспорт пишется в rag_model_onnx_dir.
+
+    python tests/rag_eval/onnx_backend_bench.py [--threads 4]
+"""
+import os, sys, re, time, argparse
+from pathlib import Path
+os.environ.setdefault("HF_HUB_OFFLINE", "1"); os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import numpy as np
+from scipy.stats import spearmanr
+
+from tests.rag_eval.rageval_indep import Q
+
+E5 = "intfloat/multilingual-e5-large"
+U2 = "deepvk/USER2-small"
+DITY = "DiTy/cross-encoder-russian-msmarco"
+
+
+def _use_backend(backend):
+    """Новый реестр + сброс ленивых синглтонов admin_rag_retriever"""
+    import src.services.model_registry as mr
+    import src.services.admin_rag_retriever as ar
+    mr._model_registry = mr.ModelRegistry(backend=backend, batch_wait_ms=0)
+    ar._embedding_fn = None
+    ar._reranker = None; ar._reranker_failed = False
+    ar._u2_model = None; ar._u2_failed = False
+    return mr._model_registry
+
+
+def _pools():
+    """Кандидаты на вопрос: лексический пул законов (или сами вопросы, если FTS-индекса нет)"""
+    from src.services.admin_rag_retriever import _fts_search
+    pools = [(q, [row[1][:600] for row in _fts_search(q, k=48)]) for _, q, _ in Q]
+    if not any(pool for _, pool in pools):
+        questions = [q for _, q, _ in Q]
+        pools = [(q, questions) for q in questions]
+    return pools
+
+
+def _timed(fn, n_items):
+    fn()  # прогрев (экспорт/загрузка графа, аллокации)
+    t0 = time.perf_counter(); out = fn(); dt = time.perf_counter() - t0
+    return out, n_items / dt
+
+
+def _measure(backend, chunks, pairs):
+    reg = _use_backend(backend)
+    queries = [q for _, q, _ in Q]
+    res = {}
+    u2 = reg.embedder(U2, device="cpu")
+    res["u2"], res["u2_rate"] = _timed(lambda: u2.encode(queries, prompt_name="search_query"), len(queries))
+    e5 = reg.embedder(E5, device="cpu")
+    res["e5"], res["e5_rate"] = _timed(lambda: e5.encode(["passage: " + c for c in chunks]), len(chunks))
+    rr = reg.reranker(DITY, device="cpu", max_length=512)
+    res["rr"], res["rr_rate"] = _timed(lambda: np.asarray(rr.predict(pairs)), len(pairs))
+    return res
+
+
+def _recall_at_3(backend):
+    from config.settings import settings
+    from src.services.admin_rag_retriever import get_legal_context
+    _use_backend(backend)
+    settings.rag_rewrite = False
+    ok = []
+    for topic, q, exp in Q:
+        ctx = get_legal_context(q, collections=["laws", "case_law"], n_results=3)
+        titles = re.findall(r'\[(?:Законы и НПА|Судебная практика)\] — ([^\n]+)', ctx)
+        ok.append(any(re.search(exp, t, re.I) for t in titles))
+    return ok
+
+
+def _min_cosine(a, b):
+    return float(((a * b).sum(1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))).min())
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=0, help="rag_model_threads (0 = по умолчанию)")
+    args = ap.parse_args()
+    from config.settings import settings
+    from src.services.model_registry import ONNX_MIN_COSINE, ONNX_MIN_SPEARMAN, ONNX_MAX_RECALL_DROP
+    settings.rag_model_threads = args.threads
+
+    pools = _pools()
+    chunks = [c for _, pool in pools for c in pool]
+    pairs = [(q, c) for q, pool in pools for c in pool]
+
+    base = _measure("torch", chunks, pairs)
+    onnx = _measure("onnx", chunks, pairs)
+    rec_t = _recall_at_3("torch")
+    rec_o = _recall_at_3("onnx")
+
+    cos_u2 = _min_cosine(base["u2"], onnx["u2"])
+    cos_e5 = _min_cosine(base["e5"], onnx["e5"])
+    rho = spearmanr(base["rr"], onnx["rr"]).correlation
+    N = len(Q); drop = sum(rec_t) - sum(rec_o)
+
+    print(f"\n{'='*64}", flush=True)
+    print(f"CPU, threads={args.threads or 'default'}; {len(chunks)} чанков, {len(pairs)} пар реранка", flush=True)
+    print(f"{'модель':<24}{'torch/s':>10}{'onnx/s':>10}{'x':>7}", flush=True)
+    for name, key in (("USER2 encode (запросы)", "u2_rate"), ("e5-large encode (чанки)", "e5_rate"),
+                      ("DiTy rerank (пары)", "rr_rate")):
+        print(f"{name:<24}{base[key]:>10.1f}{onnx[key]:>10.1f}{onnx[key] / base[key]:>7.2f}", flush=True)
+    print(f"min cos USER2 {cos_u2:.4f}, e5 {cos_e5:.4f} (допуск ≥{ONNX_MIN_COSINE}); "
+          f"Спирмен DiTy {rho:.4f} (≥{ONNX_MIN_SPEARMAN})", flush=True)
+    print(f"recall@3: torch {sum(rec_t)}/{N}, onnx {sum(rec_o)}/{N} "
+          f"(Δ {-drop:+d}, допуск −{ONNX_MAX_RECALL_DROP})", flush=True)
+    for (topic, _, _), a, b in zip(Q, rec_t, rec_o):
+        if a != b:
+            print(f"  {'↑↑' if b else '↓↓'} [{topic}]", flush=True)
+    ok = min(cos_u2, cos_e5) >= ONNX_MIN_COSINE and rho >= ONNX_MIN_SPEARMAN and drop <= ONNX_MAX_RECALL_DROP
+    print("В ДОПУСКЕ" if ok else "ВНЕ ДОПУСКА", flush=True)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""БЕНЧМАРК pool-union: вызовы модели и round-trip'ы к стору на один get_legal_context.
+
+Два варианта рерайта по laws + case_law, стор и модель — заглушки из
+tests/test_admin_rag_cache.py (ChromaDB, USER2 и LLM не нужны). Прежний путь
+(encode и query на каждый вариант) посчитан по формуле; батч — замерен:
+  рерайт в кеше — один encode и один query на коллекцию на всё;
+  рерайт в полёте — raw-поиск параллельно LLM, варианты — вторым батчем.
+
+    python tests/rag_eval/pool_union_bench.py
+"""
+import sys, threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from config.settings import settings
+from src.services import admin_rag_retriever as ar
+from tests.test_admin_rag_cache import _U2Collection, _U2Model
+
+COLLECTIONS = ["laws", "case_law"]
+REWRITE = "неустойка, уменьшение неустойки\nГражданский кодекс"  # два варианта
+
+
+def _round_trips(query, pending):
+    """(encode-вызовов, query к стору) за один get_legal_context"""
+    model, stores = _U2Model(), {}
+    raw_encoded = threading.Event()
+    encode = model.encode
+
+    def encode_then_signal(texts, **kwargs):
+        out = encode(texts, **kwargs); raw_encoded.set(); return out
+
+    def rewrite(*args, **kwargs):
+        if pending:
+            raw_encoded.wait(5)  # LLM отвечает, когда raw-поиск уже ушёл
+        return REWRITE
+
+    model.encode = encode_then_signal
+    gateway = MagicMock()
+    gateway.return_value.call.side_effect = rewrite
+    client = MagicMock()
+    client.get_or_create_collection.side_effect = lambda name: stores.setdefault(name, _U2Collection(name))
+    ar.clear_result_cache(); ar.invalidate_collection_catalog()
+    with patch.object(ar, "get_collection", return_value=MagicMock(count=MagicMock(return_value=5))), \
+            patch.object(ar, "get_chroma_client", return_value=client), \
+            patch.object(ar, "get_u2_model", return_value=model), \
+            patch.object(ar, "get_reranker", return_value=None), \
+            patch.object(ar, "_fts_search", return_value=[]), \
+            patch("src.services.llm_gateway.LLMGateway", gateway):
+        if not pending:
+            ar._rewrite_query(query)  # рерайт уже в кеше
+        model.calls.clear()
+        ar.get_legal_context(query, collections=COLLECTIONS, n_results=3)
+    return len(model.calls), sum(len(s.calls) for s in stores.values())
+
+
+if __name__ == "__main__":
+    settings.rag_rewrite = True
+    variants = len(REWRITE.splitlines())
+    before = (1 + variants, len(COLLECTIONS) * (1 + variants))
+    ready = _round_trips("директор не выплатил зарплату", pending=False)
+    pending = _round_trips("работодатель задержал зарплату", pending=True)
+
+    print(f"\n{variants} варианта рерайта, коллекции: {', '.join(COLLECTIONS)}", flush=True)
+    print(f"{'режим':<28}{'encode':>8}{'query к стору':>15}", flush=True)
+    for mode, (enc, qry) in (("по варианту (до)", before), ("батч, рерайт в кеше", ready),
+                             ("батч, рерайт в полёте", pending)):
+        print(f"{mode:<28}{enc:>8}{qry:>15}", flush=True)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""БЕНЧМАРК выявления рисков: Pass 1 (полный текст) и Pass 2 (по разделам) —
+последовательно vs одновременно (settings.risk_passes_concurrent).
+
+LLM — заглушка из tests/test_risk_passes_concurrency.py с фиксированной
+задержкой на вызов: полнотекстовый проход — --full-text-delay, каждый батч
+разделов — --batch-delay. Последовательно время — сумма проходов,
+одновременно — максимум из них.
+
+    python tests/rag_eval/risk_passes_bench.py [--clauses 60] [--full-text-delay 0.5] [--batch-delay 0.25]
+"""
+import sys, time, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from config.settings import settings
+from src.agents.contract_analyzer_agent import ContractAnalyzerAgent
+import tests.test_risk_passes_concurrency as stub
+
+
+def _run(concurrent, clauses):
+    settings.risk_passes_concurrent = concurrent
+    agent = ContractAnalyzerAgent(llm_gateway=stub._StubGateway(), db_session=None,
+                                  template_manager=object(), counterparty_service=object())
+    agent._required_fields = []; agent._placeholder_clause_ids = set(); agent._clause_analyses = []
+    agent._progress_updater = lambda pct, msg: None
+    t0 = time.perf_counter()
+    risks = agent._identify_risks(stub._contract_xml(clauses), {}, {}, None, analysis_context={})
+    return time.perf_counter() - t0, len(risks), agent.llm.calls
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clauses", type=int, default=60, help="разделов в договоре")
+    ap.add_argument("--full-text-delay", type=float, default=0.5, help="сек. на полнотекстовый вызов")
+    ap.add_argument("--batch-delay", type=float, default=0.25, help="сек. на батч разделов")
+    args = ap.parse_args()
+    stub.FULL_TEXT_DELAY, stub.BATCH_DELAY = args.full_text_delay, args.batch_delay
+    settings.full_text_analysis = True
+    settings.llm_test_mode = False
+
+    results = {mode: _run(mode == "одновременно", args.clauses) for mode in ("последовательно", "одновременно")}
+
+    print(f"\n{args.clauses} разделов, батч {settings.llm_batch_size}, "
+          f"параллельных батчей {settings.max_concurrent_batches}", flush=True)
+    print(f"{'режим':<18}{'сек':>8}{'рисков':>8}{'LLM-вызовов':>13}", flush=True)
+    for mode, (elapsed, risks, calls) in results.items():
+        print(f"{mode:<18}{elapsed:>8.2f}{risks:>8}{calls:>13}", flush=True)
+    seq, conc = results["последовательно"][0], results["одновременно"][0]
+    print(f"ускорение ×{seq / conc:.2f}", flush=True)
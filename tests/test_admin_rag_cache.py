@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+admin_rag_retriever: TTL cache of get_legal_context results and query rewrites,
+cached collection catalog, concurrent rewrite/retrieval (mocked ChromaDB and LLM).
+"""
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from config.settings import settings
+from src.services import admin_rag_retriever
+
+
+@pytest.fixture
+def coll():
+    mock_coll = MagicMock()
+    mock_coll.count.return_value = 5
+    mock_coll.query.return_value = {
+        "documents": [["Статья 330. Неустойка", "Статья 333. Уменьшение неустойки"]],
+        "metadatas": [[{"title": "ГК РФ", "category": "kodeks"}, {"title": "ГК РФ", "category": "kodeks"}]],
+        "distances": [[0.1, 0.2]],
+        "ids": [["a", "b"]],
+    }
+    admin_rag_retriever.clear_result_cache()
+    admin_rag_retriever.invalidate_collection_catalog()
+    with patch.object(admin_rag_retriever, "get_collection", return_value=mock_coll), \
+            patch.object(admin_rag_retriever, "get_chroma_client", return_value=MagicMock()), \
+            patch.object(admin_rag_retriever, "get_u2_model", return_value=None), \
+            patch.object(admin_rag_retriever, "get_reranker", return_value=None), \
+            patch.object(admin_rag_retriever, "_fts_search", return_value=[]):
+        yield mock_coll
+    admin_rag_retriever.clear_result_cache()
+    admin_rag_retriever.invalidate_collection_catalog()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    gateway = MagicMock()
+    gateway.return_value.call.return_value = "неустойка, уменьшение неустойки\nГражданский кодекс"
+    monkeypatch.setattr(settings, "rag_rewrite", True)
+    with patch("src.services.llm_gateway.LLMGateway", gateway):
+        yield gateway.return_value.call
+
+
+def _context(query, **kwargs):
+    return admin_rag_retriever.get_legal_context(query, collections=["laws"], n_results=2, **kwargs)
+
+
+def test_repeated_query_is_served_from_cache(coll):
+    first = _context("Договор поставки: неустойка")
+    second = _context("  Договор поставки:   неустойка ")
+
+    assert "Статья 330" in first
+    assert second == first
+    assert coll.query.call_count == 1
+
+
+def test_parameters_weights_and_kb_version_are_part_of_the_key(coll, monkeypatch):
+    _context("штраф")
+    admin_rag_retriever.get_legal_context("штраф", collections=["laws"], n_results=1)
+    monkeypatch.setenv("RAG_VEC_W", "0.5")
+    _context("штраф")
+    assert coll.query.call_count == 3
+
+    _context("штраф")
+    assert coll.query.call_count == 3
+
+    admin_rag_retriever.bump_kb_index_version()
+    _context("штраф")
+    assert coll.query.call_count == 4
+
+
+def test_rewrite_output_is_cached_separately(coll, llm):
+    _context("что будет если поставщик опоздал")
+    admin_rag_retriever.get_legal_context("что будет если поставщик опоздал", collections=["laws"], n_results=1)
+
+    assert llm.call_count == 1
+    assert coll.query.call_count == 2
+
+
+def test_failed_rewrite_is_not_cached(coll, llm):
+    llm.side_effect = RuntimeError("deepseek timeout")
+
+    _context("просрочка оплаты")
+    _context("просрочка оплаты")
+
+    assert llm.call_count == 2
+    assert coll.query.call_count == 2
+
+
+def test_cache_can_be_disabled(coll, monkeypatch):
+    monkeypatch.setattr(settings, "rag_context_cache_ttl", 0)
+
+    _context("аренда")
+    _context("аренда")
+
+    assert coll.query.call_count == 2
+
+
+def test_collection_catalog_avoids_per_query_count(coll, monkeypatch):
+    for query in ("неустойка", "задаток", "аренда"):
+        _context(query)
+    assert admin_rag_retriever.has_legal_docs()
+    assert coll.count.call_count == 1
+    assert coll.query.call_count == 3
+
+    admin_rag_retriever.bump_kb_index_version()
+    assert admin_rag_retriever.collection_info("laws").count == 5
+    assert coll.count.call_count == 2
+
+    monkeypatch.setattr(settings, "rag_collection_catalog_ttl", 0)
+    admin_rag_retriever.collection_info("laws")
+    assert coll.count.call_count == 3
+
+
+def test_u2_collection_with_other_dimension_is_skipped(coll):
+    u2 = MagicMock()
+    u2.encode.return_value = [MagicMock(tolist=lambda: [0.1, 0.2, 0.3])]
+    u2_coll = MagicMock(dimension=768)
+    u2_coll.count.return_value = 10
+    admin_rag_retriever.get_chroma_client.return_value.get_or_create_collection.return_value = u2_coll
+
+    with patch.object(admin_rag_retriever, "get_u2_model", return_value=u2):
+        assert _context("неустойка") == ""
+
+    assert admin_rag_retriever.collection_info("laws", u2=True).dimension == 768
+    u2_coll.query.assert_not_called()
+
+
+def _blocking(event, value):
+    """Mock side effect that returns value only once event is set (or after 5 s)"""
+    def call(*args, **kwargs):
+        event.wait(5)
+        return value
+    return call
+
+
+def _track_rewrites(monkeypatch):
+    """Semaphore released each time a background _rewrite_query finishes (cache written)"""
+    finished = threading.Semaphore(0)
+    rewrite = admin_rag_retriever._rewrite_query
+
+    def tracked(query):
+        try:
+            return rewrite(query)
+        finally:
+            finished.release()
+
+    monkeypatch.setattr(admin_rag_retriever, "_rewrite_query", tracked)
+    return finished
+
+
+def test_rewrite_dense_and_lexical_retrieval_overlap(coll, llm):
+    # LLM, плотный query и FTS возвращаются, только когда все трое в полёте
+    barrier = threading.Barrier(3, timeout=5)
+
+    def meet(value):
+        def call(*args, **kwargs):
+            barrier.wait()
+            return value
+        return call
+
+    llm.side_effect = meet("неустойка\nГражданский кодекс")
+    coll.query.side_effect = meet(coll.query.return_value)
+
+    with patch.object(admin_rag_retriever, "_fts_search", side_effect=meet([])):
+        context = _context("поставщик сорвал срок")
+
+    assert not barrier.broken
+    assert "Статья 330" in context
+
+
+def test_slow_rewrite_is_dropped_after_deadline(coll, llm, monkeypatch):
+    monkeypatch.setattr(settings, "rag_rewrite_deadline", 0.1)
+    release = threading.Event()
+    llm.side_effect = _blocking(release, "неустойка\nГражданский кодекс")
+    rewrite_finished = _track_rewrites(monkeypatch)
+
+    context = _context("покупатель не платит")
+    assert "Статья 330" in context
+    # Поиск вернулся, не дождавшись рерайта
+    assert not rewrite_finished.acquire(blocking=False)
+
+    # Опоздавший рерайт досчитан в фоне и закеширован; контекст без него — нет
+    release.set()
+    assert rewrite_finished.acquire(timeout=5)
+    _context("покупатель не платит")
+    assert llm.call_count == 1
+    assert coll.query.call_count == 2
+
+
+class _U2Model:
+    """USER2 stand-in: records the batch size of every encode()"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(len(texts))
+        return np.ones((len(texts), 3))
+
+
+class _U2Collection:
+    """Chroma USER2 collection stand-in: one row of hits per query embedding"""
+
+    dimension = 3
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    def count(self):
+        return 30
+
+    def query(self, query_embeddings, n_results, include):
+        self.calls.append(len(query_embeddings))
+        rows = range(len(query_embeddings))
+        return {
+            "documents": [[f"{self.name} q{r} doc {i}" for i in range(n_results)] for r in rows],
+            "metadatas": [[{"title": f"{self.name} {r}-{i}", "category": ""} for i in range(n_results)] for r in rows],
+            "distances": [[0.1 + i / 100 for i in range(n_results)] for _ in rows],
+            "ids": [[f"{self.name}-{r}-{i}" for i in range(n_results)] for r in rows],
+        }
+
+
+@pytest.fixture
+def u2_store(coll):
+    model = _U2Model()
+    stores = {}
+
+    def get_or_create(name):
+        return stores.setdefault(name, _U2Collection(name))
+
+    admin_rag_retriever.get_chroma_client.return_value.get_or_create_collection.side_effect = get_or_create
+    with patch.object(admin_rag_retriever, "get_u2_model", return_value=model):
+        yield model, stores
+
+
+def test_rewrite_variants_share_one_encode_and_one_query_per_collection(u2_store, llm, monkeypatch):
+    model, stores = u2_store
+    admin_rag_retriever._rewrite_query("директор не выплатил зарплату")  # рерайт уже в кеше
+    # закешированный рерайт берётся синхронно — в пул ничего не уходит
+    monkeypatch.setattr(admin_rag_retriever, "_rewrite_query", lambda q: pytest.fail("rewrite submitted"))
+
+    admin_rag_retriever.get_legal_context("директор не выплатил зарплату",
+                                          collections=["laws", "case_law"], n_results=3)
+
+    assert model.calls == [3]
+    assert {name: store.calls for name, store in stores.items()} == {"laws_u2": [3], "case_law_u2": [3]}
+
+
+def test_pending_rewrite_variants_are_one_extra_encode_and_query_per_collection(u2_store, llm):
+    model, stores = u2_store
+    raw_encoded = threading.Event()
+    encode = model.encode
+
+    def encode_then_signal(texts, **kwargs):
+        embeddings = encode(texts, **kwargs)
+        raw_encoded.set()
+        return embeddings
+
+    def rewrite_after_raw_search(*args, **kwargs):
+        assert raw_encoded.wait(5)  # LLM-рерайт в полёте, пока идёт raw-поиск
+        return "неустойка, уменьшение неустойки\nГражданский кодекс"
+
+    model.encode = encode_then_signal
+    llm.side_effect = rewrite_after_raw_search
+
+    admin_rag_retriever.get_legal_context("работодатель задержал зарплату",
+                                          collections=["laws", "case_law"], n_results=3)
+
+    # raw: один encode и query на коллекцию; оба варианта рерайта — ещё по одному
+    assert model.calls == [1, 2]
+    assert {name: store.calls for name, store in stores.items()} == {"laws_u2": [1, 2], "case_law_u2": [1, 2]}
+
+
+def test_slow_fts_degrades_to_dense_only(coll, monkeypatch):
+    monkeypatch.setattr(settings, "rag_fts_deadline", 0.1)
+    release = threading.Event()
+    fts = MagicMock(side_effect=_blocking(release, []))
+
+    try:
+        with patch.object(admin_rag_retriever, "_fts_search", fts):
+            context = _context("неустойка по договору займа")
+            assert "Статья 330" in context
+            assert fts.call_count == 1  # FTS ещё висит — контекст собран без него
+
+            # Контекст без лексического канала не кешируется
+            _context("неустойка по договору займа")
+    finally:
+        release.set()
+    assert coll.query.call_count == 2
+
+
+def test_stuck_rewrites_do_not_hold_up_fts(coll, llm, monkeypatch):
+    monkeypatch.setattr(settings, "rag_rewrite_deadline", 0.05)
+    release = threading.Event()
+    llm.side_effect = _blocking(release, "неустойка")
+    rewrite_finished = _track_rewrites(monkeypatch)
+    fts_threads = []
+
+    def fts(query, k):
+        fts_threads.append(threading.current_thread().name)
+        return []
+
+    try:
+        with patch.object(admin_rag_retriever, "_fts_search", side_effect=fts):
+            for i in range(10):  # больше, чем потоков у пула рерайтов
+                _context(f"поставщик опоздал {i}")
+    finally:
+        release.set()
+
+    # Все потоки пула рерайтов заняты висящим LLM, а FTS каждый раз успел
+    assert len(fts_threads) == 10
+    assert all(name.startswith("admin-rag_") for name in fts_threads)
+
+    # Дождаться опоздавших рерайтов, пока LLM ещё замокан
+    for _ in range(10):
+        assert rewrite_finished.acquire(timeout=5)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis progress channel: ticks upsert one contract_progress row and never
+touch the contracts row (meta_info JSON).
+"""
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from src.models.database import Contract, ContractProgress
+from src.services.analysis_progress import (
+    get_progress, progress_query, resolve_progress, set_progress,
+)
+
+
+def _contract(db, meta=None):
+    contract = Contract(file_name="c.docx", file_path="/tmp/c.docx", document_type="contract",
+                        status="analyzing", meta_info=meta)
+    db.add(contract)
+    db.commit()
+    return contract
+
+
+def test_ticks_upsert_one_row_without_touching_contract(test_db):
+    contract_id = _contract(test_db, meta={"analysis_perspective": "buyer", "notes": "x" * 100_000}).id
+    statements = []
+    engine = test_db.get_bind()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        for pct in range(0, 100, 10):
+            set_progress(test_db, contract_id, pct, f"Этап {pct}")
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert get_progress(test_db, contract_id) == (90, "Этап 90")
+    assert test_db.query(ContractProgress).count() == 1
+    assert not any("contracts" in s for s in statements)
+    assert "_progress" not in test_db.get(Contract, contract_id).meta_info
+
+
+def test_uncommitted_tick_lands_with_caller_commit(test_db):
+    contract = _contract(test_db)
+    contract.status = "uploaded"
+
+    set_progress(test_db, contract.id, 0, "Анализ остановлен", commit=False)
+    test_db.rollback()
+    assert get_progress(test_db, contract.id) is None
+
+    set_progress(test_db, contract.id, 0, "Анализ остановлен", commit=False)
+    test_db.commit()
+    assert get_progress(test_db, contract.id) == (0, "Анализ остановлен")
+
+
+def test_resolve_falls_back_to_legacy_meta(test_db):
+    contract = _contract(test_db, meta={"_progress": 45, "_progress_msg": "Старый прогресс"})
+
+    recorded = test_db.execute(progress_query(contract.id)).first()
+    assert resolve_progress(recorded, contract.meta_info) == (45, "Старый прогресс")
+    assert resolve_progress(None, None) == (None, None)
+
+    set_progress(test_db, contract.id, 60, "Новый")
+    recorded = test_db.execute(progress_query(contract.id)).first()
+    assert resolve_progress(recorded, contract.meta_info) == (60, "Новый")
+
+
+def test_message_is_truncated_and_errors_are_swallowed(test_db):
+    contract = _contract(test_db)
+
+    set_progress(test_db, contract.id, 5, "м" * 2000)
+    assert len(get_progress(test_db, contract.id)[1]) == 500
+
+    set_progress(test_db, contract.id, "не число", "ошибка")  # логируется, не падает
+    assert get_progress(test_db, contract.id)[0] == 5
+
+
+def test_failed_tick_keeps_callers_pending_changes(test_db, monkeypatch):
+    contract = _contract(test_db)
+    contract.status = "uploaded"
+    execute = test_db.execute
+
+    def failing_upsert(statement, *args, **kwargs):
+        if "contract_progress" in str(statement):
+            raise OperationalError(str(statement), {}, Exception("database is locked"))
+        return execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(test_db, "execute", failing_upsert)
+    set_progress(test_db, contract.id, 0, "Анализ остановлен", commit=False)
+    set_progress(test_db, contract.id, "не число", "Анализ остановлен", commit=False)
+    monkeypatch.undo()
+    test_db.commit()
+
+    test_db.expire_all()
+    assert test_db.get(Contract, contract.id).status == "uploaded"
+    assert get_progress(test_db, contract.id) is None
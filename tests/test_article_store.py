@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Article store: SQLite build from article_texts/semantic_edges JSON, point
+lookups by (doc_id, article), JSON fallback and graph-hop wiring.
+"""
+import json
+import os
+
+import pytest
+
+from src.services import admin_rag_retriever
+from src.services.article_store import (
+    ArticleStore, JsonArticleStore, build_article_store, open_article_store,
+)
+
+TEXTS = {"5142": {"330": "Неустойкой признается ...", "333": "Если подлежащая уплате неустойка ..."}}
+EDGES = {"5142": {"330": ["331", "333"], "521": []}, "34683": {"81": ["77"]}}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    texts, edges = tmp_path / "article_texts.json", tmp_path / "semantic_edges.json"
+    texts.write_text(json.dumps(TEXTS, ensure_ascii=False), encoding="utf-8")
+    edges.write_text(json.dumps(EDGES, ensure_ascii=False), encoding="utf-8")
+    return str(tmp_path / "article_store.db"), str(texts), str(edges)
+
+
+@pytest.fixture
+def store(sources):
+    build_article_store(*sources)
+    return open_article_store(*sources)
+
+
+def test_build_reports_counts(sources):
+    assert build_article_store(*sources) == {"articles": 4, "texts": 2, "edges": 3}
+    assert not os.path.exists(sources[0] + ".tmp")
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "json"])
+def test_sqlite_and_json_stores_agree(sources, store, kind):
+    s = store if kind == "sqlite" else JsonArticleStore(*sources[1:])
+    assert isinstance(store, ArticleStore)
+
+    assert s.text("5142", "330").startswith("Неустойкой")
+    assert s.text("5142", "521") is None and s.text("1", "1") is None
+    assert s.related("5142", "330") == ["331", "333"]
+    assert s.related("5142", "333") == [] and s.related("1", "1") == []
+    assert s.has_doc("34683") and not s.has_doc("8982")
+    assert s.has_article("5142", "521")
+    assert not s.has_article("5142", "333")  # текст есть, узла в графе нет
+    assert bool(s)
+
+
+def test_falls_back_to_json_when_store_is_missing_or_stale(sources):
+    db, texts, edges = sources
+    assert isinstance(open_article_store(*sources), JsonArticleStore)
+
+    build_article_store(*sources)
+    stamp = os.stat(db).st_mtime_ns
+    os.utime(texts, ns=(stamp + 10**9, stamp + 10**9))
+    assert isinstance(open_article_store(*sources), JsonArticleStore)
+
+    assert not open_article_store(db, texts, str(os.path.dirname(db)) + "/missing.json")
+
+
+def _use_sources(monkeypatch, db, texts, edges):
+    monkeypatch.setattr(admin_rag_retriever, "_ARTICLE_STORE_PATH", db)
+    monkeypatch.setattr(admin_rag_retriever, "_ARTICLE_TEXTS_PATH", texts)
+    monkeypatch.setattr(admin_rag_retriever, "_SEMANTIC_EDGES_PATH", edges)
+    monkeypatch.setattr(admin_rag_retriever, "_article_store_obj", None)
+    monkeypatch.setattr(admin_rag_retriever, "_ARTICLE_STORE_CHECK_INTERVAL", 0.0)
+
+
+def test_graph_hop_lookups_use_store_and_reload_on_rebuild(sources, monkeypatch):
+    db, texts, edges = sources
+    build_article_store(*sources)
+    _use_sources(monkeypatch, *sources)
+
+    assert admin_rag_retriever._norm_text("5142", "333").startswith("Если")
+    first = admin_rag_retriever._article_store()
+    assert admin_rag_retriever._article_store() is first
+
+    with open(texts, "w", encoding="utf-8") as f:
+        json.dump({"5142": {"333": "новая редакция"}}, f, ensure_ascii=False)
+    build_article_store(*sources)
+    stamp = os.stat(db).st_mtime_ns + 10**9
+    os.utime(db, ns=(stamp, stamp))
+
+    assert admin_rag_retriever._norm_text("5142", "333") == "новая редакция"
+    assert admin_rag_retriever._article_store() is not first
+    # Поток, который ещё держит прежний store, дочитывает его без ошибок
+    assert first.text("5142", "333").startswith("Если")
+
+
+def test_json_fallback_reloads_when_sources_change(sources, monkeypatch):
+    db, texts, edges = sources
+    _use_sources(monkeypatch, *sources)
+
+    first = admin_rag_retriever._article_store()
+    assert isinstance(first, JsonArticleStore)
+    assert admin_rag_retriever._norm_text("5142", "333").startswith("Если")
+
+    with open(texts, "w", encoding="utf-8") as f:
+        json.dump({"5142": {"333": "новая редакция"}}, f, ensure_ascii=False)
+    stamp = os.stat(texts).st_mtime_ns + 10**9
+    os.utime(texts, ns=(stamp, stamp))
+
+    assert admin_rag_retriever._norm_text("5142", "333") == "новая редакция"
+    assert admin_rag_retriever._article_store() is not first
+
+
+def test_mtime_check_is_throttled(sources, monkeypatch):
+    build_article_store(*sources)
+    _use_sources(monkeypatch, *sources)
+    monkeypatch.setattr(admin_rag_retriever, "_ARTICLE_STORE_CHECK_INTERVAL", 60.0)
+    stats = []
+    stat = os.stat
+    monkeypatch.setattr(admin_rag_retriever.os, "stat",
+                        lambda path, *a, **kw: stats.append(path) or stat(path, *a, **kw))
+
+    admin_rag_retriever._norm_text("5142", "333")
+    assert len([path for path in stats if path in sources]) >= 3
+    stats.clear()
+
+    for _ in range(100):
+        admin_rag_retriever._norm_text("5142", "333")
+    assert not [path for path in stats if path in sources]
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for cache_service.py - in-memory LRU/TTL tier
+"""
+import time
+
+import pytest
+
+from src.services.cache_service import CacheService
+
+
+class TestMemoryLRU:
+    """LRU eviction, TTL and byte budget of the memory tier"""
+
+    def test_evicts_least_recently_used(self):
+        cache = CacheService(max_memory_items=3)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+
+        # Touch "a" so "b" becomes the least recently used
+        assert cache.get("a") == "a"
+        cache.set("d", "d")
+
+        assert cache.get("b") is None
+        assert [cache.get(k) for k in ("a", "c", "d")] == ["a", "c", "d"]
+        assert cache.get_stats()['memory_evictions'] == 1
+
+    def test_overwrite_does_not_evict(self):
+        cache = CacheService(max_memory_items=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("a", 3)
+
+        assert cache.get("a") == 3
+        assert cache.get("b") == 2
+        assert cache.get_stats()['memory_evictions'] == 0
+
+    def test_ttl_expiry(self):
+        cache = CacheService()
+        cache.set("short", "value", ttl=1)
+        assert cache.get("short") == "value"
+
+        time.sleep(1.05)
+
+        assert cache.get("short") is None
+        stats = cache.get_stats()
+        assert stats['memory_expirations'] == 1
+        assert stats['memory_items'] == 0
+
+    def test_byte_budget(self):
+        cache = CacheService(max_memory_items=100, max_memory_bytes=2000)
+        for i in range(5):
+            cache.set(f"k{i}", "x" * 500)
+
+        stats = cache.get_stats()
+        assert stats['memory_bytes'] <= 2000
+        assert stats['memory_items'] < 5
+        assert cache.get("k4") == "x" * 500
+        assert cache.get("k0") is None
+
+    def test_value_larger_than_budget_is_not_kept(self):
+        cache = CacheService(max_memory_bytes=1000)
+        cache.set("small", "ok")
+        cache.set("huge", {"text": "x" * 5000})
+
+        assert cache.get("huge") is None
+        assert cache.get("small") == "ok"
+
+    def test_delete_and_pattern_keep_byte_accounting(self):
+        cache = CacheService(max_memory_bytes=10_000)
+        cache.set("contract:1:a", "a" * 100)
+        cache.set("contract:1:b", "b" * 100)
+        cache.set("contract:2:a", "c" * 100)
+
+        assert cache.delete("contract:2:a")
+        assert cache.delete_pattern("contract:1:*") == 2
+        assert cache.get_stats()['memory_bytes'] == 0
+
+    def test_hit_miss_counters(self):
+        cache = CacheService()
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.get_stats()
+        assert stats['memory_hits'] == 2
+        assert stats['memory_misses'] == 1
+        assert stats['memory_hit_rate'] == pytest.approx(200 / 3)
+
+
+def test_full_memory_tier_evicts_one_key_per_insert():
+    """Every set into a full memory tier evicts exactly the oldest key"""
+    n = 200
+    cache = CacheService(max_memory_items=n)
+    payload = {"risk": "high", "score": 0.9}
+
+    for i in range(2 * n):
+        cache.set(f"key:{i}", payload)
+    for i in range(n, 2 * n):
+        assert cache.get(f"key:{i}") == payload
+
+    stats = cache.get_stats()
+    assert stats['memory_items'] == n
+    assert stats['memory_evictions'] == n
+    assert stats['memory_hits'] == n
+    assert cache.get("key:0") is None
+
+
+class TestRedisTier:
+    """Batched Redis operations (fakeredis)"""
+
+    @pytest.fixture
+    def redis_client(self, monkeypatch):
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.FakeRedis()
+        # Every read must go through a single pipelined round-trip
+        for name in ("get", "ttl", "mget", "keys"):
+            monkeypatch.setattr(client, name, lambda *a, _name=name, **kw: pytest.fail(f"direct {_name}() call"))
+        return client
+
+    def test_get_fetches_value_and_ttl_in_one_round_trip(self, redis_client):
+        writer = CacheService(redis_client=redis_client)
+        writer.set("fns:1", {"inn": "7707083893"}, ttl=120)
+
+        reader = CacheService(redis_client=redis_client)
+        assert reader.get("fns:1") == {"inn": "7707083893"}
+        # Promoted to memory with the remaining Redis TTL
+        _, _, expires_at = reader._memory_cache["fns:1"]
+        assert 100 < expires_at - time.time() <= 120
+
+    def test_get_many_and_set_many(self, redis_client):
+        writer = CacheService(redis_client=redis_client)
+        assert writer.set_many({f"k{i}": i for i in range(50)}, ttl=60)
+
+        reader = CacheService(redis_client=redis_client)
+        reader.set("local", "memory")
+        calls = []
+        original = redis_client.pipeline
+        redis_client.pipeline = lambda *a, **kw: calls.append(1) or original(*a, **kw)
+
+        found = reader.get_many(["local", "missing"] + [f"k{i}" for i in range(50)])
+
+        assert len(calls) == 1
+        assert found["local"] == "memory"
+        assert "missing" not in found
+        assert [found[f"k{i}"] for i in range(50)] == list(range(50))
+
+    def test_delete_pattern_uses_scan(self, redis_client):
+        cache = CacheService(redis_client=redis_client)
+        cache.set_many({f"contract:1:{i}": i for i in range(1200)})
+        cache.set("contract:2:0", 0)
+
+        cache.delete_pattern("contract:1:*")
+
+        fresh = CacheService(redis_client=redis_client)
+        assert fresh.get_many([f"contract:1:{i}" for i in range(1200)]) == {}
+        assert fresh.get("contract:2:0") == 0
+
+    @pytest.mark.parametrize("serializer", ["json", "orjson", "msgpack"])
+    def test_serializers_round_trip(self, redis_client, serializer):
+        if serializer != "json":
+            pytest.importorskip(serializer)
+        value = {"title": "Договор поставки", "risks": [1, 2.5, None, True], "nested": {"a": "б"}}
+
+        CacheService(redis_client=redis_client, serializer=serializer).set("v", value)
+
+        assert CacheService(redis_client=redis_client, serializer=serializer).get("v") == value
+
+    def test_value_from_other_codec_is_a_miss(self, redis_client):
+        pytest.importorskip("msgpack")
+        CacheService(redis_client=redis_client, serializer="msgpack").set("v", {"a": 1})
+
+        assert CacheService(redis_client=redis_client, serializer="json").get("v") is None
+
+    def test_serializer_defaults_to_settings(self, redis_client, monkeypatch):
+        pytest.importorskip("msgpack")
+        from config.settings import settings
+        monkeypatch.setattr(settings, "cache_serializer", "msgpack")
+
+        assert CacheService(redis_client=redis_client).serializer == "msgpack"
+        assert CacheService(redis_client=redis_client, serializer="json").serializer == "json"
+
+    def test_set_many_skips_unserializable_entry(self, redis_client):
+        cache = CacheService(redis_client=redis_client)
+
+        assert cache.set_many({"ok:1": 1, "bad": object(), "ok:2": 2}, ttl=60)
+
+        fresh = CacheService(redis_client=redis_client)
+        assert fresh.get_many(["ok:1", "bad", "ok:2"]) == {"ok:1": 1, "ok:2": 2}
+
+    def test_cached_decorator_many(self, redis_client):
+        cache = CacheService(redis_client=redis_client)
+        calls = []
+
+        @cache.cached(ttl=60, key_prefix="fns")
+        def company(inn):
+            calls.append(inn)
+            return {"inn": inn}
+
+        assert company("1") == {"inn": "1"}
+        results = company.many([("1",), ("2",), ("3",), ("2",)])
+
+        assert results == [{"inn": "1"}, {"inn": "2"}, {"inn": "3"}, {"inn": "2"}]
+        assert calls == ["1", "2", "3"]
+        # Batched writes are visible to other workers
+        assert CacheService(redis_client=redis_client).get_many(
+            [k for k in cache._memory_cache if k.startswith("fns:")]
+        ).keys() == cache._memory_cache.keys()
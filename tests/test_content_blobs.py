@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed blobs: parsed XML / extracted text live in content_blobs
+keyed by SHA-256, identical uploads share one row, and loading a Contract
+reads only its small columns.
+"""
+import hashlib
+
+import pytest
+from sqlalchemy import event, exists, select
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from src.models.database import ContentBlob, Contract
+
+XML = "<contract><clauses><clause>" + "Поставщик обязуется поставить товар. " * 5000 + "</clause></clauses></contract>"
+
+
+def _contract(db, name="c.docx"):
+    contract = Contract(file_name=name, file_path=f"/tmp/{name}", document_type="contract", status="uploaded")
+    db.add(contract)
+    db.flush()
+    return contract
+
+
+def test_identical_uploads_share_one_blob(test_db):
+    first, second = _contract(test_db, "a.docx"), _contract(test_db, "b.docx")
+
+    first.parsed_xml = XML
+    second.parsed_xml = XML
+    first.parsed_text = "Текст договора"
+    test_db.commit()
+
+    assert first.xml_sha256 == second.xml_sha256 == hashlib.sha256(XML.encode("utf-8")).hexdigest()
+    assert test_db.query(ContentBlob).count() == 2
+    assert test_db.get(ContentBlob, first.xml_sha256).size == len(XML.encode("utf-8"))
+    assert second.parsed_xml == XML and second.parsed_text is None
+
+
+def test_loading_contract_reads_blob_only_on_access(test_db):
+    contract = _contract(test_db)
+    contract.parsed_xml = XML
+    test_db.commit()
+    contract_id = contract.id
+    test_db.expunge_all()
+
+    statements = []
+    engine = test_db.get_bind()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        loaded = test_db.get(Contract, contract_id)
+        assert not any("content_blobs" in s for s in statements)
+        assert loaded.parsed_xml == XML
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert any("content_blobs" in s for s in statements)
+
+
+def test_text_search_through_blobs(test_db):
+    with_text, without = _contract(test_db, "a.docx"), _contract(test_db, "b.docx")
+    with_text.parsed_text = "Договор аренды нежилого помещения"
+    without.parsed_xml = "<contract>Договор аренды</contract>"  # XML в поиске не участвует
+    test_db.commit()
+
+    stmt = select(Contract.id).where(exists(select(1).where(
+        ContentBlob.sha256 == Contract.text_sha256,
+        ContentBlob.content.ilike("%аренды%"),
+    )))
+
+    assert test_db.execute(stmt).scalars().all() == [with_text.id]
+
+
+def test_clearing_and_detached_access(test_db):
+    contract = _contract(test_db)
+    contract.parsed_text = "Текст"
+    contract.parsed_text = None
+    test_db.commit()
+    assert contract.text_sha256 is None and contract.parsed_text is None
+
+    contract.parsed_text = "Текст"
+    test_db.commit()
+    test_db.expunge(contract)
+    with pytest.raises(DetachedInstanceError):
+        contract.parsed_text
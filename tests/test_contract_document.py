@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+ContractDocument: parse-once model shared by the analysis pipeline stages.
+"""
+import copy
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import src.services.contract_document as contract_document_module
+from src.services.clause_extractor import ClauseExtractor
+from src.services.contract_document import ContractDocument
+from src.services.metadata_analyzer import MetadataAnalyzer
+from src.utils.contract_types import infer_contract_type_from_xml
+
+
+def _contract_xml(clause_count: int = 6, paragraphs_per_clause: int = 3) -> str:
+    clauses = []
+    for i in range(1, clause_count + 1):
+        paragraphs = "".join(
+            f"<paragraph>{i}.{j}. Поставщик обязуется передать товар в срок ___ дней, "
+            f"а Покупатель оплатить его стоимость в размере [указать сумму] рублей.</paragraph>"
+            for j in range(1, paragraphs_per_clause + 1)
+        )
+        title = "ДОГОВОР ПОСТАВКИ № 15" if i == 1 else f"{i}. Раздел {i}"
+        clauses.append(f'<clause id="{i}"><title>{title}</title><content>{paragraphs}</content></clause>')
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><contract>'
+        '<metadata><title>Договор поставки</title></metadata>'
+        '<parties><party role="supplier"><name>ООО Поставщик</name><inn>7701234567</inn></party>'
+        '<party role="buyer"><name>ООО Покупатель</name><inn>7707654321</inn></party></parties>'
+        f'<clauses>{"".join(clauses)}</clauses></contract>'
+    )
+
+
+GENERIC_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<contract>
+    <subject>Поставка оборудования и комплектующих</subject>
+    <payment_terms><days>90 календарных дней с момента поставки</days></payment_terms>
+    <liability><penalty>0.01% за каждый день просрочки</penalty></liability>
+</contract>
+"""
+
+
+class _TemplateManager:
+    def get_template(self, contract_type):
+        return SimpleNamespace(
+            name="Поставка",
+            version="1",
+            xml_content="<contract><parties/><clauses/><price/></contract>",
+        )
+
+
+@pytest.mark.parametrize("xml", [_contract_xml(), GENERIC_XML])
+def test_views_match_string_based_extraction(xml):
+    document = ContractDocument(xml)
+
+    assert ClauseExtractor.extract_clauses(document) == ClauseExtractor.extract_clauses(xml)
+    assert ClauseExtractor.extract_clauses(document, max_clauses=2) == ClauseExtractor.extract_clauses(xml, max_clauses=2)
+    assert ClauseExtractor.extract_structure(document) == ClauseExtractor.extract_structure(xml)
+    assert infer_contract_type_from_xml(document) == infer_contract_type_from_xml(xml)
+
+    analyzer = MetadataAnalyzer(llm_gateway=None, template_manager=_TemplateManager())
+    by_document = analyzer.compare_with_templates(document, "supply")
+    by_string = analyzer.compare_with_templates(xml, "supply")
+    assert sorted(by_document.pop('missing_sections')) == sorted(by_string.pop('missing_sections'))
+    assert sorted(by_document.pop('extra_sections')) == sorted(by_string.pop('extra_sections'))
+    assert by_document == by_string
+
+
+def test_parties_and_xpath_index():
+    document = ContractDocument(_contract_xml())
+
+    assert document.parties == [
+        {'name': 'ООО Поставщик', 'role': 'supplier', 'inn': '7701234567'},
+        {'name': 'ООО Покупатель', 'role': 'buyer', 'inn': '7707654321'},
+    ]
+    assert document.xpath_index['/clauses/clause[2]']['title'] == '2. Раздел 2'
+    assert document.plain_text.startswith('ДОГОВОР ПОСТАВКИ № 15\n1.1.')
+
+
+def test_xml_is_parsed_once_across_stages(monkeypatch):
+    calls = []
+    original = contract_document_module.parse_xml_safely
+
+    def _counting_parse(xml):
+        calls.append(xml)
+        return original(xml)
+
+    monkeypatch.setattr(contract_document_module, "parse_xml_safely", _counting_parse)
+    document = ContractDocument(_contract_xml())
+
+    ClauseExtractor.extract_structure(document)
+    ClauseExtractor.extract_clauses(document)
+    ClauseExtractor.extract_clauses(document)
+    infer_contract_type_from_xml(document)
+    MetadataAnalyzer(llm_gateway=None, template_manager=_TemplateManager()).compare_with_templates(document, "supply")
+    _ = document.plain_text, document.parties, document.xpath_index
+
+    assert len(calls) == 1
+    assert ContractDocument.coerce(document) is document
+
+
+def test_parse_error_is_cached_and_views_degrade_like_strings():
+    document = ContractDocument("<contract><broken></contract>")
+
+    with pytest.raises(Exception):
+        _ = document.root
+    assert ClauseExtractor.extract_clauses(document) == []
+    assert ClauseExtractor.extract_structure(document) == {}
+
+
+def test_shared_views_are_read_only():
+    document = ContractDocument(_contract_xml())
+    clause = ClauseExtractor.extract_clauses(document)[0]
+
+    with pytest.raises(TypeError):
+        clause['text'] = 'изменено этапом'
+    with pytest.raises(TypeError):
+        document.structure['parties'].append({'name': 'лишняя сторона'})
+    with pytest.raises(TypeError):
+        document.parties[0].update(name='')
+
+    # Без копий на каждом обращении; свою изменяемую копию этап берёт сам
+    assert document.clauses is document.clauses
+    assert document.xpath_index[clause['xpath']] is clause
+    own = copy.deepcopy(document.structure)
+    own['parties'].append({'name': 'лишняя сторона'})
+    assert ClauseExtractor.extract_structure(document) == ClauseExtractor.extract_structure(_contract_xml())
+    assert json.loads(json.dumps(document.structure)) == ClauseExtractor.extract_structure(_contract_xml())
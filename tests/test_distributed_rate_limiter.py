@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for distributed_rate_limiter.py - shared budget across processes (fakeredis)
+"""
+import asyncio
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.utils.distributed_rate_limiter import RedisRateLimiter
+from src.utils.rate_limiter import RateLimitExceeded
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def _limiter(server, **kwargs):
+    """Отдельный клиент на каждый лимитер - как у разных воркеров"""
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    return RedisRateLimiter(client, key_prefix="ratelimit:test:", **kwargs)
+
+
+class TestSharedBudget:
+    """Limits are shared between limiter instances (workers)"""
+
+    def test_request_limit_shared_between_workers(self, server):
+        worker_a = _limiter(server, requests_per_minute=3)
+        worker_b = _limiter(server, requests_per_minute=3)
+
+        for limiter in (worker_a, worker_b, worker_a):
+            with limiter.acquire():
+                pass
+
+        with pytest.raises(RateLimitExceeded, match="Request rate limit exceeded"):
+            with worker_b.acquire():
+                pass
+
+    def test_token_and_cost_limits(self, server):
+        limiter = _limiter(server, requests_per_minute=100, tokens_per_minute=1000, cost_per_day=1.0)
+
+        with limiter.acquire(tokens=900, cost=0.5):
+            pass
+
+        with pytest.raises(RateLimitExceeded, match="Token rate limit exceeded"):
+            with limiter.acquire(tokens=200):
+                pass
+
+        with pytest.raises(RateLimitExceeded, match="Daily cost limit exceeded"):
+            with limiter.acquire(tokens=10, cost=0.6):
+                pass
+
+        # Rejected calls do not consume budget
+        stats = _limiter(server, requests_per_minute=100, tokens_per_minute=1000, cost_per_day=1.0).get_stats()
+        assert stats['backend'] == 'redis'
+        assert stats['current_rpm'] == 1
+        assert stats['current_tpm'] == 900
+        assert stats['current_daily_cost'] == pytest.approx(0.5)
+
+    def test_tenant_sub_bucket(self, server):
+        limiter = _limiter(server, requests_per_minute=100, tenant_requests_per_minute=1)
+
+        with limiter.acquire(tenant="org-a"):
+            pass
+
+        with pytest.raises(RateLimitExceeded, match="Tenant request rate limit exceeded for org-a"):
+            with _limiter(server, requests_per_minute=100, tenant_requests_per_minute=1).acquire(tenant="org-a"):
+                pass
+
+        with limiter.acquire(tenant="org-b"):
+            pass
+
+    def test_window_expires(self, server, monkeypatch):
+        limiter = _limiter(server, requests_per_minute=1)
+        with limiter.acquire():
+            pass
+
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 62)
+        with limiter.acquire():
+            pass
+
+    def test_reset_stats_clears_redis_windows(self, server):
+        limiter = _limiter(server, requests_per_minute=1)
+        with limiter.acquire():
+            pass
+
+        limiter.reset_stats()
+
+        with limiter.acquire():
+            pass
+
+
+class TestBlockingMode:
+    def test_async_waits_for_budget_freed_by_other_worker(self, server):
+        worker_a = _limiter(server, requests_per_minute=1)
+        worker_b = _limiter(server, requests_per_minute=1, blocking=True, max_wait=5)
+
+        with worker_a.acquire():
+            pass
+
+        async def run():
+            async def free_budget():
+                await asyncio.sleep(0.2)
+                worker_a.reset_stats()
+
+            asyncio.get_running_loop().create_task(free_budget())
+            started = time.monotonic()
+            async with worker_b.acquire():
+                return time.monotonic() - started
+
+        waited = asyncio.run(run())
+        assert 0.15 <= waited < 2.0
+        assert worker_b.get_stats()['total_queued'] == 1
+
+    def test_timeout(self, server):
+        worker_a = _limiter(server, requests_per_minute=1)
+        worker_b = _limiter(server, requests_per_minute=1, blocking=True)
+
+        with worker_a.acquire():
+            pass
+
+        with pytest.raises(RateLimitExceeded, match="timed out"):
+            with worker_b.acquire(timeout=0.1):
+                pass
+
+    def test_event_loop_stays_responsive_while_redis_is_slow(self, server):
+        limiter = _limiter(server, requests_per_minute=100, tenant_requests_per_minute=1, blocking=True)
+        with limiter.acquire(tenant="org-a"):
+            pass
+
+        reserve = limiter._redis_reserve
+
+        def slow_reserve(*args):
+            time.sleep(0.05)
+            return reserve(*args)
+
+        limiter._redis_reserve = slow_reserve
+
+        async def run():
+            gaps = []
+
+            async def ticker():
+                last = time.monotonic()
+                while True:
+                    await asyncio.sleep(0.01)
+                    now = time.monotonic()
+                    gaps.append(now - last)
+                    last = now
+
+            async def waiter():
+                with pytest.raises(RateLimitExceeded, match="timed out"):
+                    async with limiter.acquire(tenant="org-a", timeout=0.5):
+                        pass
+
+            tick = asyncio.get_running_loop().create_task(ticker())
+            # Every dispatch reserves for each tenant-limited waiter: 8 slow EVALs per poll
+            await asyncio.gather(*(waiter() for _ in range(8)))
+            tick.cancel()
+            return max(gaps)
+
+        assert asyncio.run(run()) < 0.2
+
+
+class TestRedisFallback:
+    def test_falls_back_to_in_process_limits(self, server):
+        limiter = _limiter(server, requests_per_minute=2)
+        server.connected = False
+
+        for _ in range(2):
+            with limiter.acquire():
+                pass
+
+        with pytest.raises(RateLimitExceeded, match="Request rate limit exceeded"):
+            with limiter.acquire():
+                pass
+
+        assert limiter.get_stats()['backend'] == 'memory (redis unavailable)'
+
+    def test_async_acquire_runs_redis_call_off_the_event_loop(self, server):
+        import threading
+
+        limiter = _limiter(server, requests_per_minute=5)
+        threads = []
+        reserve = limiter._redis_reserve
+
+        def spy(*args):
+            threads.append(threading.current_thread())
+            return reserve(*args)
+
+        limiter._redis_reserve = spy
+
+        async def run():
+            async with limiter.acquire():
+                pass
+            return threading.current_thread()
+
+        loop_thread = asyncio.run(run())
+        assert threads and threads[0] is not loop_thread
+
+    def test_stalled_redis_times_out_to_in_process_limits(self, server, monkeypatch):
+        import redis
+        from src.utils import distributed_rate_limiter
+
+        captured = {}
+
+        def from_url(url, **kwargs):
+            captured.update(kwargs)
+            return fakeredis.FakeRedis(server=server, decode_responses=True)
+
+        monkeypatch.setattr(redis.Redis, "from_url", staticmethod(from_url))
+        monkeypatch.setattr("src.services.redis_runtime.ensure_local_redis", lambda: False)
+        client = distributed_rate_limiter.connect_rate_limit_redis()
+        assert 0 < captured["socket_timeout"] <= 1
+
+        limiter = RedisRateLimiter(client, key_prefix="ratelimit:test:", requests_per_minute=1)
+
+        def stalled(**kwargs):
+            raise redis.exceptions.TimeoutError("Timeout reading from socket")
+
+        limiter._script = stalled
+        with limiter.acquire():
+            pass
+        with pytest.raises(RateLimitExceeded, match="Request rate limit exceeded"):
+            with limiter.acquire():
+                pass
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+EnhancedRAGSystem.search: one query embedding, concurrent collection
+queries and heap-merged rerank pool (stub model and collections).
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.services.enhanced_rag import DocumentChunker, EnhancedRAGSystem
+
+QUERY_DELAY = 0.2
+
+
+class _Model:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return np.ones((len(texts), 4))
+
+
+class _Collection:
+    """Chroma collection stand-in returning distances 0.0, 0.1, ...; tracks peak concurrency"""
+
+    _global_lock = threading.Lock()
+    _active = 0
+    peak = 0
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def query(self, n_results, query_embeddings=None, query_texts=None):
+        with self._lock:
+            self.queries.append({"embeddings": query_embeddings, "texts": query_texts})
+        _Collection.active_total(+1)
+        time.sleep(QUERY_DELAY)
+        _Collection.active_total(-1)
+        return {
+            "documents": [[f"{self.name} doc {i}" for i in range(n_results)]],
+            "metadatas": [[{"id": f"{self.name}-{i}"} for i in range(n_results)]],
+            "distances": [[i / 10 for i in range(n_results)]],
+        }
+
+    @classmethod
+    def active_total(cls, delta):
+        with cls._global_lock:
+            cls._active += delta
+            cls.peak = max(cls.peak, cls._active)
+
+
+class _Reranker:
+    def __init__(self):
+        self.pairs = []
+
+    def predict(self, pairs):
+        self.pairs.append(len(pairs))
+        return [float(len(content)) for _, content in pairs]
+
+
+@pytest.fixture
+def rag():
+    system = EnhancedRAGSystem.__new__(EnhancedRAGSystem)
+    system.embedding_model = _Model()
+    system.reranker = None
+    system.contracts_collection = _Collection("contracts")
+    system.kb_collection = _Collection("kb")
+    system.legal_collection = _Collection("legal")
+    system.company_kb = {}
+    system.synonyms = {}
+    system.chunker = DocumentChunker()
+    system._initialize_cache()
+    _Collection.peak = 0
+    return system
+
+
+def test_query_embedded_once_and_collections_queried_concurrently(rag):
+    results = rag.search("неустойка", top_k=5, search_legal=True, use_reranking=False)
+
+    assert rag.embedding_model.calls == 1
+    for collection in (rag.contracts_collection, rag.kb_collection, rag.legal_collection):
+        assert collection.queries == [{"embeddings": [[1.0, 1.0, 1.0, 1.0]], "texts": None}]
+    assert _Collection.peak == 3
+
+    # Heap merge keeps the global order, KB boost included
+    assert len(results) == 5
+    assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+    assert results[0].source == "kb" and results[0].score == pytest.approx(1.2)
+
+
+def test_reranker_sees_only_the_candidate_pool(rag):
+    rag.reranker = _Reranker()
+
+    results = rag.search("штраф", top_k=4, search_legal=True, rerank_pool=6)
+
+    # 3 collections x 4 hits = 12 candidates, only the best 6 are reranked
+    assert rag.reranker.pairs == [6]
+    assert len(results) == 4
+
+
+def test_falls_back_to_query_texts_without_embedding_model(rag):
+    rag.embedding_model = None
+
+    rag.search("срок", top_k=2, search_kb=False, use_reranking=False)
+
+    assert rag.contracts_collection.queries == [{"embeddings": None, "texts": ["срок"]}]
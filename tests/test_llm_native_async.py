@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Native async LLMGateway.acall/stream over the shared pooled HTTP clients.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from config.settings import settings
+from src.services.llm_gateway import LLMGateway
+from src.services.llm_http_pool import LLMHttpPool, get_llm_http_pool, run_with_llm_clients
+
+
+class _FakeCompletions:
+    """AsyncOpenAI.chat.completions stand-in that records peak concurrency."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+
+    async def create(self, model, messages, temperature, max_tokens, stream=False, **kwargs):
+        self.calls.append(messages[-1]["content"])
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        content = f"answer to {messages[-1]['content']}"
+        if stream:
+            return self._stream(content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+        )
+
+    async def _stream(self, content):
+        for word in content.split(" "):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+
+
+def _register(provider, client):
+    """Put a client into the pool of the running loop before the gateway creates a real one."""
+    return get_llm_http_pool().get(provider, lambda: client)
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    monkeypatch.setattr(settings, "llm_native_async", True)
+    gw = LLMGateway(provider="deepseek", model="deepseek-chat")
+    gw.use_rate_limiter = False
+    gw.memory_cache = None
+
+    def _sync_call(*args, **kwargs):
+        raise AssertionError("sync provider call must not be used")
+
+    monkeypatch.setattr(gw, "_make_api_call", _sync_call)
+    return gw
+
+
+def test_hundreds_of_concurrent_calls_without_thread_pool(gateway):
+    completions = _FakeCompletions(delay=0.3)
+
+    async def _run():
+        _register("deepseek", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return await asyncio.gather(*(gateway.acall(f"clause batch {i}") for i in range(256)))
+
+    results = asyncio.run(_run())
+
+    assert results[7] == "answer to clause batch 7"
+    assert len(completions.calls) == 256
+    # A 32-thread pool would need 8 rounds x 0.3 s
+    assert completions.peak == 256
+    assert gateway.get_token_stats()["input_tokens"] == 256 * 10
+
+
+def test_db_session_falls_back_to_thread_pool(gateway, monkeypatch, test_db):
+    monkeypatch.setattr(gateway, "_make_api_call", lambda *args, **kwargs: "from thread")
+
+    async def _native(*args, **kwargs):
+        raise AssertionError("native path must not be used with a sync db_session")
+
+    monkeypatch.setattr(gateway, "_amake_api_call", _native)
+    assert asyncio.run(gateway.acall("hello", db_session=test_db)) == "from thread"
+
+
+def test_qwen_rest_request(monkeypatch):
+    monkeypatch.setattr(settings, "llm_native_async", True)
+    requests = []
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"output": {"choices": [{"message": {"content": "qwen says hi"}}]}})
+
+    gw = LLMGateway.__new__(LLMGateway)
+    gw.provider, gw.model, gw._client = "qwen", None, None
+    gw.use_rate_limiter, gw.memory_cache = False, None
+
+    async def _run():
+        _register("qwen", httpx.AsyncClient(transport=httpx.MockTransport(_handler)))
+        return await gw.acall("hi", system_prompt="be brief", temperature=0.1, max_tokens=50)
+
+    assert asyncio.run(_run()) == "qwen says hi"
+    assert requests[0]["input"]["messages"][0] == {"role": "system", "content": "be brief"}
+    assert requests[0]["parameters"] == {"temperature": 0.1, "max_tokens": 50, "result_format": "message"}
+
+
+def test_yandex_rest_request(monkeypatch):
+    monkeypatch.setattr(settings, "llm_native_async", True)
+    monkeypatch.setattr(settings, "yandex_folder_id", "folder")
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        assert body["modelUri"] == "gpt://folder/yandexgpt/latest"
+        assert body["messages"] == [{"role": "user", "text": "hi"}]
+        return httpx.Response(200, json={"result": {"alternatives": [{"message": {"text": "привет"}}]}})
+
+    gw = LLMGateway.__new__(LLMGateway)
+    gw.provider, gw.model, gw._client = "yandex", None, None
+    gw.use_rate_limiter, gw.memory_cache = False, None
+
+    async def _run():
+        _register("yandex", httpx.AsyncClient(transport=httpx.MockTransport(_handler)))
+        return await gw.acall("hi")
+
+    assert asyncio.run(_run()) == "привет"
+
+
+def test_stream_uses_async_client(gateway):
+    completions = _FakeCompletions()
+
+    async def _run():
+        _register("deepseek", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return [chunk async for chunk in gateway.stream("ping")]
+
+    assert "".join(asyncio.run(_run())).strip() == "answer to ping"
+
+
+class TestLLMHttpPool:
+    def test_clients_are_shared_per_loop_and_closed(self):
+        pool = LLMHttpPool()
+        created = []
+
+        def _factory():
+            client = httpx.AsyncClient(limits=pool.limits("deepseek"))
+            created.append(client)
+            return client
+
+        async def _run():
+            first = pool.get("deepseek", _factory)
+            assert pool.get("deepseek", _factory) is first
+            assert pool.size() == 1
+            await pool.aclose()
+            assert pool.size() == 0
+
+        asyncio.run(_run())
+        asyncio.run(_run())  # a new event loop gets its own client
+        assert len(created) == 2
+        assert all(client.is_closed for client in created)
+
+    def test_short_lived_loop_closes_its_clients(self):
+        client = httpx.AsyncClient()
+
+        async def _analysis():
+            assert get_llm_http_pool().get("deepseek", lambda: client) is client
+            return "done"
+
+        assert run_with_llm_clients(_analysis()) == "done"
+        assert client.is_closed
+
+    def test_per_provider_limits(self, monkeypatch):
+        monkeypatch.setattr(settings, "llm_http_max_connections", 300)
+        monkeypatch.setattr(settings, "llm_http_max_keepalive_connections", 50)
+        monkeypatch.setattr(settings, "llm_http_provider_max_connections", {"ollama": 4})
+
+        assert LLMHttpPool.limits("deepseek").max_connections == 300
+        assert LLMHttpPool.limits("deepseek").max_keepalive_connections == 50
+        assert LLMHttpPool.limits("ollama").max_connections == 4
+        assert LLMHttpPool.limits("ollama").max_keepalive_connections == 4
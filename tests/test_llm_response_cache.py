@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory LLM response cache (tier 1) in front of the llm_cache table (tier 2).
+"""
+import time
+
+import pytest
+
+from src.models.database import LLMCache
+from src.services.llm_gateway import LLMGateway
+from src.services.llm_response_cache import LLMResponseCache
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gw = LLMGateway(provider="deepseek", model="deepseek-chat")
+    gw.use_rate_limiter = False
+    gw.memory_cache = LLMResponseCache(max_entries=16, hit_flush_interval=3600)
+    gw.api_calls = []
+
+    def _fake_api_call(prompt, system_prompt, temperature, max_tokens, **kwargs):
+        gw.api_calls.append(prompt)
+        if prompt.startswith("json"):
+            return '```json\n{"answer": 42}\n```'
+        if prompt.startswith("broken"):
+            return "not json at all"
+        return f"response to {prompt}"
+
+    monkeypatch.setattr(gw, "_make_api_call", _fake_api_call)
+    return gw
+
+
+class TestLLMResponseCache:
+    def test_lru_eviction_by_entries(self):
+        cache = LLMResponseCache(max_entries=2, hit_flush_interval=3600)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        assert cache.get("a") == "1"  # a becomes most recent
+        cache.put("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_eviction_by_bytes(self):
+        cache = LLMResponseCache(max_entries=100, max_bytes=3000, hit_flush_interval=3600)
+        for key in "abcd":
+            cache.put(key, key * 1000)
+
+        stats = cache.get_stats()
+        assert stats["bytes"] <= 3000
+        assert cache.get("a") is None
+        assert cache.get("d") == "d" * 1000
+
+    def test_oversized_response_not_cached(self):
+        cache = LLMResponseCache(max_bytes=100, hit_flush_interval=3600)
+        cache.put("big", "x" * 1000)
+        assert cache.get("big") is None
+
+    def test_ttl_expiry(self):
+        cache = LLMResponseCache(ttl_seconds=0.05, hit_flush_interval=3600)
+        cache.put("a", "1")
+        assert cache.get("a") == "1"
+        time.sleep(0.06)
+        assert cache.get("a") is None
+
+
+class TestGatewayMemoryTier:
+    def test_repeated_prompt_skips_provider_without_session(self, gateway):
+        assert gateway.call("hello", temperature=0.0) == "response to hello"
+        assert gateway.call("hello", temperature=0.0) == "response to hello"
+        assert gateway.api_calls == ["hello"]
+
+    def test_cache_key_includes_parameters(self, gateway):
+        gateway.call("hello", temperature=0.0)
+        gateway.call("hello", temperature=0.5)
+        gateway.call("hello", temperature=0.0, system_prompt="sys")
+        assert len(gateway.api_calls) == 3
+
+    def test_use_cache_false_bypasses_memory(self, gateway):
+        gateway.call("hello", use_cache=False)
+        gateway.call("hello", use_cache=False)
+        assert len(gateway.api_calls) == 2
+
+    def test_json_responses_are_cached_parsed(self, gateway):
+        first = gateway.call("json please", response_format="json")
+        first["answer"] = "mutated by caller"
+        second = gateway.call("json please", response_format="json")
+
+        assert second == {"answer": 42}
+        assert len(gateway.api_calls) == 1
+
+    def test_invalid_json_is_not_cached(self, gateway):
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                gateway.call("broken", response_format="json", retry_attempts=1)
+        assert len(gateway.api_calls) == 2
+
+
+class TestGatewayDatabaseTier:
+    def _add_row(self, db, gateway, prompt, response):
+        key = gateway._generate_cache_key(prompt, None, 0.0, 100, "text")
+        db.add(LLMCache(
+            prompt_hash=key, provider="deepseek", model="deepseek-chat", prompt=prompt,
+            response=response, response_format="text", hit_count=0,
+        ))
+        db.commit()
+        return key
+
+    def test_db_hit_is_promoted_and_hits_flushed_in_batch(self, gateway, test_db):
+        key = self._add_row(test_db, gateway, "stored", "from db")
+
+        for _ in range(3):
+            assert gateway.call("stored", temperature=0.0, max_tokens=100, db_session=test_db) == "from db"
+        assert gateway.api_calls == []
+        assert len(gateway.memory_cache) == 1
+
+        # No per-hit UPDATE: counters stay pending until the batch flush
+        test_db.expire_all()
+        assert test_db.query(LLMCache).filter_by(prompt_hash=key).one().hit_count == 0
+
+        assert gateway.memory_cache.flush_hits(db_session=test_db) == 1
+        test_db.commit()
+        test_db.expire_all()
+        assert test_db.query(LLMCache).filter_by(prompt_hash=key).one().hit_count == 3
+
+    def test_flush_triggered_by_batch_size(self, test_db):
+        import threading
+
+        flushed = []
+        flush_done = threading.Event()
+        cache = LLMResponseCache(hit_flush_interval=3600, hit_flush_batch=2)
+
+        def _flush(db_session=None):
+            flushed.append(dict(cache._pending_hits))
+            cache._pending_hits = {}
+            flush_done.set()
+
+        cache.flush_hits = _flush
+        cache.record_hit("a")
+        assert not flush_done.wait(0.1)
+        cache.record_hit("b")
+        assert flush_done.wait(5)
+        assert len(flushed) == 1 and set(flushed[0]) == {"a", "b"}
+        cache.close()
+
+    def test_pending_hits_flushed_periodically_without_new_hits(self):
+        import threading
+
+        flush_done = threading.Event()
+        cache = LLMResponseCache(hit_flush_interval=0.05, hit_flush_batch=100)
+
+        def _flush(db_session=None):
+            if cache._pending_hits:
+                flush_done.set()
+            cache._pending_hits = {}
+
+        cache.flush_hits = _flush
+        cache.record_hit("a")  # a single hit, then the process goes idle
+        assert flush_done.wait(5)
+        cache.close()
+        assert not cache._flush_thread.is_alive()
+
+    def test_hits_after_close_restart_the_flusher(self):
+        import threading
+
+        flush_done = threading.Event()
+        cache = LLMResponseCache(hit_flush_interval=3600, hit_flush_batch=1)
+
+        def _flush(db_session=None):
+            if cache._pending_hits:
+                flush_done.set()
+            cache._pending_hits = {}
+
+        cache.flush_hits = _flush
+        cache.close()
+
+        cache.record_hit("late")
+        assert flush_done.wait(5)
+        assert cache._flush_thread.is_alive()
+        cache.close()
+
+    def test_only_db_backed_hits_are_flushed_off_the_caller_thread(self):
+        import threading
+
+        flush_threads = []
+        flush_done = threading.Event()
+        cache = LLMResponseCache(hit_flush_interval=3600, hit_flush_batch=1)
+
+        def _flush(db_session=None):
+            flush_threads.append(threading.current_thread())
+            cache._pending_hits = {}
+            flush_done.set()
+
+        cache.flush_hits = _flush
+        cache.put("memory-only", "x")
+        cache.put("from-db", "y", persisted=True)
+
+        assert cache.get("memory-only") == "x"
+        assert cache._pending_hits == {} and cache._flush_thread is None
+
+        assert cache.get("from-db") == "y"
+        assert flush_done.wait(5)
+        assert flush_threads[0] is cache._flush_thread
+        assert flush_threads[0] is not threading.current_thread()
+        cache.close()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight coalescing of identical in-flight LLMGateway requests.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config.settings import settings
+from src.services.llm_gateway import LLMGateway, _IN_FLIGHT
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gw = LLMGateway(provider="deepseek", model="deepseek-chat")
+    gw.use_rate_limiter = False
+    gw.memory_cache = None  # isolate coalescing from the response cache
+    gw.api_calls = []
+    lock = threading.Lock()
+
+    def _slow_api_call(prompt, system_prompt, temperature, max_tokens, **kwargs):
+        with lock:
+            gw.api_calls.append(prompt)
+        time.sleep(0.2)
+        if prompt == "fail":
+            raise RuntimeError("provider error")
+        return '{"risks": [{"title": "r"}]}'
+
+    async def _slow_async_api_call(prompt, system_prompt, temperature, max_tokens, **kwargs):
+        with lock:
+            gw.api_calls.append(prompt)
+        await asyncio.sleep(0.2)
+        return '{"risks": [{"title": "r"}]}'
+
+    monkeypatch.setattr(gw, "_make_api_call", _slow_api_call)
+    monkeypatch.setattr(gw, "_amake_api_call", _slow_async_api_call)
+    monkeypatch.setattr(settings, "llm_single_flight_enabled", True)
+    return gw
+
+
+def test_concurrent_identical_calls_share_one_upstream_request(gateway):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: gateway.call("same", response_format="json"), range(8)))
+
+    assert gateway.api_calls == ["same"]
+    assert all(result == {"risks": [{"title": "r"}]} for result in results)
+    # every caller owns its dict
+    assert len({id(result) for result in results}) == 8
+    assert _IN_FLIGHT.in_flight() == 0
+
+
+def test_different_prompts_are_not_coalesced(gateway):
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda i: gateway.call(f"prompt {i}", response_format="json"), range(4)))
+    assert len(gateway.api_calls) == 4
+
+
+def test_use_cache_false_is_not_coalesced(gateway):
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda _: gateway.call("same", use_cache=False), range(3)))
+    assert len(gateway.api_calls) == 3
+
+
+def test_errors_propagate_to_all_waiters(gateway):
+    def _call(_):
+        try:
+            gateway.call("fail", retry_attempts=1)
+        except RuntimeError as exc:
+            return str(exc)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        errors = list(pool.map(_call, range(4)))
+
+    assert errors == ["provider error"] * 4
+    assert gateway.api_calls == ["fail"]
+    assert _IN_FLIGHT.in_flight() == 0
+
+
+def test_acall_and_call_share_one_request(gateway):
+    async def _run():
+        loop = asyncio.get_running_loop()
+        sync_call = loop.run_in_executor(None, lambda: gateway.call("same", response_format="json"))
+        async_calls = [gateway.acall("same", response_format="json") for _ in range(5)]
+        return await asyncio.gather(sync_call, *async_calls)
+
+    results = asyncio.run(_run())
+
+    assert gateway.api_calls == ["same"]
+    assert len(results) == 6
+    assert all(result == {"risks": [{"title": "r"}]} for result in results)
+
+
+def test_thread_pool_acall_and_call_share_one_request(gateway, monkeypatch):
+    monkeypatch.setattr(settings, "llm_native_async", False)
+    test_acall_and_call_share_one_request(gateway)
+
+
+def test_cancelled_leader_hands_off_to_a_follower(gateway):
+    async def _run():
+        leader = asyncio.create_task(gateway.acall("same", response_format="json"))
+        await asyncio.sleep(0.05)
+        followers = [asyncio.create_task(gateway.acall("same", response_format="json")) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        followers[0].cancel()  # a cancelled follower does not touch the shared future
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers, return_exceptions=True)
+
+    results = asyncio.run(_run())
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert all(result == {"risks": [{"title": "r"}]} for result in results[1:])
+    assert gateway.api_calls == ["same", "same"]
+    assert _IN_FLIGHT.in_flight() == 0
+
+
+def test_sync_call_on_loop_thread_does_not_wait_for_async_leader(gateway):
+    async def _run():
+        leader = asyncio.create_task(gateway.acall("same", response_format="json"))
+        await asyncio.sleep(0.05)
+        # A blocking follower here would starve the leader on this very loop
+        result = gateway.call("same", response_format="json")
+        return result, await leader
+
+    sync_result, leader_result = asyncio.run(_run())
+
+    assert sync_result == leader_result == {"risks": [{"title": "r"}]}
+    assert gateway.api_calls == ["same", "same"]
+    assert _IN_FLIGHT.in_flight() == 0
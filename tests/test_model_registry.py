@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Model registry: one model per process, micro-batched encode/rerank (stub models).
+"""
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import src.services.model_registry as model_registry
+from config.settings import settings
+from src.services.model_registry import MicroBatcher, ModelRegistry
+
+
+class _Embedder:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, show_progress_bar=False, **kwargs):
+        self.batches.append((list(texts), kwargs))
+        time.sleep(0.01)
+        return np.array([[float(len(t)), float(i)] for i, t in enumerate(texts)])
+
+
+class _CrossEncoder:
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, pairs, show_progress_bar=False, **kwargs):
+        self.batches.append(len(pairs))
+        return np.array([float(len(doc)) for _, doc in pairs])
+
+
+@pytest.fixture
+def loads():
+    return []
+
+
+@pytest.fixture
+def registry(loads):
+    def loader(kind, name, device, options):
+        loads.append((kind, name, device, options))
+        time.sleep(0.05)
+        return _Embedder() if kind == "embedder" else _CrossEncoder()
+
+    return ModelRegistry(loader=loader, batch_wait_ms=50, max_batch=64)
+
+
+def _in_threads(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i):
+        barrier.wait()
+        results[i] = target(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_model_loaded_once_per_process(registry, loads):
+    models = _in_threads(8, lambda i: registry.embedder("e5"))
+
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+    assert registry.reranker("dity", device="cpu", max_length=512) is registry.reranker("dity", device="cpu", max_length=512)
+    assert registry.reranker("dity", device="cpu") is not registry.reranker("dity", device="cpu", max_length=512)
+
+
+def test_concurrent_encode_calls_share_a_batch(registry):
+    embedder = registry.embedder("e5")
+
+    results = _in_threads(8, lambda i: embedder.encode([f"текст {i}", "x" * i]))
+
+    assert len(embedder.model.batches) == 1
+    assert len(embedder.model.batches[0][0]) == 16
+    for i, result in enumerate(results):
+        assert result.shape == (2, 2)
+        assert list(result[:, 0]) == [float(len(f"текст {i}")), float(i)]
+    assert embedder.get_stats()['avg_batch_size'] == 16
+
+
+def test_single_string_and_kwargs_groups(registry):
+    embedder = registry.embedder("user2")
+
+    results = _in_threads(4, lambda i: embedder.encode("запрос", prompt_name="search_query" if i % 2 else None))
+
+    assert all(result.shape == (2,) for result in results)
+    assert sorted(kwargs.get("prompt_name") or "" for _, kwargs in embedder.model.batches) == ["", "search_query"]
+
+
+def test_rerank_batches_pairs(registry):
+    reranker = registry.reranker("dity")
+
+    results = _in_threads(5, lambda i: reranker.rerank("неустойка", ["a" * i, "bb"]))
+
+    assert reranker.model.batches == [10]
+    assert results[3] == [3.0, 2.0]
+    assert reranker.predict([]) == []
+
+
+def test_batch_size_is_capped():
+    sizes = []
+    batcher = MicroBatcher(lambda key, items: sizes.append(len(items)) or list(items), wait_seconds=0.05, max_batch=4)
+
+    results = _in_threads(6, lambda i: batcher.submit(None, [i, i]))
+
+    assert results == [[i, i] for i in range(6)]
+    assert max(sizes) <= 4 and sum(sizes) == 12
+
+
+def test_errors_reach_every_caller():
+    def fail(key, items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(fail, wait_seconds=0.02, max_batch=8)
+    errors = _in_threads(3, lambda i: pytest.raises(RuntimeError, batcher.submit, None, [i]))
+
+    assert all("model failed" in str(error.value) for error in errors)
+
+
+def test_onnx_backend_uses_onnx_loader(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(model_registry, "_load_onnx_model", lambda *args: loaded.append(args) or _CrossEncoder())
+
+    registry = ModelRegistry(backend="onnx", batch_wait_ms=0)
+
+    assert registry.reranker("dity", device="cpu", max_length=512).rerank("q", ["abc"]) == [3.0]
+    assert loaded == [("reranker", "dity", "cpu", {"max_length": 512})]
+    assert registry.get_stats()[0]['backend'] == "onnx"
+
+
+def test_concurrent_onnx_exports_publish_one_complete_directory(tmp_path, monkeypatch):
+    import sys
+    import types
+
+    class _Model:
+        def save(self, path):
+            (Path(path) / "onnx").mkdir(parents=True)
+            (Path(path) / "config.json").write_text("{}")
+
+    def export(model, quantization_config, model_name_or_path, file_suffix):
+        nonlocal exports
+        exports += 1
+        target = Path(model_name_or_path) / "onnx" / f"model_{file_suffix}.onnx"
+        target.write_text("partial")
+        time.sleep(0.05)
+        target.write_text("complete")
+
+    backend = types.ModuleType("sentence_transformers.backend")
+    backend.export_dynamic_quantized_onnx_model = export
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.ModuleType("sentence_transformers"))
+    monkeypatch.setitem(sys.modules, "sentence_transformers.backend", backend)
+    monkeypatch.setattr(model_registry, "_quantization_config", lambda: "avx2")
+
+    exports = 0
+    export_dir = tmp_path / "onnx_models" / "paraphrase"
+    quantized = export_dir / "onnx" / "model_qint8.onnx"
+    seen = []
+
+    def worker(_):
+        model_registry._export_quantized_onnx(_Model, "paraphrase", export_dir, "onnx/model_qint8.onnx")
+        seen.append(quantized.read_text())
+
+    # Недописанный экспорт старой версии заменяется
+    (export_dir / "onnx").mkdir(parents=True)
+    _in_threads(4, worker)
+
+    assert seen == ["complete"] * 4
+    assert exports == 1
+    assert [p.name for p in export_dir.parent.iterdir() if not p.name.endswith(".lock")] == ["paraphrase"]
+
+
+def test_int8_onnx_matches_torch_within_tolerance(tmp_path, monkeypatch):
+    """Needs sentence-transformers[onnx] and the model in the local HF cache"""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum")
+    pytest.importorskip("sentence_transformers")
+    monkeypatch.setattr(settings, "rag_model_onnx_dir", str(tmp_path))
+    monkeypatch.setenv("HF_HUB_OFFLINE", "1")
+    texts = ["неустойка за просрочку поставки", "расторжение договора аренды", "задаток при покупке квартиры"]
+
+    try:
+        torch_model = ModelRegistry(backend="torch", batch_wait_ms=0).embedder("paraphrase-multilingual-MiniLM-L12-v2")
+    except Exception as e:
+        pytest.skip(f"model unavailable offline: {e}")
+    onnx_model = ModelRegistry(backend="onnx", batch_wait_ms=0).embedder("paraphrase-multilingual-MiniLM-L12-v2")
+
+    expected, actual = torch_model.encode(texts), onnx_model.encode(texts)
+    cosine = (expected * actual).sum(axis=1) / (np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1))
+    assert cosine.min() >= model_registry.ONNX_MIN_COSINE
@@ -57,6 +57,7 @@ def test_export_docx_preserves_original_bytes(tmp_path: Path):
         file_path=str(original_path),
         analysis_results=[],
         meta_info={},
+        parsed_xml=None,
         upload_date=datetime.now(timezone.utc),
         document_type='contract',
         contract_type='supply',
@@ -85,6 +86,7 @@ def test_export_xml_returns_canonical_valid_xml(tmp_path: Path):
         file_path=str(original_path),
         analysis_results=[],
         meta_info={},
+        parsed_xml=None,
         upload_date=datetime.now(timezone.utc),
         document_type='contract',
         contract_type='supply',
@@ -111,9 +113,8 @@ def test_cross_format_export_requires_explicit_lossy_confirmation(tmp_path: Path
         file_name='source.pdf',
         file_path=str(source_path),
         analysis_results=[],
-        meta_info={
-            'xml': '<contract><title>Договор</title><clauses><clause><title>1. Предмет</title><paragraph>Текст договора.</paragraph></clause></clauses></contract>'
-        },
+        meta_info={},
+        parsed_xml='<contract><title>Договор</title><clauses><clause><title>1. Предмет</title><paragraph>Текст договора.</paragraph></clause></clauses></contract>',
         upload_date=datetime.now(timezone.utc),
         document_type='contract',
         contract_type='supply',
@@ -136,9 +137,8 @@ def test_cross_format_export_generates_best_effort_docx_after_confirmation(tmp_p
         file_name='source.pdf',
         file_path=str(source_path),
         analysis_results=[],
-        meta_info={
-            'xml': '<contract><metadata><title>Без названия</title></metadata><clauses><clause type="preamble"><title>Преамбула</title><content><paragraph>ДОГОВОР ПОСТАВКИ</paragraph></content></clause><clause><title>1. Предмет</title><content><paragraph>Поставщик обязуется поставить зерно.</paragraph></content></clause></clauses><tables><table><row><cell>Продавец: ООО Ромашка</cell><cell>Покупатель: ООО Василек</cell></row></table></tables></contract>'
-        },
+        meta_info={},
+        parsed_xml='<contract><metadata><title>Без названия</title></metadata><clauses><clause type="preamble"><title>Преамбула</title><content><paragraph>ДОГОВОР ПОСТАВКИ</paragraph></content></clause><clause><title>1. Предмет</title><content><paragraph>Поставщик обязуется поставить зерно.</paragraph></content></clause></clauses><tables><table><row><cell>Продавец: ООО Ромашка</cell><cell>Покупатель: ООО Василек</cell></row></table></tables></contract>',
         upload_date=datetime.now(timezone.utc),
         document_type='contract',
         contract_type='supply',
@@ -173,9 +173,8 @@ def test_cross_format_export_generates_best_effort_pdf_after_confirmation(tmp_pa
         file_name='source.docx',
         file_path=str(source_path),
         analysis_results=[],
-        meta_info={
-            'xml': '<contract><metadata><title>Без названия</title></metadata><clauses><clause type="preamble"><title>Преамбула</title><content><paragraph>ДОГОВОР УСЛУГ</paragraph></content></clause><clause><title>1. Предмет</title><content><paragraph>Исполнитель оказывает услуги.</paragraph></content></clause></clauses><tables><table><row><cell>Исполнитель: ООО Альфа</cell><cell>Заказчик: ООО Бета</cell></row></table></tables></contract>'
-        },
+        meta_info={},
+        parsed_xml='<contract><metadata><title>Без названия</title></metadata><clauses><clause type="preamble"><title>Преамбула</title><content><paragraph>ДОГОВОР УСЛУГ</paragraph></content></clause><clause><title>1. Предмет</title><content><paragraph>Исполнитель оказывает услуги.</paragraph></content></clause></clauses><tables><table><row><cell>Исполнитель: ООО Альфа</cell><cell>Заказчик: ООО Бета</cell></row></table></tables></contract>',
         upload_date=datetime.now(timezone.utc),
         document_type='contract',
         contract_type='service',
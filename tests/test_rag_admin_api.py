@@ -179,6 +179,15 @@ class TestUploadRateLimit:
 
 class TestAdminRAGRetriever:
 
+    @pytest.fixture(autouse=True)
+    def _fresh_caches(self):
+        from src.services import admin_rag_retriever
+        admin_rag_retriever.clear_result_cache()
+        admin_rag_retriever.invalidate_collection_catalog()
+        yield
+        admin_rag_retriever.clear_result_cache()
+        admin_rag_retriever.invalidate_collection_catalog()
+
     def test_has_legal_docs_false_when_empty(self):
         mock_coll = MagicMock()
         mock_coll.count.return_value = 0
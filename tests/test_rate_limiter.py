@@ -523,5 +523,201 @@ class TestRealWorldScenarios:
         assert stats['total_cost'] <= 10.0
 
 
+def _age_entries(limiter, seconds_left):
+    """Сдвинуть записи окна RPM/TPM так, чтобы они истекли через seconds_left секунд"""
+    stamp = time.time() - 60 + seconds_left
+    for queue in [limiter.request_times, limiter.token_usage, *limiter.tenant_requests.values(), *limiter.tenant_tokens.values()]:
+        for i, (_, value) in enumerate(list(queue)):
+            queue[i] = (stamp, value)
+
+
+def _refill(limiter):
+    """Истечь текущее окно и сразу пропустить ожидающих (вместо ожидания минуты)"""
+    _age_entries(limiter, 0)
+    with limiter.lock:
+        limiter._dispatch()
+
+
+def _wait_queued(limiter, count, timeout=2.0):
+    deadline = time.time() + timeout
+    while limiter.get_stats()['queued_requests'] < count:
+        assert time.time() < deadline, "waiters were not queued"
+        time.sleep(0.01)
+
+
+class TestBlockingMode:
+    """Test blocking (queueing) mode"""
+
+    def test_waits_for_refill_instead_of_raising(self):
+        limiter = RateLimiter(requests_per_minute=2, blocking=True, max_wait=5)
+        for _ in range(2):
+            with limiter.acquire():
+                pass
+        _age_entries(limiter, 0.3)
+
+        started = time.time()
+        with limiter.acquire():
+            pass
+
+        assert time.time() - started >= 0.2
+        stats = limiter.get_stats()
+        assert stats['total_requests'] == 3
+        assert stats['total_queued'] == 1
+        assert stats['queued_requests'] == 0
+
+    def test_timeout_raises_and_leaves_queue(self):
+        limiter = RateLimiter(requests_per_minute=1, blocking=True)
+        with limiter.acquire():
+            pass
+
+        with pytest.raises(RateLimitExceeded, match="timed out"):
+            with limiter.acquire(timeout=0.1):
+                pass
+
+        assert limiter.get_stats()['queued_requests'] == 0
+        assert limiter.total_requests == 1
+
+    def test_request_larger_than_limit_fails_fast(self):
+        limiter = RateLimiter(tokens_per_minute=100, blocking=True)
+
+        with pytest.raises(RateLimitExceeded, match="larger than the limit"):
+            with limiter.acquire(tokens=101):
+                pass
+
+    def test_fifo_then_priority_order(self):
+        limiter = RateLimiter(requests_per_minute=1, blocking=True, max_wait=5)
+        with limiter.acquire():
+            pass
+
+        order = []
+
+        def worker(name, priority):
+            with limiter.acquire(priority=priority):
+                order.append(name)
+
+        threads = []
+        for count, (name, priority) in enumerate([("first", 5), ("second", 5), ("urgent", 0)], start=1):
+            t = threading.Thread(target=worker, args=(name, priority))
+            t.start()
+            threads.append(t)
+            _wait_queued(limiter, count)
+
+        for _ in range(3):
+            _refill(limiter)
+            time.sleep(0.05)
+
+        for t in threads:
+            t.join(timeout=2)
+
+        assert order == ["urgent", "first", "second"]
+
+    def test_tenant_sub_bucket_does_not_block_other_tenants(self):
+        limiter = RateLimiter(
+            requests_per_minute=10, tenant_requests_per_minute=1, blocking=True, max_wait=5
+        )
+        with limiter.acquire(tenant="org-a"):
+            pass
+
+        done = []
+        t = threading.Thread(target=lambda: done.append(limiter.acquire(tenant="org-a").__enter__()))
+        t.start()
+        _wait_queued(limiter, 1)
+
+        # org-a waits for its own bucket, org-b goes straight through
+        with limiter.acquire(tenant="org-b", timeout=0.5):
+            pass
+        assert not done
+
+        _refill(limiter)
+        t.join(timeout=2)
+        assert len(done) == 1
+        assert limiter.total_requests == 3
+
+    def test_async_acquire(self):
+        import asyncio
+
+        limiter = RateLimiter(requests_per_minute=3, tokens_per_minute=300, blocking=True, max_wait=5)
+        for _ in range(3):
+            with limiter.acquire(tokens=100):
+                pass
+        _age_entries(limiter, 0.2)
+
+        async def one():
+            async with limiter.acquire(tokens=100):
+                return True
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            tick_task = asyncio.create_task(ticker())
+            results = await asyncio.gather(*(one() for _ in range(3)))
+            tick_task.cancel()
+            return results, ticks
+
+        results, ticks = asyncio.run(run())
+
+        assert results == [True, True, True]
+        # The event loop kept running while the callers waited
+        assert ticks >= 5
+        assert limiter.get_stats()['total_tokens'] == 600
+
+
+class TestTenantLimits:
+    """Test per-tenant sub-buckets in the default (raising) mode"""
+
+    def test_tenant_limit_enforced(self):
+        limiter = RateLimiter(tenant_tokens_per_minute=1000)
+
+        with limiter.acquire(tokens=800, tenant="org-a"):
+            pass
+
+        with pytest.raises(RateLimitExceeded, match="Tenant token rate limit"):
+            with limiter.acquire(tokens=300, tenant="org-a"):
+                pass
+
+        with limiter.acquire(tokens=300, tenant="org-b"):
+            pass
+
+        assert limiter.get_stats()['active_tenants'] == 2
+
+    def test_gateway_tenant_reaches_limiter(self):
+        from src.services.llm_gateway import LLMGateway
+
+        gateway = LLMGateway(provider="deepseek", model="deepseek-chat", rate_limit_tenant="org-a")
+        gateway.rate_limiter = RateLimiter(tenant_requests_per_minute=1)
+
+        with gateway._rate_limit_slot(100, **gateway._pop_rate_limit_options({})):
+            pass
+        with pytest.raises(RateLimitExceeded, match="Tenant"):
+            with gateway._rate_limit_slot(100, **gateway._pop_rate_limit_options({})):
+                pass
+
+        # An explicit per-call tenant wins and is not forwarded to the provider
+        kwargs = {"rate_limit_tenant": "org-b", "temperature": 0}
+        with gateway._rate_limit_slot(100, **gateway._pop_rate_limit_options(kwargs)):
+            pass
+        assert kwargs == {"temperature": 0}
+
+    def test_tenant_scope_does_not_pin_shared_gateway(self):
+        from src.services.llm_gateway import LLMGateway, rate_limit_tenant_scope
+
+        gateway = LLMGateway(provider="deepseek", model="deepseek-chat")
+
+        with rate_limit_tenant_scope("org-a"):
+            assert gateway._pop_rate_limit_options({})["tenant"] == "org-a"
+        with rate_limit_tenant_scope("org-b"):
+            assert gateway._pop_rate_limit_options({})["tenant"] == "org-b"
+            assert gateway._pop_rate_limit_options({"rate_limit_tenant": "org-c"})["tenant"] == "org-c"
+
+        assert gateway._pop_rate_limit_options({})["tenant"] is None
+        assert gateway.rate_limit_tenant is None
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
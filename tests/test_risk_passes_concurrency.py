@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent vs sequential execution of the two risk-identification passes
+(full-text Pass 1 and clause-level Pass 2) in ContractAnalyzerAgent.
+"""
+import threading
+import time
+
+import pytest
+
+from config.settings import settings
+from src.agents.contract_analyzer_agent import ContractAnalyzerAgent
+from src.services.llm_gateway import _RATE_LIMIT_TENANT, rate_limit_tenant_scope
+
+
+FULL_TEXT_DELAY = 0.05
+BATCH_DELAY = 0.02
+
+
+def _contract_xml(clause_count: int = 10) -> str:
+    clauses = "".join(
+        f'<clause id="{i}"><title>{i}. Раздел {i}</title>'
+        f'<paragraph>Стороны обязуются исполнить условие номер {i} в полном объёме и в срок.</paragraph></clause>'
+        for i in range(1, clause_count + 1)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><contract>{clauses}</contract>'
+
+
+class _StubGateway:
+    """LLM gateway stub with fixed per-call latency and deterministic answers."""
+
+    provider = "deepseek"
+    model = "stub"
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def is_local_provider(self) -> bool:
+        return False
+
+    def call(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if "ПОЛНЫЙ ТЕКСТ ДОГОВОРА" in prompt:
+            time.sleep(FULL_TEXT_DELAY)
+            return {
+                "risks": [
+                    {"type": "compliance", "severity": "significant", "title": "Системный риск баланса сторон"},
+                    {"type": "financial", "severity": "high", "title": "Риск раздел 1"},
+                ],
+                "required_fields": [{"title": "Цена договора", "description": "Не указана цена"}],
+            }
+        time.sleep(BATCH_DELAY)
+        return {"analyses": []}
+
+
+@pytest.fixture
+def make_agent(test_db, monkeypatch):
+    monkeypatch.setattr(settings, "full_text_analysis", True)
+    monkeypatch.setattr(settings, "llm_test_mode", False)
+    monkeypatch.setattr(settings, "llm_batch_size", 20)
+    monkeypatch.setattr(settings, "max_concurrent_batches", 1)
+
+    def _factory(concurrent: bool, gateway=None):
+        monkeypatch.setattr(settings, "risk_passes_concurrent", concurrent)
+        agent = ContractAnalyzerAgent(
+            llm_gateway=gateway or _StubGateway(),
+            db_session=test_db,
+            template_manager=object(),
+            counterparty_service=object(),
+        )
+        agent._required_fields = []
+        agent._placeholder_clause_ids = set()
+        agent._clause_analyses = []
+        return agent
+
+    return _factory
+
+
+def _run(agent):
+    progress = []
+    agent._progress_updater = lambda pct, msg: progress.append((pct, msg, threading.current_thread().name))
+    risks = agent._identify_risks(_contract_xml(), {}, {}, None, analysis_context={})
+    return risks, progress
+
+
+def _snapshot(agent, risks):
+    return (
+        [(r.title, r.severity, r.risk_type, r.section_name) for r in risks],
+        [f.get('title') for f in agent._required_fields],
+        len(agent._clause_analyses),
+        agent._full_text_analysis,
+    )
+
+
+def test_concurrent_mode_merges_like_sequential(make_agent):
+    sequential_agent = make_agent(concurrent=False)
+    sequential_risks, _ = _run(sequential_agent)
+
+    concurrent_agent = make_agent(concurrent=True)
+    concurrent_risks, progress = _run(concurrent_agent)
+
+    assert _snapshot(concurrent_agent, concurrent_risks) == _snapshot(sequential_agent, sequential_risks)
+    assert concurrent_risks[0].section_name == 'full_text_analysis'
+    # Progress is always reported from the caller thread that owns the DB session.
+    main_thread = threading.current_thread().name
+    assert progress and all(thread == main_thread for _, _, thread in progress)
+
+
+def test_full_text_failure_does_not_break_concurrent_mode(make_agent, monkeypatch):
+    agent = make_agent(concurrent=True)
+
+    def _boom(**kwargs):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(agent.risk_analyzer, "analyze_full_text", _boom)
+    risks, _ = _run(agent)
+
+    assert agent._full_text_analysis is None
+    assert all(r.section_name != 'full_text_analysis' for r in risks)
+    assert len(agent._clause_analyses) == len(agent.clause_extractor.extract_clauses(_contract_xml()))
+
+
+class _OverlapGateway(_StubGateway):
+    """Full-text call and the first clause batch only return once both are in flight."""
+
+    def __init__(self):
+        super().__init__()
+        self.barrier = threading.Barrier(2, timeout=5)
+        self.overlapped = {}
+
+    def call(self, prompt, **kwargs):
+        kind = "full_text" if "ПОЛНЫЙ ТЕКСТ ДОГОВОРА" in prompt else "clauses"
+        if kind not in self.overlapped:
+            self.overlapped[kind] = None
+            try:
+                self.barrier.wait()
+                self.overlapped[kind] = True
+            except threading.BrokenBarrierError:
+                self.overlapped[kind] = False
+        return super().call(prompt, **kwargs)
+
+
+def test_concurrent_mode_overlaps_the_two_passes(make_agent):
+    gateway = _OverlapGateway()
+    agent = make_agent(concurrent=True, gateway=gateway)
+
+    _run(agent)
+
+    # Both passes reached the barrier together: Pass 1 did not block Pass 2
+    assert gateway.overlapped == {"full_text": True, "clauses": True}
+
+
+class _TenantRecordingGateway(_StubGateway):
+    """Records the rate limiter tenant and thread every clause batch call runs with."""
+
+    def __init__(self):
+        super().__init__()
+        self.batch_calls = []
+
+    def call(self, prompt, **kwargs):
+        if "ПОЛНЫЙ ТЕКСТ ДОГОВОРА" not in prompt:
+            self.batch_calls.append((_RATE_LIMIT_TENANT.get(), threading.current_thread().name))
+        return super().call(prompt, **kwargs)
+
+
+def test_clause_batch_workers_keep_the_rate_limit_tenant(make_agent, monkeypatch):
+    monkeypatch.setattr(settings, "llm_batch_size", 3)
+    monkeypatch.setattr(settings, "max_concurrent_batches", 3)
+    gateway = _TenantRecordingGateway()
+    agent = make_agent(concurrent=True, gateway=gateway)
+
+    with rate_limit_tenant_scope("org-a"):
+        _run(agent)
+
+    assert len(gateway.batch_calls) > 1
+    assert {tenant for tenant, _ in gateway.batch_calls} == {"org-a"}
+    assert all(thread != threading.current_thread().name for _, thread in gateway.batch_calls)